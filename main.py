@@ -286,6 +286,13 @@ if __name__ == "__main__":
                 print(f"ERROR: Falló la ejecución directa de yt-dlp: {e}")
                 sys.exit(1)
 
+    # --- BENCHMARK DE CÓDECS SIN INTERFAZ ---
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark-encoders":
+        if PROJECT_ROOT not in sys.path:
+            sys.path.insert(0, PROJECT_ROOT)
+        from src.core.encoder_benchmark import run_cli
+        sys.exit(run_cli(sys.argv[2:]))
+
     # 1. Mostrar Splash INMEDIATAMENTE
     splash = SplashScreen()
     splash.update_status("Verificando instancia única...")
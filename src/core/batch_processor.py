@@ -1,22 +1,30 @@
 import threading
-import time
+import queue
 from uuid import uuid4
 import os
-import yt_dlp
 import shutil
+from urllib.parse import urlparse
+from contextlib import contextmanager
 
-import requests
 from PIL import Image
 from io import BytesIO
 
-from src.core.downloader import download_media, apply_site_specific_rules, apply_yt_patch
+from src.core.downloader import (
+    download_media, apply_site_specific_rules, apply_yt_patch, apply_segmented_download,
+    ydl_sessions, set_ydl_outtmpl, FormatStream
+)
 from src.core.exceptions import UserCancelledError
+from src.core.queue_journal import QueueJournal
+from src.core.thumbnail_harvester import ThumbnailHarvester
+from src.core.metadata_cache import cookie_key_from_opts
 from src.core.video_upscaler import VideoUpscaler
 from main import UPSCALING_DIR
 
 from src.core.constants import (
     EDITOR_FRIENDLY_CRITERIA, LANGUAGE_ORDER, DEFAULT_PRIORITY,
-    VIDEO_EXTENSIONS, AUDIO_EXTENSIONS
+    VIDEO_EXTENSIONS, AUDIO_EXTENSIONS,
+    BATCH_DEFAULT_DOWNLOAD_WORKERS, BATCH_DEFAULT_PER_HOST_LIMIT, BATCH_DEFAULT_RECODE_WORKERS,
+    BATCH_DEFAULT_PLAYLIST_WORKERS, DOWNLOAD_DEFAULT_CONNECTIONS
 )
 
 
@@ -43,13 +51,80 @@ def get_smart_thumbnail_extension(image_data):
         print(f"ERROR detectando formato de miniatura: {e}")
         return '.jpg'  # Fallback seguro
 
+def _default_recode_workers():
+    """
+    Tamaño automático del pool de recodificación. FFmpeg ya usa varios hilos
+    por proceso, así que se reserva aproximadamente 4 núcleos por trabajo.
+    """
+    return max(1, (os.cpu_count() or 1) // 4)
+
+class _PlaylistItemHook:
+    """
+    Hook de progreso de un worker de playlist. El YoutubeDL es siempre el
+    mismo; lo que cambia entre ítems es el callback y el título.
+    """
+    def __init__(self, pause_event: threading.Event):
+        self.pause_event = pause_event
+        self.progress_callback = None
+        self.title = ""
+
+    def set_item(self, progress_callback, title: str):
+        self.progress_callback = progress_callback
+        self.title = title
+
+    def __call__(self, d):
+        if self.pause_event.is_set():
+            # Truco para pausar yt-dlp: lanzar error
+            raise UserCancelledError("Pausado")
+
+        if not self.progress_callback:
+            return
+
+        if d['status'] == 'downloading':
+            total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
+            downloaded = d.get('downloaded_bytes', 0)
+            if total > 0:
+                pct = (downloaded / total) * 100
+                self.progress_callback(pct, f"Descargando: {self.title}")
+        elif d['status'] == 'finished':
+            self.progress_callback(100, f"Procesando: {self.title}")
+
+class _PlaylistProgress:
+    """Progreso agregado de una playlist cuyos ítems se descargan en paralelo."""
+    def __init__(self, total_items: int):
+        self.total_items = max(1, total_items)
+        self.item_percents: dict[int, float] = {}
+        self.done_count = 0
+        self.failed_items: set[int] = set()
+        self._lock = threading.Lock()
+
+    def update(self, item: int, percent: float) -> tuple[float, int]:
+        """Registra el % de un ítem y devuelve (% global, ítems terminados)."""
+        with self._lock:
+            self.item_percents[item] = max(self.item_percents.get(item, 0.0), min(percent, 100.0))
+            global_percent = sum(self.item_percents.values()) / self.total_items
+            return global_percent, self.done_count
+
+    def mark_done(self, item: int):
+        with self._lock:
+            self.item_percents[item] = 100.0
+            self.done_count += 1
+
+    def mark_failed(self, item: int):
+        """Ítem con error: no cuenta como terminado ni suma al % global."""
+        with self._lock:
+            self.item_percents.pop(item, None)
+            self.failed_items.add(item)
+
 class Job:
     """
     Contiene la información y el estado de un único trabajo en la cola.
     """
     def __init__(self, config: dict, job_type: str = "DOWNLOAD"):
+        self._manager: "QueueManager | None" = None # Se asigna en add_job
         self.job_id: str = str(uuid4()) 
         self.config: dict = config 
+        self.analysis_version: int = 0 # Sube con cada asignación de analysis_data (ver QueueJournal)
         self.analysis_data: dict | None = None
         self.status: str = "PENDING"
         self.progress_message: str = ""
@@ -57,19 +132,55 @@ class Job:
         self.total_items: int = 0
         self.job_type: str = job_type
 
+    @property
+    def analysis_data(self) -> dict | None:
+        return self._analysis_data
+
+    @analysis_data.setter
+    def analysis_data(self, value: dict | None):
+        self._analysis_data = value
+        self.analysis_version += 1
+
+    @property
+    def status(self) -> str:
+        return self._status
+
+    @status.setter
+    def status(self, value: str):
+        # El estado se cambia desde muchos sitios (worker, pestaña de lotes...).
+        # Avisar al QueueManager mantiene sus índices al día y despierta al despachador.
+        old_status = getattr(self, '_status', None)
+        self._status = value
+        if self._manager is not None and old_status != value:
+            self._manager._on_job_status_change(self, old_status, value)
+
 class QueueManager:
     """
     Gestiona la cola de trabajos (Jobs) en un hilo de trabajo separado
     para no bloquear la interfaz de usuario.
+
+    El hilo despachador reparte los trabajos en dos pools independientes:
+    'download' (red, DOWNLOAD/PLAYLIST) y 'recode' (CPU, LOCAL_RECODE),
+    respetando además un límite de trabajos simultáneos por servidor.
     """
+    # Pool al que pertenece cada tipo de trabajo
+    JOB_POOLS = {
+        "DOWNLOAD": "download",
+        "PLAYLIST": "download",
+        "LOCAL_RECODE": "recode",
+    }
+
     def __init__(self, main_app, ui_callback):
         self.main_app = main_app
         self.ui_callback = ui_callback
 
-        self.analysis_cache = {}
-        
-        self.jobs: list[Job] = []
-        self.jobs_lock = threading.Lock()
+        # Índices O(1): por ID (en orden de llegada) y por estado
+        self.jobs_by_id: dict[str, Job] = {}
+        self.jobs_by_status: dict[str, dict[str, Job]] = {}
+        # RLock: Job.status puede cambiar mientras ya se tiene el candado
+        self.jobs_lock = threading.RLock()
+        # El despachador duerme aquí hasta que algo cambie en la cola
+        self.jobs_changed = threading.Condition(self.jobs_lock)
         
         self.run_thread = None
         self.pause_event = threading.Event()
@@ -78,9 +189,150 @@ class QueueManager:
         
         self.user_paused: bool = False
         self.jobs_completed: int = 0 
+
+        # --- Concurrencia (pools por tipo y límite por servidor) ---
+        self.max_workers = {"download": BATCH_DEFAULT_DOWNLOAD_WORKERS, "recode": 1}
+        self.max_jobs_per_host = BATCH_DEFAULT_PER_HOST_LIMIT
+        self.playlist_item_workers = BATCH_DEFAULT_PLAYLIST_WORKERS
+
+        # Sesión HTTP compartida para miniaturas (reutiliza conexiones)
+        self.thumbnail_harvester = ThumbnailHarvester(
+            sanitize_filename=lambda name: self.main_app.single_tab.sanitize_filename(name)
+        )
+        self.active_workers = {"download": 0, "recode": 0}
+        self.active_hosts: dict[str, int] = {}
+        self.job_threads: dict[str, threading.Thread] = {}
+        # Rutas de salida ya asignadas a trabajos en curso (ruta normalizada -> dueño).
+        # Con varios trabajos a la vez, os.path.exists no basta: el archivo aún no existe.
+        self.reserved_outputs: dict[str, str] = {}
+
+        # --- Diario persistente de la cola (sobrevive a cierres inesperados) ---
+        self.journal: QueueJournal | None = None
+        self.journaled_job_ids: set[str] = set()
+        app_data_dir = getattr(main_app, 'APP_DATA_DIR', None)
+        if app_data_dir:
+            self.journal = QueueJournal(os.path.join(app_data_dir, "batch_queue.jsonl"))
+
+        self.set_concurrency(
+            downloads=getattr(main_app, 'batch_max_downloads_saved', BATCH_DEFAULT_DOWNLOAD_WORKERS),
+            recodes=getattr(main_app, 'batch_max_recodes_saved', BATCH_DEFAULT_RECODE_WORKERS),
+            per_host=getattr(main_app, 'batch_max_per_host_saved', BATCH_DEFAULT_PER_HOST_LIMIT),
+            playlist_items=getattr(main_app, 'batch_playlist_workers_saved', BATCH_DEFAULT_PLAYLIST_WORKERS)
+        )
         
         print("INFO: QueueManager inicializado.")
 
+    def set_concurrency(self, downloads=None, recodes=None, per_host=None, playlist_items=None):
+        """
+        Ajusta el tamaño de los pools. Los cambios se aplican al siguiente
+        despacho; los trabajos en curso no se interrumpen.
+        recodes = 0 significa automático (según núcleos de la CPU).
+        playlist_items = ítems de una playlist que se descargan a la vez.
+        """
+        with self.jobs_lock:
+            if downloads is not None:
+                self.max_workers["download"] = max(1, int(downloads))
+            if recodes is not None:
+                recodes = int(recodes)
+                self.max_workers["recode"] = recodes if recodes > 0 else _default_recode_workers()
+            if per_host is not None:
+                self.max_jobs_per_host = max(1, int(per_host))
+            if playlist_items is not None:
+                self.playlist_item_workers = max(1, int(playlist_items))
+            self.jobs_changed.notify_all()
+
+        print(f"INFO: Concurrencia de lotes: {self.max_workers['download']} descargas, "
+              f"{self.max_workers['recode']} recodificaciones, {self.max_jobs_per_host} por servidor, "
+              f"{self.playlist_item_workers} ítems por playlist.")
+
+    @property
+    def jobs(self) -> list[Job]:
+        """Instantánea ordenada de todos los trabajos (para recorridos de la UI)."""
+        with self.jobs_lock:
+            return list(self.jobs_by_id.values())
+
+    def _on_job_status_change(self, job: Job, old_status: str | None, new_status: str):
+        """Mueve el trabajo entre los índices de estado y despierta al despachador."""
+        with self.jobs_changed:
+            if job.job_id not in self.jobs_by_id:
+                return
+            if old_status is not None:
+                self.jobs_by_status.get(old_status, {}).pop(job.job_id, None)
+            self.jobs_by_status.setdefault(new_status, {})[job.job_id] = job
+            self.jobs_changed.notify_all()
+            if job.job_id in self.journaled_job_ids:
+                # Solo se encola (el fsync lo hace el hilo del diario), así que
+                # el orden del diario es el de los cambios bajo el candado
+                self.journal.record_status(job.job_id, new_status)
+
+    def persist_jobs(self, jobs: list[Job]):
+        """
+        Guarda en el diario la configuración (y el análisis) de los trabajos
+        ya listos. Llamar cada vez que la UI termine de configurar un trabajo
+        o cambie su configuración. Los trabajos aún sin analizar se ignoran.
+        """
+        if not self.journal:
+            return
+        with self.jobs_lock:
+            jobs = [job for job in jobs
+                    if job.job_id in self.jobs_by_id and job.analysis_data is not None]
+        if not jobs:
+            return
+
+        # Copiar el análisis puede tardar: se hace sin el candado
+        records = self.journal.job_records(jobs)
+
+        with self.jobs_lock:
+            # Estado al día y sin los trabajos quitados mientras tanto; a partir
+            # de aquí sus cambios de estado se encolan detrás de este registro
+            records = [record for record in records if record["job_id"] in self.jobs_by_id]
+            for record in records:
+                record["status"] = self.jobs_by_id[record["job_id"]].status
+                self.journaled_job_ids.add(record["job_id"])
+            self.journal.write_records(records)
+
+    def persist_job(self, job: Job):
+        self.persist_jobs([job])
+
+    def restore_from_journal(self) -> list[Job]:
+        """
+        Rehidrata los trabajos que quedaron sin terminar en la sesión anterior,
+        con su análisis incluido (no hace falta volver a llamar a yt-dlp).
+        """
+        if not self.journal:
+            return []
+
+        try:
+            saved_states = self.journal.load_unfinished()
+        except Exception as e:
+            print(f"ERROR: No se pudo leer el diario de la cola: {e}")
+            return []
+
+        restored = []
+        for state in saved_states:
+            if state["job_id"] in self.jobs_by_id:
+                continue
+            job = Job(config=state["config"], job_type=state["job_type"])
+            job.job_id = state["job_id"]
+            job.analysis_data = state.get("analysis_data")
+            self.add_job(job)
+
+            with self.jobs_lock:
+                self.journaled_job_ids.add(job.job_id)
+            self.journal.mark_persisted(job)
+            restored.append(job)
+
+        if restored:
+            print(f"INFO: Se restauraron {len(restored)} trabajos pendientes del diario de la cola.")
+        return restored
+
+    def _count_jobs(self, status: str) -> int:
+        return len(self.jobs_by_status.get(status, {}))
+
+    def _count_finished_jobs(self) -> int:
+        """Trabajos que ya no están en la cola de espera (ni PENDING ni RUNNING)."""
+        return len(self.jobs_by_id) - self._count_jobs("PENDING") - self._count_jobs("RUNNING")
+
     def start_worker_thread(self):
         """Inicia el hilo de trabajo si no está ya corriendo."""
         if self.run_thread is None or not self.run_thread.is_alive():
@@ -92,101 +344,162 @@ class QueueManager:
     def stop_worker_thread(self):
         """Detiene el hilo de trabajo."""
         self.stop_event.set()
+        with self.jobs_changed:
+            self.jobs_changed.notify_all()
         if self.run_thread:
             self.run_thread.join()
         print("INFO: Hilo de trabajo de la cola detenido.")
 
+    def _get_job_host(self, job: Job) -> str | None:
+        """Devuelve el servidor de un trabajo de red (None para trabajos locales)."""
+        if self.JOB_POOLS.get(job.job_type) != "download":
+            return None
+        host = urlparse(job.config.get('url') or '').hostname or ''
+        return host[4:] if host.startswith('www.') else host
+
+    def _claim_next_job(self) -> Job | None:
+        """
+        Busca el primer trabajo PENDING cuyo pool y servidor tengan hueco,
+        lo marca como RUNNING y reserva su plaza. Debe llamarse con jobs_lock.
+        """
+        for job in list(self.jobs_by_status.get("PENDING", {}).values()):
+            pool = self.JOB_POOLS.get(job.job_type, "download")
+            if self.active_workers[pool] >= self.max_workers[pool]:
+                continue
+
+            host = self._get_job_host(job)
+            if host and self.active_hosts.get(host, 0) >= self.max_jobs_per_host:
+                continue
+
+            job.status = "RUNNING"
+            self.active_workers[pool] += 1
+            if host:
+                self.active_hosts[host] = self.active_hosts.get(host, 0) + 1
+            return job
+        return None
+
+    def _release_job_slot(self, job: Job):
+        """Libera la plaza reservada por _claim_next_job."""
+        with self.jobs_lock:
+            pool = self.JOB_POOLS.get(job.job_type, "download")
+            self.active_workers[pool] = max(0, self.active_workers[pool] - 1)
+
+            host = self._get_job_host(job)
+            if host:
+                remaining = self.active_hosts.get(host, 0) - 1
+                if remaining > 0:
+                    self.active_hosts[host] = remaining
+                else:
+                    self.active_hosts.pop(host, None)
+
+            self.job_threads.pop(job.job_id, None)
+            self.jobs_changed.notify_all()
+
     def _worker_thread(self):
         """
         El bucle principal que se ejecuta en segundo plano.
-        Busca trabajos pendientes y los procesa.
+        Duerme en la condición 'jobs_changed' y despacha trabajos a su pool
+        en cuanto hay uno pendiente y una plaza libre (sin sondeo).
         """
         print("DEBUG: El worker de lotes ha empezado a escuchar...")
-        while not self.stop_event.is_set():
-            if self.pause_event.is_set():
-                time.sleep(1)
-                continue
-
+        while True:
             job_to_run: Job | None = None
-            with self.jobs_lock:
-                job_to_run = next((job for job in self.jobs if job.status == "PENDING"), None)
-                if job_to_run:
-                    job_to_run.status = "RUNNING"
+            with self.jobs_changed:
+                while not self.stop_event.is_set():
+                    if not self.pause_event.is_set():
+                        job_to_run = self._claim_next_job()
+                        if job_to_run:
+                            break
+                        if not self._count_jobs("PENDING") and not self.job_threads:
+                            self._on_queue_idle()
+                    self.jobs_changed.wait()
+
+                if job_to_run is None:
+                    break
+                job_thread = threading.Thread(target=self._run_job, args=(job_to_run,), daemon=True)
+                self.job_threads[job_to_run.job_id] = job_thread
+
+            job_thread.start()
             
-            if job_to_run:
-                try:
-                    # --- INICIO DE MODIFICACIÓN: Lógica de enrutamiento ---
-                    if job_to_run.job_type == "DOWNLOAD":
-                        self._execute_download_job(job_to_run)
-                    elif job_to_run.job_type == "LOCAL_RECODE":
-                        self._execute_recode_job(job_to_run)
-                    elif job_to_run.job_type == "PLAYLIST":  # <--- NUEVO CASO
-                        self._execute_playlist_job(job_to_run)
-                    else:
-                        raise Exception(f"Tipo de trabajo desconocido: {job_to_run.job_type}")
-                    # --- FIN DE MODIFICACIÓN ---
+        print("DEBUG: El worker de lotes ha sido detenido.")
+
+    def _on_queue_idle(self):
+        """No quedan trabajos pendientes ni en curso."""
+        batch_tab = self.main_app.batch_tab
+        if batch_tab:
+            if not batch_tab.auto_download_checkbox.get():
+                # Auto-descarga está OFF. Pausar la cola automáticamente.
+                if not self.pause_event.is_set():
+                    print("INFO: Cola completada. Auto-descargar deshabilitado, pausando...")
+                    self.pause_event.set()
+                    self.user_paused = False # <-- NO fue el usuario
+                    self.ui_callback("QUEUE_STATUS", "PAUSED", "")
+            else:
+                # Auto-descarga está ON. La cola simplemente espera
+                # a que add_job la despierte.
+                self.user_paused = False
+
+    def _run_job(self, job_to_run: Job):
+        """Ejecuta un trabajo en su propio hilo y publica el progreso global."""
+        try:
+            # --- INICIO DE MODIFICACIÓN: Lógica de enrutamiento ---
+            if job_to_run.job_type == "DOWNLOAD":
+                self._execute_download_job(job_to_run)
+            elif job_to_run.job_type == "LOCAL_RECODE":
+                self._execute_recode_job(job_to_run)
+            elif job_to_run.job_type == "PLAYLIST":  # <--- NUEVO CASO
+                self._execute_playlist_job(job_to_run)
+            else:
+                raise Exception(f"Tipo de trabajo desconocido: {job_to_run.job_type}")
+            # --- FIN DE MODIFICACIÓN ---
 
-                except UserCancelledError as e:
-                    job_to_run.status = "PENDING"
-                    self.ui_callback(job_to_run.job_id, "PENDING", f"Pausado: {e}")
+        except UserCancelledError as e:
+            job_to_run.status = "PENDING"
+            self.ui_callback(job_to_run.job_id, "PENDING", f"Pausado: {e}")
+        
+        except Exception as e:
+            print(f"ERROR: Falló el trabajo {job_to_run.job_id}: {e}")
+            job_to_run.status = "FAILED"
+            self.ui_callback(job_to_run.job_id, "FAILED", f"Error: {str(e)[:100]}")
+
+        finally:
+            self._release_outputs(job_to_run.job_id)
+            self._release_job_slot(job_to_run)
+        
+        # --- INICIO DE MODIFICACIÓN (Progreso Global) ---
+        # Este bloque se ejecuta SIEMPRE, ya sea que el job haya fallado,
+        # se haya completado, o se haya omitido (dentro de _execute_job)
+        if job_to_run.status not in ("PENDING", "RUNNING"):
+            with self.jobs_lock:
+                # Contar todos los trabajos que ya no están en la cola de espera
+                self.jobs_completed = self._count_finished_jobs()
+                total_jobs = len(self.jobs_by_id)
                 
-                except Exception as e:
-                    print(f"ERROR: Falló el trabajo {job_to_run.job_id}: {e}")
-                    job_to_run.status = "FAILED"
-                    self.ui_callback(job_to_run.job_id, "FAILED", f"Error: {str(e)[:100]}")
+            if total_jobs > 0:
+                progress_percent = self.jobs_completed / total_jobs
                 
-                # --- INICIO DE MODIFICACIÓN (Progreso Global) ---
-                # Este bloque se ejecuta SIEMPRE, ya sea que el job haya fallado,
-                # se haya completado, o se haya omitido (dentro de _execute_job)
-                if job_to_run.status not in ("PENDING", "RUNNING"):
-                    with self.jobs_lock:
-                        # Contar todos los trabajos que ya no están en la cola de espera
-                        self.jobs_completed = sum(1 for j in self.jobs if j.status not in ("PENDING", "RUNNING"))
-                        total_jobs = len(self.jobs)
-                        
-                    if total_jobs > 0:
-                        progress_percent = self.jobs_completed / total_jobs
-                        
-                        # Mensaje de progreso
-                        current_title = job_to_run.config.get('title', 'Ítem')
-                        if len(current_title) > 40:
-                            current_title = current_title[:37] + "..."
-                        
-                        progress_message = f"({self.jobs_completed}/{total_jobs}) Completado: {current_title}"
-                        
-                        if job_to_run.status == "FAILED":
-                            progress_message = f"({self.jobs_completed}/{total_jobs}) Falló: {current_title}"
-                        elif job_to_run.status == "SKIPPED":
-                            progress_message = f"({self.jobs_completed}/{total_jobs}) Omitido: {current_title}"
-                        
-                        self.ui_callback("GLOBAL_PROGRESS", "UPDATE", progress_message, progress_percent)
-                # --- FIN DE MODIFICACIÓN ---
-            
-            else:
-                # No hay trabajos pendientes
-                batch_tab = self.main_app.batch_tab
-                if batch_tab:
-                    if not batch_tab.auto_download_checkbox.get():
-                        # Auto-descarga está OFF. Pausar la cola automáticamente.
-                        if not self.pause_event.is_set():
-                            print("INFO: Cola completada. Auto-descargar deshabilitado, pausando...")
-                            self.pause_event.set()
-                            self.user_paused = False # <-- NO fue el usuario
-                            self.ui_callback("QUEUE_STATUS", "PAUSED", "")
-                    else:
-                        # Auto-descarga está ON. La cola simplemente espera.
-                        # Si llegamos aquí, la cola está inactiva (sin trabajos)
-                        # y no fue pausada por el usuario.
-                        self.user_paused = False
+                # Mensaje de progreso
+                current_title = job_to_run.config.get('title', 'Ítem')
+                if len(current_title) > 40:
+                    current_title = current_title[:37] + "..."
                 
-                time.sleep(1) 
-            
-        print("DEBUG: El worker de lotes ha sido detenido.")
+                progress_message = f"({self.jobs_completed}/{total_jobs}) Completado: {current_title}"
+                
+                if job_to_run.status == "FAILED":
+                    progress_message = f"({self.jobs_completed}/{total_jobs}) Falló: {current_title}"
+                elif job_to_run.status == "SKIPPED":
+                    progress_message = f"({self.jobs_completed}/{total_jobs}) Omitido: {current_title}"
+                
+                self.ui_callback("GLOBAL_PROGRESS", "UPDATE", progress_message, progress_percent)
+        # --- FIN DE MODIFICACIÓN ---
 
     def add_job(self, job: Job):
         """Añade un nuevo trabajo a la cola y notifica a la UI."""
-        with self.jobs_lock:
-            self.jobs.append(job)
+        with self.jobs_changed:
+            job._manager = self
+            self.jobs_by_id[job.job_id] = job
+            self.jobs_by_status.setdefault(job.status, {})[job.job_id] = job
+            self.jobs_changed.notify_all()
             print(f"INFO: Nuevo trabajo añadido a la cola: {job.config.get('title', job.job_id)}")
         
         self.ui_callback(job.job_id, "PENDING", job.config.get('title', 'Trabajo pendiente...'))
@@ -197,6 +510,8 @@ class QueueManager:
             print("INFO: Reanudando la cola de lotes.")
             self.pause_event.clear()
             self.user_paused = False # <-- El usuario REANUDA
+            with self.jobs_changed:
+                self.jobs_changed.notify_all()
         
         self.start_worker_thread()
         self.ui_callback("QUEUE_STATUS", "RUNNING", "")
@@ -204,9 +519,9 @@ class QueueManager:
         # ✅ CORRECCIÓN: Forzar actualización inmediata de la barra
         # Esto elimina el "100%" residual del análisis y pone la barra en 0% (o en el estado actual)
         with self.jobs_lock:
-            total_jobs = len(self.jobs)
+            total_jobs = len(self.jobs_by_id)
             # Recalcular completados reales al momento de iniciar
-            current_completed = sum(1 for j in self.jobs if j.status not in ("PENDING", "RUNNING"))
+            current_completed = self._count_finished_jobs()
             
             # Sincronizar el contador interno
             self.jobs_completed = current_completed
@@ -227,21 +542,26 @@ class QueueManager:
 
     def remove_job(self, job_id: str):
         """Elimina un trabajo de la cola usando su ID."""
-        with self.jobs_lock:
-            job_to_remove = next((j for j in self.jobs if j.job_id == job_id), None)
+        with self.jobs_changed:
+            job_to_remove = self.jobs_by_id.get(job_id)
             if job_to_remove:
                 if job_to_remove.status == "RUNNING":
                     job_to_remove.status = "FAILED"
                 
-                self.jobs.remove(job_to_remove)
+                del self.jobs_by_id[job_id]
+                self.jobs_by_status.get(job_to_remove.status, {}).pop(job_id, None)
+                job_to_remove._manager = None
+                if job_id in self.journaled_job_ids:
+                    self.journaled_job_ids.discard(job_id)
+                    self.journal.record_remove(job_id)
+                self.jobs_changed.notify_all()
                 print(f"INFO: Trabajo {job_id} eliminado de la cola.")
             else:
                 print(f"ADVERTENCIA: Se intentó eliminar el job {job_id} pero no se encontró.")
 
     def get_job_by_id(self, job_id: str) -> Job | None:
         """Obtiene un objeto Job por su ID."""
-        with self.jobs_lock:
-            return next((j for j in self.jobs if j.job_id == job_id), None)
+        return self.jobs_by_id.get(job_id)
 
     def reset_progress(self):
         """Resetea el contador de progreso global."""
@@ -287,31 +607,33 @@ class QueueManager:
             # Crear carpeta específica de thumbnails dentro de la playlist (opcional, o usar la raíz de la playlist)
             # El usuario pidió "descargue las miniaturas de la playlist", lo pondremos en la carpeta de la playlist.
             
-            for i, index in enumerate(selected_indices):
-                if self.pause_event.is_set(): return 
-                if self.stop_event.is_set(): return
-
-                if index >= len(entries): continue
+            thumb_items = []
+            for index in selected_indices:
+                if index >= len(entries) or not entries[index]: continue
                 entry = entries[index]
-                video_title = entry.get('title', f"Video {index}")
-                
+                thumb_items.append((entry.get('title', f"Video {index}"), entry))
+
+            auto_send = self.main_app.batch_tab.auto_send_to_it_checkbox.get() == 1
+
+            def on_thumb_done(done, total, video_title, thumb_path):
                 # Calcular progreso
-                percent = ((i + 1) / total_videos) * 100
-                msg = f"[{i+1}/{total_videos}] Miniatura: {video_title[:20]}..."
+                percent = (done / total) * 100
+                msg = f"[{done}/{total}] Miniatura: {video_title[:20]}..."
                 self.ui_callback(job.job_id, "RUNNING", msg, percent)
-                
-                # Descargar SOLO la miniatura en PNG
-                try:
-                    # 1. Capturamos la ruta
-                    thumb_path = self._download_best_thumb_png(entry, playlist_dir, video_title)
-                    
-                    # 2. Verificar si Auto-envío está activo
-                    if thumb_path and self.main_app.batch_tab.auto_send_to_it_checkbox.get() == 1:
-                        # 3. Enviar a Herramientas de Imagen (Usando after para seguridad de hilos)
-                        self.main_app.after(0, self.main_app.image_tab._process_imported_files, [thumb_path])
-                        
-                except Exception as e:
-                    print(f"ERROR miniatura {i}: {e}")
+
+                # Enviar a Herramientas de Imagen (Usando after para seguridad de hilos)
+                if thumb_path and auto_send:
+                    self.main_app.after(0, self.main_app.image_tab._process_imported_files, [thumb_path])
+
+            # Descarga en paralelo (sesión HTTP con pool) y conversión a PNG en procesos
+            self.thumbnail_harvester.harvest(
+                thumb_items, playlist_dir,
+                cancel_event=self.pause_event,
+                on_item_done=on_thumb_done
+            )
+
+            if self.pause_event.is_set() or self.stop_event.is_set():
+                return
             
             job.status = "COMPLETED"
             job.final_filepath = playlist_dir
@@ -319,69 +641,136 @@ class QueueManager:
             return
 
         # --- CASO NORMAL (VIDEO/AUDIO) ---
+        # Cada worker reutiliza un único YoutubeDL configurado (cookies, parche,
+        # formato) y va tomando ítems de una cola compartida.
+        item_queue = queue.Queue()
         for i, index in enumerate(selected_indices):
-            if self.pause_event.is_set():
-                self.ui_callback(job.job_id, "PENDING", f"Pausado en video {i+1}/{total_videos}")
-                return 
-            if self.stop_event.is_set(): return
-            
-            if index >= len(entries): continue
-            entry = entries[index]
-            
-            video_url = entry.get('url')
-            video_title = entry.get('title', f"Video {index}")
-            
-            # Callback de progreso interno
-            def playlist_progress_callback(vid_percent, vid_message):
-                chunk_size = 100 / total_videos
-                base_progress = i * chunk_size
-                current_contribution = (vid_percent / 100) * chunk_size
-                global_percent = base_progress + current_contribution
-                
-                short_title = (video_title[:20] + '..') if len(video_title) > 20 else video_title
-                status_msg = f"[{i+1}/{total_videos}] {short_title}: {vid_percent:.0f}%"
-                self.ui_callback(job.job_id, "RUNNING", status_msg, global_percent)
-
-            # Opciones de descarga
-            child_options = {
-                'url': video_url,
-                'title': video_title,
-                'output_path': playlist_dir,
-                'mode': mode,
-                'cookie_mode': self.main_app.cookies_mode_saved,
-            }
-            
-            self._apply_playlist_quality(child_options, mode, quality_setting)
-            
-            # Inicializar variables para importación
-            thumb_path = None
-            final_path_for_import = None
+            if index < len(entries) and entries[index]:
+                item_queue.put((i, entries[index]))
+
+        num_workers = max(1, min(self.playlist_item_workers, item_queue.qsize()))
+        progress = _PlaylistProgress(total_videos)
+        postprocess_lock = threading.Lock()
+
+        format_options = {}
+        self._apply_playlist_quality(format_options, mode, quality_setting)
+
+        def report_progress(i, video_title, vid_percent):
+            global_percent, done = progress.update(i, vid_percent)
+            short_title = (video_title[:20] + '..') if len(video_title) > 20 else video_title
+            status_msg = f"[{done}/{total_videos}] {short_title}: {vid_percent:.0f}%"
+            if num_workers > 1:
+                status_msg += f" ({num_workers} en paralelo)"
+            self.ui_callback(job.job_id, "RUNNING", status_msg, global_percent)
+
+        def item_worker():
+            with self._playlist_ydl_session(format_options.get('format_selector', 'best'),
+                                            self._get_job_download_connections(job)) as (ydl, item_hook):
+                while not (self.pause_event.is_set() or self.stop_event.is_set()):
+                    try:
+                        i, entry = item_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    success = self._process_playlist_item(
+                        job, ydl, item_hook, i, entry, total_videos, playlist_dir, playlist_title,
+                        mode, quality_setting, thumbnail_mode, conflict_policy,
+                        postprocess_lock, report_progress
+                    )
+                    if success:
+                        progress.mark_done(i)
+                    elif not (self.pause_event.is_set() or self.stop_event.is_set()):
+                        # Si se pausó o detuvo, el ítem no falló: queda a medias
+                        progress.mark_failed(i)
+
+        if num_workers > 1:
+            print(f"INFO: Playlist en modo paralelo: {num_workers} descargas simultáneas.")
+            workers = [threading.Thread(target=item_worker, daemon=True) for _ in range(num_workers)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        else:
+            item_worker()
 
-            try:
-                # 1. Descargar Video/Audio
-                downloaded_path = self._download_single_video_in_playlist(child_options, playlist_progress_callback, job.job_id)
-                
-                # ✅ ROBUSTEZ: Corregir ruta si cambió la extensión (ej: Solo Audio)
-                if downloaded_path and not os.path.exists(downloaded_path):
-                    base_path_no_ext = os.path.splitext(downloaded_path)[0]
-                    for ext in ['.m4a', '.mp3', '.mp4', '.webm', '.opus', '.wav']:
-                        candidate = f"{base_path_no_ext}{ext}"
-                        if os.path.exists(candidate):
-                            downloaded_path = candidate
-                            break
+        if self.stop_event.is_set():
+            return
+        if self.pause_event.is_set():
+            self.ui_callback(job.job_id, "PENDING", f"Pausado en video {progress.done_count + 1}/{total_videos}")
+            return
 
-                final_path_for_import = downloaded_path # Por defecto, es el descargado
-                
+        job.status = "COMPLETED"
+        job.final_filepath = playlist_dir
+        if progress.failed_items:
+            print(f"ADVERTENCIA: Playlist '{playlist_title}': {len(progress.failed_items)} ítems con errores.")
+            self.ui_callback(job.job_id, "COMPLETED",
+                             f"Playlist completada ✅ ({len(progress.failed_items)}/{total_videos} con errores)", 100.0)
+        else:
+            self.ui_callback(job.job_id, "COMPLETED", "Playlist completada ✅", 100.0)
+
+    def _process_playlist_item(self, job: Job, ydl, item_hook, i, entry, total_videos, playlist_dir,
+                               playlist_title, mode, quality_setting, thumbnail_mode, conflict_policy,
+                               postprocess_lock, report_progress):
+        """
+        Descarga y post-procesa un ítem de la playlist usando el YoutubeDL del
+        worker. Los errores se registran y no detienen al resto de ítems.
+        Devuelve True si el ítem se completó.
+        """
+        video_url = entry.get('url')
+        video_title = entry.get('title', f"Video {i + 1}")
+        item_owner = f"{job.job_id}:{i}"
+        # Títulos repetidos son habituales en playlists: cada ítem reserva el suyo
+        file_title = self._reserve_playlist_title(
+            playlist_dir, self.main_app.single_tab.sanitize_filename(video_title), item_owner
+        )
+
+        # Callback de progreso interno
+        def playlist_progress_callback(vid_percent, vid_message):
+            report_progress(i, video_title, vid_percent)
+
+        # Opciones de descarga
+        child_options = {
+            'url': video_url,
+            'title': file_title,
+            'output_path': playlist_dir,
+            'mode': mode,
+            'cookie_mode': self.main_app.cookies_mode_saved,
+        }
+        
+        self._apply_playlist_quality(child_options, mode, quality_setting)
+        
+        # Inicializar variables para importación
+        thumb_path = None
+        final_path_for_import = None
+
+        try:
+            # 1. Descargar Video/Audio
+            downloaded_path = self._download_single_video_in_playlist(
+                child_options, playlist_progress_callback, job.job_id, ydl=ydl, item_hook=item_hook
+            )
+            
+            # ✅ ROBUSTEZ: Corregir ruta si cambió la extensión (ej: Solo Audio)
+            if downloaded_path and not os.path.exists(downloaded_path):
+                base_path_no_ext = os.path.splitext(downloaded_path)[0]
+                for ext in ['.m4a', '.mp3', '.mp4', '.webm', '.opus', '.wav']:
+                    candidate = f"{base_path_no_ext}{ext}"
+                    if os.path.exists(candidate):
+                        downloaded_path = candidate
+                        break
+
+            final_path_for_import = downloaded_path # Por defecto, es el descargado
+            
+            # El post-proceso (CPU/GPU) va de uno en uno; las descargas siguen en paralelo
+            with postprocess_lock:
                 # ✅ LÓGICA DE HERENCIA DE RECODIFICACIÓN
                 if job.config.get('recode_enabled', False) and downloaded_path and os.path.exists(downloaded_path):
-                    
+                
                     preset_name = job.config.get('recode_preset_name')
                     preset_params = self._find_preset_params(preset_name)
-                    
+                
                     if preset_params:
                         output_dir = os.path.dirname(downloaded_path)
                         base_name = os.path.splitext(os.path.basename(downloaded_path))[0]
-                        
+                    
                         # ✅ CORRECCIÓN: Inyectar el modo de la playlist en las opciones
                         recode_options = preset_params.copy()
                         recode_options['mode'] = mode 
@@ -397,7 +786,7 @@ class QueueManager:
                                 self.ui_callback(job.job_id, "RUNNING", f"[{i+1}/{total_videos}] Fotogramas: {video_title}...")
                                 folder_name = f"{base_name}_frames"
                                 final_output_directory = os.path.join(output_dir, folder_name)
-                                
+                            
                                 extraction_options = {
                                     'input_file': downloaded_path,
                                     'output_folder': final_output_directory,
@@ -407,17 +796,17 @@ class QueueManager:
                                     'duration': self._get_job_media_duration(job, downloaded_path),
                                     'pre_params': []
                                 }
-                                
+                            
                                 output_folder = self.main_app.ffmpeg_processor.execute_video_to_images(
                                     extraction_options,
                                     lambda p, m: self.ui_callback(job.job_id, "RUNNING", f"[{i+1}/{total_videos}] Extraer {p:.1f}%"),
                                     self.pause_event
                                 )
-                                
+                            
                                 if not preset_params.get('keep_original_file', True):
                                     try: os.remove(downloaded_path)
                                     except OSError: pass
-                                
+                            
                                 final_path_for_import = output_folder
                                 processed_by_extra = True
 
@@ -426,35 +815,42 @@ class QueueManager:
                                 scale_str = str(preset_params.get("upscale_scale", "2")).replace("x", "")
                                 out_stem = f"{base_name}_upscaled_x{scale_str}"
                                 desired_out_path = os.path.join(output_dir, out_stem + ".mp4")
-                                
+                            
                                 # Resolución de conflictos
-                                out_path, _ = self._resolve_batch_conflict(desired_out_path, conflict_policy)
-                                
+                                out_path, _ = self._resolve_batch_conflict(desired_out_path, conflict_policy, owner=item_owner)
+                            
                                 if out_path:
                                     ffmpeg_dir = os.path.dirname(self.main_app.ffmpeg_processor.ffmpeg_path)
                                     upscaler = VideoUpscaler(
                                         ffmpeg_dir=ffmpeg_dir,
                                         upscaling_dir=UPSCALING_DIR,
                                         cancellation_event=self.pause_event,
-                                        progress_callback=lambda p, m: self.ui_callback(job.job_id, "RUNNING", f"[{i+1}/{total_videos}] {m} ({p:.1f}%)" if isinstance(p, float) and p >= 0 else f"[{i+1}/{total_videos}] {m}")
+                                        progress_callback=lambda p, m: self.ui_callback(job.job_id, "RUNNING", f"[{i+1}/{total_videos}] {m} ({p:.1f}%)" if isinstance(p, float) and p >= 0 else f"[{i+1}/{total_videos}] {m}"),
+                                        temp_budget_mb=self.main_app.upscale_temp_budget_saved,
+                                        resume_dir=self.main_app.get_upscale_resume_dir(),
+                                        dedup_mode=self.main_app.upscale_dedup_saved,
+                                        ncnn_devices=self.main_app.upscale_ncnn_devices_saved,
+                                        ncnn_instances=self.main_app.upscale_ncnn_instances_saved,
+                                        frame_format=self.main_app.upscale_frame_format_saved,
+                                        tuning_cache_path=self.main_app.get_upscale_tuning_cache()
                                     )
                                     final_path = upscaler.upscale_video(downloaded_path, out_path, preset_params)
-                                    
+                                
                                     if not preset_params.get('keep_originals', True):
                                         try: os.remove(downloaded_path)
                                         except OSError: pass
-                                        
+                                    
                                     final_path_for_import = final_path
                                     processed_by_extra = True
                                 else:
                                     print(f"INFO: Item {i+1} omitido (upscale ya existe).")
                                     # Si se omite el upscale, final_path_for_import sigue siendo el descargado
-                        
+                    
                         # Si no se procesó por extra, ejecutar recodificación normal
                         if not processed_by_extra:
                             self.ui_callback(job.job_id, "RUNNING", f"[{i+1}/{total_videos}] Recodificando: {video_title}...")
                             recoded_base_name = f"{base_name}_recoded"
-                            
+                        
                             recoded_path = self._execute_recode_master(
                                 job=job,
                                 input_file=downloaded_path,
@@ -463,40 +859,37 @@ class QueueManager:
                                 recode_options=recode_options
                             )
                             final_path_for_import = recoded_path
-                            
+                        
                             if not job.config.get('recode_keep_original', True):
                                 try: os.remove(downloaded_path)
                                 except: pass
+            
+            # 3. Descargar Miniatura (Si el modo es "con video/audio" o "manual" activado)
+            if thumbnail_mode == "with_thumbnail":
+                thumb_path = self._download_best_thumb_png(entry, playlist_dir, file_title)
                 
-                # 3. Descargar Miniatura (Si el modo es "con video/audio" o "manual" activado)
-                if thumbnail_mode == "with_thumbnail":
-                    thumb_path = self._download_best_thumb_png(entry, playlist_dir, video_title)
-                    
-                    # ✅ Lógica de Auto-Envío para ítems de Playlist
-                    if thumb_path and self.main_app.batch_tab.auto_send_to_it_checkbox.get() == 1:
-                        self.main_app.after(0, self.main_app.image_tab._process_imported_files, [thumb_path])
-                    
-                # 4. ✅ LÓGICA DE INTEGRACIÓN CENTRALIZADA
-                if final_path_for_import:
-                    # Determinamos el Bin (Carpeta) de destino
-                    # Usamos el título de la playlist para agrupar los ítems
-                    target_bin_name = playlist_title 
-                    
-                    self.main_app.integration_manager.broadcast_import(
-                        source_path=downloaded_path,
-                        final_path=final_path_for_import,
-                        thumb_path=thumb_path,
-                        workflow_type="batch",
-                        bin_name=target_bin_name
-                    )
-
-            except Exception as e:
-                print(f"ERROR procesando item {i+1} ({video_title}): {e}")
-                continue
+                # ✅ Lógica de Auto-Envío para ítems de Playlist
+                if thumb_path and self.main_app.batch_tab.auto_send_to_it_checkbox.get() == 1:
+                    self.main_app.after(0, self.main_app.image_tab._process_imported_files, [thumb_path])
+                
+            # 4. ✅ LÓGICA DE INTEGRACIÓN CENTRALIZADA
+            if final_path_for_import:
+                # Determinamos el Bin (Carpeta) de destino
+                # Usamos el título de la playlist para agrupar los ítems
+                target_bin_name = playlist_title 
+                
+                self.main_app.integration_manager.broadcast_import(
+                    source_path=downloaded_path,
+                    final_path=final_path_for_import,
+                    thumb_path=thumb_path,
+                    workflow_type="batch",
+                    bin_name=target_bin_name
+                )
+            return True
 
-        job.status = "COMPLETED"
-        job.final_filepath = playlist_dir
-        self.ui_callback(job.job_id, "COMPLETED", "Playlist completada ✅", 100.0)
+        except Exception as e:
+            print(f"ERROR procesando item {i+1} ({video_title}): {e}")
+            return False
 
     def _apply_playlist_quality(self, options, mode, quality_setting):
         """Traduce la selección del menú a selectores de formato de yt-dlp."""
@@ -533,19 +926,13 @@ class QueueManager:
         
         options['format_selector'] = selector
 
-    def _download_single_video_in_playlist(self, options, progress_callback, job_id):
+    def _build_playlist_ydl_opts(self, format_selector: str, connections: int | None = None) -> dict:
         """
-        Versión mini de _execute_download_job para uso interno en playlists.
+        Opciones de yt-dlp comunes a todos los ítems de una playlist.
+        'connections' = conexiones por archivo del trabajo (None = ajuste global).
         """
-        output_dir = options['output_path']
-        title = self.main_app.single_tab.sanitize_filename(options['title'])
-        
-        # Template de salida
-        output_template = os.path.join(output_dir, f"{title}.%(ext)s")
-        
         ydl_opts = {
-            'outtmpl': output_template,
-            'format': options.get('format_selector', 'best'),
+            'format': format_selector,
             'noplaylist': True,
             'quiet': True,
             'no_warnings': True,
@@ -574,38 +961,74 @@ class QueueManager:
         if using_cookies:
             ydl_opts = apply_yt_patch(ydl_opts)
 
-        # Hook de progreso
-        def hook(d):
-            if self.pause_event.is_set():
-                # Truco para pausar yt-dlp: lanzar error
-                raise UserCancelledError("Pausado")
-            
-            if d['status'] == 'downloading':
-                total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
-                downloaded = d.get('downloaded_bytes', 0)
-                if total > 0:
-                    pct = (downloaded / total) * 100
-                    progress_callback(pct, f"Descargando: {title}")
-            elif d['status'] == 'finished':
-                progress_callback(100, f"Procesando: {title}")
+        if connections is None:
+            connections = getattr(self.main_app, 'download_connections_saved', DOWNLOAD_DEFAULT_CONNECTIONS)
+        ydl_opts = apply_segmented_download(ydl_opts, connections)
+
+        return ydl_opts
+
+    @contextmanager
+    def _playlist_ydl_session(self, format_selector: str, connections: int | None = None):
+        """
+        Entrega el YoutubeDL de un worker de playlist, tomado del gestor de
+        sesiones compartido (cookies, parche y formato ya configurados). Se
+        reutiliza para todos sus ítems; el hook devuelto se redirige al ítem
+        en curso.
+        """
+        item_hook = _PlaylistItemHook(self.pause_event)
+        ydl_opts = self._build_playlist_ydl_opts(format_selector, connections)
+        ydl_opts['progress_hooks'] = [item_hook]
+        with ydl_sessions.session(ydl_opts) as ydl:
+            yield ydl, item_hook
 
-        ydl_opts['progress_hooks'] = [hook]
+    def _download_single_video_in_playlist(self, options, progress_callback, job_id, ydl=None, item_hook=None):
+        """
+        Versión mini de _execute_download_job para uso interno en playlists.
+        Si se pasa 'ydl' (con su 'item_hook'), se reutiliza en lugar de crear
+        una instancia nueva por ítem.
+        """
+        output_dir = options['output_path']
+        title = self.main_app.single_tab.sanitize_filename(options['title'])
+        
+        # Template de salida
+        output_template = os.path.join(output_dir, f"{title}.%(ext)s")
+
+        if ydl is None:
+            with self._playlist_ydl_session(options.get('format_selector', 'best')) as (ydl, item_hook):
+                return self._download_single_video_in_playlist(
+                    options, progress_callback, job_id, ydl=ydl, item_hook=item_hook
+                )
+
+        set_ydl_outtmpl(ydl, output_template)
+        item_hook.set_item(progress_callback, title)
         
         # Ejecutar descarga
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                # ✅ CAMBIO: Capturar info para obtener el nombre real del archivo
-                info = ydl.extract_info(options['url'], download=True)
-                
-                # Obtener la ruta final del archivo descargado
-                filename = ydl.prepare_filename(info)
-                return filename # <--- AÑADIR ESTE RETURN
+            # ✅ CAMBIO: Capturar info para obtener el nombre real del archivo
+            info = ydl.extract_info(options['url'], download=True)
+            
+            # Obtener la ruta final del archivo descargado
+            filename = ydl.prepare_filename(info)
+            return filename # <--- AÑADIR ESTE RETURN
                 
         except UserCancelledError:
             raise # Re-lanzar para manejar la pausa arriba
         except Exception as e:
             print(f"Error interno en video playlist: {e}")
             raise e
+        finally:
+            item_hook.set_item(None, "")
+
+    def _get_job_download_connections(self, job: Job) -> int:
+        """
+        Conexiones por archivo: 'download_connections' del trabajo (menú
+        "Conexiones" del panel de lotes; sin la clave = "Global") o el ajuste
+        global de Configuración.
+        """
+        return job.config.get(
+            'download_connections',
+            getattr(self.main_app, 'download_connections_saved', DOWNLOAD_DEFAULT_CONNECTIONS)
+        )
 
     def _execute_download_job(self, job: Job):
         """
@@ -674,19 +1097,29 @@ class QueueManager:
                     ydl_opts['cookiesfrombrowser'] = (browser_arg,)
                     using_cookies = True
                 
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    job.analysis_data = ydl.extract_info(url, download=False)
+                metadata_cache = getattr(self.main_app, 'metadata_cache', None)
+                cookie_key = cookie_key_from_opts(ydl_opts)
+                cached_info = metadata_cache.get(url, cookie_key, "video") if metadata_cache else None
 
-                # Aplicar parche SOLO con cookies
-                if using_cookies:
-                    ydl_opts = apply_yt_patch(ydl_opts)
-                
-                # ✅ INYECCIÓN DEL PARCHE
-                if job.analysis_data:
-                    job.analysis_data = apply_site_specific_rules(job.analysis_data)
+                if cached_info:
+                    job.analysis_data = cached_info
+                else:
+                    with ydl_sessions.session(ydl_opts) as ydl:
+                        job.analysis_data = ydl.extract_info(url, download=False)
+
+                    # Aplicar parche SOLO con cookies
+                    if using_cookies:
+                        ydl_opts = apply_yt_patch(ydl_opts)
+                    
+                    # ✅ INYECCIÓN DEL PARCHE
+                    if job.analysis_data:
+                        job.analysis_data = apply_site_specific_rules(job.analysis_data)
+
+                    # 🆕 CRÍTICO: Normalizar si falta información
+                    job.analysis_data = self._normalize_info_dict(job.analysis_data)
 
-                # 🆕 CRÍTICO: Normalizar si falta información
-                job.analysis_data = self._normalize_info_dict(job.analysis_data)
+                    if metadata_cache and job.analysis_data and 'formats' in job.analysis_data:
+                        metadata_cache.put(url, cookie_key, "video", job.analysis_data)
                     
             except Exception as e:
                 raise Exception(f"No se pudo analizar el video: {e}")
@@ -804,7 +1237,7 @@ class QueueManager:
         predicted_ext = self._predict_final_extension(v_format_dict, a_format_dict, mode)
         desired_filepath = os.path.join(output_dir, f"{title}{predicted_ext}")
         
-        final_filepath, backup_path = self._resolve_batch_conflict(desired_filepath, conflict_policy)
+        final_filepath, backup_path = self._resolve_batch_conflict(desired_filepath, conflict_policy, owner=job.job_id)
         
         if final_filepath is None:
             # ¡ESTA ES LA SOLUCIÓN!
@@ -897,6 +1330,9 @@ class QueueManager:
         if using_cookies:
             ydl_opts = apply_yt_patch(ydl_opts)
 
+        # Descarga segmentada opcional (el trabajo puede sobrescribir el valor global)
+        ydl_opts = apply_segmented_download(ydl_opts, self._get_job_download_connections(job))
+
         # 🔧 GENERACIÓN DE COMANDO CLI EQUIVALENTE
         cli_command = f'yt-dlp -f "{precise_selector}"{cookie_flag} "{url}" -o "{output_template}"'
         
@@ -942,11 +1378,17 @@ class QueueManager:
         
         # Iniciar la descarga
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+            # Modo streaming: descargar y recodificar a la vez, sin archivo intermedio
+            streamed_filepath = None
+            if self._can_stream_recode(job, speed_limit):
+                streamed_filepath = self._try_streaming_recode(job, url, ydl_opts, final_filepath)
+
+            if streamed_filepath is None:
+                with ydl_sessions.session(ydl_opts) as ydl:
+                    ydl.download([url])
             
             # Guardamos la ruta del original descargado para integraciones (DaVinci "Import Everything")
-            original_source_path = final_filepath
+            original_source_path = streamed_filepath or final_filepath
             
             # Limpiar backup si todo salió bien
             if backup_path and os.path.exists(backup_path):
@@ -956,7 +1398,7 @@ class QueueManager:
             
             # Descargar miniatura si está habilitado
             if should_download_thumbnail:
-                thumbnail_path = self._download_thumbnail_alongside_video(job, final_filepath)
+                thumbnail_path = self._download_thumbnail_alongside_video(job, streamed_filepath or final_filepath)
 
             # ✅ CORRECCIÓN: Actualizar ruta final si cambió la extensión (Modo Solo Audio)
             # Si yt-dlp convirtió el video a audio y borró el original, 'final_filepath' apunta a la nada.
@@ -982,7 +1424,11 @@ class QueueManager:
 
             # --- INICIO DE LA LÓGICA DE RECODIFICACIÓN ---
             
-            if job.config.get('recode_enabled', False):
+            if streamed_filepath:
+                # La recodificación ya se hizo durante la descarga
+                final_filepath = streamed_filepath
+
+            elif job.config.get('recode_enabled', False):
                 self.ui_callback(job.job_id, "RUNNING", "Recodificación en cola...")
                 
                 preset_name = job.config.get('recode_preset_name')
@@ -1042,7 +1488,7 @@ class QueueManager:
                         desired_out_path = os.path.join(output_dir, out_stem + ".mp4")
                         
                         # Resolución de conflictos
-                        out_path, _ = self._resolve_batch_conflict(desired_out_path, conflict_policy)
+                        out_path, _ = self._resolve_batch_conflict(desired_out_path, conflict_policy, owner=job.job_id)
                         if out_path is None:
                             job.status = "SKIPPED"
                             self.ui_callback(job.job_id, "SKIPPED", "Omitido: El archivo reescalado ya existe")
@@ -1054,7 +1500,14 @@ class QueueManager:
                             ffmpeg_dir=ffmpeg_dir,
                             upscaling_dir=UPSCALING_DIR,
                             cancellation_event=self.pause_event,
-                            progress_callback=lambda p, m: self.ui_callback(job.job_id, "RUNNING", f"({p:.1f}%) {m}" if isinstance(p, float) and p >= 0 else f"{m}")
+                            progress_callback=lambda p, m: self.ui_callback(job.job_id, "RUNNING", f"({p:.1f}%) {m}" if isinstance(p, float) and p >= 0 else f"{m}"),
+                            temp_budget_mb=self.main_app.upscale_temp_budget_saved,
+                            resume_dir=self.main_app.get_upscale_resume_dir(),
+                            dedup_mode=self.main_app.upscale_dedup_saved,
+                            ncnn_devices=self.main_app.upscale_ncnn_devices_saved,
+                            ncnn_instances=self.main_app.upscale_ncnn_instances_saved,
+                            frame_format=self.main_app.upscale_frame_format_saved,
+                            tuning_cache_path=self.main_app.get_upscale_tuning_cache()
                         )
                         
                         final_path = upscaler.upscale_video(final_filepath, out_path, preset_params)
@@ -1161,6 +1614,68 @@ class QueueManager:
                 os.rename(backup_path, final_filepath)
             raise e
         
+    def _can_stream_recode(self, job: Job, speed_limit) -> bool:
+        """
+        Indica si el trabajo puede descargarse y recodificarse en streaming:
+        opción activada, recodificación sin conservar el original y sin
+        extras (fotogramas/reescalado) que necesiten el archivo en disco.
+        """
+        if not getattr(self.main_app, 'batch_stream_recode_saved', False):
+            return False
+        if not job.config.get('recode_enabled', False) or job.config.get('recode_keep_original', True):
+            return False
+
+        # El límite de velocidad y los ítems de playlist los gestiona la descarga de yt-dlp
+        if speed_limit or job.config.get('playlist_index') is not None:
+            return False
+
+        preset_name = job.config.get('recode_preset_name')
+        if not preset_name or preset_name.startswith('-'):
+            return False
+        preset_params = self._find_preset_params(preset_name)
+        if not preset_params:
+            return False
+        if preset_params.get('extract_frames_enabled') or preset_params.get('upscale_video_enabled'):
+            return False
+        return bool(preset_params.get('recode_video_enabled') or preset_params.get('recode_audio_enabled'))
+
+    def _try_streaming_recode(self, job: Job, url, ydl_opts, source_filepath):
+        """
+        Descarga y recodifica a la vez: los bytes del formato elegido entran
+        directamente a FFmpeg por stdin y el original nunca se escribe en disco.
+        Devuelve la ruta recodificada, o None si el formato no lo permite
+        (video y audio separados, HLS/DASH...) o si falló; en ese caso el
+        trabajo sigue por la descarga normal.
+        """
+        preset_params = self._find_preset_params(job.config.get('recode_preset_name'))
+        output_dir = os.path.dirname(source_filepath)
+        base_name = os.path.splitext(os.path.basename(source_filepath))[0]
+
+        try:
+            with ydl_sessions.session(ydl_opts) as ydl:
+                input_stream = FormatStream.open(ydl, url, self.pause_event)
+                if input_stream is None:
+                    print(f"INFO: Job {job.job_id}: el formato no se puede leer como flujo único, se usa la descarga normal.")
+                    return None
+
+                print(f"INFO: Job {job.job_id}: descarga y recodificación en streaming ({input_stream.info.get('format_id')}).")
+                self.ui_callback(job.job_id, "RUNNING", "Descargando y recodificando...")
+                return self._execute_recode_master(
+                    job=job,
+                    input_file=source_filepath,
+                    output_dir=output_dir,
+                    base_filename=f"{base_name}_recoded",
+                    recode_options=preset_params,
+                    input_stream=input_stream
+                )
+        except UserCancelledError:
+            raise
+        except Exception as e:
+            if self.pause_event.is_set() or self.stop_event.is_set():
+                raise UserCancelledError("Proceso pausado por el usuario.")
+            print(f"ADVERTENCIA: Falló la recodificación en streaming del job {job.job_id}, se usa la descarga normal: {e}")
+            return None
+
     def _execute_recode_job(self, job: Job):
         """
         Ejecuta un único trabajo de RECODIFICACIÓN LOCAL (desde archivo).
@@ -1262,7 +1777,7 @@ class QueueManager:
                 
                 # Resolución de conflictos
                 conflict_policy = batch_tab.conflict_policy_menu.get() if hasattr(batch_tab, 'conflict_policy_menu') else "Renombrar"
-                out_path, _ = self._resolve_batch_conflict(desired_out_path, conflict_policy)
+                out_path, _ = self._resolve_batch_conflict(desired_out_path, conflict_policy, owner=job.job_id)
                 if out_path is None:
                     job.status = "SKIPPED"
                     self.ui_callback(job.job_id, "SKIPPED", "Omitido: El archivo reescalado ya existe")
@@ -1274,7 +1789,14 @@ class QueueManager:
                     ffmpeg_dir=ffmpeg_dir,
                     upscaling_dir=UPSCALING_DIR,
                     cancellation_event=self.pause_event,
-                    progress_callback=lambda p, m: self.ui_callback(job.job_id, "RUNNING", f"({p:.1f}%) {m}" if isinstance(p, float) and p >= 0 else f"{m}")
+                    progress_callback=lambda p, m: self.ui_callback(job.job_id, "RUNNING", f"({p:.1f}%) {m}" if isinstance(p, float) and p >= 0 else f"{m}"),
+                    temp_budget_mb=self.main_app.upscale_temp_budget_saved,
+                    resume_dir=self.main_app.get_upscale_resume_dir(),
+                    dedup_mode=self.main_app.upscale_dedup_saved,
+                    ncnn_devices=self.main_app.upscale_ncnn_devices_saved,
+                    ncnn_instances=self.main_app.upscale_ncnn_instances_saved,
+                    frame_format=self.main_app.upscale_frame_format_saved,
+                    tuning_cache_path=self.main_app.get_upscale_tuning_cache()
                 )
                 
                 final_path = upscaler.upscale_video(input_file, out_path, preset_params)
@@ -1407,7 +1929,7 @@ class QueueManager:
             
             # Resolver conflictos
             conflict_policy = batch_tab.conflict_policy_menu.get()
-            final_path, backup_path = self._resolve_batch_conflict(final_path_smart, conflict_policy) # <-- Usar ruta smart
+            final_path, backup_path = self._resolve_batch_conflict(final_path_smart, conflict_policy, owner=job.job_id) # <-- Usar ruta smart
             
             if final_path is None:
                 # Si se omite, no es un error, solo se salta
@@ -1755,39 +2277,76 @@ class QueueManager:
         
         return job_video_formats, job_audio_formats
 
-    def _resolve_batch_conflict(self, desired_filepath, policy):
+    @staticmethod
+    def _output_key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    def _is_reserved_by_other(self, path: str, owner: str) -> bool:
+        """True si otro trabajo (u otro ítem de la playlist) ya tiene asignada esta ruta. Con jobs_lock."""
+        holder = self.reserved_outputs.get(self._output_key(path))
+        return holder is not None and holder != owner
+
+    def _release_outputs(self, job_id: str):
+        """Libera las rutas reservadas por un trabajo y por los ítems de su playlist."""
+        with self.jobs_lock:
+            for key, holder in list(self.reserved_outputs.items()):
+                if holder == job_id or holder.startswith(job_id + ":"):
+                    del self.reserved_outputs[key]
+
+    def _reserve_playlist_title(self, playlist_dir: str, title: str, owner: str) -> str:
         """
-        Maneja conflictos de archivo basado en una política.
+        Título de archivo único entre los ítems de playlist en curso: yt-dlp
+        escribe '<título>.<ext>' (y sus .part), y dos ítems con el mismo
+        título descargando a la vez se pisarían. Devuelve el título, con
+        ' (n)' si otro ítem ya lo tiene reservado.
         """
-        final_path = desired_filepath
-        backup_path = None
+        with self.jobs_lock:
+            candidate, counter = title, 1
+            while self._is_reserved_by_other(os.path.join(playlist_dir, candidate), owner):
+                candidate = f"{title} ({counter})"
+                counter += 1
+            self.reserved_outputs[self._output_key(os.path.join(playlist_dir, candidate))] = owner
+            return candidate
 
-        if not os.path.exists(final_path):
-            return final_path, backup_path
+    def _resolve_batch_conflict(self, desired_filepath, policy, owner: str):
+        """
+        Maneja conflictos de archivo basado en una política y reserva la ruta
+        elegida para 'owner' (job_id, o "job_id:ítem" en playlists) hasta que
+        el trabajo termine. Una ruta reservada por otro trabajo cuenta como
+        ocupada aunque aún no exista en disco, y no se sobrescribe (se
+        renombra) porque ese trabajo la está escribiendo.
+        """
+        with self.jobs_lock:
+            final_path = desired_filepath
+            backup_path = None
+            reserved_elsewhere = self._is_reserved_by_other(final_path, owner)
 
-        if policy == "Omitir":
-            return None, None
+            if reserved_elsewhere or os.path.exists(final_path):
+                if policy == "Omitir":
+                    return None, None
 
-        elif policy == "Sobrescribir":
-            try:
-                backup_path = final_path + ".bak"
-                if os.path.exists(backup_path): 
-                    os.remove(backup_path)
-                os.rename(final_path, backup_path)
-            except OSError as e:
-                raise Exception(f"No se pudo respaldar el archivo original: {e}")
+                if policy == "Sobrescribir" and not reserved_elsewhere:
+                    try:
+                        backup_path = final_path + ".bak"
+                        if os.path.exists(backup_path): 
+                            os.remove(backup_path)
+                        os.rename(final_path, backup_path)
+                    except OSError as e:
+                        raise Exception(f"No se pudo respaldar el archivo original: {e}")
+                else:
+                    if policy == "Sobrescribir":
+                        print(f"ADVERTENCIA: Otro trabajo está escribiendo {os.path.basename(final_path)}; se renombra.")
+                    base, ext = os.path.splitext(final_path)
+                    counter = 1
+                    while True:
+                        new_path_candidate = f"{base} ({counter}){ext}"
+                        if not os.path.exists(new_path_candidate) and not self._is_reserved_by_other(new_path_candidate, owner):
+                            final_path = new_path_candidate
+                            break
+                        counter += 1
+
+            self.reserved_outputs[self._output_key(final_path)] = owner
             return final_path, backup_path
-        
-        elif policy == "Renombrar":
-            base, ext = os.path.splitext(final_path)
-            counter = 1
-            while True:
-                new_path_candidate = f"{base} ({counter}){ext}"
-                if not os.path.exists(new_path_candidate):
-                    final_path = new_path_candidate
-                    break
-                counter += 1
-            return final_path, None
 
     def _predict_final_extension(self, video_info, audio_info, mode):
         """
@@ -2043,10 +2602,12 @@ class QueueManager:
             
         return 0.0 # No se pudo determinar
 
-    def _execute_recode_master(self, job: Job, input_file, output_dir, base_filename, recode_options):
+    def _execute_recode_master(self, job: Job, input_file, output_dir, base_filename, recode_options, input_stream=None):
         """
         Función maestra que maneja la lógica de recodificación para un job.
         Adaptada de single_download_tab.py.
+        Si se pasa 'input_stream' (FormatStream), FFmpeg lee de ahí en lugar
+        de 'input_file', que solo se usa como referencia.
         """
         final_recoded_path = None
         backup_file_path = None
@@ -2063,7 +2624,7 @@ class QueueManager:
             desired_recoded_path = os.path.join(output_dir, final_filename_with_ext)
             
             # Resolver conflictos de archivo
-            final_recoded_path, backup_file_path = self._resolve_batch_conflict(desired_recoded_path, "Sobrescribir")
+            final_recoded_path, backup_file_path = self._resolve_batch_conflict(desired_recoded_path, "Sobrescribir", owner=job.job_id)
 
             temp_output_path = final_recoded_path + ".temp"
 
@@ -2127,9 +2688,15 @@ class QueueManager:
                             if target_w > 0 and target_h > 0:
                                 if recode_options.get("no_upscaling_enabled"):
                                     # Obtener resolución original
-                                    media_info = self.main_app.ffmpeg_processor.get_local_media_info(input_file)
                                     original_width = 0
                                     original_height = 0
+                                    if input_stream is not None:
+                                        # No hay archivo que sondear: usar el formato resuelto
+                                        original_width = input_stream.info.get('width') or 0
+                                        original_height = input_stream.info.get('height') or 0
+                                        media_info = None
+                                    else:
+                                        media_info = self.main_app.ffmpeg_processor.get_local_media_info(input_file)
                                     if media_info and media_info.get('streams'):
                                         video_stream = next((s for s in media_info['streams'] if s.get('codec_type') == 'video'), None)
                                         if video_stream:
@@ -2234,18 +2801,28 @@ class QueueManager:
                 "pre_params": pre_params, 
                 "mode": recode_options.get('mode_compatibility'),
                 "selected_video_stream_index": selected_video_idx, # <-- CORREGIDO
-                "selected_audio_stream_index": selected_audio_idx   # <-- CORREGIDO
+                "selected_audio_stream_index": selected_audio_idx,   # <-- CORREGIDO
+                "input_stream": input_stream,
+                # Solo los núcleos que no usan las demás recodificaciones de la cola
+                "segment_workers": self.main_app.get_recode_segment_workers(self.max_workers["recode"])
             }
 
             # Función de callback de progreso para este job
             def recode_progress_callback(percentage, message):
                 self.ui_callback(job.job_id, "RUNNING", message)
 
+            def recode_event_callback(event):
+                # Sin duración conocida (p. ej. en streaming) no hay porcentaje,
+                # pero sí velocidad y tiempo procesado
+                if event.duration <= 0:
+                    self.ui_callback(job.job_id, "RUNNING", event.to_message())
+
             # Ejecutar recodificación
             self.main_app.ffmpeg_processor.execute_recode(
                 command_options, 
                 recode_progress_callback, 
-                self.pause_event # Usar el pause_event de la cola
+                self.pause_event, # Usar el pause_event de la cola
+                event_callback=recode_event_callback
             )
 
             if self.pause_event.is_set():
@@ -2276,57 +2853,6 @@ class QueueManager:
     def _download_best_thumb_png(self, entry, output_dir, title):
         """
         Descarga la mejor miniatura disponible (Forzando MaxRes) y la guarda como PNG.
+        Usa la sesión HTTP compartida del ThumbnailHarvester.
         """
-        try:
-            # 1. Buscar la URL base
-            thumb_url = None
-            thumbs = entry.get('thumbnails')
-            
-            if thumbs:
-                sorted_thumbs = sorted(thumbs, key=lambda x: x.get('width', 0) or 0, reverse=True)
-                thumb_url = sorted_thumbs[0].get('url')
-            
-            if not thumb_url:
-                thumb_url = entry.get('thumbnail')
-            
-            if not thumb_url: return
-
-            # 2. INTENTO INTELIGENTE: Forzar MaxResDefault
-            # Primero intentamos descargar la versión HD forzada.
-            # Si falla (404), caemos a la versión original (hqdefault).
-            final_url = thumb_url
-            if "i.ytimg.com" in thumb_url:
-                import re
-                max_res_url = re.sub(r'/(hq|mq|sd|default)default', '/maxresdefault', thumb_url)
-                
-                # Probamos si maxres existe (haciendo una petición HEAD o GET rápida)
-                try:
-                    check_resp = requests.get(max_res_url, timeout=5, stream=True)
-                    if check_resp.status_code == 200:
-                        final_url = max_res_url
-                        check_resp.close() # Cerramos stream
-                    # Si da 404, nos quedamos con thumb_url original
-                except:
-                    pass # Si falla la comprobación, usar la original
-
-            # 3. Descargar datos reales
-            response = requests.get(final_url, timeout=30)
-            response.raise_for_status()
-            image_data = response.content
-            
-            # 4. Procesar y guardar como PNG
-            sanitized_title = self.main_app.single_tab.sanitize_filename(title)
-            output_path = os.path.join(output_dir, f"{sanitized_title}.png")
-            
-            from PIL import Image
-            from io import BytesIO
-
-            img = Image.open(BytesIO(image_data))
-            img.save(output_path, "PNG")
-            print(f"DEBUG: Miniatura PNG guardada ({'MAXRES' if final_url != thumb_url else 'ORIG'}): {output_path}")
-            
-            return output_path # <--- AÑADIDO: Devolver la ruta
-            
-        except Exception as e:
-            print(f"ADVERTENCIA: Falló descarga de miniatura PNG para '{title}': {e}")
-            return None # <--- AÑADIDO: Devolver None si falla
\ No newline at end of file
+        return self.thumbnail_harvester.fetch_png(entry, output_dir, title)
\ No newline at end of file
@@ -8,6 +8,100 @@ FAST_MODE_SUPPORTED_DOMAINS = ["youtube.com", "youtu.be", "soundcloud.com", "x.c
 "dailymotion.com", "bandcamp.com", "twitch.tv", "smugmug.com", "flickr.com", "metacafe.com", "vimeo.com", 
 "archive.org", "archive.org", "archive.org", "archive.org", "archive.org", "archive.org", "archive.org"]
 
+# --- CONCURRENCIA DE LA COLA DE LOTES ---
+# Descargas simultáneas (pool de red) y límite por servidor para no disparar bloqueos
+BATCH_DEFAULT_DOWNLOAD_WORKERS = 3
+BATCH_DEFAULT_PER_HOST_LIMIT = 2
+BATCH_MAX_WORKERS_OPTION = 8
+# 0 = Automático (se calcula según los núcleos de la CPU)
+BATCH_DEFAULT_RECODE_WORKERS = 0
+# Ítems de una misma playlist que se descargan a la vez (1 = secuencial)
+BATCH_DEFAULT_PLAYLIST_WORKERS = 3
+
+# --- RECODIFICACIÓN LOCAL POR SEGMENTOS ---
+# Los codificadores por software de GOP largo no aprovechan muchos núcleos con
+# presets lentos: el video se corta en keyframes y los trozos se codifican a la vez
+RECODE_SEGMENT_CODECS = ("libx264", "libx265", "libvpx", "libvpx-vp9", "libaom-av1")
+RECODE_SEGMENT_MIN_DURATION = 300       # Segundos; los archivos más cortos se recodifican enteros
+RECODE_SEGMENT_SECONDS = 60             # Duración aproximada de cada trozo
+RECODE_SEGMENT_THREADS_PER_WORKER = 4   # Núcleos reservados por cada FFmpeg simultáneo
+RECODE_SEGMENT_MAX_WORKERS = 8
+
+# --- BENCHMARK DE CÓDECS (main.py --benchmark-encoders) ---
+ENCODER_BENCHMARK_FILENAME = "encoder_benchmark.json"   # Junto a encoder_cache.json
+ENCODER_BENCHMARK_VERSION = 1
+ENCODER_BENCHMARK_VIDEO_SIZE = "1920x1080"   # Los perfiles de DNxHD/XDCAM exigen 1080
+ENCODER_BENCHMARK_VIDEO_RATE = 25
+ENCODER_BENCHMARK_VIDEO_SECONDS = 4
+ENCODER_BENCHMARK_AUDIO_SECONDS = 30
+
+# --- DESCARGA SEGMENTADA (VARIAS CONEXIONES POR ARCHIVO) ---
+# 1 = Desactivado (una sola conexión, comportamiento clásico)
+DOWNLOAD_DEFAULT_CONNECTIONS = 1
+DOWNLOAD_CONNECTIONS_OPTIONS = [1, 2, 4, 8, 16]
+
+# --- DESCARGA MASIVA DE MINIATURAS ---
+# Peticiones HTTP simultáneas (son pequeñas: domina la latencia, no el ancho de banda)
+THUMBNAIL_FETCH_WORKERS = 16
+# A partir de cuántas miniaturas la conversión a PNG se reparte en procesos
+THUMBNAIL_PROCESS_POOL_MIN_ITEMS = 20
+
+# --- CACHÉ DE METADATOS (ANÁLISIS DE yt-dlp) ---
+# Las URLs de los formatos caducan (YouTube ~6h), así que el TTL se queda por debajo
+METADATA_CACHE_TTL_SECONDS = 3 * 60 * 60
+METADATA_CACHE_MAX_ENTRIES = 500
+
+# --- REESCALADO DE VIDEO (IA) POR BLOQUES ---
+# Espacio máximo en disco para fotogramas temporales (MB). 0 = modo clásico
+# (se extraen todos los fotogramas antes de reescalar)
+UPSCALE_DEFAULT_TEMP_BUDGET_MB = 4096
+UPSCALE_TEMP_BUDGET_OPTIONS_MB = [0, 1024, 2048, 4096, 8192, 16384]
+# Bloques en circulación: uno se extrae, otro pasa por NCNN y otro se codifica
+UPSCALE_RING_SLOTS = 3
+UPSCALE_MIN_CHUNK_FRAMES = 8
+UPSCALE_MAX_CHUNK_FRAMES = 1000
+# Carpeta (dentro de los datos de usuario) con los bloques ya reescalados de trabajos
+# interrumpidos, y días que se conservan si no se vuelven a usar
+UPSCALE_RESUME_DIRNAME = "upscale_resume"
+UPSCALE_RESUME_MAX_AGE_DAYS = 14
+# Fotogramas repetidos que no pasan por el motor AI: "off", "exact" o "similar"
+UPSCALE_DEDUP_DEFAULT = "exact"
+# Modo "similar": diferencia máxima por canal (0-255) sobre una miniatura del lado indicado
+UPSCALE_DEDUP_TOLERANCE = 6
+UPSCALE_DEDUP_THUMB_SIZE = 256
+# Varios procesos NCNN en paralelo. La memoria de cada proceso se estima con el
+# tamaño de los fotogramas y del mosaico; el de GPU es un presupuesto fijo por
+# dispositivo (no se puede consultar la VRAM) y el de CPU una parte de la RAM libre
+UPSCALE_NCNN_SHARED_TILE = 200           # Mosaico si varios procesos comparten una GPU
+UPSCALE_NCNN_TILE_BYTES_PER_PIXEL = 512
+UPSCALE_NCNN_BASE_MEMORY_MB = 256
+UPSCALE_NCNN_GPU_MEMORY_MB = 4096
+UPSCALE_NCNN_RAM_FRACTION = 0.5
+UPSCALE_NCNN_MAX_INSTANCES = 4
+UPSCALE_NCNN_MIN_SHARD_FRAMES = 4
+UPSCALE_NCNN_SHARDS_PER_INSTANCE = 2
+# Formato de los fotogramas intermedios (FFmpeg -> NCNN -> FFmpeg). PNG con
+# compresión mínima y WebP sin pérdida conservan el original; JPG es el más
+# rápido y ligero pero con pérdida y sin transparencia
+UPSCALE_DEFAULT_FRAME_FORMAT = "png"
+UPSCALE_FRAME_FORMATS = {
+    "png":  {"label": "PNG (compresión mínima)", "ext": ".png",  "ncnn": "png",  "alpha": True,
+             "ffmpeg": ["-c:v", "png", "-compression_level", "1"]},
+    "webp": {"label": "WebP sin pérdida",        "ext": ".webp", "ncnn": "webp", "alpha": True,
+             "ffmpeg": ["-c:v", "libwebp", "-lossless", "1", "-compression_level", "0"]},
+    "jpg":  {"label": "JPG alta calidad",        "ext": ".jpg",  "ncnn": "jpg",  "alpha": False,
+             "ffmpeg": ["-c:v", "mjpeg", "-q:v", "2", "-pix_fmt", "yuvj444p"]},
+}
+UPSCALE_FRAME_BENCHMARK_FRAMES = 60
+# Calibración de NCNN (mosaico -t e hilos -j en "Automático"): candidatos que se
+# prueban con unos pocos fotogramas. El resultado se guarda por motor, modelo y resolución
+UPSCALE_TUNING_CACHE_FILENAME = "ncnn_tuning.json"
+UPSCALE_TUNING_VERSION = 1
+UPSCALE_TUNING_TILES = [0, 400, 256, 200, 128]    # 0 = el automático de NCNN
+UPSCALE_TUNING_THREADS = ["1:1:1", "1:2:1", "2:2:2", "2:4:2"]
+UPSCALE_TUNING_SAMPLE_FRAMES = 6
+UPSCALE_TUNING_MIN_GAIN = 1.05   # Un candidato sustituye al anterior solo si es un 5% más rápido
+
 FORMAT_MUXER_MAP = {
     ".m4a": "mp4",
     ".wma": "asf"
@@ -413,6 +507,43 @@ IMAGE_EXPORT_FORMATS = ["PNG", "JPG", "JPEG", "WEBP", "AVIF", "BMP", "PDF", "TIF
 
 # Agrupar formatos por tipo para mejor manejo en la lógica y la UI
 IMAGE_RASTER_FORMATS = {"PNG", "JPG", "JPEG", "WEBP", "BMP", "TIFF", "AVIF"}
+
+# Conversión por lotes en varios procesos (solo sin IA ni Inkscape)
+IMAGE_CONVERT_PROCESS_MIN_FILES = 4   # Por debajo, arrancar procesos cuesta más de lo que ahorra
+IMAGE_CONVERT_MAX_WORKERS = 16
+
+# Eliminación de fondo por lotes: varias imágenes por inferencia ONNX
+REMBG_BATCH_SIZE = 8                       # Máximo de imágenes por lote
+REMBG_BATCH_MAX_PIXELS = 2 * 1024 * 1024   # Píxeles de entrada por lote (1024x1024 -> 2, 320x320 -> 8)
+
+# Refinado de bordes por mosaico (modelos de alta resolución: RMBG 2.0, InSPyReNet)
+REMBG_TILE_SIZE = 1024                  # Entrada del modelo: cada tesela se procesa a esta resolución
+REMBG_TILE_OVERLAP = 128                # Solape entre teselas (se funden con pesos en rampa)
+REMBG_TILE_EDGE_RANGE = (8, 247)        # Alfa (0-255) de la pasada global que se considera borde dudoso
+REMBG_TILE_BYTES_PER_PIXEL = 16         # Memoria de trabajo por píxel (imagen RGB + máscaras + acumuladores)
+REMBG_TILE_MEMORY_OPTIONS_MB = [512, 1024, 2048, 4096]
+REMBG_TILE_DEFAULT_MEMORY_MB = 1024
+
+# Sesiones ONNX (eliminación de fondo): límite de memoria con desalojo LRU
+ONNX_SESSION_BUDGET_OPTIONS_MB = [0, 1024, 2048, 4096, 8192]   # 0 = sin límite
+ONNX_SESSION_DEFAULT_BUDGET_MB = 4096
+ONNX_SESSION_SIZE_FACTOR = 2.0          # Memoria estimada de una sesión respecto al tamaño del .onnx
+ONNX_OPTIMIZED_DIRNAME = "onnx_optimized"   # Grafos ya optimizados (dentro de la carpeta de modelos)
+
+# Variantes de precisión en CPU (INT8/FP16): se usa la más rápida cuya máscara se parece a la del modelo elegido
+REMBG_VARIANT_CACHE_FILENAME = "rembg_variants.json"
+REMBG_VARIANT_CACHE_VERSION = 1
+REMBG_VARIANT_MIN_IOU = 0.97            # IoU medio mínimo frente a las máscaras del modelo elegido
+REMBG_VARIANT_MIN_SPEEDUP = 1.10        # Una variante solo sustituye al modelo si es al menos un 10% más rápida
+REMBG_CALIBRATION_IMAGES = 4            # Imágenes sintéticas del conjunto de calibración
+REMBG_QUANTIZED_SUFFIX = ".int8-dyn"    # model.onnx -> model.int8-dyn.onnx (junto al original)
+REMBG_QUANTIZE_MAX_BYTES = 2 * 1024 ** 3   # Límite de protobuf: modelos mayores no se cuantizan
+# Archivos intercambiables del mismo modelo (misma carpeta)
+REMBG_VARIANT_GROUPS = [
+    ["rmbg2_gatis.onnx", "model.onnx", "model_fp16.onnx", "model_int8.onnx", "model_uint8.onnx",
+     "model_quantized.onnx", "model_q4.onnx", "model_q4f16.onnx", "model_bnb4.onnx"],
+    ["inspyrenet_ultra.onnx", "inspyrenet_ultra_fp16.onnx"],
+]
 IMAGE_VECTOR_FORMATS = {"PDF"} 
 FORMATS_WITH_TRANSPARENCY = {"PNG", "WEBP", "TIFF", "ICO", "PDF", "AVIF"}
 
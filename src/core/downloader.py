@@ -1,8 +1,12 @@
 import yt_dlp
 from .exceptions import UserCancelledError, PlaylistDownloadError
+from .metadata_cache import cookie_key_from_opts
 import threading 
 import os
 import sys
+import json
+import time
+from contextlib import contextmanager
 
 def get_deno_path():
     """Obtiene la ruta absoluta de la carpeta donde está deno.exe."""
@@ -12,32 +16,116 @@ def get_deno_path():
         root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
     return os.path.join(root, "bin", "deno")
 
+# Resultado de la búsqueda de Deno (se hace una sola vez por ejecución)
+_deno_lookup_done = False
+_deno_executable_path = None
+_deno_lookup_lock = threading.Lock()
+
+def _find_deno_executable():
+    """
+    Devuelve la ruta del ejecutable de Deno (el incluido en bin/ o el del
+    sistema) o None. El resultado se cachea: apply_yt_patch se llama en
+    cada análisis/descarga con cookies y no hace falta volver al disco.
+    """
+    global _deno_lookup_done, _deno_executable_path
+
+    with _deno_lookup_lock:
+        if _deno_lookup_done:
+            return _deno_executable_path
+
+        # Detectar plataforma
+        if sys.platform == "win32":
+            deno_executable = "deno.exe"
+        else:
+            deno_executable = "deno"
+        
+        deno_path = os.path.join(get_deno_path(), deno_executable)
+        
+        # Verificar Deno
+        if not os.path.exists(deno_path):
+            print(f"⚠️ Deno no encontrado en {deno_path}")
+            import shutil
+            system_deno = shutil.which("deno")
+            if system_deno:
+                deno_path = system_deno
+                print(f"✅ Usando Deno del sistema: {deno_path}")
+            else:
+                print(f"❌ Deno no disponible. El parche puede no funcionar correctamente.")
+                deno_path = None
+
+        _deno_executable_path = deno_path
+        _deno_lookup_done = True
+        return deno_path
+
+# Búsqueda de aria2c (mismo esquema que Deno: una sola vez por ejecución)
+_aria2c_lookup_done = False
+_aria2c_executable_path = None
+
+def _find_aria2c_executable():
+    """Devuelve la ruta de aria2c (bin/aria2 incluido o el del sistema) o None."""
+    global _aria2c_lookup_done, _aria2c_executable_path
+
+    with _deno_lookup_lock:
+        if _aria2c_lookup_done:
+            return _aria2c_executable_path
+
+        executable = "aria2c.exe" if sys.platform == "win32" else "aria2c"
+        bundled_path = os.path.join(os.path.dirname(get_deno_path()), "aria2", executable)
+
+        if os.path.exists(bundled_path):
+            _aria2c_executable_path = bundled_path
+        else:
+            import shutil
+            _aria2c_executable_path = shutil.which("aria2c")
+
+        if _aria2c_executable_path:
+            print(f"✅ aria2c disponible para descargas segmentadas: {_aria2c_executable_path}")
+        _aria2c_lookup_done = True
+        return _aria2c_executable_path
+
+def apply_segmented_download(ydl_opts, connections):
+    """
+    Activa la descarga con varias conexiones simultáneas (opcional).
+
+    - DASH/HLS: yt-dlp descarga 'connections' fragmentos a la vez
+      (concurrent_fragment_downloads). El progreso ya llega sumado al hook.
+    - Archivos HTTP de una pieza: si aria2c está disponible, se usa con
+      peticiones por rangos (-x/-s). Si no, se mantiene una sola conexión.
+    """
+    try:
+        connections = int(connections or 1)
+    except (TypeError, ValueError):
+        connections = 1
+
+    if connections <= 1:
+        return ydl_opts
+
+    ydl_opts['concurrent_fragment_downloads'] = connections
+
+    # Los recortes (download_ranges) los hace FFmpeg: aria2c no aplica
+    aria2c_path = _find_aria2c_executable() if 'download_ranges' not in ydl_opts else None
+    if aria2c_path:
+        external = dict(ydl_opts.get('external_downloader') or {})
+        external.setdefault('http', aria2c_path)
+        ydl_opts['external_downloader'] = external
+
+        external_args = dict(ydl_opts.get('external_downloader_args') or {})
+        external_args['aria2c'] = [
+            f'--max-connection-per-server={connections}',
+            f'--split={connections}',
+            '--min-split-size=1M',
+        ]
+        ydl_opts['external_downloader_args'] = external_args
+
+    print(f"📶 Descarga segmentada: {connections} conexiones"
+          f"{' (aria2c para HTTP)' if aria2c_path else ' (solo DASH/HLS)'}")
+    return ydl_opts
+
 def apply_yt_patch(ydl_opts):
     """Configuración optimizada SOLO para cuando se usan cookies."""
-    if getattr(sys, 'frozen', False):
-        root = os.path.dirname(sys.executable)
-    else:
-        root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-    
-    # Detectar plataforma
-    if sys.platform == "win32":
-        deno_executable = "deno.exe"
-    else:
-        deno_executable = "deno"
-    
-    deno_path = os.path.join(root, "bin", "deno", deno_executable)
-    
-    # Verificar Deno
-    if not os.path.exists(deno_path):
-        print(f"⚠️ Deno no encontrado en {deno_path}")
-        import shutil
-        system_deno = shutil.which("deno")
-        if system_deno:
-            deno_path = system_deno
-            print(f"✅ Usando Deno del sistema: {deno_path}")
-        else:
-            print(f"❌ Deno no disponible. El parche puede no funcionar correctamente.")
-            return ydl_opts
+    deno_path = _find_deno_executable()
+    if not deno_path:
+        return ydl_opts
     
     # Configuración para cookies
     ydl_opts['quiet'] = False
@@ -63,7 +151,273 @@ def apply_yt_patch(ydl_opts):
     return ydl_opts
 
 
-def get_video_info(url, cookie_opts=None):
+def set_ydl_outtmpl(ydl, template):
+    """
+    Cambia la plantilla de salida de un YoutubeDL ya creado. Según la versión
+    de yt-dlp, 'outtmpl' es un str o un dict normalizado ({'default': ...}).
+    """
+    outtmpl = ydl.params.get('outtmpl')
+    if isinstance(outtmpl, dict):
+        outtmpl['default'] = template
+    else:
+        ydl.params['outtmpl'] = template
+    # Versiones antiguas guardan una copia en 'outtmpl_dict'
+    if isinstance(getattr(ydl, 'outtmpl_dict', None), dict):
+        ydl.outtmpl_dict['default'] = template
+
+
+# Plantilla por defecto de yt-dlp (para instancias reutilizadas sin 'outtmpl')
+YTDLP_DEFAULT_OUTTMPL = '%(title)s [%(id)s].%(ext)s'
+
+
+class _SessionProgressHook:
+    """Hook fijo de una instancia compartida: reenvía a los hooks de la llamada en curso."""
+    def __init__(self):
+        self.targets = []
+
+    def __call__(self, d):
+        for target in self.targets:
+            target(d)
+
+
+class YtdlpSessionManager:
+    """
+    Reutiliza instancias de yt_dlp.YoutubeDL ya configuradas.
+
+    Crear un YoutubeDL carga cookies, extractores y abre conexiones nuevas;
+    aquí se guardan por "perfil" (todas las opciones salvo 'progress_hooks'
+    y 'outtmpl', que se ajustan en cada uso). Cada instancia la usa un solo
+    hilo a la vez y se renueva pasado SESSION_MAX_AGE, para que las cookies
+    del navegador no se queden viejas.
+    """
+
+    PER_CALL_OPTIONS = ('progress_hooks', 'outtmpl')
+    SESSION_MAX_AGE = 10 * 60
+    MAX_IDLE_PER_PROFILE = 4
+    MAX_PROFILES = 8
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # perfil -> [(ydl, hook, creado), ...] libres
+        self._idle = {}
+        # Orden de uso de los perfiles (LRU)
+        self._profile_order = []
+
+    @classmethod
+    def _profile_key(cls, ydl_opts):
+        """
+        Clave del perfil, o None si las opciones llevan objetos propios de
+        la llamada (funciones, loggers...): esas instancias no se comparten.
+        """
+        profile_opts = {k: v for k, v in ydl_opts.items() if k not in cls.PER_CALL_OPTIONS}
+        try:
+            return json.dumps(profile_opts, sort_keys=True)
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _close(ydl):
+        try:
+            ydl.close()
+        except Exception:
+            pass
+
+    def _checkout(self, profile, ydl_opts):
+        now = time.time()
+        with self._lock:
+            idle = self._idle.get(profile, []) if profile is not None else []
+            while idle:
+                ydl, hook, created = idle.pop()
+                if now - created < self.SESSION_MAX_AGE:
+                    return ydl, hook, created
+                self._close(ydl)
+
+        hook = _SessionProgressHook()
+        opts = {k: v for k, v in ydl_opts.items() if k not in self.PER_CALL_OPTIONS}
+        opts['progress_hooks'] = [hook]
+        return yt_dlp.YoutubeDL(opts), hook, now
+
+    def _checkin(self, profile, ydl, hook, created):
+        hook.targets = []
+        if profile is None:
+            self._close(ydl)
+            return
+
+        to_close = []
+        with self._lock:
+            idle = self._idle.setdefault(profile, [])
+            if len(idle) < self.MAX_IDLE_PER_PROFILE:
+                idle.append((ydl, hook, created))
+            else:
+                to_close.append(ydl)
+
+            if profile in self._profile_order:
+                self._profile_order.remove(profile)
+            self._profile_order.append(profile)
+
+            while len(self._profile_order) > self.MAX_PROFILES:
+                old_profile = self._profile_order.pop(0)
+                to_close.extend(item[0] for item in self._idle.pop(old_profile, []))
+
+        for old_ydl in to_close:
+            self._close(old_ydl)
+
+    @contextmanager
+    def session(self, ydl_opts):
+        """
+        Entrega un YoutubeDL configurado con 'ydl_opts' para uso exclusivo
+        dentro del bloque 'with'. Los 'progress_hooks' y el 'outtmpl' de
+        ydl_opts se aplican solo a este uso.
+        """
+        profile = self._profile_key(ydl_opts)
+        ydl, hook, created = self._checkout(profile, ydl_opts)
+        hook.targets = list(ydl_opts.get('progress_hooks') or [])
+        set_ydl_outtmpl(ydl, ydl_opts.get('outtmpl') or YTDLP_DEFAULT_OUTTMPL)
+
+        try:
+            yield ydl
+        except BaseException:
+            # Tras un error (o una cancelación a mitad de descarga) no se reutiliza
+            hook.targets = []
+            self._close(ydl)
+            raise
+        else:
+            self._checkin(profile, ydl, hook, created)
+
+    def clear(self):
+        """Cierra todas las instancias libres (p. ej. al cambiar de cookies)."""
+        with self._lock:
+            idle, self._idle, self._profile_order = self._idle, {}, []
+        for items in idle.values():
+            for ydl, _, _ in items:
+                self._close(ydl)
+
+# Gestor compartido por toda la aplicación
+ydl_sessions = YtdlpSessionManager()
+
+
+# Protocolos que se pueden leer como un flujo continuo de bytes
+STREAMABLE_PROTOCOLS = ('http', 'https')
+
+class FormatStream:
+    """
+    Lee de forma secuencial el archivo de un formato ya resuelto por yt-dlp,
+    usando la red de la propia instancia (cookies, cabeceras, proxy).
+    Se itera en bloques de bytes para alimentar la entrada estándar de
+    FFmpeg sin escribir el archivo descargado en disco.
+    """
+
+    READ_SIZE = 1024 * 1024
+
+    def __init__(self, ydl, info, cancellation_event: threading.Event):
+        self.ydl = ydl
+        self.info = info
+        self.url = info['url']
+        self.headers = dict(info.get('http_headers') or {})
+        # YouTube limita la velocidad de las peticiones largas: yt-dlp pide por rangos
+        self.chunk_size = (info.get('downloader_options') or {}).get('http_chunk_size') or 0
+        # Tamaño exacto del archivo si se conoce (Content-Range lo confirma o lo aporta)
+        self.total_size = info.get('filesize') or None
+        self.cancellation_event = cancellation_event
+        self.downloaded_bytes = 0
+
+    @classmethod
+    def open(cls, ydl, url, cancellation_event: threading.Event):
+        """
+        Resuelve el formato de 'url' con las opciones de 'ydl'. Devuelve None
+        si no se puede leer como un único flujo (video y audio por separado,
+        HLS/DASH, playlists...).
+        """
+        info = ydl.extract_info(url, download=False)
+        if not info or info.get('_type') in ('playlist', 'multi_video'):
+            return None
+        if info.get('requested_formats') or not info.get('url'):
+            return None
+        if info.get('protocol') not in STREAMABLE_PROTOCOLS:
+            return None
+        return cls(ydl, info, cancellation_event)
+
+    def __iter__(self):
+        from yt_dlp.networking import Request
+        from yt_dlp.networking.exceptions import HTTPError
+
+        start = 0
+        while True:
+            headers = dict(self.headers)
+            if self.chunk_size:
+                headers['Range'] = f'bytes={start}-{start + self.chunk_size - 1}'
+
+            try:
+                response = self.ydl.urlopen(Request(self.url, headers=headers))
+            except HTTPError as e:
+                # 416: el archivo terminó justo en el límite del bloque anterior
+                if self.chunk_size and start > 0 and e.status == 416:
+                    return
+                raise
+
+            expected = self._parse_length(response.headers.get('Content-Length'))
+            if response.status == 206:
+                self.total_size = self._parse_range_total(response.headers.get('Content-Range')) or self.total_size
+
+            received = 0
+            try:
+                while True:
+                    if self.cancellation_event.is_set():
+                        raise UserCancelledError("Descarga cancelada por el usuario.")
+                    data = response.read(self.READ_SIZE)
+                    if not data:
+                        break
+                    received += len(data)
+                    self.downloaded_bytes += len(data)
+                    yield data
+            finally:
+                response.close()
+
+            # Una conexión cortada termina la lectura sin error: no darla por buena
+            if expected is not None and received < expected:
+                raise yt_dlp.utils.DownloadError(
+                    f"Conexión interrumpida: se recibieron {received} de {expected} bytes.")
+
+            # Sin rangos (o si el servidor los ignoró) la respuesta era el archivo entero
+            if not self.chunk_size or response.status != 206:
+                end = received
+            else:
+                end = start + received
+                if self.total_size is None:
+                    # Sin tamaño total, un bloque incompleto solo puede ser el último
+                    if received < self.chunk_size:
+                        return
+                    start = end
+                    continue
+                if end < self.total_size and received:
+                    start = end
+                    continue
+
+            if self.total_size is not None and end < self.total_size:
+                raise yt_dlp.utils.DownloadError(
+                    f"Conexión interrumpida: se recibieron {end} de {self.total_size} bytes.")
+            return
+
+    @staticmethod
+    def _parse_length(value) -> int | None:
+        try:
+            return int(value) if value is not None else None
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _parse_range_total(value) -> int | None:
+        """Total de 'Content-Range: bytes a-b/total' (None si es '*' o no viene)."""
+        if not value or '/' not in value:
+            return None
+        return FormatStream._parse_length(value.rsplit('/', 1)[1].strip())
+
+
+def get_video_info(url, cookie_opts=None, cache=None):
+    """
+    Obtiene el info_dict de una URL. Si se pasa 'cache' (MetadataCache),
+    se reutiliza un análisis previo de la misma URL y origen de cookies.
+    """
     ydl_opts = {
         'quiet': True,
         'no_warnings': True,  # Cambiar a True para modo sin cookies
@@ -90,12 +444,20 @@ def get_video_info(url, cookie_opts=None):
     else:
         print("📝 Modo: Sin cookies (configuración predeterminada de yt-dlp)")
 
+    cookie_key = cookie_key_from_opts(ydl_opts)
+    if cache:
+        cached_info = cache.get(url, cookie_key, "info")
+        if cached_info:
+            return cached_info
+
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with ydl_sessions.session(ydl_opts) as ydl:
             info_dict = ydl.extract_info(url, download=False)
             
             if info_dict:
                 info_dict = apply_site_specific_rules(info_dict)
+                if cache:
+                    cache.put(url, cookie_key, "info", info_dict)
             
             return info_dict
     except Exception as e:
@@ -103,9 +465,10 @@ def get_video_info(url, cookie_opts=None):
         return None
 
 
-def download_media(url, ydl_opts, progress_callback, cancellation_event: threading.Event):
+def download_media(url, ydl_opts, progress_callback, cancellation_event: threading.Event, connections=1):
     """
     Descarga y procesa el medio.
+    'connections' > 1 activa la descarga segmentada (ver apply_segmented_download).
     """
     
     # 🔧 DETECTAR si hay cookies en ydl_opts
@@ -169,6 +532,7 @@ def download_media(url, ydl_opts, progress_callback, cancellation_event: threadi
     
     ydl_opts['progress_hooks'] = [hook]
     ydl_opts.setdefault('downloader', 'native')
+    ydl_opts = apply_segmented_download(ydl_opts, connections)
     
     if 'outtmpl' in ydl_opts:
         ydl_opts['restrictfilenames'] = True 
@@ -180,7 +544,7 @@ def download_media(url, ydl_opts, progress_callback, cancellation_event: threadi
         if is_fragment:
             progress_callback(-1, "Descargando fragmento, esto puede tardar...")
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with ydl_sessions.session(ydl_opts) as ydl:
             info_dict = ydl.extract_info(url, download=True)
         
         if is_fragment and not fragment_started:
@@ -0,0 +1,282 @@
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+from src.core.constants import (
+    ENCODER_BENCHMARK_FILENAME, ENCODER_BENCHMARK_VERSION, ENCODER_BENCHMARK_VIDEO_SIZE,
+    ENCODER_BENCHMARK_VIDEO_RATE, ENCODER_BENCHMARK_VIDEO_SECONDS, ENCODER_BENCHMARK_AUDIO_SECONDS
+)
+from src.core.exceptions import UserCancelledError
+from src.core.ffmpeg_progress import FFmpegProgressParser
+
+try:
+    import psutil
+    CAN_MEASURE_RSS = True
+except ImportError:
+    CAN_MEASURE_RSS = False
+    print("ADVERTENCIA: 'psutil' no instalado. El benchmark de códecs no medirá la memoria.")
+
+
+class EncoderBenchmark:
+    """
+    Mide cada perfil de CODEC_PROFILES que el FFmpeg local puede usar
+    (los de '_detect_encoders') codificando una fuente sintética:
+    'testsrc2' para video y 'sine' para audio, sin leer archivos del usuario.
+
+    Por perfil se guarda: fps, velocidad (múltiplo del tiempo real),
+    bitrate de salida y pico de memoria (RSS) del proceso. El informe se
+    cachea en ENCODER_BENCHMARK_FILENAME, junto a 'encoder_cache.json',
+    y se invalida al cambiar la versión de FFmpeg.
+    Los perfiles de bitrate personalizado y GIF personalizado se omiten.
+    """
+
+    def __init__(self, processor, cache_dir: str | None = None):
+        self.processor = processor
+        self.cache_dir = cache_dir if cache_dir is not None else processor.cache_dir
+        self.ffmpeg_version = None
+
+    @property
+    def cache_path(self) -> str | None:
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, ENCODER_BENCHMARK_FILENAME)
+
+    def _creationflags(self):
+        return subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+
+    def _read_ffmpeg_version(self) -> str:
+        output = subprocess.check_output([self.processor.ffmpeg_path, '-version'], stderr=subprocess.STDOUT,
+                                         creationflags=self._creationflags())
+        return output.decode('utf-8', errors='ignore').split('\n')[0].strip()
+
+    def _ensure_encoders(self):
+        """Detecta los códecs de forma síncrona si aún no se ha hecho."""
+        if self.processor.is_detection_complete:
+            return
+        result = {}
+        self.processor._detect_encoders(lambda success, message: result.update(success=success, message=message))
+        if not result.get("success"):
+            raise Exception(result.get("message", "No se pudieron detectar los códecs de FFmpeg."))
+
+    def load_cached(self) -> dict | None:
+        """Devuelve el último informe si corresponde al FFmpeg instalado, o None."""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                report = json.load(f)
+            if self.ffmpeg_version is None:
+                self.ffmpeg_version = self._read_ffmpeg_version()
+            if report.get("version") == ENCODER_BENCHMARK_VERSION and report.get("ffmpeg_version") == self.ffmpeg_version:
+                return report
+        except Exception as e:
+            print(f"ADVERTENCIA: No se pudo leer el benchmark de códecs guardado: {e}")
+        return None
+
+    def _save(self, report: dict):
+        if not self.cache_path:
+            return
+        tmp_path = self.cache_path + ".tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+            print(f"INFO: Benchmark de códecs guardado en {self.cache_path}")
+        except Exception as e:
+            print(f"ADVERTENCIA: No se pudo guardar el benchmark de códecs: {e}")
+
+    def iter_profiles(self):
+        """Genera (proc, categoría, nombre del códec, encoder, perfil, parámetros, contenedor) medibles."""
+        for proc_type, categories in self.processor.available_encoders.items():
+            for category, codecs in categories.items():
+                for friendly_name, details in codecs.items():
+                    encoder = next((key for key in details if key != 'container'), None)
+                    if not encoder:
+                        continue
+                    for profile_name, params in details[encoder].items():
+                        if isinstance(params, str):
+                            continue # CUSTOM_BITRATE_* / CUSTOM_GIF dependen de valores del usuario
+                        yield proc_type, category, friendly_name, encoder, profile_name, params, details.get('container', '.mkv')
+
+    def _source_args(self, category: str) -> tuple[list, float]:
+        if category == "Audio":
+            seconds = ENCODER_BENCHMARK_AUDIO_SECONDS
+            return ['-f', 'lavfi', '-i', f'sine=frequency=1000:sample_rate=48000:duration={seconds}'], seconds
+        seconds = ENCODER_BENCHMARK_VIDEO_SECONDS
+        # testsrc2 tiene movimiento y color en toda la imagen: más realista que testsrc
+        source = f'testsrc2=size={ENCODER_BENCHMARK_VIDEO_SIZE}:rate={ENCODER_BENCHMARK_VIDEO_RATE}:duration={seconds}'
+        return ['-f', 'lavfi', '-i', source], seconds
+
+    def measure(self, category: str, params: list, container: str, work_dir: str,
+                cancellation_event: threading.Event | None = None) -> dict:
+        """Codifica la fuente sintética con 'params' y devuelve las métricas."""
+        source_args, seconds = self._source_args(category)
+        output_path = os.path.join(work_dir, f"bench{container}")
+        command = [self.processor.ffmpeg_path, '-y', '-nostdin', '-progress', '-'] + source_args
+        command += params + ([] if category == "Audio" else ['-an']) + [output_path]
+
+        parser = FFmpegProgressParser(seconds)
+        error_output_buffer = []
+        started = time.monotonic()
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                   encoding='utf-8', errors='ignore', creationflags=self._creationflags())
+
+        def read_progress():
+            for line in iter(process.stdout.readline, ''):
+                parser.feed(line)
+
+        def read_stream_into_buffer(stream, buffer):
+            for line in iter(stream.readline, ''):
+                buffer.append(line.strip())
+
+        readers = [threading.Thread(target=read_progress, daemon=True),
+                   threading.Thread(target=read_stream_into_buffer, args=(process.stderr, error_output_buffer), daemon=True)]
+        for reader in readers:
+            reader.start()
+
+        peak_rss = 0
+        ps_process = None
+        if CAN_MEASURE_RSS:
+            try:
+                ps_process = psutil.Process(process.pid)
+            except psutil.Error:
+                ps_process = None
+        try:
+            while process.poll() is None:
+                if cancellation_event is not None and cancellation_event.is_set():
+                    process.terminate()
+                    raise UserCancelledError("Benchmark de códecs cancelado.")
+                if ps_process is not None:
+                    try:
+                        peak_rss = max(peak_rss, ps_process.memory_info().rss)
+                    except psutil.Error:
+                        ps_process = None
+                time.sleep(0.05)
+            for reader in readers:
+                reader.join()
+        finally:
+            process.stdout.close()
+            process.stderr.close()
+        elapsed = time.monotonic() - started
+
+        if process.returncode != 0 or not os.path.exists(output_path):
+            lines = [L for L in error_output_buffer if L.strip()]
+            return {"status": "error", "error": "\n".join(lines[-3:]) or f"Código {process.returncode}"}
+
+        size = os.path.getsize(output_path)
+        os.remove(output_path)
+        event = parser.last_event
+        frames = event.frame if event and event.frame else None
+        result = {
+            "status": "ok",
+            "seconds": round(elapsed, 3),
+            "speed": round(seconds / elapsed, 3) if elapsed > 0 else None,
+            "bitrate_kbps": round(size * 8 / seconds / 1000, 1),
+            "size_bytes": size,
+            "peak_rss_mb": round(peak_rss / (1024 * 1024), 1) if peak_rss else None,
+        }
+        if category != "Audio":
+            result["fps"] = round((frames or seconds * ENCODER_BENCHMARK_VIDEO_RATE) / elapsed, 2) if elapsed > 0 else None
+        return result
+
+    def run(self, force: bool = False, progress_callback=None, cancellation_event: threading.Event | None = None) -> dict:
+        """
+        Mide todos los perfiles disponibles (o devuelve el informe en caché
+        si es del mismo FFmpeg y no se fuerza). 'progress_callback(hechos,
+        total, nombre)' se llama antes de cada perfil.
+        """
+        self.ffmpeg_version = self._read_ffmpeg_version()
+        if not force:
+            cached = self.load_cached()
+            if cached:
+                print("INFO: Benchmark de códecs cargado de la caché.")
+                return cached
+
+        self._ensure_encoders()
+        profiles = list(self.iter_profiles())
+        results = []
+        work_dir = tempfile.mkdtemp(prefix="dowp_encoder_bench_")
+        try:
+            for done, (proc_type, category, friendly_name, encoder, profile_name, params, container) in enumerate(profiles):
+                label = f"{friendly_name} / {profile_name}"
+                if progress_callback:
+                    progress_callback(done, len(profiles), label)
+                metrics = self.measure(category, params, container, work_dir, cancellation_event)
+                if metrics["status"] != "ok":
+                    print(f"ADVERTENCIA: Benchmark de '{label}' falló: {metrics['error']}")
+                results.append({
+                    "proc": proc_type, "category": category, "codec": friendly_name,
+                    "encoder": encoder, "profile": profile_name, **metrics
+                })
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        report = {
+            "version": ENCODER_BENCHMARK_VERSION,
+            "ffmpeg_version": self.ffmpeg_version,
+            "created": time.time(),
+            "source": {
+                "video": f"testsrc2 {ENCODER_BENCHMARK_VIDEO_SIZE} {ENCODER_BENCHMARK_VIDEO_RATE} fps, {ENCODER_BENCHMARK_VIDEO_SECONDS}s",
+                "audio": f"sine 1 kHz 48 kHz, {ENCODER_BENCHMARK_AUDIO_SECONDS}s",
+            },
+            "results": results,
+        }
+        self._save(report)
+        return report
+
+    @staticmethod
+    def format_report(report: dict) -> str:
+        """Tabla de texto ordenada por velocidad dentro de cada categoría."""
+        lines = [f"FFmpeg: {report.get('ffmpeg_version')}"]
+        for category in ("Video", "Audio"):
+            rows = [r for r in report.get("results", []) if r["category"] == category]
+            if not rows:
+                continue
+            lines.append(f"\n--- {category} ({report['source'][category.lower()]}) ---")
+            rows.sort(key=lambda r: r.get("speed") or 0, reverse=True)
+            for r in rows:
+                name = f"[{r['proc']}] {r['codec']} / {r['profile']}"
+                if r["status"] != "ok":
+                    lines.append(f"{name}: error ({r['error'].splitlines()[-1] if r['error'] else '?'})")
+                    continue
+                parts = [f"{r['speed']:.2f}x"]
+                if r.get("fps"):
+                    parts.append(f"{r['fps']:.1f} fps")
+                parts.append(f"{r['bitrate_kbps']:.0f} kbit/s")
+                if r.get("peak_rss_mb"):
+                    parts.append(f"{r['peak_rss_mb']:.0f} MB RAM")
+                lines.append(f"{name}: " + " | ".join(parts))
+        return "\n".join(lines)
+
+
+def run_cli(args: list[str]) -> int:
+    """
+    Punto de entrada de 'main.py --benchmark-encoders [--force] [--output informe.json]'.
+    Usa la misma carpeta de datos que la interfaz para la caché.
+    """
+    from src.core.processor import FFmpegProcessor
+
+    appdata_path = os.getenv('APPDATA') or os.path.expanduser('~\\AppData\\Roaming')
+    app_data_dir = os.path.join(appdata_path, 'DowP')
+    output_path = args[args.index('--output') + 1] if '--output' in args and args.index('--output') + 1 < len(args) else None
+
+    processor = FFmpegProcessor(cache_dir=app_data_dir)
+    benchmark = EncoderBenchmark(processor, cache_dir=app_data_dir)
+    try:
+        report = benchmark.run(force='--force' in args,
+                               progress_callback=lambda done, total, label: print(f"[{done + 1}/{total}] {label}..."))
+    except Exception as e:
+        print(f"ERROR: Benchmark de códecs fallido: {e}")
+        return 1
+
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"INFO: Informe escrito en {output_path}")
+    print(EncoderBenchmark.format_report(report))
+    return 0
@@ -0,0 +1,182 @@
+import time
+from dataclasses import dataclass
+
+
+def format_eta(seconds: float | None) -> str:
+    """Formatea segundos como MM:SS (o H:MM:SS). '--:--' si no se conoce."""
+    if seconds is None or seconds < 0:
+        return "--:--"
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes:02d}:{secs:02d}"
+
+
+@dataclass(frozen=True)
+class FFmpegProgressEvent:
+    """
+    Un bloque completo de '-progress -' de FFmpeg, ya interpretado.
+    Los campos que FFmpeg reporta como 'N/A' quedan en None.
+    """
+    percentage: float           # 0-100 (0 si no se conoce la duración)
+    out_time: float             # Segundos de salida ya escritos
+    duration: float             # Duración total esperada (0 si se desconoce)
+    elapsed: float              # Segundos reales desde el inicio del proceso
+    frame: int | None = None
+    fps: float | None = None
+    bitrate_kbps: float | None = None
+    total_size: int | None = None   # Bytes escritos en la salida
+    speed: float | None = None      # Múltiplo del tiempo real (1.0 = tiempo real)
+    eta_seconds: float | None = None
+    finished: bool = False          # True en el último bloque (progress=end)
+
+    def to_message(self, action: str = "Recodificando") -> str:
+        """Texto corto para la UI: 'Recodificando... 42.0% | 2.30x | 120 fps | ETA 01:12'."""
+        if self.duration > 0:
+            parts = [f"{action}... {self.percentage:.1f}%"]
+        else:
+            # Sin duración conocida solo se puede mostrar lo ya procesado
+            parts = [f"{action}... {format_eta(self.out_time)} procesados"]
+        if self.speed:
+            parts.append(f"{self.speed:.2f}x")
+        if self.fps:
+            parts.append(f"{self.fps:.0f} fps")
+        if self.eta_seconds is not None and not self.finished:
+            parts.append(f"ETA {format_eta(self.eta_seconds)}")
+        return " | ".join(parts)
+
+
+class FFmpegProgressParser:
+    """
+    Interpreta la salida de 'ffmpeg -progress -' línea a línea.
+
+    FFmpeg escribe bloques de 'clave=valor' que terminan en
+    'progress=continue' o 'progress=end'. 'feed()' acumula las claves y
+    devuelve un FFmpegProgressEvent al cerrar cada bloque (None mientras
+    tanto). La ETA usa la velocidad que reporta FFmpeg y, si falta, el
+    ritmo medido desde el inicio.
+    """
+
+    def __init__(self, duration: float = 0.0):
+        try:
+            self.duration = max(0.0, float(duration or 0))
+        except (TypeError, ValueError):
+            self.duration = 0.0
+        self.start_time = time.monotonic()
+        self.last_event: FFmpegProgressEvent | None = None
+        self._block: dict[str, str] = {}
+        self._fps_samples: list[float] = []
+        self._last_bitrate: float | None = None
+
+    @staticmethod
+    def _to_float(value: str | None) -> float | None:
+        if value is None:
+            return None
+        value = value.strip().rstrip('x')
+        if not value or value == 'N/A':
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return None
+
+    def _out_time_seconds(self, block: dict[str, str]) -> float | None:
+        # 'out_time_us' es el valor correcto; 'out_time_ms' (también en µs por
+        # un error histórico de FFmpeg) queda como respaldo
+        for key in ('out_time_us', 'out_time_ms'):
+            value = self._to_float(block.get(key))
+            if value is not None and value >= 0:
+                return value / 1_000_000
+        return None
+
+    def feed(self, line: str) -> FFmpegProgressEvent | None:
+        line = line.strip()
+        if '=' not in line:
+            return None
+        key, _, value = line.partition('=')
+        key, value = key.strip(), value.strip()
+
+        if key != 'progress':
+            self._block[key] = value
+            return None
+
+        block, self._block = self._block, {}
+        return self._build_event(block, finished=(value == 'end'))
+
+    def _build_event(self, block: dict[str, str], finished: bool) -> FFmpegProgressEvent:
+        elapsed = time.monotonic() - self.start_time
+        previous = self.last_event
+
+        out_time = self._out_time_seconds(block)
+        if out_time is None:
+            out_time = previous.out_time if previous else 0.0
+
+        frame = self._to_float(block.get('frame'))
+        fps = self._to_float(block.get('fps'))
+        speed = self._to_float(block.get('speed'))
+        total_size = self._to_float(block.get('total_size'))
+        bitrate = self._to_float((block.get('bitrate') or '').replace('kbits/s', ''))
+
+        if fps:
+            self._fps_samples.append(fps)
+        if bitrate:
+            self._last_bitrate = bitrate
+        # El tamaño solo crece: si falta en este bloque se conserva el anterior
+        if total_size is None and previous:
+            total_size = previous.total_size
+
+        if self.duration > 0:
+            percentage = min(100.0, (out_time / self.duration) * 100)
+        else:
+            percentage = 0.0
+        if finished:
+            percentage = 100.0
+
+        eta = None
+        if self.duration > 0 and not finished:
+            remaining = max(0.0, self.duration - out_time)
+            if speed and speed > 0:
+                eta = remaining / speed
+            elif out_time > 0 and elapsed > 0:
+                eta = remaining / (out_time / elapsed)
+        elif finished:
+            eta = 0.0
+
+        event = FFmpegProgressEvent(
+            percentage=percentage,
+            out_time=out_time,
+            duration=self.duration,
+            elapsed=elapsed,
+            frame=int(frame) if frame is not None else None,
+            fps=fps,
+            bitrate_kbps=bitrate,
+            total_size=int(total_size) if total_size is not None else None,
+            speed=speed,
+            eta_seconds=eta,
+            finished=finished,
+        )
+        self.last_event = event
+        return event
+
+    def summary(self) -> str | None:
+        """Resumen del rendimiento del proceso (para el log), o None si no hubo progreso."""
+        event = self.last_event
+        if event is None:
+            return None
+
+        parts = [f"{event.elapsed:.1f}s reales"]
+        if event.out_time > 0 and event.elapsed > 0:
+            parts.append(f"velocidad media {event.out_time / event.elapsed:.2f}x")
+        if event.frame:
+            parts.append(f"{event.frame} fotogramas")
+            if event.elapsed > 0:
+                parts.append(f"{event.frame / event.elapsed:.1f} fps medios")
+        elif self._fps_samples:
+            parts.append(f"{sum(self._fps_samples) / len(self._fps_samples):.1f} fps medios")
+        if event.total_size:
+            parts.append(f"{event.total_size / (1024 * 1024):.1f} MB")
+        if self._last_bitrate:
+            parts.append(f"{self._last_bitrate:.0f} kbit/s")
+        return ", ".join(parts)
@@ -0,0 +1,164 @@
+import os
+import threading
+import time
+from collections import deque
+
+from src.core.ffmpeg_progress import format_eta
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    CAN_WATCH = True
+except ImportError:
+    CAN_WATCH = False
+    FileSystemEventHandler = object
+    print("ADVERTENCIA: 'watchdog' no instalado. El progreso de fotogramas se medirá comprobando archivos.")
+
+
+class _FrameEventHandler(FileSystemEventHandler):
+    """Anota los fotogramas que aparecen en la carpeta vigilada (creados o movidos dentro)."""
+
+    def __init__(self, seen: set, lock: threading.Lock, extension: str):
+        super().__init__()
+        self._seen = seen
+        self._lock = lock
+        self._extension = extension
+
+    def _add(self, path: str):
+        if path.endswith(self._extension):
+            with self._lock:
+                self._seen.add(os.path.basename(path))
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._add(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self._add(event.dest_path)
+
+
+class FrameProgressTracker:
+    """
+    Cuenta los fotogramas que van apareciendo en una carpeta sin listarla
+    entera en cada consulta.
+
+    - Con 'watchdog' se usan eventos del sistema de archivos.
+    - Sin él, se comprueba solo la existencia de los siguientes nombres
+      esperados: 'expected' son grupos de nombres en el orden en que se
+      generan (uno por proceso); sin 'expected', se sigue el patrón
+      secuencial frame_00000001 + 'extension' desde 'start_number' (salida de FFmpeg).
+    En ambos casos el coste por consulta depende de los fotogramas nuevos,
+    no del total de la carpeta.
+    """
+
+    RATE_WINDOW_SECONDS = 10.0
+
+    def __init__(self, directory: str, total: int = 0, expected: list[list[str]] | None = None,
+                 extension: str = ".png", start_number: int = 1):
+        self.directory = directory
+        self.extension = extension
+        self.total = max(0, int(total or 0))
+        self.expected = expected
+        self.pattern = "frame_{:08d}" + extension
+        self.start_number = start_number
+        self.start_time = time.monotonic()
+
+        self._cursors = [0] * len(expected) if expected is not None else [0]
+        self._seen: set[str] = set()
+        self._lock = threading.Lock()
+        self._observer = None
+        self._samples = deque()
+        self.count = 0
+
+    def start(self):
+        if CAN_WATCH:
+            try:
+                observer = Observer()
+                observer.schedule(_FrameEventHandler(self._seen, self._lock, self.extension), self.directory, recursive=False)
+                observer.start()
+                self._observer = observer
+            except Exception as e:
+                print(f"ADVERTENCIA: No se pudo vigilar '{self.directory}', se usará el recuento incremental: {e}")
+                self._observer = None
+        return self
+
+    def stop(self):
+        if self._observer is not None:
+            try:
+                self._observer.stop()
+                self._observer.join(timeout=2.0)
+            except Exception:
+                pass
+            self._observer = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _advance_cursors(self) -> int:
+        if self.expected is None:
+            index = self._cursors[0]
+            while os.path.exists(os.path.join(self.directory, self.pattern.format(self.start_number + index))):
+                index += 1
+            self._cursors[0] = index
+            return index
+
+        for i, names in enumerate(self.expected):
+            index = self._cursors[i]
+            while index < len(names) and os.path.exists(os.path.join(self.directory, names[index])):
+                index += 1
+            self._cursors[i] = index
+        return sum(self._cursors)
+
+    def poll(self) -> int:
+        """Actualiza y devuelve el número de fotogramas ya escritos."""
+        if self._observer is not None:
+            with self._lock:
+                count = len(self._seen)
+        else:
+            count = self._advance_cursors()
+        # Nunca retrocede (p. ej. un archivo renombrado al terminar)
+        self.count = max(self.count, count)
+
+        now = time.monotonic()
+        self._samples.append((now, self.count))
+        while len(self._samples) > 2 and now - self._samples[0][0] > self.RATE_WINDOW_SECONDS:
+            self._samples.popleft()
+        return self.count
+
+    @property
+    def fps(self) -> float | None:
+        """Fotogramas por segundo en la ventana reciente (None si aún no hay datos)."""
+        if len(self._samples) < 2:
+            return None
+        (t0, c0), (t1, c1) = self._samples[0], self._samples[-1]
+        if t1 <= t0 or c1 <= c0:
+            return None
+        return (c1 - c0) / (t1 - t0)
+
+    def eta_seconds(self, done: int | None = None, total: int | None = None, fps: float | None = None) -> float | None:
+        total = self.total if total is None else total
+        done = self.count if done is None else done
+        fps = fps or self.fps
+        if not total or not fps:
+            return None
+        return max(0, total - done) / fps
+
+    def describe(self, action: str, done: int | None = None, total: int | None = None, fps: float | None = None) -> str:
+        """Texto para la UI: 'Procesando: 120/900 fotogramas | 4.2 fps | ETA 03:05'."""
+        done = self.count if done is None else done
+        total = self.total if total is None else total
+        fps = fps or self.fps
+        parts = [f"{action}: {done}/{total} fotogramas" if total else f"{action}: {done} fotogramas"]
+        if fps:
+            parts.append(f"{fps:.1f} fps")
+            eta = self.eta_seconds(done, total, fps)
+            if eta is not None:
+                parts.append(f"ETA {format_eta(eta)}")
+        else:
+            parts.append(f"{int(time.monotonic() - self.start_time)}s")
+        return " | ".join(parts)
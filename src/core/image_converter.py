@@ -1,14 +1,25 @@
 import os
 import io
 import re
+import queue
+import pickle
 import tempfile
 import threading
 import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
 import pillow_avif
 from src.core.inkscape_service import InkscapeService
+from src.core.onnx_session_pool import OnnxSessionPool
+from src.core.rembg_variants import RembgVariantSelector
 
 from src.core.constants import WAIFU2X_MODELS, SRMD_MODELS
 from src.core.constants import IMAGE_RASTER_FORMATS, IMAGE_INPUT_FORMATS, IMAGE_RAW_FORMATS
+from src.core.constants import IMAGE_CONVERT_MAX_WORKERS, REMBG_BATCH_SIZE, REMBG_BATCH_MAX_PIXELS
+from src.core.constants import (REMBG_TILE_SIZE, REMBG_TILE_OVERLAP, REMBG_TILE_EDGE_RANGE,
+                                REMBG_TILE_BYTES_PER_PIXEL, REMBG_TILE_DEFAULT_MEMORY_MB)
+from src.core.constants import ONNX_SESSION_DEFAULT_BUDGET_MB, ONNX_OPTIMIZED_DIRNAME
 from main import BIN_DIR, REMBG_MODELS_DIR, MODELS_DIR
 
 try:
@@ -45,20 +56,55 @@ except ImportError:
 
 
 
+# Normalización ImageNet de la entrada de los modelos de eliminación de fondo
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+
+# --- Estado de cada proceso del pool de conversión (ver convert_files_parallel) ---
+_worker_converter = None
+_worker_cancel_event = None
+_worker_progress_queue = None
+
+
+def _init_convert_worker(poppler_path, cancel_event, progress_queue):
+    """Crea un ImageConverter propio en cada proceso del pool (sin IA ni Inkscape)."""
+    global _worker_converter, _worker_cancel_event, _worker_progress_queue
+    _worker_converter = ImageConverter(poppler_path=poppler_path)
+    _worker_cancel_event = cancel_event
+    _worker_progress_queue = progress_queue
+
+
+def _convert_in_worker(key, input_path, output_path, options, page_number):
+    """Convierte un archivo dentro de un proceso del pool. Devuelve (clave, éxito)."""
+    def report(file_pct, message=None):
+        if file_pct is not None:
+            _worker_progress_queue.put((key, file_pct))
+
+    success = _worker_converter.convert_file(input_path, output_path, options, page_number=page_number,
+                                             progress_callback=report, cancellation_event=_worker_cancel_event)
+    return key, success
+
+
 class ImageConverter:
     """
     Motor de conversión de imágenes que soporta múltiples formatos
     de entrada/salida con opciones avanzadas.
     """
     
-    def __init__(self, poppler_path=None, inkscape_service=None, ffmpeg_processor=None):
+    def __init__(self, poppler_path=None, inkscape_service=None, ffmpeg_processor=None,
+                 ai_memory_budget_mb=ONNX_SESSION_DEFAULT_BUDGET_MB, variant_cache_path=None):
         self.poppler_path = poppler_path
         self.inkscape_service = inkscape_service
         self.ffmpeg_processor = ffmpeg_processor
 
         # --- Variables para Lazy Loading de IA ---
         self.rembg_module = None   # Aquí guardaremos la librería cargada
-        self.rembg_sessions = {}   # Aquí guardaremos las sesiones de modelos
+        # Sesiones de modelos: límite de memoria con desalojo LRU y grafos optimizados en disco
+        self.session_pool = OnnxSessionPool(ai_memory_budget_mb, os.path.join(MODELS_DIR, ONNX_OPTIMIZED_DIRNAME))
+        self._rembg_input_buffer = None   # Tensor de entrada reutilizado entre inferencias
+        self.variant_selector = None       # Variantes INT8/FP16 en CPU (ver set_variant_cache)
+        self.set_variant_cache(variant_cache_path)
         
         # --- Asignar correctamente las variables ---
         self.gs_dir, self.gs_exe = self._find_local_ghostscript()
@@ -135,13 +181,42 @@ class ImageConverter:
         
     def clear_ai_sessions(self):
         """Libera la memoria de los modelos de IA cargados."""
-        if self.rembg_sessions:
-            print(f"DEBUG: Liberando {len(self.rembg_sessions)} sesiones de IA de la memoria.")
-            self.rembg_sessions.clear()
-            
-        # Forzar al recolector de basura de Python
-        import gc
-        gc.collect()
+        if len(self.session_pool):
+            print(f"DEBUG: Liberando {len(self.session_pool)} sesiones de IA de la memoria.")
+        # El pool fuerza al recolector de basura de Python
+        self.session_pool.clear()
+        self._rembg_input_buffer = None
+
+    def set_ai_memory_budget(self, megabytes):
+        """Cambia el límite de memoria de los modelos IA (0 = sin límite). Se aplica en la próxima carga."""
+        self.session_pool.memory_budget_mb = megabytes
+
+    def set_variant_cache(self, cache_path):
+        """Activa (con la ruta de su caché) o desactiva (None) la elección de variantes en CPU."""
+        self.variant_selector = RembgVariantSelector(cache_path) if cache_path else None
+
+    def _cpu_variant(self, model_path, high_res, size=None, progress_callback=None):
+        """
+        Variante del modelo a usar en CPU: la más rápida (INT8/FP16) cuya
+        máscara se parece a la del modelo elegido, o el propio modelo.
+        """
+        if self.variant_selector is None:
+            return model_path
+
+        def mask_fn(session, pil_image):
+            import numpy as np
+            if high_res:
+                return self._high_res_mask_to_uint8(self._run_high_res_model(session, pil_image))
+            return np.asarray(self._process_onnx_manual(pil_image, session, size).getchannel("A"))
+
+        variant = self.variant_selector.select(model_path, mask_fn, progress_callback)
+        if variant != model_path:
+            print(f"DEBUG: Variante para CPU de {os.path.basename(model_path)}: {os.path.basename(variant)}")
+        return variant
+
+    def get_ai_session_summary(self):
+        """Modelos cargados con su memoria y tiempo de carga (texto para la UI)."""
+        return self.session_pool.summary()
 
     def prepare_ai_sessions(self, options, progress_callback=None):
         """
@@ -153,107 +228,55 @@ class ImageConverter:
             if not self._load_rembg_lazy(progress_callback):
                 return False
             
-            # 2. Inicializar la sesión de ONNX si no existe
-            model_name = options.get("rembg_model", "u2net")
-            use_gpu = options.get("use_gpu", True)
-            
-            # Buscar ruta del modelo
-            from main import MODELS_DIR
-            model_path = os.path.join(MODELS_DIR, "rembg", f"{model_name}.onnx")
-            
-            if not os.path.exists(model_path):
-                # Si no existe, no podemos pre-cargar (se descargará luego en remove_background)
+            # 2. Inicializar la sesión de ONNX si no existe (queda en el pool para remove_background)
+            model_name = options.get("rembg_model", "u2netp")
+            use_gpu = options.get("rembg_gpu", True)
+            is_high_res, high_res_path = self._find_high_res_model(model_name)
+            if is_high_res and not high_res_path:
+                # Si no existe, no podemos pre-cargar (se avisará en remove_background)
                 return True
+
+            if progress_callback:
+                hw = "GPU/DirectML" if use_gpu else "CPU"
+                progress_callback(None, f"Inicializando modelo {model_name} en {hw}...")
             
-            session_key = f"{model_path}_{'gpu' if use_gpu else 'cpu'}"
-            if session_key not in self.rembg_sessions:
-                if progress_callback:
-                    hw = "GPU/DirectML" if use_gpu else "CPU"
-                    progress_callback(None, f"Inicializando modelo {model_name} en {hw}...")
-                
-                try:
-                    import onnxruntime as ort
-                    sess_opts = ort.SessionOptions()
-                    if use_gpu:
-                        providers = ['DmlExecutionProvider', 'CPUExecutionProvider']
-                        sess_opts.enable_mem_pattern = False
-                    else:
-                        providers = ['CPUExecutionProvider']
-                    
-                    # Carga real (Bloqueante por 2-3s)
-                    self.rembg_sessions[session_key] = ort.InferenceSession(
-                        model_path, providers=providers, sess_options=sess_opts
-                    )
-                    print(f"DEBUG: Sesión {model_name} pre-cargada con éxito.")
-                except Exception as e:
-                    print(f"WARNING: No se pudo pre-cargar el modelo: {e}")
+            try:
+                # Carga real (Bloqueante por 2-3s; menos con el grafo optimizado en caché)
+                if is_high_res:
+                    self._get_high_res_session(high_res_path, use_gpu, progress_callback)
+                else:
+                    self._get_rembg_session(model_name, use_gpu, progress_callback)
+            except Exception as e:
+                print(f"WARNING: No se pudo pre-cargar el modelo: {e}")
         
         return True
         
-    def _process_high_res_onnx(self, pil_image, model_path, use_gpu=True):
+    def _process_high_res_onnx(self, pil_image, model_path, use_gpu=True, refine_edges=False,
+                               refine_memory_mb=REMBG_TILE_DEFAULT_MEMORY_MB):
         """
         Ejecuta la inferencia específica para modelos de alta resolución (RMBG 2.0, InSPyReNet) 
         usando ONNX Runtime con redimensión a 1024x1024 y normalización ImageNet.
+        Con 'refine_edges', en imágenes más grandes que la entrada del modelo
+        los bordes se refinan por mosaico (ver _refine_high_res_mask).
         """
         try:
-            import numpy as np
-            import onnxruntime as ort
-            
             # 1. Gestión de Sesión (Clave única por hardware)
-            session_key = f"{model_path}_{'gpu' if use_gpu else 'cpu'}"
-            
-            if session_key not in self.rembg_sessions:
-                hw_label = 'GPU' if use_gpu else 'CPU'
-                print(f"DEBUG: Cargando Modelo de Alta Res. en [{hw_label}]: {os.path.basename(model_path)}")
-                
-                sess_opts = ort.SessionOptions()
-                
-                if use_gpu:
-                    # --- MODO GPU (Seguro) ---
-                    providers = ['DmlExecutionProvider', 'CPUExecutionProvider']
-                    sess_opts.enable_mem_pattern = False
-                else:
-                    # --- MODO CPU (Rápido) ---
-                    providers = ['CPUExecutionProvider']
-                    sess_opts.enable_cpu_mem_arena = True
-                    sess_opts.execution_mode = ort.ExecutionMode.ORT_PARALLEL
-                
-                self.rembg_sessions[session_key] = ort.InferenceSession(model_path, providers=providers, sess_options=sess_opts)
-            
-            session = self.rembg_sessions[session_key]
+            session = self._get_high_res_session(model_path, use_gpu)
+            orig_w, orig_h = pil_image.size
 
-            # 2. Preprocesamiento
-            original_image = pil_image.convert("RGB")
-            orig_w, orig_h = original_image.size
-            
-            # Redimensionar a 1024x1024
-            img_resized = original_image.resize((1024, 1024), Image.Resampling.BILINEAR)
-            
-            # Convertir a Numpy y Normalizar (0-1)
-            img_np = np.array(img_resized).astype(np.float32) / 255.0
-            
-            # Estandarización (ImageNet mean/std)
-            mean = np.array([0.485, 0.456, 0.406], dtype=np.float32)
-            std  = np.array([0.229, 0.224, 0.225], dtype=np.float32)
-            
-            img_np = (img_np - mean) / std
-            img_np = img_np.astype(np.float32)
-            
-            # Transponer a (Batch, Channel, Height, Width) -> (1, 3, 1024, 1024)
-            img_np = img_np.transpose(2, 0, 1)
-            img_np = np.expand_dims(img_np, 0)
-
-            # 3. Inferencia
-            input_name = session.get_inputs()[0].name
-            result = session.run(None, {input_name: img_np})
-            mask = result[0][0, 0]
+            # 2-3. Pasada global (toda la imagen a 1024x1024)
+            coarse_mask = self._high_res_mask_to_uint8(self._run_high_res_model(session, pil_image))
 
             # 4. Postprocesamiento
-            mask = (mask * 255).clip(0, 255).astype(np.uint8)
-            mask_img = Image.fromarray(mask, mode='L')
-            mask_img = mask_img.resize((orig_w, orig_h), Image.Resampling.LANCZOS)
-
-            # 5. Aplicar al canal Alfa
+            mask_img = None
+            if refine_edges and max(orig_w, orig_h) > REMBG_TILE_SIZE:
+                mask_img = self._refine_high_res_mask(session, pil_image, coarse_mask, refine_memory_mb)
+            if mask_img is None:
+                mask_img = Image.fromarray(coarse_mask, mode='L')
+            if mask_img.size != (orig_w, orig_h):
+                mask_img = mask_img.resize((orig_w, orig_h), Image.Resampling.LANCZOS)
+
+            # 5. Aplicar al canal Alfa (única copia del tamaño original)
             final_image = pil_image.convert("RGBA")
             final_image.putalpha(mask_img)
             
@@ -262,38 +285,141 @@ class ImageConverter:
         except Exception as e:
             print(f"ERROR en inferencia de alta resolución: {e}")
             return pil_image
-        
-    def _process_onnx_manual(self, pil_image, session, target_size):
+
+    def _get_high_res_session(self, model_path, use_gpu, progress_callback=None):
+        """Sesión de un modelo de alta resolución (RMBG 2.0, InSPyReNet) desde el pool."""
+        import onnxruntime as ort
+
+        if not use_gpu:
+            model_path = self._cpu_variant(model_path, high_res=True, progress_callback=progress_callback)
+
+        def configure(sess_opts):
+            if use_gpu:
+                # --- MODO GPU (Seguro) ---
+                sess_opts.enable_mem_pattern = False
+            else:
+                # --- MODO CPU (Rápido) ---
+                sess_opts.enable_cpu_mem_arena = True
+                sess_opts.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+
+        if self.session_pool.key_for(model_path, use_gpu) not in self.session_pool:
+            hw_label = 'GPU' if use_gpu else 'CPU'
+            print(f"DEBUG: Cargando Modelo de Alta Res. en [{hw_label}]: {os.path.basename(model_path)}")
+        return self.session_pool.get(model_path, use_gpu, configure)
+
+    def _run_high_res_model(self, session, pil_image):
+        """Pasa una imagen por un modelo de alta resolución. Devuelve la máscara (1024, 1024) en 0-1."""
+        size = (REMBG_TILE_SIZE, REMBG_TILE_SIZE)
+        input_tensor = self._get_rembg_input_buffer(1, size)
+        self._fill_rembg_input(input_tensor[0], pil_image, size)
+
+        input_name = session.get_inputs()[0].name
+        result = session.run(None, {input_name: input_tensor})
+        return result[0][0, 0]
+
+    @staticmethod
+    def _high_res_mask_to_uint8(mask):
+        import numpy as np
+        return (mask * 255).clip(0, 255).astype(np.uint8)
+
+    def _refine_high_res_mask(self, session, pil_image, coarse_mask, memory_mb):
         """
-        Inferencia manual universal con corrección matemática para BiRefNet.
+        Refina por mosaico la máscara de un modelo de alta resolución.
+
+        Se trabaja a la mayor resolución que cabe en 'memory_mb' (como mucho
+        la original). Solo se procesan las teselas solapadas que tocan la
+        franja dudosa de la pasada global (bordes, pelo); dentro de esa franja
+        las teselas se funden con pesos en rampa y fuera se conserva la
+        máscara global, que tiene el contexto de toda la imagen.
+        Devuelve la máscara 'L' a resolución de trabajo, o None si no hay nada que refinar.
         """
         import numpy as np
-        
-        # 1. Preprocesamiento
-        original_image = pil_image.convert("RGB")
-        orig_w, orig_h = original_image.size
-        
-        # Redimensionar (BiRefNet/IsNet requieren 1024, U2Net 320)
-        img_resized = original_image.resize(target_size, Image.Resampling.BILINEAR)
-        
-        # Normalización estándar (ImageNet)
-        img_np = np.array(img_resized).astype(np.float32) / 255.0
-        mean = np.array([0.485, 0.456, 0.406], dtype=np.float32)
-        std  = np.array([0.229, 0.224, 0.225], dtype=np.float32)
-        img_np = (img_np - mean) / std
-        
-        img_np = img_np.transpose(2, 0, 1)
-        img_np = np.expand_dims(img_np, 0)
+        from PIL import ImageFilter
 
-        # 2. Inferencia
-        input_name = session.get_inputs()[0].name
-        result = session.run(None, {input_name: img_np})
+        orig_w, orig_h = pil_image.size
+        budget_pixels = memory_mb * 1024 * 1024 / REMBG_TILE_BYTES_PER_PIXEL
+        scale = min(1.0, (budget_pixels / (orig_w * orig_h)) ** 0.5)
+        work_w, work_h = max(1, int(orig_w * scale)), max(1, int(orig_h * scale))
+        if max(work_w, work_h) <= REMBG_TILE_SIZE:
+            return None # A esta resolución las teselas no aportan detalle
+
+        # Franja dudosa: se calcula y dilata sobre la máscara global (barato) y luego se amplía
+        edge_low, edge_high = REMBG_TILE_EDGE_RANGE
+        band_small = Image.fromarray(((coarse_mask > edge_low) & (coarse_mask < edge_high)).astype(np.uint8) * 255, mode='L')
+        band_small = band_small.filter(ImageFilter.MaxFilter(5))
+        if not band_small.getbbox():
+            return None
+        band = np.asarray(band_small.resize((work_w, work_h), Image.Resampling.NEAREST)) > 0
+        coarse = np.asarray(Image.fromarray(coarse_mask, mode='L').resize((work_w, work_h), Image.Resampling.BILINEAR))
+
+        work_image = pil_image if scale >= 1.0 else pil_image.resize((work_w, work_h), Image.Resampling.BILINEAR)
+        if work_image.mode != "RGB":
+            work_image = work_image.convert("RGB")
+
+        tile_w, tile_h = min(REMBG_TILE_SIZE, work_w), min(REMBG_TILE_SIZE, work_h)
+
+        def starts(length, size):
+            stride = max(1, size - REMBG_TILE_OVERLAP)
+            return list(range(0, length - size, stride)) + [length - size]
+
+        def ramp(size):
+            distance = np.minimum(np.arange(1, size + 1), np.arange(size, 0, -1)).astype(np.float32)
+            return np.clip(distance / REMBG_TILE_OVERLAP, 1e-3, 1.0)
+
+        tiles = [(x, y) for y in starts(work_h, tile_h) for x in starts(work_w, tile_w)
+                 if band[y:y + tile_h, x:x + tile_w].any()]
+        print(f"INFO: Refinando bordes en {len(tiles)} teselas ({work_w}x{work_h}, escala {scale:.2f}).")
+
+        weight = np.outer(ramp(tile_h), ramp(tile_w))
+        accumulated = np.zeros((work_h, work_w), dtype=np.float32)
+        weight_sum = np.zeros((work_h, work_w), dtype=np.float32)
+
+        for x, y in tiles:
+            tile_mask = self._run_high_res_model(session, work_image.crop((x, y, x + tile_w, y + tile_h)))
+            if tile_mask.shape != (tile_h, tile_w):
+                tile_mask = np.asarray(Image.fromarray(tile_mask.astype(np.float32), mode='F').resize(
+                    (tile_w, tile_h), Image.Resampling.BILINEAR))
+            accumulated[y:y + tile_h, x:x + tile_w] += tile_mask * weight
+            weight_sum[y:y + tile_h, x:x + tile_w] += weight
+
+        refined_area = band & (weight_sum > 0)
+        mask = coarse.copy()
+        mask[refined_area] = np.clip(accumulated[refined_area] / weight_sum[refined_area] * 255, 0, 255).astype(np.uint8)
+        return Image.fromarray(mask, mode='L')
         
-        # Obtener máscara (Batch, 1, H, W) -> (H, W)
-        # Algunos modelos devuelven una lista, tomamos el primer tensor
-        raw_mask = result[0][0, 0]
+    def _get_rembg_input_buffer(self, rows, size):
+        """
+        Devuelve el tensor de entrada (rows, 3, H, W) en float32, reservado
+        una sola vez y reutilizado en cada lote mientras no cambie la forma.
+        """
+        import numpy as np
+
+        shape = (rows, 3, size[1], size[0])
+        if self._rembg_input_buffer is None or self._rembg_input_buffer.shape != shape:
+            self._rembg_input_buffer = np.empty(shape, dtype=np.float32)
+        return self._rembg_input_buffer
+
+    def _fill_rembg_input(self, slot, pil_image, target_size):
+        """
+        Escribe en 'slot' (3, H, W) la imagen redimensionada y normalizada
+        (ImageNet). Se calcula canal a canal sobre el propio buffer, sin
+        tensores intermedios del tamaño de la imagen.
+        """
+        import numpy as np
+
+        rgb_image = pil_image if pil_image.mode == "RGB" else pil_image.convert("RGB")
+        pixels = np.asarray(rgb_image.resize(target_size, Image.Resampling.BILINEAR))
 
-        # 3. Postprocesamiento Inteligente (CORRECCIÓN BIREFNET)
+        # (x / 255 - mean) / std  ==  x * (1 / (255 * std)) - mean / std
+        for channel, (mean, std) in enumerate(zip(IMAGENET_MEAN, IMAGENET_STD)):
+            np.multiply(pixels[:, :, channel], np.float32(1.0 / (255.0 * std)), out=slot[channel], dtype=np.float32)
+            np.subtract(slot[channel], np.float32(mean / std), out=slot[channel])
+
+    def _apply_rembg_mask(self, pil_image, raw_mask):
+        """Convierte la salida del modelo (H, W) en el canal alfa de la imagen original."""
+        import numpy as np
+
+        # Postprocesamiento Inteligente (CORRECCIÓN BIREFNET)
         
         # Detectar si necesitamos Sigmoide:
         # Si los valores salen del rango [0, 1] (ej: -5 a +5), son Logits.
@@ -311,26 +437,38 @@ class ImageConverter:
         mask = (mask - mask.min()) / (mask.max() - mask.min() + 1e-8)
         mask = (mask * 255).astype(np.uint8)
         
-        # 4. Redimensionar y Aplicar
+        # Redimensionar y Aplicar
         mask_img = Image.fromarray(mask, mode='L')
-        mask_img = mask_img.resize((orig_w, orig_h), Image.Resampling.LANCZOS)
+        mask_img = mask_img.resize(pil_image.size, Image.Resampling.LANCZOS)
 
         final_image = pil_image.convert("RGBA")
         final_image.putalpha(mask_img)
         
         return final_image
-        
-    def remove_background(self, pil_image, model_filename="u2netp.onnx", progress_callback=None, use_gpu=True):
+
+    def _process_onnx_manual(self, pil_image, session, target_size):
         """
-        Elimina el fondo.
-        Args:
-            use_gpu (bool): True = GPU (DirectML Anti-Freeze), False = CPU (Full Performance)
+        Inferencia manual universal con corrección matemática para BiRefNet.
         """
+        # 1. Preprocesamiento (BiRefNet/IsNet requieren 1024, U2Net 320)
+        input_tensor = self._get_rembg_input_buffer(1, target_size)
+        self._fill_rembg_input(input_tensor[0], pil_image, target_size)
+
+        # 2. Inferencia
+        input_name = session.get_inputs()[0].name
+        result = session.run(None, {input_name: input_tensor})
         
+        # Obtener máscara (Batch, 1, H, W) -> (H, W)
+        # Algunos modelos devuelven una lista, tomamos el primer tensor
+        return self._apply_rembg_mask(pil_image, result[0][0, 0])
+
+    def _find_high_res_model(self, model_filename):
+        """
+        Identifica los modelos de alta resolución (RMBG 2.0 e InSPyReNet).
+        Devuelve (es_alta_resolución, ruta local o None si no está descargado).
+        """
         from main import MODELS_DIR
-        import onnxruntime as ort 
-        
-        # --- BLOQUE DE ALTA RESOLUCIÓN (RMBG 2.0 e InSPyReNet) ---
+
         high_res_names = [
             "bria-rmbg-2.0.onnx", "model.onnx", "model_bnb4.onnx", "model_fp16.onnx", 
             "model_int8.onnx", "model_quantized.onnx", "model_q4.onnx",
@@ -350,11 +488,88 @@ class ImageConverter:
                 target_model_path = p
                 break
 
-        if model_filename in high_res_names or target_model_path:
+        return (model_filename in high_res_names or target_model_path is not None), target_model_path
+
+    def _rembg_input_size(self, model_filename):
+        """Resolución de entrada del modelo rembg (ancho, alto)."""
+        model_lower = model_filename.lower()
+        
+        # Reglas basadas en tus errores:
+        # - BiRefNet: SIEMPRE 1024
+        # - IsNet (General/Anime): SIEMPRE 1024 (El log dice Expected: 1024)
+        # - U2Net (Standard/Human/P): 320
+        
+        if "birefnet" in model_lower:
+            return (1024, 1024)
+        elif "isnet" in model_lower: # <-- CAMBIO CLAVE: IsNet a 1024
+            return (1024, 1024)
+        elif "u2net" in model_lower:
+            return (320, 320)
+        # Ante la duda, hoy en día los modelos modernos usan 1024
+        return (1024, 1024)
+
+    def _get_rembg_session(self, model_filename, use_gpu, progress_callback=None):
+        """Carga (o reutiliza) la sesión ONNX de un modelo rembg. None si no se encuentra."""
+        from main import MODELS_DIR
+        import onnxruntime as ort 
+
+        # 1. Construir ruta completa
+        full_model_path = os.path.join(REMBG_MODELS_DIR, model_filename)
+        
+        # Si no está en la carpeta REMBG, buscar en la raíz de models (fallback)
+        if not os.path.exists(full_model_path):
+            full_model_path = os.path.join(MODELS_DIR, "rembg", model_filename)
+        
+        if not os.path.exists(full_model_path):
+            print(f"ERROR: No encuentro el modelo {model_filename}")
+            return None
+
+        if not use_gpu:
+            full_model_path = self._cpu_variant(full_model_path, high_res=False,
+                                                size=self._rembg_input_size(model_filename),
+                                                progress_callback=progress_callback)
+
+        def configure(sess_opts):
+            if use_gpu:
+                # CONFIG GPU (DirectML Anti-Freeze)
+                sess_opts.enable_mem_pattern = False 
+                sess_opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_BASIC
+                sess_opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+                sess_opts.inter_op_num_threads = 1 
+                sess_opts.intra_op_num_threads = 1
+            else:
+                # CONFIG CPU (Máxima Velocidad)
+                sess_opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                sess_opts.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+
+        # 2. Cargar sesión ONNX si no está en el pool (clave: ruta + GPU/CPU)
+        if self.session_pool.key_for(full_model_path, use_gpu) not in self.session_pool:
+            hw_label = 'GPU' if use_gpu else 'CPU'
+            print(f"DEBUG: Cargando Manualmente {model_filename} en [{hw_label}]")
+        return self.session_pool.get(full_model_path, use_gpu, configure)
+
+    @staticmethod
+    def _is_gpu_failure(error_msg):
+        """True si el error de ONNX Runtime es un fallo/timeout de la GPU (DirectML)."""
+        return "DmlFusedNode" in error_msg or "887A0007" in error_msg or "Non-zero status" in error_msg
+
+    def remove_background(self, pil_image, model_filename="u2netp.onnx", progress_callback=None, use_gpu=True,
+                          refine_edges=False, refine_memory_mb=REMBG_TILE_DEFAULT_MEMORY_MB):
+        """
+        Elimina el fondo.
+        Args:
+            use_gpu (bool): True = GPU (DirectML Anti-Freeze), False = CPU (Full Performance)
+            refine_edges (bool): Refinar bordes por mosaico (solo modelos de alta resolución)
+            refine_memory_mb (int): Memoria de trabajo máxima del refinado
+        """
+        # --- BLOQUE DE ALTA RESOLUCIÓN (RMBG 2.0 e InSPyReNet) ---
+        is_high_res, target_model_path = self._find_high_res_model(model_filename)
+        if is_high_res:
             if not target_model_path:
                 print(f"ERROR: El modelo de alta resolución no se encuentra localmente: {model_filename}")
                 return pil_image
-            return self._process_high_res_onnx(pil_image, target_model_path, use_gpu=use_gpu)
+            return self._process_high_res_onnx(pil_image, target_model_path, use_gpu=use_gpu,
+                                               refine_edges=refine_edges, refine_memory_mb=refine_memory_mb)
 
         # --- CARGA LAZY DE REMBG ---
         if not self._load_rembg_lazy(progress_callback):
@@ -362,68 +577,13 @@ class ImageConverter:
             return pil_image
 
         try:
-            # 1. Definir clave de caché única (Nombre + GPU/CPU)
-            session_key = f"{model_filename}_{'gpu' if use_gpu else 'cpu'}"
-
-            # 2. Cargar sesión ONNX si no existe
-            if session_key not in self.rembg_sessions:
-                # Construir ruta completa
-                full_model_path = os.path.join(REMBG_MODELS_DIR, model_filename)
-                
-                # Si no está en la carpeta REMBG, buscar en la raíz de models (fallback)
-                if not os.path.exists(full_model_path):
-                    full_model_path = os.path.join(MODELS_DIR, "rembg", model_filename)
-                
-                if not os.path.exists(full_model_path):
-                    print(f"ERROR: No encuentro el modelo {model_filename}")
-                    return pil_image
-
-                hw_label = 'GPU' if use_gpu else 'CPU'
-                print(f"DEBUG: Cargando Manualmente {model_filename} en [{hw_label}]")
-                
-                sess_opts = ort.SessionOptions()
-
-                if use_gpu:
-                    # CONFIG GPU (DirectML Anti-Freeze)
-                    providers = ['DmlExecutionProvider', 'CPUExecutionProvider']
-                    sess_opts.enable_mem_pattern = False 
-                    sess_opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_BASIC
-                    sess_opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
-                    sess_opts.inter_op_num_threads = 1 
-                    sess_opts.intra_op_num_threads = 1
-                else:
-                    # CONFIG CPU (Máxima Velocidad)
-                    providers = ['CPUExecutionProvider']
-                    sess_opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
-                    sess_opts.execution_mode = ort.ExecutionMode.ORT_PARALLEL
-                
-                # Cargamos la sesión "cruda" de ONNX Runtime
-                self.rembg_sessions[session_key] = ort.InferenceSession(
-                    full_model_path, 
-                    providers=providers, 
-                    sess_options=sess_opts
-                )
-            
-            # 3. Obtener sesión
-            session = self.rembg_sessions[session_key]
+            # 1-3. Obtener sesión
+            session = self._get_rembg_session(model_filename, use_gpu)
+            if session is None:
+                return pil_image
             
             # 4. Determinar resolución (CORREGIDO SEGÚN LOGS)
-            model_lower = model_filename.lower()
-            
-            # Reglas basadas en tus errores:
-            # - BiRefNet: SIEMPRE 1024
-            # - IsNet (General/Anime): SIEMPRE 1024 (El log dice Expected: 1024)
-            # - U2Net (Standard/Human/P): 320
-            
-            if "birefnet" in model_lower:
-                size = (1024, 1024)
-            elif "isnet" in model_lower: # <-- CAMBIO CLAVE: IsNet a 1024
-                size = (1024, 1024)
-            elif "u2net" in model_lower:
-                size = (320, 320)
-            else:
-                # Ante la duda, hoy en día los modelos modernos usan 1024
-                size = (1024, 1024) 
+            size = self._rembg_input_size(model_filename)
             
             # 5. Ejecutar inferencia MANUAL
             try:
@@ -435,7 +595,7 @@ class ImageConverter:
                 error_msg = repr(run_error)
 
                 # Detectar si fue un fallo de GPU (DirectML)
-                if use_gpu and ("DmlFusedNode" in error_msg or "887A0007" in error_msg or "Non-zero status" in error_msg):
+                if use_gpu and self._is_gpu_failure(error_msg):
                     print(f"⚠️ ADVERTENCIA: La GPU falló o se agotó el tiempo. Reintentando con CPU...")
                     
                     # 🔥 FALLBACK: Llamada recursiva forzando CPU
@@ -450,6 +610,92 @@ class ImageConverter:
             # Esto imprime el objeto error crudo y evita el crash por tildes/caracteres raros
             print(f"ERROR CRÍTICO al procesar IA ({model_filename}): {repr(e)}")
             return pil_image
+
+    def rembg_batch_size(self, model_filename):
+        """
+        Imágenes por inferencia para este modelo. Los de alta resolución
+        (RMBG 2.0, InSPyReNet) van de una en una.
+        """
+        if self._find_high_res_model(model_filename)[0]:
+            return 1
+        width, height = self._rembg_input_size(model_filename)
+        return max(1, min(REMBG_BATCH_SIZE, REMBG_BATCH_MAX_PIXELS // (width * height)))
+
+    def can_batch_background_removal(self, options):
+        """True si con estas opciones la eliminación de fondo se agrupa en lotes."""
+        return (options.get("rembg_enabled", False)
+                and self.rembg_batch_size(options.get("rembg_model", "u2netp")) > 1)
+
+    def remove_background_batch(self, pil_images, model_filename="u2netp.onnx", progress_callback=None,
+                                use_gpu=True, batch_size=None, **refine_options):
+        """
+        Elimina el fondo de varias imágenes agrupándolas en un solo tensor
+        (N, 3, H, W) por inferencia. Devuelve las imágenes en el mismo orden;
+        las que fallan se devuelven sin cambios, igual que 'remove_background'.
+        'refine_options' se pasan a 'remove_background' cuando se procesa de una en una.
+        """
+        pil_images = list(pil_images)
+        requested_batch_size = batch_size
+        batch_size = batch_size or self.rembg_batch_size(model_filename)
+        if batch_size <= 1 or len(pil_images) <= 1:
+            return [self.remove_background(img, model_filename, progress_callback, use_gpu=use_gpu, **refine_options)
+                    for img in pil_images]
+
+        if not self._load_rembg_lazy(progress_callback):
+            print("ERROR: La librería de IA no pudo cargarse.")
+            return pil_images
+
+        try:
+            session = self._get_rembg_session(model_filename, use_gpu)
+        except Exception as e:
+            print(f"ERROR CRÍTICO al procesar IA ({model_filename}): {repr(e)}")
+            return pil_images
+        if session is None:
+            return pil_images
+
+        size = self._rembg_input_size(model_filename)
+        model_input = session.get_inputs()[0]
+
+        # Si el modelo se exportó con el lote fijo, se rellena siempre el tensor completo
+        fixed_rows = model_input.shape[0] if isinstance(model_input.shape[0], int) and model_input.shape[0] > 0 else None
+        if fixed_rows is not None:
+            batch_size = fixed_rows
+        if batch_size <= 1:
+            return [self.remove_background(img, model_filename, progress_callback, use_gpu=use_gpu, **refine_options)
+                    for img in pil_images]
+
+        results = []
+        for start in range(0, len(pil_images), batch_size):
+            chunk = pil_images[start:start + batch_size]
+            rows = fixed_rows or len(chunk)
+            input_tensor = self._get_rembg_input_buffer(batch_size, size)
+            for slot, img in enumerate(chunk):
+                self._fill_rembg_input(input_tensor[slot], img, size)
+
+            try:
+                masks = session.run(None, {model_input.name: input_tensor[:rows]})[0]
+            except Exception as run_error:
+                error_msg = repr(run_error)
+                if use_gpu and self._is_gpu_failure(error_msg):
+                    print("⚠️ ADVERTENCIA: La GPU falló o se agotó el tiempo. Reintentando el lote con CPU...")
+                    return results + self.remove_background_batch(pil_images[start:], model_filename,
+                                                                   progress_callback, use_gpu=False,
+                                                                   batch_size=requested_batch_size, **refine_options)
+                print(f"ERROR CRÍTICO al procesar IA por lotes ({model_filename}): {error_msg}")
+                results.extend(chunk)
+                continue
+
+            for slot, img in enumerate(chunk):
+                try:
+                    results.append(self._apply_rembg_mask(img, masks[slot, 0]))
+                except Exception as e:
+                    print(f"ERROR CRÍTICO al procesar IA ({model_filename}): {repr(e)}")
+                    results.append(img)
+
+            if progress_callback:
+                progress_callback(None, f"IA por lotes: {start + len(chunk)}/{len(pil_images)} imágenes")
+
+        return results
     
     def _apply_alpha_postprocess(self, pil_image, smooth_px=0, expand_px=0):
         """
@@ -525,45 +771,7 @@ class ImageConverter:
             bool: True si la conversión fue exitosa
         """
         try:
-            # Reporte inicial: Inicio (0-10%)
-            if progress_callback: progress_callback(5)
-
-            input_ext = os.path.splitext(input_path)[1].lower()
-            output_format = options.get("format", "PNG").upper()
-            
-            resize_enabled = options.get("resize_enabled", False)
-            target_size = None
-            maintain_aspect = True
-            
-            if resize_enabled:
-                target_width = options.get("resize_width")
-                target_height = options.get("resize_height")
-                maintain_aspect = options.get("resize_maintain_aspect", True)
-                
-                if target_width and target_height:
-                    target_size = (int(target_width), int(target_height))
-            
-            # 1. Cargar imagen
-            if cancellation_event and cancellation_event.is_set(): raise UserCancelledError("Cancelado por usuario") # ✅ CHEQUEO
-            
-            pil_image = self._load_image(input_path, input_ext, target_size, maintain_aspect, options, page_number=page_number)
-            
-            if not pil_image:
-                raise Exception(f"No se pudo cargar la imagen desde {input_path}")
-            
-            # Reporte: Cargado (30%)
-            if progress_callback: progress_callback(30)
-            
-            if cancellation_event and cancellation_event.is_set(): raise UserCancelledError("Cancelado por usuario") # ✅ CHEQUEO
-
-            # 2. Resize raster
-            if resize_enabled and target_size and input_ext not in self.VECTOR_FORMATS:
-                pil_image = self._resize_raster_image(pil_image, target_size, maintain_aspect, options)
-            
-            # Reporte: Resize listo (40%)
-            if progress_callback: progress_callback(40)
-
-            if cancellation_event and cancellation_event.is_set(): raise UserCancelledError("Cancelado por usuario") # ✅ CHEQUEO
+            pil_image = self._load_for_conversion(input_path, options, page_number, progress_callback, cancellation_event)
 
             # 2.5 Eliminar fondo con IA
             if options.get("rembg_enabled", False):
@@ -579,78 +787,14 @@ class ImageConverter:
                     progress_callback(45, f"Preparando IA ({'GPU' if use_gpu else 'CPU'})...")
                 
                 # Pasamos el callback y la opción use_gpu
-                pil_image = self.remove_background(pil_image, model_name, progress_callback, use_gpu=use_gpu)
-
-                # Post-procesado de bordes (suavizado + expandir/contraer)
-                edge_smooth = options.get("rembg_edge_smooth", 0)
-                edge_expand = options.get("rembg_edge_expand", 0)
-                if edge_smooth != 0 or edge_expand != 0:
-                    pil_image = self._apply_alpha_postprocess(pil_image, edge_smooth, edge_expand)
+                pil_image = self.remove_background(pil_image, model_name, progress_callback, use_gpu=use_gpu,
+                                                   **self._rembg_refine_options(options))
+                pil_image = self._apply_rembg_edges(pil_image, options)
                 
                 # Reporte: IA Terminada (80%)
                 if progress_callback: progress_callback(80)
-            
-            if cancellation_event and cancellation_event.is_set(): raise UserCancelledError("Cancelado por usuario") # ✅ CHEQUEO
 
-            # --- 2.6 REESCALADO CON IA (NUEVO BLOQUE) ---
-            if options.get("upscale_enabled", False):
-                print("INFO: Iniciando reescalado con IA...")
-                if progress_callback: progress_callback(50, f"Reescalando ({options['upscale_engine']})...")
-                
-                # ✅ VÍA RÁPIDA: Si no hay ediciones previas y el archivo es local, pasar ruta directa
-                input_path_override = None
-                input_ext = os.path.splitext(input_path)[1].lower()
-                if not options.get("rembg_enabled", False) and input_ext in (".jpg", ".jpeg", ".png"):
-                    input_path_override = input_path
-                
-                pil_image = self._upscale_image_ai(pil_image, options, cancellation_event, input_path_override, progress_callback)
-                
-                if progress_callback: progress_callback(60)
-
-            if cancellation_event and cancellation_event.is_set(): raise UserCancelledError("Cancelado por usuario") # ✅ CHEQUEO
-            
-            # 3. Canvas
-            canvas_enabled = options.get("canvas_enabled", False)
-            if canvas_enabled:
-                canvas_option = options.get("canvas_option", "Sin ajuste")
-                if canvas_option != "Sin ajuste":
-                    pil_image = self._apply_canvas_by_option(pil_image, canvas_option, options)
-
-            # 4. Fondo
-            background_enabled = options.get("background_enabled", False)
-            if background_enabled:
-                pil_image = self._apply_background(pil_image, options)
-            
-            # Reporte: Preparando guardado (85%)
-            if progress_callback: progress_callback(85)
-            
-            # 5. Guardar (Conversión final)
-            if output_format == "NO CONVERTIR":
-                input_ext = os.path.splitext(input_path)[1].lower()
-                if input_ext in self.RASTER_FORMATS:
-                    if input_ext in (".jpg", ".jpeg"): self._save_as_jpg(pil_image, output_path, options)
-                    elif input_ext == ".png": self._save_as_png(pil_image, output_path, options)
-                    elif input_ext == ".webp": self._save_as_webp(pil_image, output_path, options)
-                    elif input_ext in (".tiff", ".tif"): self._save_as_tiff(pil_image, output_path, options)
-                    elif input_ext == ".bmp": self._save_as_bmp(pil_image, output_path, options)
-                    else: pil_image.save(output_path)
-                else:
-                    self._save_as_png(pil_image, output_path, options)
-            
-            elif output_format == "PNG": self._save_as_png(pil_image, output_path, options)
-            elif output_format in ["JPG", "JPEG"]: self._save_as_jpg(pil_image, output_path, options)
-            elif output_format == "WEBP": self._save_as_webp(pil_image, output_path, options)
-            elif output_format == "AVIF": self._save_as_avif(pil_image, output_path, options)
-            elif output_format == "PDF": self._save_as_pdf(pil_image, output_path, options)
-            elif output_format == "TIFF": self._save_as_tiff(pil_image, output_path, options)
-            elif output_format == "ICO": self._save_as_ico(pil_image, output_path, options)
-            elif output_format == "BMP": self._save_as_bmp(pil_image, output_path, options)
-            else:
-                raise Exception(f"Formato de salida no soportado: {output_format}")
-            
-            # Reporte: Finalizado (100%)
-            if progress_callback: progress_callback(100)
-            
+            self._finish_conversion(pil_image, input_path, output_path, options, progress_callback, cancellation_event)
             return True
             
         except UserCancelledError:
@@ -659,7 +803,297 @@ class ImageConverter:
         except Exception as e:
             print(f"ERROR: Fallo la conversión de {input_path}: {e}")
             return False
+
+    def _load_for_conversion(self, input_path, options, page_number=None, progress_callback=None, cancellation_event=None):
+        """Pasos 1-2 de 'convert_file': carga y redimensionado. Lanza excepción si falla."""
+        # Reporte inicial: Inicio (0-10%)
+        if progress_callback: progress_callback(5)
+
+        input_ext = os.path.splitext(input_path)[1].lower()
+        
+        resize_enabled = options.get("resize_enabled", False)
+        target_size = None
+        maintain_aspect = True
+        
+        if resize_enabled:
+            target_width = options.get("resize_width")
+            target_height = options.get("resize_height")
+            maintain_aspect = options.get("resize_maintain_aspect", True)
+            
+            if target_width and target_height:
+                target_size = (int(target_width), int(target_height))
         
+        # 1. Cargar imagen
+        if cancellation_event and cancellation_event.is_set(): raise UserCancelledError("Cancelado por usuario") # ✅ CHEQUEO
+        
+        pil_image = self._load_image(input_path, input_ext, target_size, maintain_aspect, options, page_number=page_number)
+        
+        if not pil_image:
+            raise Exception(f"No se pudo cargar la imagen desde {input_path}")
+        
+        # Reporte: Cargado (30%)
+        if progress_callback: progress_callback(30)
+        
+        if cancellation_event and cancellation_event.is_set(): raise UserCancelledError("Cancelado por usuario") # ✅ CHEQUEO
+
+        # 2. Resize raster
+        if resize_enabled and target_size and input_ext not in self.VECTOR_FORMATS:
+            pil_image = self._resize_raster_image(pil_image, target_size, maintain_aspect, options)
+        
+        # Reporte: Resize listo (40%)
+        if progress_callback: progress_callback(40)
+
+        if cancellation_event and cancellation_event.is_set(): raise UserCancelledError("Cancelado por usuario") # ✅ CHEQUEO
+
+        return pil_image
+
+    def _rembg_refine_options(self, options):
+        """Argumentos del refinado por mosaico de 'remove_background' según las opciones."""
+        return {
+            "refine_edges": options.get("rembg_tile_refine", False),
+            "refine_memory_mb": options.get("rembg_tile_memory_mb", REMBG_TILE_DEFAULT_MEMORY_MB),
+        }
+
+    def _apply_rembg_edges(self, pil_image, options):
+        """Post-procesado de bordes (suavizado + expandir/contraer) tras eliminar el fondo."""
+        edge_smooth = options.get("rembg_edge_smooth", 0)
+        edge_expand = options.get("rembg_edge_expand", 0)
+        if edge_smooth != 0 or edge_expand != 0:
+            pil_image = self._apply_alpha_postprocess(pil_image, edge_smooth, edge_expand)
+        return pil_image
+
+    def _finish_conversion(self, pil_image, input_path, output_path, options, progress_callback=None, cancellation_event=None):
+        """Pasos 2.6-5 de 'convert_file': reescalado, canvas, fondo y guardado."""
+        output_format = options.get("format", "PNG").upper()
+
+        if cancellation_event and cancellation_event.is_set(): raise UserCancelledError("Cancelado por usuario") # ✅ CHEQUEO
+
+        # --- 2.6 REESCALADO CON IA (NUEVO BLOQUE) ---
+        if options.get("upscale_enabled", False):
+            print("INFO: Iniciando reescalado con IA...")
+            if progress_callback: progress_callback(50, f"Reescalando ({options['upscale_engine']})...")
+            
+            # ✅ VÍA RÁPIDA: Si no hay ediciones previas y el archivo es local, pasar ruta directa
+            input_path_override = None
+            input_ext = os.path.splitext(input_path)[1].lower()
+            if not options.get("rembg_enabled", False) and input_ext in (".jpg", ".jpeg", ".png"):
+                input_path_override = input_path
+            
+            pil_image = self._upscale_image_ai(pil_image, options, cancellation_event, input_path_override, progress_callback)
+            
+            if progress_callback: progress_callback(60)
+
+        if cancellation_event and cancellation_event.is_set(): raise UserCancelledError("Cancelado por usuario") # ✅ CHEQUEO
+        
+        # 3. Canvas
+        canvas_enabled = options.get("canvas_enabled", False)
+        if canvas_enabled:
+            canvas_option = options.get("canvas_option", "Sin ajuste")
+            if canvas_option != "Sin ajuste":
+                pil_image = self._apply_canvas_by_option(pil_image, canvas_option, options)
+
+        # 4. Fondo
+        background_enabled = options.get("background_enabled", False)
+        if background_enabled:
+            pil_image = self._apply_background(pil_image, options)
+        
+        # Reporte: Preparando guardado (85%)
+        if progress_callback: progress_callback(85)
+        
+        # 5. Guardar (Conversión final)
+        if output_format == "NO CONVERTIR":
+            input_ext = os.path.splitext(input_path)[1].lower()
+            if input_ext in self.RASTER_FORMATS:
+                if input_ext in (".jpg", ".jpeg"): self._save_as_jpg(pil_image, output_path, options)
+                elif input_ext == ".png": self._save_as_png(pil_image, output_path, options)
+                elif input_ext == ".webp": self._save_as_webp(pil_image, output_path, options)
+                elif input_ext in (".tiff", ".tif"): self._save_as_tiff(pil_image, output_path, options)
+                elif input_ext == ".bmp": self._save_as_bmp(pil_image, output_path, options)
+                else: pil_image.save(output_path)
+            else:
+                self._save_as_png(pil_image, output_path, options)
+        
+        elif output_format == "PNG": self._save_as_png(pil_image, output_path, options)
+        elif output_format in ["JPG", "JPEG"]: self._save_as_jpg(pil_image, output_path, options)
+        elif output_format == "WEBP": self._save_as_webp(pil_image, output_path, options)
+        elif output_format == "AVIF": self._save_as_avif(pil_image, output_path, options)
+        elif output_format == "PDF": self._save_as_pdf(pil_image, output_path, options)
+        elif output_format == "TIFF": self._save_as_tiff(pil_image, output_path, options)
+        elif output_format == "ICO": self._save_as_ico(pil_image, output_path, options)
+        elif output_format == "BMP": self._save_as_bmp(pil_image, output_path, options)
+        else:
+            raise Exception(f"Formato de salida no soportado: {output_format}")
+        
+        # Reporte: Finalizado (100%)
+        if progress_callback: progress_callback(100)
+
+    def convert_files_batched(self, tasks, options, cancellation_event, progress_callback=None, result_callback=None):
+        """
+        Convierte varios archivos en este proceso eliminando el fondo por
+        lotes: se cargan 'rembg_batch_size' imágenes, se les quita el fondo
+        con una sola inferencia y después se termina cada una por separado.
+
+        - tasks, progress_callback(clave, porcentaje) y result_callback(clave, éxito)
+          como en 'convert_files_parallel'. Las tareas se terminan en orden.
+        """
+        model_name = options.get("rembg_model", "u2netp")
+        use_gpu = options.get("rembg_gpu", True)
+        batch_size = self.rembg_batch_size(model_name)
+
+        def reporter(key):
+            def report(file_pct, message=None):
+                if progress_callback and file_pct is not None:
+                    progress_callback(key, file_pct)
+            return report
+
+        def finish(key, success):
+            if result_callback:
+                result_callback(key, success)
+
+        print(f"INFO: Eliminando fondo con IA ({model_name} en {'GPU' if use_gpu else 'CPU'}) en lotes de {batch_size}...")
+        try:
+            for start in range(0, len(tasks), batch_size):
+                loaded = []
+                for key, input_path, output_path, page_number in tasks[start:start + batch_size]:
+                    try:
+                        pil_image = self._load_for_conversion(input_path, options, page_number,
+                                                              reporter(key), cancellation_event)
+                        loaded.append((key, input_path, output_path, pil_image))
+                    except UserCancelledError:
+                        raise
+                    except Exception as e:
+                        print(f"ERROR: Fallo la conversión de {input_path}: {e}")
+                        finish(key, False)
+
+                if not loaded:
+                    continue
+                if cancellation_event.is_set():
+                    raise UserCancelledError("Cancelado por usuario")
+
+                images = self.remove_background_batch([item[3] for item in loaded], model_name,
+                                                      use_gpu=use_gpu, batch_size=batch_size,
+                                                      **self._rembg_refine_options(options))
+
+                for (key, input_path, output_path, _), pil_image in zip(loaded, images):
+                    report = reporter(key)
+                    report(80)
+                    try:
+                        pil_image = self._apply_rembg_edges(pil_image, options)
+                        self._finish_conversion(pil_image, input_path, output_path, options, report, cancellation_event)
+                        finish(key, True)
+                    except UserCancelledError:
+                        raise
+                    except Exception as e:
+                        print(f"ERROR: Fallo la conversión de {input_path}: {e}")
+                        finish(key, False)
+        except UserCancelledError:
+            print("INFO: Conversión por lotes cancelada.")
+        
+    def can_convert_in_processes(self, options):
+        """
+        True si 'convert_file' puede ejecutarse en otros procesos con estas
+        opciones: la IA (sesiones ONNX / NCNN en GPU) vive en este proceso y
+        no se puede compartir. Si Inkscape está activo lo decide quien llama.
+        """
+        return not (options.get("rembg_enabled", False) or options.get("upscale_enabled", False))
+
+    def convert_files_parallel(self, tasks, options, max_workers, cancellation_event,
+                               progress_callback=None, result_callback=None):
+        """
+        Convierte varios archivos en un pool de procesos con 'convert_file'.
+
+        - tasks: [(clave, entrada, salida, página), ...] con las salidas ya
+          resueltas (política de conflictos aplicada por quien llama).
+        - progress_callback(clave, porcentaje) y result_callback(clave, éxito)
+          se llaman desde el hilo que invoca este método.
+        - Dos tareas con la misma salida nunca se ejecutan a la vez: la
+          segunda espera a la primera, como en el proceso secuencial.
+        - Si el pool no se puede crear o se rompe, lo que queda se convierte
+          aquí mismo de forma secuencial.
+        """
+        pending = list(tasks)
+        worker_cancel = multiprocessing.Event()
+        progress_queue = multiprocessing.Queue()
+
+        def drain_progress():
+            while True:
+                try:
+                    key, pct = progress_queue.get_nowait()
+                except (queue.Empty, OSError, ValueError):
+                    return
+                if progress_callback:
+                    progress_callback(key, pct)
+
+        try:
+            pickle.dumps(options) # Las opciones viajan a cada proceso
+            pool = ProcessPoolExecutor(max_workers=max(1, min(max_workers, IMAGE_CONVERT_MAX_WORKERS)),
+                                       initializer=_init_convert_worker,
+                                       initargs=(self.poppler_path, worker_cancel, progress_queue))
+        except Exception as e:
+            print(f"ADVERTENCIA: No se pudo crear el pool de conversión, se usará un solo proceso: {e}")
+            pool = None
+
+        running = {}        # future -> tarea
+        busy_outputs = set()
+        try:
+            while pool is not None and (pending or running):
+                if cancellation_event.is_set():
+                    worker_cancel.set()
+                    pending.clear()
+
+                # Mantener el pool lleno sin encolar todo de golpe (la cancelación es inmediata)
+                index = 0
+                while pending and len(running) < max_workers * 2 and index < len(pending):
+                    task = pending[index]
+                    if task[2] in busy_outputs:
+                        index += 1
+                        continue
+                    pending.pop(index)
+                    future = pool.submit(_convert_in_worker, task[0], task[1], task[2], options, task[3])
+                    running[future] = task
+                    busy_outputs.add(task[2])
+
+                if not running:
+                    continue
+                done, _ = wait(running, timeout=0.1, return_when=FIRST_COMPLETED)
+                drain_progress()
+                for future in done:
+                    task = running.pop(future)
+                    busy_outputs.discard(task[2])
+                    try:
+                        _, success = future.result()
+                    except BrokenProcessPool:
+                        pending.insert(0, task) # Se reintenta en el respaldo secuencial
+                        raise
+                    except Exception as e:
+                        print(f"ERROR: Fallo la conversión de {task[1]} en el pool: {e}")
+                        success = False
+                    if result_callback:
+                        result_callback(task[0], success)
+        except BrokenProcessPool as e:
+            print(f"ADVERTENCIA: El pool de conversión se detuvo ({e}); se continúa en un solo proceso.")
+            pending = list(running.values()) + pending
+            running.clear()
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+            drain_progress()
+            progress_queue.close()
+
+        # Respaldo secuencial (sin pool o con el pool roto)
+        for key, input_path, output_path, page_number in pending:
+            if cancellation_event.is_set():
+                break
+
+            def report(file_pct, message=None, key=key):
+                if progress_callback and file_pct is not None:
+                    progress_callback(key, file_pct)
+
+            success = self.convert_file(input_path, output_path, options, page_number=page_number,
+                                        progress_callback=report, cancellation_event=cancellation_event)
+            if result_callback:
+                result_callback(key, success)
+
     def _load_raw_with_rawpy(self, filepath):
         """
         Revela archivos RAW usando rawpy (LibRaw).
@@ -2160,74 +2594,85 @@ class ImageConverter:
             fit_mode = options.get("video_fit_mode", "Ajustar al Fotograma (Barras)")
             total_files = len(file_data_list)
             
-            for i, (filepath, page_num) in enumerate(file_data_list):
+            # Con IA, los frames se cargan en lotes para quitar el fondo con una sola inferencia
+            rembg_enabled = options.get("rembg_enabled", False)
+            model_name = options.get("rembg_model", "u2netp")
+            use_gpu = options.get("rembg_gpu", True) # <--- NUEVO
+            batch_size = self.rembg_batch_size(model_name) if rembg_enabled else 1
+            indexed_files = list(enumerate(file_data_list))
+            
+            for start in range(0, total_files, batch_size):
+                loaded = []
+                for i, (filepath, page_num) in indexed_files[start:start + batch_size]:
                 
-                # ✅ 1. CHEQUEO DE CANCELACIÓN (Dentro del bucle)
-                if cancellation_event.is_set():
-                    print("DEBUG: Cancelación detectada durante generación de frames.")
-                    raise UserCancelledError("Proceso cancelado por el usuario.")
+                    # ✅ 1. CHEQUEO DE CANCELACIÓN (Dentro del bucle)
+                    if cancellation_event.is_set():
+                        print("DEBUG: Cancelación detectada durante generación de frames.")
+                        raise UserCancelledError("Proceso cancelado por el usuario.")
                 
-                # --- LÓGICA DE PROGRESO ---
-                base_progress = (i / total_files) * 100
-                step_size = 100 / total_files
+                    # --- LÓGICA DE PROGRESO ---
+                    base_progress = (i / total_files) * 100
+                    step_size = 100 / total_files
                 
-                current_pct = base_progress + (step_size * 0.1)
-                progress_callback("Standardizing", current_pct, f"Procesando: {os.path.basename(filepath)}")
+                    current_pct = base_progress + (step_size * 0.1)
+                    progress_callback("Standardizing", current_pct, f"Procesando: {os.path.basename(filepath)}")
                 
-                try:
-                    # 2.2. Crear el fondo
-                    bg_canvas = self._create_background_canvas(target_size, options)
-                    
-                    # 2.3. Cargar la imagen
-                    fg_image = self._load_image(filepath, os.path.splitext(filepath)[1].lower(), 
-                                                page_number=page_num, options=options)
-                    
-                    if not fg_image:
-                        continue
-
-                    # --- IA REMBG ---
-                    if options.get("rembg_enabled", False):
-                        # ✅ 2. CHEQUEO DE CANCELACIÓN (Antes de IA pesada)
-                        if cancellation_event.is_set(): raise UserCancelledError("Cancelado")
+                    try:
+                        # 2.3. Cargar la imagen
+                        fg_image = self._load_image(filepath, os.path.splitext(filepath)[1].lower(), 
+                                                    page_number=page_num, options=options)
+                        if fg_image:
+                            loaded.append((i, filepath, fg_image))
+                    except Exception as e:
+                        print(f"ERROR: Falló frame {filepath}: {e}")
+
+                # --- IA REMBG ---
+                if rembg_enabled and loaded:
+                    # ✅ 2. CHEQUEO DE CANCELACIÓN (Antes de IA pesada)
+                    if cancellation_event.is_set(): raise UserCancelledError("Cancelado")
 
-                        current_pct = base_progress + (step_size * 0.3)
-                        model_name = options.get("rembg_model", "u2netp")
-                        use_gpu = options.get("rembg_gpu", True) # <--- NUEVO
-                        
-                        progress_callback("Standardizing", current_pct, f"🤖 IA ({'GPU' if use_gpu else 'CPU'}): {os.path.basename(filepath)}")
-                        
-                        # Adaptador de callback
-                        def temp_callback(p, m):
-                            progress_callback("Standardizing", current_pct, m)
-
-                        fg_image = self.remove_background(
-                            pil_image=fg_image, 
-                            model_filename=model_name, 
-                            progress_callback=temp_callback,
-                            use_gpu=use_gpu # <--- PASAR OPCIÓN
-                        )
+                    current_pct = ((loaded[0][0] / total_files) * 100) + (100 / total_files * 0.3)
+                    names = ", ".join(os.path.basename(item[1]) for item in loaded)
+                    progress_callback("Standardizing", current_pct, f"🤖 IA ({'GPU' if use_gpu else 'CPU'}): {names}")
                     
+                    # Adaptador de callback
+                    def temp_callback(p, m):
+                        progress_callback("Standardizing", current_pct, m)
+
+                    images = self.remove_background_batch(
+                        [item[2] for item in loaded], 
+                        model_filename=model_name, 
+                        progress_callback=temp_callback,
+                        use_gpu=use_gpu, # <--- PASAR OPCIÓN
+                        batch_size=batch_size,
+                        **self._rembg_refine_options(options)
+                    )
+                    loaded = [(i, filepath, image) for (i, filepath, _), image in zip(loaded, images)]
+
+                for i, filepath, fg_image in loaded:
                     # ✅ 3. CHEQUEO DE CANCELACIÓN (Después de IA)
                     if cancellation_event.is_set(): raise UserCancelledError("Cancelado")
 
-                    current_pct = base_progress + (step_size * 0.8)
+                    current_pct = (i / total_files) * 100 + (100 / total_files * 0.8)
                     progress_callback("Standardizing", current_pct, f"Componiendo: {os.path.basename(filepath)}")
+                    
+                    try:
+                        # 2.2. Crear el fondo
+                        bg_canvas = self._create_background_canvas(target_size, options)
                         
-                    # 2.4. Aplicar escalado
-                    scaled_fg_image = self._apply_video_fit_mode(fg_image, target_size, fit_mode)
+                        # 2.4. Aplicar escalado
+                        scaled_fg_image = self._apply_video_fit_mode(fg_image, target_size, fit_mode)
                     
-                    # 2.5. Componer
-                    final_frame = self._composite_images(bg_canvas, scaled_fg_image)
+                        # 2.5. Componer
+                        final_frame = self._composite_images(bg_canvas, scaled_fg_image)
                     
-                    # 2.6. Guardar
-                    frame_path = os.path.join(temp_frame_dir, f"frame_{i:06d}.png")
-                    final_frame.save(frame_path, "PNG")
+                        # 2.6. Guardar
+                        frame_path = os.path.join(temp_frame_dir, f"frame_{i:06d}.png")
+                        final_frame.save(frame_path, "PNG")
                     
-                except UserCancelledError:
-                    raise # Re-lanzar para salir del bucle inmediatamente
-                except Exception as e:
-                    print(f"ERROR: Falló frame {filepath}: {e}")
-                    continue
+                    except Exception as e:
+                        print(f"ERROR: Falló frame {filepath}: {e}")
+                        continue
             
             # --- FASE B: CODIFICACIÓN DE VIDEO (FFMPEG) ---
             
@@ -0,0 +1,256 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from src.core.constants import METADATA_CACHE_TTL_SECONDS, METADATA_CACHE_MAX_ENTRIES
+
+# Parámetros de la URL que no cambian el contenido (rastreo, posición, etc.)
+_IGNORED_QUERY_PARAMS = {"si", "feature", "pp", "t", "start", "ab_channel", "fbclid", "gclid", "igshid"}
+
+# Credenciales que yt-dlp copia en el info_dict y en cada formato: no se guardan en disco
+_SENSITIVE_KEYS = ("cookies", "http_headers")
+_FORMAT_LIST_KEYS = ("formats", "requested_formats", "requested_downloads")
+
+# Directos y estrenos: sus manifiestos caducan en minutos, no se cachean
+_LIVE_STATUSES = {"is_live", "is_upcoming"}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normaliza una URL para usarla como clave de caché: esquema https,
+    servidor en minúsculas sin 'www.'/'m.', sin fragmento, sin parámetros
+    de rastreo y con el resto de parámetros ordenados.
+    """
+    url = (url or "").strip()
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+
+    host = (parts.hostname or "").lower()
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    if parts.port:
+        host = f"{host}:{parts.port}"
+
+    path = parts.path.rstrip("/") or "/"
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k not in _IGNORED_QUERY_PARAMS and not k.startswith("utm_")
+    ]
+
+    # youtu.be/ID -> youtube.com/watch?v=ID
+    if host == "youtu.be" and path != "/":
+        query.append(("v", path.lstrip("/")))
+        host, path = "youtube.com", "/watch"
+
+    query.sort()
+    return urlunsplit(("https", host, path, urlencode(query), ""))
+
+
+def strip_sensitive_fields(info: dict) -> dict:
+    """
+    Copia del info_dict sin cookies ni cabeceras HTTP (nivel superior,
+    'formats', 'requested_formats' y 'requested_downloads') y sin los campos
+    internos de yt-dlp ('__...'), que no son JSON.
+    """
+    clean = {k: v for k, v in info.items() if k not in _SENSITIVE_KEYS and not k.startswith("__")}
+    for list_key in _FORMAT_LIST_KEYS:
+        items = clean.get(list_key)
+        if isinstance(items, list):
+            clean[list_key] = [strip_sensitive_fields(item) if isinstance(item, dict) else item for item in items]
+    return clean
+
+
+def is_live_info(info: dict) -> bool:
+    return bool(info.get("is_live")) or info.get("live_status") in _LIVE_STATUSES
+
+
+def cookie_key_from_opts(ydl_opts: dict) -> str:
+    """Identifica el origen de cookies de unas opciones de yt-dlp."""
+    if ydl_opts.get("cookiefile"):
+        return f"file:{ydl_opts['cookiefile']}"
+    if ydl_opts.get("cookiesfrombrowser"):
+        return "browser:" + ":".join(str(x) for x in ydl_opts["cookiesfrombrowser"])
+    return "none"
+
+
+def cookie_key_from_app(app) -> str:
+    """Igual que cookie_key_from_opts, pero leyendo la configuración de MainWindow."""
+    cookie_mode = getattr(app, "cookies_mode_saved", "No usar")
+    if cookie_mode == "No usar":
+        return "none"
+    if cookie_mode == "Archivo Manual..." and getattr(app, "cookies_path", ""):
+        return f"file:{app.cookies_path}"
+    browser_arg = getattr(app, "selected_browser_saved", "")
+    profile = getattr(app, "browser_profile_saved", "")
+    if profile:
+        browser_arg += f":{profile}"
+    return f"browser:{browser_arg}"
+
+
+class MetadataCache:
+    """
+    Caché en disco de los resultados de análisis de yt-dlp (info_dict).
+
+    - Clave: URL normalizada + origen de cookies + variante del análisis
+      (cada pestaña usa opciones distintas de yt-dlp).
+    - Cada entrada es un JSON en 'cache_dir'; el índice (creación y último
+      acceso) vive en 'index.json'.
+    - Caduca por TTL (el de la caché o el que pase cada 'put') y, si se
+      supera 'max_entries', se expulsa la entrada usada hace más tiempo (LRU).
+    - No guarda cookies ni cabeceras HTTP, ni directos o estrenos.
+    """
+
+    INDEX_FILENAME = "index.json"
+
+    def __init__(self, cache_dir: str, ttl_seconds: int = METADATA_CACHE_TTL_SECONDS,
+                 max_entries: int = METADATA_CACHE_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> {"created": ts, "accessed": ts}, ordenado del menos al más reciente
+        self._index: OrderedDict[str, dict] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._load_index()
+
+    @staticmethod
+    def make_key(url: str, cookie_key: str, variant: str) -> str:
+        raw = f"{variant}|{cookie_key}|{normalize_url(url)}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load_index(self):
+        index_path = os.path.join(self.cache_dir, self.INDEX_FILENAME)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            if os.path.exists(index_path):
+                with open(index_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                for key, meta in sorted(data.items(), key=lambda item: item[1].get("accessed", 0)):
+                    if os.path.exists(self._entry_path(key)):
+                        self._index[key] = meta
+        except Exception as e:
+            print(f"ADVERTENCIA: No se pudo leer el índice de la caché de metadatos: {e}")
+            self._index.clear()
+
+        with self._lock:
+            self._evict_locked()
+
+    def _save_index_locked(self):
+        index_path = os.path.join(self.cache_dir, self.INDEX_FILENAME)
+        tmp_path = index_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._index, f)
+            os.replace(tmp_path, index_path)
+        except Exception as e:
+            print(f"ADVERTENCIA: No se pudo guardar el índice de la caché de metadatos: {e}")
+
+    def _remove_locked(self, key: str):
+        self._index.pop(key, None)
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            pass
+
+    def _is_expired(self, meta: dict, now: float) -> bool:
+        return now - meta.get("created", 0) > meta.get("ttl", self.ttl_seconds)
+
+    def _evict_locked(self) -> bool:
+        """Elimina entradas caducadas y el exceso por LRU. Devuelve True si hubo cambios."""
+        now = time.time()
+        expired = [k for k, meta in self._index.items() if self._is_expired(meta, now)]
+        for key in expired:
+            self._remove_locked(key)
+
+        evicted = 0
+        while len(self._index) > self.max_entries:
+            oldest_key = next(iter(self._index))
+            self._remove_locked(oldest_key)
+            evicted += 1
+
+        return bool(expired or evicted)
+
+    def get(self, url: str, cookie_key: str, variant: str) -> dict | None:
+        """Devuelve una copia del info_dict guardado, o None si no hay entrada válida."""
+        if not url:
+            return None
+        key = self.make_key(url, cookie_key, variant)
+
+        with self._lock:
+            meta = self._index.get(key)
+            if not meta or self._is_expired(meta, time.time()):
+                if meta:
+                    self._remove_locked(key)
+                    self._save_index_locked()
+                self.misses += 1
+                return None
+
+            try:
+                with open(self._entry_path(key), "r", encoding="utf-8") as f:
+                    info = json.load(f)
+            except Exception as e:
+                print(f"ADVERTENCIA: Entrada de caché de metadatos dañada, se descarta: {e}")
+                self._remove_locked(key)
+                self._save_index_locked()
+                self.misses += 1
+                return None
+
+            # Solo se reordena en memoria; el índice se guarda en el siguiente 'put'
+            meta["accessed"] = time.time()
+            self._index.move_to_end(key)
+            self.hits += 1
+
+        print(f"DEBUG: Caché de metadatos: acierto para {normalize_url(url)} ({variant})")
+        return info
+
+    def put(self, url: str, cookie_key: str, variant: str, info: dict, ttl_seconds: int | None = None):
+        """
+        Guarda un info_dict durante 'ttl_seconds' (por defecto, el TTL de la
+        caché; nunca más). Los errores de escritura solo se registran.
+        """
+        if not url or not info or is_live_info(info):
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        key = self.make_key(url, cookie_key, variant)
+        entry_path = self._entry_path(key)
+        tmp_path = entry_path + ".tmp"
+
+        try:
+            payload = json.dumps(strip_sensitive_fields(info), ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            print(f"ADVERTENCIA: No se pudo serializar el análisis para la caché: {e}")
+            return
+
+        with self._lock:
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(payload)
+                os.replace(tmp_path, entry_path)
+            except Exception as e:
+                print(f"ADVERTENCIA: No se pudo escribir en la caché de metadatos: {e}")
+                return
+
+            now = time.time()
+            self._index[key] = {"created": now, "accessed": now, "ttl": ttl}
+            self._index.move_to_end(key)
+            self._evict_locked()
+            self._save_index_locked()
+
+    def clear(self):
+        """Vacía la caché por completo."""
+        with self._lock:
+            for key in list(self._index):
+                self._remove_locked(key)
+            self._save_index_locked()
+            self.hits = self.misses = 0
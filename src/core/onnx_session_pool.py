@@ -0,0 +1,245 @@
+import gc
+import hashlib
+import os
+import platform
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from src.core.constants import ONNX_SESSION_SIZE_FACTOR
+
+try:
+    import psutil
+    CAN_MEASURE_RSS = True
+except ImportError:
+    CAN_MEASURE_RSS = False
+    print("ADVERTENCIA: 'psutil' no instalado. La memoria de los modelos IA se estimará por el tamaño del archivo.")
+
+
+@dataclass
+class SessionStats:
+    """Métricas de una sesión cargada en el pool."""
+    model_path: str
+    device: str                 # "gpu" / "cpu"
+    memory_mb: float            # Medida (RSS) o estimada por tamaño de archivo
+    load_seconds: float
+    optimized_cache: bool       # True si se cargó el grafo ya optimizado del disco
+    uses: int = 0
+
+    def describe(self) -> str:
+        load = f"carga {self.load_seconds:.1f}s"
+        if self.optimized_cache:
+            load += " (grafo optimizado en caché)"
+        return (f"{os.path.basename(self.model_path)} [{self.device.upper()}]: {self.memory_mb:.0f} MB, "
+                f"{load}, {self.uses} usos")
+
+
+class OnnxSessionPool:
+    """
+    Sesiones de ONNX Runtime compartidas por modelo y dispositivo.
+
+    - Límite de memoria con desalojo LRU: antes de cargar un modelo se
+      descargan los menos usados recientemente hasta que quepa (la sesión
+      pedida siempre se carga, aunque sola supere el límite). 0 = sin límite.
+    - En CPU, la primera carga guarda el grafo ya optimizado en 'cache_dir'
+      ('optimized_model_filepath') y las siguientes, también tras reiniciar
+      la aplicación, lo cargan sin volver a optimizar. DirectML no lo
+      admite (sus nodos fusionados no se pueden serializar).
+    - 'stats()' devuelve el tiempo de carga y la memoria de cada sesión.
+    """
+
+    def __init__(self, memory_budget_mb: int = 0, cache_dir: str | None = None):
+        self.memory_budget_mb = memory_budget_mb
+        self.cache_dir = cache_dir
+        self.evictions = 0
+        self._sessions: OrderedDict[tuple, tuple] = OrderedDict()   # clave -> (sesión, SessionStats)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, key):
+        return key in self._sessions
+
+    @staticmethod
+    def key_for(model_path: str, use_gpu: bool) -> tuple:
+        return (os.path.abspath(model_path), "gpu" if use_gpu else "cpu")
+
+    def get(self, model_path: str, use_gpu: bool, configure=None):
+        """
+        Devuelve la sesión de 'model_path' en GPU (DirectML) o CPU, cargándola
+        si hace falta. 'configure(sess_opts)' ajusta las SessionOptions.
+        """
+        key = self.key_for(model_path, use_gpu)
+        with self._lock:
+            if key in self._sessions:
+                self._sessions.move_to_end(key)
+                session, stats = self._sessions[key]
+                stats.uses += 1
+                return session
+
+            self._make_room(self._estimate_mb(model_path))
+            session, stats = self._load(model_path, use_gpu, configure)
+            stats.uses = 1
+            self._sessions[key] = (session, stats)
+            print(f"INFO: Modelo IA cargado: {stats.describe()} | Total: {self.total_memory_mb():.0f} MB")
+            return session
+
+    def discard(self, model_path: str, use_gpu: bool):
+        """Descarga una sesión concreta (p. ej. tras un fallo de la GPU)."""
+        with self._lock:
+            if self._sessions.pop(self.key_for(model_path, use_gpu), None) is not None:
+                gc.collect()
+
+    def clear(self):
+        with self._lock:
+            count = len(self._sessions)
+            self._sessions.clear()
+        gc.collect()
+        return count
+
+    def total_memory_mb(self) -> float:
+        with self._lock:
+            return sum(stats.memory_mb for _, stats in self._sessions.values())
+
+    def stats(self) -> list[SessionStats]:
+        """Métricas de las sesiones cargadas, de la más antigua a la más reciente."""
+        with self._lock:
+            return [stats for _, stats in self._sessions.values()]
+
+    def summary(self) -> str:
+        """Resumen corto para la UI."""
+        stats = self.stats()
+        if not stats:
+            return "Sin modelos IA cargados."
+        budget = f" de {self.memory_budget_mb / 1024:g} GB" if self.memory_budget_mb else ""
+        text = f"{len(stats)} modelo(s) en memoria: {self.total_memory_mb():.0f} MB{budget}"
+        if self.evictions:
+            text += f" | {self.evictions} descargado(s) por límite"
+        return text + "\n" + "\n".join(s.describe() for s in reversed(stats))
+
+    # --- Memoria ---
+
+    @staticmethod
+    def _estimate_mb(model_path: str) -> float:
+        try:
+            return os.path.getsize(model_path) / (1024 * 1024) * ONNX_SESSION_SIZE_FACTOR
+        except OSError:
+            return 0.0
+
+    @staticmethod
+    def _rss_mb() -> float | None:
+        if not CAN_MEASURE_RSS:
+            return None
+        try:
+            return psutil.Process().memory_info().rss / (1024 * 1024)
+        except Exception:
+            return None
+
+    def _make_room(self, needed_mb: float):
+        """Desaloja las sesiones menos usadas recientemente hasta que quepan 'needed_mb'."""
+        if not self.memory_budget_mb:
+            return
+        evicted = False
+        while self._sessions and self.total_memory_mb() + needed_mb > self.memory_budget_mb:
+            _, (_, stats) = self._sessions.popitem(last=False)
+            self.evictions += 1
+            evicted = True
+            print(f"INFO: Límite de memoria IA ({self.memory_budget_mb} MB): se descarga {stats.describe()}")
+        if evicted:
+            gc.collect()
+
+    # --- Carga ---
+
+    @staticmethod
+    def _optimized_prefix(model_path: str) -> str:
+        """Prefijo de los grafos optimizados de un archivo concreto (hay varios 'model.onnx')."""
+        name = os.path.splitext(os.path.basename(model_path))[0]
+        path_id = hashlib.sha1(os.path.abspath(model_path).encode("utf-8")).hexdigest()[:8]
+        return f"{name}.{path_id}."
+
+    def _optimized_path(self, model_path: str, ort) -> str | None:
+        """Ruta del grafo optimizado para este archivo, versión de ONNX Runtime y CPU."""
+        if not self.cache_dir:
+            return None
+        try:
+            stat = os.stat(model_path)
+        except OSError:
+            return None
+        signature = "|".join([str(stat.st_size), str(int(stat.st_mtime)),
+                              ort.__version__, platform.machine(), platform.processor()])
+        digest = hashlib.sha1(signature.encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"{self._optimized_prefix(model_path)}{digest}.onnx")
+
+    def _forget_optimized(self, model_path: str, keep: str | None = None):
+        """Borra grafos optimizados antiguos del mismo modelo (otra versión del archivo o de ORT)."""
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return
+        prefix = self._optimized_prefix(model_path)
+        for entry in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, entry)
+            if entry.startswith(prefix) and entry.endswith(".onnx") and path != keep:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _load(self, model_path: str, use_gpu: bool, configure=None):
+        import onnxruntime as ort
+
+        def make_options():
+            sess_opts = ort.SessionOptions()
+            if configure:
+                configure(sess_opts)
+            return sess_opts
+
+        if use_gpu:
+            providers = ['DmlExecutionProvider', 'CPUExecutionProvider']
+        else:
+            providers = ['CPUExecutionProvider']
+
+        rss_before = self._rss_mb()
+        start = time.monotonic()
+        session = None
+        optimized_cache = False
+
+        optimized_path = None if use_gpu else self._optimized_path(model_path, ort)
+        if optimized_path and os.path.exists(optimized_path):
+            # El grafo ya está optimizado: cargarlo sin repetir la optimización
+            try:
+                sess_opts = make_options()
+                sess_opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+                session = ort.InferenceSession(optimized_path, providers=providers, sess_options=sess_opts)
+                optimized_cache = True
+            except Exception as e:
+                print(f"ADVERTENCIA: Grafo optimizado inválido, se regenerará: {e}")
+                self._forget_optimized(model_path)
+
+        if session is None and optimized_path:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                sess_opts = make_options()
+                sess_opts.optimized_model_filepath = optimized_path
+                session = ort.InferenceSession(model_path, providers=providers, sess_options=sess_opts)
+                self._forget_optimized(model_path, keep=optimized_path)
+            except Exception as e:
+                # Modelos > 2 GB o carpeta sin permisos: se carga sin guardar
+                print(f"ADVERTENCIA: No se pudo guardar el grafo optimizado de {os.path.basename(model_path)}: {e}")
+                session = None
+
+        if session is None:
+            session = ort.InferenceSession(model_path, providers=providers, sess_options=make_options())
+
+        load_seconds = time.monotonic() - start
+        rss_after = self._rss_mb()
+        measured = rss_after - rss_before if rss_before is not None and rss_after is not None else 0.0
+        if use_gpu or measured <= 0:
+            # En GPU casi todo vive en VRAM (el RSS se queda corto): se usa la estimación
+            memory_mb = max(measured, self._estimate_mb(model_path))
+        else:
+            memory_mb = max(measured, os.path.getsize(model_path) / (1024 * 1024))
+
+        stats = SessionStats(model_path=model_path, device="gpu" if use_gpu else "cpu", memory_mb=memory_mb,
+                             load_seconds=load_seconds, optimized_cache=optimized_cache)
+        return session, stats
@@ -1,12 +1,17 @@
+import io
 import json
 import tempfile
 import subprocess
 import threading
 import os
 import re
+import shutil
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
+from .constants import RECODE_SEGMENT_CODECS, RECODE_SEGMENT_MIN_DURATION, RECODE_SEGMENT_SECONDS
 from .exceptions import UserCancelledError
+from .ffmpeg_progress import FFmpegProgressParser, format_eta
 from main import FFMPEG_BIN_DIR
 
 CODEC_PROFILES = {
@@ -293,23 +298,49 @@ class FFmpegProcessor:
         self.gpu_vendor = None
         self.is_detection_complete = False
         self.available_encoders = {"CPU": {"Video": {}, "Audio": {}}, "GPU": {"Video": {}}}
-        self.current_process = None
+        # Proceso activo POR HILO: la cola de lotes puede recodificar varios
+        # archivos a la vez y cada hilo solo debe cancelar su propio FFmpeg.
+        # El registro (id del hilo -> proceso) permite cancelarlo desde otro
+        # hilo, p. ej. el botón Cancelar de la interfaz.
+        self._processes_by_thread: dict[int, subprocess.Popen] = {}
+        self._processes_lock = threading.Lock()
         # Caché de detección de códecs
         self.app_version = app_version or "unknown"
         self.cache_dir = cache_dir  # Carpeta %APPDATA%/DowP (o None en modo sin caché)
-    def cancel_current_process(self):
+
+    @property
+    def current_process(self):
+        """Proceso de FFmpeg del hilo actual (None si no tiene)."""
+        with self._processes_lock:
+            return self._processes_by_thread.get(threading.get_ident())
+
+    @current_process.setter
+    def current_process(self, process):
+        with self._processes_lock:
+            if process is None:
+                self._processes_by_thread.pop(threading.get_ident(), None)
+            else:
+                self._processes_by_thread[threading.get_ident()] = process
+
+    def cancel_current_process(self, thread: threading.Thread | None = None):
         """
-        Cancela el proceso de FFmpeg que se esté ejecutando actualmente.
+        Cancela el proceso de FFmpeg de 'thread' (por defecto, el del hilo
+        actual). Desde la interfaz se pasa el hilo de la operación en curso.
         """
-        if self.current_process and self.current_process.poll() is None:
+        ident = thread.ident if thread is not None else threading.get_ident()
+        with self._processes_lock:
+            process = self._processes_by_thread.get(ident)
+        if process and process.poll() is None:
             print("DEBUG: Enviando señal de terminación al proceso de FFmpeg...")
             try:
-                self.current_process.terminate()
-                self.current_process.wait(timeout=5) 
+                process.terminate()
+                process.wait(timeout=5) 
                 print("DEBUG: Proceso de FFmpeg terminado.")
             except Exception as e:
                 print(f"ERROR: No se pudo terminar el proceso de FFmpeg: {e}")
-            self.current_process = None
+        with self._processes_lock:
+            if self._processes_by_thread.get(ident) is process:
+                self._processes_by_thread.pop(ident, None)
 
     def run_detection_async(self, callback):
         threading.Thread(target=self._detect_encoders, args=(callback,), daemon=True).start()
@@ -416,7 +447,7 @@ class FFmpegProcessor:
             self.is_detection_complete = True
             callback(False, f"Error inesperado durante la detección: {e}")
 
-    def extract_audio(self, input_file, output_file, duration, progress_callback, cancellation_event: threading.Event):
+    def extract_audio(self, input_file, output_file, duration, progress_callback, cancellation_event: threading.Event, event_callback=None):
         """
         Extrae la pista de audio de un archivo de video sin recodificar.
         Usa '-c:a copy' para una operación extremadamente rápida.
@@ -450,7 +481,7 @@ class FFmpegProcessor:
             def read_stream_into_buffer(stream, buffer):
                 for line in iter(stream.readline, ''):
                     buffer.append(line.strip())
-            stdout_thread = threading.Thread(target=self._read_stdout_for_progress, args=(process.stdout, progress_callback, cancellation_event, duration), daemon=True)
+            stdout_thread = threading.Thread(target=self._read_stdout_for_progress, args=(process.stdout, progress_callback, cancellation_event, duration, event_callback, "Extrayendo audio"), daemon=True)
             stderr_thread = threading.Thread(target=read_stream_into_buffer, args=(process.stderr, error_output_buffer), daemon=True)
             stdout_thread.start()
             stderr_thread.start()
@@ -475,18 +506,29 @@ class FFmpegProcessor:
                 if process.stderr: process.stderr.close()
             self.current_process = None
 
-    def execute_recode(self, options, progress_callback, cancellation_event: threading.Event):
+    def execute_recode(self, options, progress_callback, cancellation_event: threading.Event, event_callback=None):
         process = None
         try:
             if cancellation_event.is_set():
                 raise UserCancelledError("Recodificación cancelada por el usuario antes de iniciar.")
             input_file = options['input_file']
             output_file = os.path.normpath(options['output_file'])
+            # Si llega 'input_stream' (bloques de bytes), FFmpeg lee de stdin y no hay archivo que sondear
+            input_stream = options.get('input_stream')
             try:
+                if input_stream is not None:
+                    raise ValueError("Entrada por stdin")
                 media_info = self.get_local_media_info(input_file)
                 actual_duration = float(media_info['format']['duration'])
             except (Exception, KeyError, TypeError):
                 actual_duration = options.get('duration', 0) 
+
+            segment_workers = self._segment_workers_for(options, actual_duration)
+            if segment_workers:
+                segmented_output = self._execute_segmented_recode(options, actual_duration, segment_workers,
+                                                                  progress_callback, cancellation_event)
+                if segmented_output:
+                    return segmented_output
             
             command = [self.ffmpeg_path, '-y', '-nostdin', '-progress', '-']
             duration = options.get('duration', 0)
@@ -498,7 +540,7 @@ class FFmpegProcessor:
             video_idx = options.get('selected_video_stream_index')
             audio_idx = options.get('selected_audio_stream_index')
             mode = options.get('mode')
-            command.extend(['-i', input_file])
+            command.extend(['-i', 'pipe:0' if input_stream is not None else input_file])
             if mode == "Video+Audio":
                 if video_idx is not None:
                     command.extend(['-map', f'0:{video_idx}?'])
@@ -518,17 +560,46 @@ class FFmpegProcessor:
             print("---------------------------------")
             creationflags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
             error_output_buffer = []
-            process = subprocess.Popen(command,stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='ignore', creationflags=creationflags)
+            feed_errors = []
+            if input_stream is not None:
+                # stdin recibe bytes: las salidas se decodifican aparte
+                process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, creationflags=creationflags)
+                process_stdout = io.TextIOWrapper(process.stdout, encoding='utf-8', errors='ignore')
+                process_stderr = io.TextIOWrapper(process.stderr, encoding='utf-8', errors='ignore')
+            else:
+                process = subprocess.Popen(command,stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='ignore', creationflags=creationflags)
+                process_stdout, process_stderr = process.stdout, process.stderr
             self.current_process = process
 
             def read_stream_into_buffer(stream, buffer):
                 """Lee línea por línea de un stream y lo guarda en una lista."""
                 for line in iter(stream.readline, ''):
                     buffer.append(line.strip())
-            stdout_reader_thread = threading.Thread(target=self._read_stdout_for_progress, args=(process.stdout, progress_callback, cancellation_event, actual_duration), daemon=True)
-            stderr_reader_thread = threading.Thread(target=read_stream_into_buffer, args=(process.stderr, error_output_buffer), daemon=True)
+
+            def feed_stdin():
+                """Escribe los bloques de 'input_stream' en la entrada de FFmpeg."""
+                try:
+                    for chunk in input_stream:
+                        try:
+                            process.stdin.write(chunk)
+                        except OSError:
+                            break # FFmpeg ya terminó; su código de salida indica el motivo
+                except Exception as e:
+                    feed_errors.append(e)
+                finally:
+                    try:
+                        process.stdin.close()
+                    except OSError:
+                        pass
+
+            stdout_reader_thread = threading.Thread(target=self._read_stdout_for_progress, args=(process_stdout, progress_callback, cancellation_event, actual_duration, event_callback), daemon=True)
+            stderr_reader_thread = threading.Thread(target=read_stream_into_buffer, args=(process_stderr, error_output_buffer), daemon=True)
             stdout_reader_thread.start()
             stderr_reader_thread.start()
+            stdin_feeder_thread = None
+            if input_stream is not None:
+                stdin_feeder_thread = threading.Thread(target=feed_stdin, daemon=True)
+                stdin_feeder_thread.start()
             while process.poll() is None:
                 if cancellation_event.is_set():
                     # ESTA ES LA LÓGICA DE CANCELACIÓN DE single_tab
@@ -539,6 +610,8 @@ class FFmpegProcessor:
 
             stdout_reader_thread.join()
             stderr_reader_thread.join()
+            if stdin_feeder_thread:
+                stdin_feeder_thread.join()
 
             # --- INICIO DE LA MODIFICACIÓN ---
             if process.returncode != 0 and not cancellation_event.is_set():
@@ -565,6 +638,10 @@ class FFmpegProcessor:
 
             if cancellation_event.is_set():
                 raise UserCancelledError("Recodificación cancelada por el usuario.")
+
+            # Si la entrada se cortó, FFmpeg cierra el archivo sin error pero incompleto
+            if feed_errors:
+                raise Exception(f"La entrada de datos se interrumpió: {feed_errors[0]}")
             return output_file
 
 # ... (resto del código) ...
@@ -576,27 +653,252 @@ class FFmpegProcessor:
             raise Exception(f"Error en recodificación: {e}")
         finally:
             if process:
+                if process.stdin:
+                    try: process.stdin.close()
+                    except OSError: pass
                 if process.stdout: process.stdout.close()
                 if process.stderr: process.stderr.close()
             self.current_process = None
 
-    def _read_stdout_for_progress(self, stream, progress_callback, cancellation_event, duration):
-        """Lee el stdout de FFmpeg para el progreso, actualizando menos frecuentemente."""
+    # Opciones de 'ffmpeg_params' del codificador de video: van en cada trozo.
+    # Todo lo demás (audio, contenedor, metadatos, '-movflags'...) va en la unión final.
+    _SEGMENT_VIDEO_OPTIONS = {
+        '-c:v', '-vcodec', '-preset', '-tune', '-crf', '-qp', '-q:v', '-qmin', '-qmax', '-b:v', '-minrate',
+        '-maxrate', '-bufsize', '-pix_fmt', '-profile:v', '-level', '-level:v', '-g', '-keyint_min', '-bf',
+        '-refs', '-sc_threshold', '-x264-params', '-x264opts', '-x265-params', '-aom-params', '-cpu-used',
+        '-deadline', '-quality', '-speed', '-row-mt', '-tile-columns', '-tile-rows', '-lag-in-frames',
+        '-auto-alt-ref', '-vf', '-r', '-flags', '-top'
+    }
+    # Afectan al codificador y al contenedor: van en los dos sitios
+    _SEGMENT_SHARED_OPTIONS = {'-strict'}
+    _FLAG_OPTIONS = {'-an', '-vn', '-sn'}
+
+    def _segment_workers_for(self, options, duration):
+        """
+        Devuelve cuántos FFmpeg simultáneos usar para recodificar por
+        segmentos, o 0 si la recodificación debe hacerse de una vez.
+        Solo se usa con archivos locales largos, sin recorte ni filtros
+        complejos, y con codificadores por software de GOP largo.
+        """
+        workers = int(options.get('segment_workers') or 0)
+        params = options.get('ffmpeg_params', [])
+        if workers < 2 or options.get('input_stream') is not None or options.get('pre_params'):
+            return 0
+        if options.get('mode') != "Video+Audio" or '-filter_complex' in params or '-c:v' not in params:
+            return 0
+        video_codec = params[params.index('-c:v') + 1]
+        if video_codec not in RECODE_SEGMENT_CODECS:
+            return 0
+        try:
+            if float(duration or 0) < RECODE_SEGMENT_MIN_DURATION:
+                return 0
+        except (TypeError, ValueError):
+            return 0
+        return workers
+
+    def _split_segment_params(self, params):
+        """Separa 'ffmpeg_params' en (opciones de video por trozo, opciones de la unión final)."""
+        video_params, final_params = [], []
+        i = 0
+        while i < len(params):
+            option = params[i]
+            takes_value = option not in self._FLAG_OPTIONS and i + 1 < len(params)
+            group = params[i:i + 2] if takes_value else [option]
+            if option in self._SEGMENT_VIDEO_OPTIONS or option in self._SEGMENT_SHARED_OPTIONS:
+                video_params.extend(group)
+            if option not in self._SEGMENT_VIDEO_OPTIONS:
+                final_params.extend(group)
+            i += len(group)
+        return video_params, final_params
+
+    def _run_segment_ffmpeg(self, command, cancellation_event, on_progress=None):
+        """
+        Ejecuta un FFmpeg auxiliar de la recodificación por segmentos.
+        'on_progress(evento)' recibe el progreso si el comando lleva '-progress -'.
+        Devuelve (código de salida, líneas de stderr).
+        """
+        creationflags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+        error_output_buffer = []
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                   encoding='utf-8', errors='ignore', creationflags=creationflags)
+        self.current_process = process
+
+        def read_progress():
+            parser = FFmpegProgressParser()
+            for line in iter(process.stdout.readline, ''):
+                event = parser.feed(line)
+                if event is not None and on_progress:
+                    on_progress(event)
+
+        def read_stream_into_buffer(stream, buffer):
+            for line in iter(stream.readline, ''):
+                buffer.append(line.strip())
+
+        readers = [threading.Thread(target=read_progress, daemon=True),
+                   threading.Thread(target=read_stream_into_buffer, args=(process.stderr, error_output_buffer), daemon=True)]
+        for reader in readers:
+            reader.start()
+        try:
+            while process.poll() is None:
+                if cancellation_event.is_set():
+                    self.cancel_current_process()
+                    raise UserCancelledError("Recodificación cancelada por el usuario.")
+                time.sleep(0.1)
+            for reader in readers:
+                reader.join()
+            return process.returncode, error_output_buffer
+        finally:
+            process.stdout.close()
+            process.stderr.close()
+            self.current_process = None
+
+    def _execute_segmented_recode(self, options, duration, workers, progress_callback, cancellation_event):
+        """
+        Recodifica un archivo largo en trozos paralelos:
+        1. Se copia la pista de video en trozos de ~RECODE_SEGMENT_SECONDS
+           cortados en keyframes (segment muxer, sin recodificar).
+        2. Cada trozo se codifica en su propio FFmpeg, 'workers' a la vez.
+        3. El concat demuxer une los trozos sin recodificar y, en la misma
+           pasada, se procesa el audio del original completo.
+        Devuelve la ruta de salida, o None si el video no se pudo trocear
+        (p. ej. pocos keyframes) y hay que recodificar de una vez.
+        """
+        input_file = options['input_file']
+        output_file = os.path.normpath(options['output_file'])
+        video_idx = options.get('selected_video_stream_index')
+        audio_idx = options.get('selected_audio_stream_index')
+        video_params, final_params = self._split_segment_params(options['ffmpeg_params'])
+        video_map = f'0:{video_idx}' if video_idx is not None else '0:v:0'
+        threads = str(max(1, (os.cpu_count() or workers) // workers))
+
+        work_dir = tempfile.mkdtemp(prefix="dowp_recode_segments_", dir=os.path.dirname(output_file) or None)
+        try:
+            progress_callback(0, "Cortando el video en segmentos...")
+            pieces_pattern = os.path.join(work_dir, "piece_%05d.mkv")
+            returncode, log = self._run_segment_ffmpeg([
+                self.ffmpeg_path, '-y', '-nostdin', '-i', input_file, '-map', video_map, '-c', 'copy',
+                '-f', 'segment', '-segment_time', str(RECODE_SEGMENT_SECONDS), '-segment_format', 'matroska',
+                '-reset_timestamps', '1', pieces_pattern
+            ], cancellation_event)
+            pieces = sorted(f for f in os.listdir(work_dir) if f.startswith("piece_"))
+            if returncode != 0 or len(pieces) < 2:
+                print(f"ADVERTENCIA: No se pudo trocear el video ({len(pieces)} trozos), se recodifica de una vez. {' '.join(log[-3:])}")
+                return None
+
+            print(f"INFO: Recodificación por segmentos: {len(pieces)} trozos, {workers} FFmpeg a la vez ({threads} hilos cada uno).")
+            done_seconds = [0.0] * len(pieces)
+            started = time.monotonic()
+            # Detiene a todos los FFmpeg de los trozos si se cancela o si uno falla
+            stop_event = threading.Event()
+
+            def encode_piece(index):
+                source = os.path.join(work_dir, pieces[index])
+                target = os.path.join(work_dir, f"encoded_{index:05d}.mkv")
+                command = [self.ffmpeg_path, '-y', '-nostdin', '-progress', '-', '-i', source, '-map', '0:v:0']
+                command += video_params + ['-threads', threads, '-an', target]
+
+                def on_progress(event):
+                    done_seconds[index] = event.out_time
+
+                returncode, log = self._run_segment_ffmpeg(command, stop_event, on_progress)
+                if returncode != 0:
+                    lines = [L for L in log if L.strip()]
+                    raise Exception(f"FFmpeg falló en el segmento {index + 1}. Detalles:\n\n" + "\n".join(lines[-8:]))
+                os.remove(source)
+                return target
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(encode_piece, i) for i in range(len(pieces))]
+                while not all(f.done() for f in futures):
+                    if cancellation_event.is_set() or any(f.done() and not f.cancelled() and f.exception() for f in futures):
+                        stop_event.set()
+                        for future in futures:
+                            future.cancel()
+                        break
+                    elapsed = time.monotonic() - started
+                    percentage = min(99.0, sum(done_seconds) / duration * 100) if duration else 0
+                    eta = elapsed * (100 - percentage) / percentage if percentage > 0 else None
+                    progress_callback(percentage * 0.95, f"Recodificando en {workers} segmentos paralelos... {percentage:.1f}% | ETA {format_eta(eta)}")
+                    time.sleep(0.5)
+
+            if cancellation_event.is_set():
+                raise UserCancelledError("Recodificación cancelada por el usuario.")
+            failed = next((f.exception() for f in futures if not f.cancelled() and f.exception()
+                           and not isinstance(f.exception(), UserCancelledError)), None)
+            if failed:
+                raise failed
+            encoded = [future.result() for future in futures]
+
+            list_path = os.path.join(work_dir, "segments.txt")
+            with open(list_path, "w", encoding="utf-8") as f:
+                for path in encoded:
+                    safe_path = path.replace("\\", "/").replace("'", "'\\''")
+                    f.write(f"file '{safe_path}'\n")
+
+            # Unión final: video copiado de los trozos + audio del original en una sola pasada
+            command = [self.ffmpeg_path, '-y', '-nostdin', '-progress', '-', '-f', 'concat', '-safe', '0', '-i', list_path,
+                       '-i', input_file, '-map', '0:v:0']
+            if audio_idx == "all":
+                command.extend(['-map', '1:a?'])
+            elif audio_idx is not None:
+                command.extend(['-map', f'1:{audio_idx}?'])
+            elif video_idx is None:
+                command.extend(['-map', '1:a:0?'])
+            command += ['-c:v', 'copy'] + final_params + [output_file]
+            print("--- Comando FFmpeg (unión de segmentos) ---")
+            print(" ".join(command))
+            print("-------------------------------------------")
+
+            def on_join_progress(event):
+                if duration:
+                    percentage = min(100.0, event.out_time / duration * 100)
+                    progress_callback(95 + percentage * 0.05, f"Uniendo segmentos y audio... {percentage:.0f}%")
+
+            returncode, log = self._run_segment_ffmpeg(command, cancellation_event, on_join_progress)
+            if returncode != 0:
+                lines = [L for L in log if L.strip()]
+                raise Exception("FFmpeg falló al unir los segmentos. Detalles:\n\n" + "\n".join(lines[-8:]))
+
+            print(f"INFO: [FFmpeg] Rendimiento (recodificación por segmentos): {time.monotonic() - started:.1f}s reales, "
+                  f"velocidad media {duration / max(0.001, time.monotonic() - started):.2f}x")
+            progress_callback(100, "Recodificación completada.")
+            return output_file
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _read_stdout_for_progress(self, stream, progress_callback, cancellation_event, duration,
+                                  event_callback=None, action="Recodificando"):
+        """
+        Lee el stdout de FFmpeg ('-progress -') con FFmpegProgressParser.
+        - 'event_callback' (opcional) recibe cada FFmpegProgressEvent completo.
+        - 'progress_callback(porcentaje, mensaje)' se llama menos a menudo
+          (cada 1%) y solo si se conoce la duración.
+        Al terminar se registra el rendimiento (fps, velocidad, tamaño).
+        """
+        parser = FFmpegProgressParser(duration)
         last_reported_percentage = -1.0
         for line in iter(stream.readline, ''):
             if cancellation_event.is_set():
                 break
-            if 'out_time_ms=' in line:
+            event = parser.feed(line)
+            if event is None:
+                continue
+
+            if event_callback:
                 try:
-                    progress_us = int(line.strip().split('=')[1])
-                    if duration > 0:
-                        progress_seconds = progress_us / 1_000_000
-                        percentage = (progress_seconds / duration) * 100
-                        if percentage >= last_reported_percentage + 1.0 or percentage >= 99.9 or percentage <= 0.1:
-                            progress_callback(percentage, f"Recodificando... {percentage:.1f}%")
-                            last_reported_percentage = percentage
-                except ValueError:
-                    pass
+                    event_callback(event)
+                except Exception as e:
+                    print(f"ADVERTENCIA: Error en el receptor de progreso de FFmpeg: {e}")
+
+            if parser.duration > 0:
+                percentage = event.percentage
+                if percentage >= last_reported_percentage + 1.0 or percentage >= 99.9 or percentage <= 0.1:
+                    progress_callback(percentage, event.to_message(action))
+                    last_reported_percentage = percentage
+
+        summary = parser.summary()
+        if summary and not cancellation_event.is_set():
+            print(f"INFO: [FFmpeg] Rendimiento ({action.lower()}): {summary}")
 
     def get_local_media_info(self, input_file):
         """
@@ -680,7 +982,7 @@ class FFmpegProcessor:
             print(f"ERROR: No se pudo extraer el fotograma: {e}")
             return None
         
-    def execute_video_to_images(self, options, progress_callback, cancellation_event: threading.Event):
+    def execute_video_to_images(self, options, progress_callback, cancellation_event: threading.Event, event_callback=None):
             """
             Convierte un archivo de video en una secuencia de imágenes (ej. JPG o PNG).
             """
@@ -769,7 +1071,7 @@ class FFmpegProcessor:
                 
                 stdout_reader_thread = threading.Thread(
                     target=self._read_stdout_for_progress, 
-                    args=(process.stdout, progress_callback, cancellation_event, actual_duration), 
+                    args=(process.stdout, progress_callback, cancellation_event, actual_duration, event_callback, "Extrayendo fotogramas"), 
                     daemon=True
                 )
                 stderr_reader_thread = threading.Thread(
@@ -0,0 +1,231 @@
+import atexit
+import json
+import os
+import threading
+
+from src.core.metadata_cache import strip_sensitive_fields
+
+
+class QueueJournal:
+    """
+    Diario append-only (JSONL) de la cola de lotes.
+
+    Cada línea es un registro independiente:
+      - {"op": "job", ...}     Instantánea del trabajo (config, tipo, estado y,
+                               si cambió, analysis_data).
+      - {"op": "status", ...}  Cambio de estado.
+      - {"op": "remove", ...}  El trabajo se quitó de la cola.
+
+    Los registros se encolan y un hilo escritor los vuelca a disco por
+    tandas (flush + fsync), así que quien registra (p. ej. el hilo de la UI)
+    nunca espera al disco. Un cierre inesperado pierde como mucho la última
+    tanda; una línea a medias se descarta al leer. Al salir de la app se
+    vacía la cola. Las claves de la configuración que no son JSON no se
+    guardan (se avisa), el análisis se guarda sin cookies ni cabeceras HTTP,
+    y un trabajo cuyo análisis no es JSON no se guarda.
+    """
+
+    # Estados que se rehidratan al arrancar
+    UNFINISHED_STATUSES = ("PENDING", "RUNNING")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        # job_id -> Job.analysis_version ya escrita, para no repetir el análisis
+        self._written_analysis: dict[str, int] = {}
+        # Registros pendientes del hilo escritor (en orden de llegada)
+        self._pending: list[dict] = []
+        self._writing = False
+        self._pending_changed = threading.Condition()
+        self._writer: threading.Thread | None = None
+
+    def _open(self):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        return self._file
+
+    def _append(self, records: list[dict]):
+        """Encola los registros para el hilo escritor. No bloquea."""
+        if not records:
+            return
+        with self._pending_changed:
+            self._pending.extend(records)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+            self._pending_changed.notify_all()
+
+    def _writer_loop(self):
+        while True:
+            with self._pending_changed:
+                while not self._pending:
+                    self._pending_changed.wait()
+                records, self._pending = self._pending, []
+                self._writing = True
+
+            self._write(records)
+
+            with self._pending_changed:
+                self._writing = False
+                self._pending_changed.notify_all()
+
+    def _write(self, records: list[dict]):
+        with self._lock:
+            try:
+                f = self._open()
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            except Exception as e:
+                print(f"ERROR: No se pudo escribir en el diario de la cola: {e}")
+
+    def flush(self, timeout: float | None = 5.0):
+        """Espera a que el hilo escritor vacíe la cola (se llama al salir)."""
+        with self._pending_changed:
+            self._pending_changed.wait_for(lambda: not self._pending and not self._writing, timeout)
+
+    @staticmethod
+    def _json_config(job) -> dict:
+        """Configuración del trabajo sin las claves que no se pueden guardar en JSON."""
+        config = {}
+        for key, value in (job.config or {}).items():
+            try:
+                json.dumps(value)
+            except (TypeError, ValueError):
+                print(f"ADVERTENCIA: La opción '{key}' del trabajo {job.job_id[:6]} no es JSON; no se guarda en el diario.")
+                continue
+            config[key] = value
+        return config
+
+    def _job_record(self, job) -> dict | None:
+        """Registro del trabajo, o None si su análisis no se puede guardar."""
+        record = {
+            "op": "job",
+            "job_id": job.job_id,
+            "job_type": job.job_type,
+            "status": job.status,
+            "config": self._json_config(job),
+        }
+        # analysis_data puede ser muy grande: solo se escribe si cambió
+        if job.analysis_data is not None and self._written_analysis.get(job.job_id) != job.analysis_version:
+            analysis = strip_sensitive_fields(job.analysis_data)
+            try:
+                json.dumps(analysis)
+            except (TypeError, ValueError) as e:
+                # Sin análisis se restauraría un trabajo que no puede ejecutarse
+                print(f"ERROR: El análisis del trabajo {job.job_id[:6]} no es JSON; el trabajo no se guarda en el diario: {e}")
+                return None
+            record["analysis_data"] = analysis
+            self._written_analysis[job.job_id] = job.analysis_version
+        return record
+
+    def job_records(self, jobs: list) -> list[dict]:
+        """
+        Instantáneas de los trabajos (la parte costosa: copia el análisis).
+        Los trabajos que no se pueden guardar se omiten.
+        """
+        records = (self._job_record(job) for job in jobs)
+        return [record for record in records if record is not None]
+
+    def record_jobs(self, jobs: list):
+        """Guarda la instantánea de uno o varios trabajos (un solo fsync)."""
+        self.write_records(self.job_records(jobs))
+
+    def write_records(self, records: list[dict]):
+        """Encola registros ya construidos con job_records()."""
+        self._append(records)
+
+    def mark_persisted(self, job):
+        """Indica que el analysis_data actual del trabajo ya está en el diario."""
+        if job.analysis_data is not None:
+            self._written_analysis[job.job_id] = job.analysis_version
+
+    def record_status(self, job_id: str, status: str):
+        self.record_statuses([(job_id, status)])
+
+    def record_statuses(self, changes: list[tuple[str, str]]):
+        """Guarda varios cambios de estado (job_id, estado) con un solo fsync."""
+        self._append([{"op": "status", "job_id": job_id, "status": status} for job_id, status in changes])
+
+    def record_remove(self, job_id: str):
+        self._written_analysis.pop(job_id, None)
+        self._append([{"op": "remove", "job_id": job_id}])
+
+    def load_unfinished(self) -> list[dict]:
+        """
+        Reproduce el diario y devuelve los trabajos sin terminar, en orden
+        de llegada. Después compacta el archivo para que solo contenga esos
+        trabajos.
+        """
+        states: dict[str, dict] = {}
+
+        if os.path.exists(self.path):
+            with self._lock:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            record = json.loads(line)
+                        except json.JSONDecodeError:
+                            # Línea truncada por un cierre inesperado
+                            print("ADVERTENCIA: Se ignoró una línea dañada del diario de la cola.")
+                            continue
+
+                        job_id = record.get("job_id")
+                        op = record.get("op")
+                        if not job_id:
+                            continue
+
+                        if op == "job":
+                            state = states.setdefault(job_id, {"job_id": job_id, "analysis_data": None})
+                            state["job_type"] = record.get("job_type", "DOWNLOAD")
+                            state["status"] = record.get("status", "PENDING")
+                            state["config"] = record.get("config") or {}
+                            if "analysis_data" in record:
+                                state["analysis_data"] = record["analysis_data"]
+                        elif op == "status" and job_id in states:
+                            states[job_id]["status"] = record.get("status")
+                        elif op == "remove":
+                            states.pop(job_id, None)
+
+        unfinished = []
+        for state in states.values():
+            if state.get("status") not in self.UNFINISHED_STATUSES:
+                continue
+            if state.get("analysis_data") is None:
+                # Diario de una versión anterior: sin análisis no se puede ejecutar
+                print(f"ADVERTENCIA: El trabajo {state['job_id'][:6]} del diario no tiene análisis; se descarta.")
+                continue
+            # Un trabajo que estaba en curso se interrumpió: vuelve a la espera
+            state["status"] = "PENDING"
+            unfinished.append(state)
+
+        self._compact(unfinished)
+        return unfinished
+
+    def _compact(self, states: list[dict]):
+        """Reescribe el diario de forma atómica con solo los trabajos indicados."""
+        tmp_path = self.path + ".tmp"
+        self.flush()
+        with self._lock:
+            try:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    for state in states:
+                        record = {"op": "job", **state}
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                print(f"ERROR: No se pudo compactar el diario de la cola: {e}")
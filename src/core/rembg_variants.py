@@ -0,0 +1,255 @@
+import json
+import os
+import random
+import threading
+import time
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from src.core.constants import (
+    REMBG_VARIANT_CACHE_VERSION, REMBG_VARIANT_MIN_IOU, REMBG_VARIANT_MIN_SPEEDUP, REMBG_VARIANT_GROUPS,
+    REMBG_CALIBRATION_IMAGES, REMBG_QUANTIZED_SUFFIX, REMBG_QUANTIZE_MAX_BYTES
+)
+
+# Nombres que ya indican precisión reducida: no se vuelven a cuantizar
+_REDUCED_PRECISION_TAGS = ("int8", "uint8", "quantized", "q4", "bnb4", "fp16")
+
+
+def calibration_images(count: int = REMBG_CALIBRATION_IMAGES) -> list:
+    """
+    Conjunto de calibración incluido en el código: escenas sintéticas y
+    deterministas (fondo con degradado y ruido, una silueta, un objeto y
+    trazos finos tipo pelo) para comparar máscaras sin fotos del usuario.
+    """
+    images = []
+    for index in range(count):
+        rng = random.Random(1000 + index)
+        width, height = (640, 480) if index % 2 == 0 else (480, 640)
+
+        top = tuple(rng.randint(0, 255) for _ in range(3))
+        bottom = tuple(rng.randint(0, 255) for _ in range(3))
+        image = Image.linear_gradient("L").resize((width, height))
+        image = Image.composite(Image.new("RGB", (width, height), bottom), Image.new("RGB", (width, height), top), image)
+        noise = Image.effect_noise((width, height), 40).convert("RGB")
+        image = Image.blend(image, noise, 0.15)
+
+        draw = ImageDraw.Draw(image)
+        color = tuple(rng.randint(0, 255) for _ in range(3))
+        cx, cy = width // 2 + rng.randint(-60, 60), height // 2 + rng.randint(-40, 40)
+        head = min(width, height) // 8
+        draw.ellipse((cx - head, cy - 3 * head, cx + head, cy - head), fill=color)
+        draw.rounded_rectangle((cx - 2 * head, cy - head, cx + 2 * head, cy + 3 * head), radius=head // 2, fill=color)
+        for _ in range(25):
+            angle_x, angle_y = rng.randint(-head, head), rng.randint(-head, 0)
+            draw.line((cx, cy - 2 * head, cx + 2 * angle_x, cy - 3 * head + angle_y), fill=color, width=1)
+
+        object_color = tuple(rng.randint(0, 255) for _ in range(3))
+        ox, oy = rng.randint(20, width // 4), rng.randint(height // 2, height - 100)
+        draw.polygon([(ox, oy), (ox + 80, oy + 10), (ox + 60, oy + 90), (ox + 5, oy + 70)], fill=object_color)
+
+        images.append(image.filter(ImageFilter.SMOOTH))
+    return images
+
+
+def mask_iou(mask_a, mask_b, threshold: int = 128) -> float | None:
+    """
+    IoU de dos máscaras 0-255 (misma forma) binarizadas en 'threshold'.
+    None si las dos están vacías: el par no dice nada de la calidad.
+    """
+    import numpy as np
+
+    a = np.asarray(mask_a) >= threshold
+    b = np.asarray(mask_b) >= threshold
+    union = np.logical_or(a, b).sum()
+    if not union:
+        return None
+    return float(np.logical_and(a, b).sum() / union)
+
+
+class RembgVariantSelector:
+    """
+    Elige para el proveedor de CPU la variante más rápida de un modelo de
+    eliminación de fondo cuya máscara se parece a la del modelo elegido.
+
+    - Candidatas: el propio modelo, los archivos intercambiables ya
+      descargados en su carpeta (REMBG_VARIANT_GROUPS, p. ej. model_int8 o
+      model_fp16 de RMBG 2.0) y una copia INT8 cuantizada dinámicamente
+      junto al original (REMBG_QUANTIZED_SUFFIX), que se genera una vez.
+    - Cada candidata procesa el conjunto de calibración; se descartan las
+      de IoU medio < REMBG_VARIANT_MIN_IOU frente al modelo elegido y gana
+      la más rápida si mejora al original en REMBG_VARIANT_MIN_SPEEDUP.
+      Solo cuentan las imágenes en las que el modelo elegido recorta algo:
+      si en ninguna lo hace, no hay con qué comparar y se usa el original.
+    - La elección se guarda en 'cache_path' por archivo (tamaño, fecha y
+      versión de ONNX Runtime); también cuando no hay nada mejor.
+    """
+
+    def __init__(self, cache_path: str):
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+
+    # --- Caché ---
+
+    def _load_cache(self) -> dict:
+        try:
+            if os.path.exists(self.cache_path):
+                with open(self.cache_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == REMBG_VARIANT_CACHE_VERSION:
+                    return data
+        except Exception as e:
+            print(f"ADVERTENCIA: No se pudo leer la caché de variantes de modelos IA: {e}")
+        return {"version": REMBG_VARIANT_CACHE_VERSION, "entries": {}}
+
+    def _save_cache(self, data: dict):
+        tmp_path = self.cache_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            print(f"ADVERTENCIA: No se pudo guardar la caché de variantes de modelos IA: {e}")
+
+    @staticmethod
+    def _file_signature(model_path: str) -> str:
+        import onnxruntime as ort
+
+        stat = os.stat(model_path)
+        return f"{stat.st_size}|{int(stat.st_mtime)}|{ort.__version__}"
+
+    # --- Candidatas ---
+
+    @staticmethod
+    def quantized_path(model_path: str) -> str:
+        stem, ext = os.path.splitext(model_path)
+        return f"{stem}{REMBG_QUANTIZED_SUFFIX}{ext}"
+
+    def _ensure_quantized(self, model_path: str, progress_callback=None) -> str | None:
+        """Copia INT8 dinámica del modelo (se crea una vez). None si no procede o falla."""
+        name = os.path.basename(model_path).lower()
+        if REMBG_QUANTIZED_SUFFIX in name or any(tag in name for tag in _REDUCED_PRECISION_TAGS):
+            return None
+        target = self.quantized_path(model_path)
+        if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(model_path):
+            return target
+        if os.path.getsize(model_path) > REMBG_QUANTIZE_MAX_BYTES:
+            return None
+
+        try:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+        except ImportError as e:
+            print(f"ADVERTENCIA: No se puede cuantizar a INT8 (falta 'onnx' u 'onnxruntime.quantization'): {e}")
+            return None
+
+        print(f"INFO: Cuantizando {os.path.basename(model_path)} a INT8 para CPU...")
+        if progress_callback:
+            progress_callback(None, f"Cuantizando {os.path.basename(model_path)} a INT8 (solo la primera vez)...")
+        tmp_path = target + ".tmp"
+        try:
+            quantize_dynamic(model_path, tmp_path, weight_type=QuantType.QUInt8)
+            os.replace(tmp_path, target)
+            return target
+        except Exception as e:
+            print(f"ADVERTENCIA: Falló la cuantización INT8 de {os.path.basename(model_path)}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+
+    def candidates(self, model_path: str, progress_callback=None) -> list[str]:
+        """El modelo elegido primero y después sus variantes disponibles."""
+        folder, name = os.path.split(model_path)
+        found = [model_path]
+        for group in REMBG_VARIANT_GROUPS:
+            if name in group:
+                found += [os.path.join(folder, other) for other in group
+                          if other != name and os.path.exists(os.path.join(folder, other))]
+        quantized = self._ensure_quantized(model_path, progress_callback)
+        if quantized:
+            found.append(quantized)
+        return found
+
+    # --- Selección ---
+
+    def select(self, model_path: str, mask_fn, progress_callback=None) -> str:
+        """
+        Ruta de la variante a usar en CPU ('model_path' si ninguna mejora).
+        'mask_fn(sesión, imagen)' devuelve la máscara 0-255 del modelo.
+        """
+        key = os.path.abspath(model_path)
+        with self._lock:
+            try:
+                signature = self._file_signature(model_path)
+            except Exception:
+                return model_path
+
+            data = self._load_cache()
+            entry = data["entries"].get(key)
+            if entry and entry.get("signature") == signature and os.path.exists(entry.get("variant", "")):
+                return entry["variant"]
+
+            if progress_callback:
+                progress_callback(None, f"Buscando la variante más rápida de {os.path.basename(model_path)} para CPU...")
+            try:
+                results = self._measure(self.candidates(model_path, progress_callback), mask_fn)
+                chosen = self._choose(results)
+            except Exception as e:
+                print(f"ADVERTENCIA: No se pudieron comparar las variantes de {os.path.basename(model_path)}: {e}")
+                results, chosen = [], model_path
+
+            data["entries"][key] = {"signature": signature, "variant": chosen, "results": results}
+            self._save_cache(data)
+            return chosen
+
+    @staticmethod
+    def _measure(paths: list[str], mask_fn) -> list[dict]:
+        """
+        Tiempo medio por imagen e IoU frente a la primera ruta (el modelo
+        elegido). Con una máscara de referencia vacía en todas las imágenes
+        solo se mide el original.
+        """
+        import onnxruntime as ort
+
+        images = calibration_images()
+        reference = None
+        results = []
+        for path in paths:
+            try:
+                session = ort.InferenceSession(path, providers=['CPUExecutionProvider'])
+                mask_fn(session, images[0]) # Calentamiento
+                start = time.perf_counter()
+                masks = [mask_fn(session, image) for image in images]
+                seconds = (time.perf_counter() - start) / len(images)
+            except Exception as e:
+                if reference is None:
+                    raise
+                print(f"ADVERTENCIA: La variante {os.path.basename(path)} no funciona en CPU: {e}")
+                continue
+            finally:
+                session = None
+
+            if reference is None:
+                reference = masks
+                iou = 1.0
+                if not any(mask_iou(mask, mask) for mask in reference):
+                    print(f"ADVERTENCIA: {os.path.basename(path)} no recorta nada en las imágenes de calibración; "
+                          f"no se pueden comparar sus variantes.")
+                    results.append({"variant": path, "seconds": round(seconds, 4), "iou": iou})
+                    return results
+            else:
+                scores = [score for score in (mask_iou(a, b) for a, b in zip(reference, masks)) if score is not None]
+                iou = sum(scores) / len(scores)
+            results.append({"variant": path, "seconds": round(seconds, 4), "iou": round(iou, 4)})
+            print(f"INFO: Variante {os.path.basename(path)}: {seconds * 1000:.0f} ms/imagen, IoU {iou:.3f}")
+        return results
+
+    @staticmethod
+    def _choose(results: list[dict]) -> str:
+        original = results[0]
+        valid = [r for r in results if r["iou"] >= REMBG_VARIANT_MIN_IOU]
+        fastest = min(valid, key=lambda r: r["seconds"])
+        if fastest is original or fastest["seconds"] * REMBG_VARIANT_MIN_SPEEDUP > original["seconds"]:
+            return original["variant"]
+        print(f"INFO: En CPU se usará {os.path.basename(fastest['variant'])} "
+              f"({original['seconds'] / fastest['seconds']:.1f}x más rápido, IoU {fastest['iou']:.3f}).")
+        return fastest["variant"]
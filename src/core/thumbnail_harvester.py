@@ -0,0 +1,153 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.core.constants import THUMBNAIL_FETCH_WORKERS, THUMBNAIL_PROCESS_POOL_MIN_ITEMS
+
+
+def _encode_png(image_data: bytes, output_path: str) -> str:
+    """
+    Convierte los bytes de una imagen a PNG en disco. Es una función de
+    módulo (y el módulo es ligero) para poder ejecutarse en otro proceso.
+    """
+    from PIL import Image
+
+    with Image.open(BytesIO(image_data)) as img:
+        img.save(output_path, "PNG")
+    return output_path
+
+
+class ThumbnailHarvester:
+    """
+    Descarga miniaturas en PNG reutilizando conexiones HTTP (una Session con
+    pool) y, para lotes grandes, repartiendo la descarga en hilos y la
+    conversión a PNG en procesos.
+    """
+
+    def __init__(self, sanitize_filename, max_workers: int = THUMBNAIL_FETCH_WORKERS):
+        self.sanitize_filename = sanitize_filename
+        self.max_workers = max_workers
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        with self._session_lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+            return self._session
+
+    @staticmethod
+    def _best_thumbnail_url(entry: dict) -> str | None:
+        thumbs = entry.get('thumbnails')
+        if thumbs:
+            sorted_thumbs = sorted(thumbs, key=lambda x: x.get('width', 0) or 0, reverse=True)
+            if sorted_thumbs[0].get('url'):
+                return sorted_thumbs[0].get('url')
+        return entry.get('thumbnail')
+
+    def fetch_image(self, entry: dict) -> tuple[bytes, bool] | None:
+        """
+        Descarga los bytes de la mejor miniatura. En YouTube se prueba primero
+        la versión maxresdefault y, si no existe, la original.
+        Devuelve (datos, es_maxres) o None si la entrada no tiene miniatura.
+        """
+        thumb_url = self._best_thumbnail_url(entry)
+        if not thumb_url:
+            return None
+
+        if "i.ytimg.com" in thumb_url:
+            max_res_url = re.sub(r'/(hq|mq|sd|default)default', '/maxresdefault', thumb_url)
+            if max_res_url != thumb_url:
+                try:
+                    # Una sola petición: si maxres existe, ya tenemos los datos
+                    response = self.session.get(max_res_url, timeout=5)
+                    if response.status_code == 200 and response.content:
+                        return response.content, True
+                except requests.RequestException:
+                    pass # Si falla la comprobación, usar la original
+
+        response = self.session.get(thumb_url, timeout=30)
+        response.raise_for_status()
+        return response.content, False
+
+    def fetch_png(self, entry: dict, output_dir: str, title: str, png_pool=None) -> str | None:
+        """Descarga una miniatura y la guarda como PNG. Devuelve la ruta o None."""
+        try:
+            fetched = self.fetch_image(entry)
+            if not fetched:
+                return None
+            image_data, is_maxres = fetched
+
+            output_path = os.path.join(output_dir, f"{self.sanitize_filename(title)}.png")
+
+            if png_pool is not None:
+                try:
+                    png_pool.submit(_encode_png, image_data, output_path).result()
+                except BrokenProcessPool:
+                    _encode_png(image_data, output_path)
+            else:
+                _encode_png(image_data, output_path)
+
+            print(f"DEBUG: Miniatura PNG guardada ({'MAXRES' if is_maxres else 'ORIG'}): {output_path}")
+            return output_path
+
+        except Exception as e:
+            print(f"ADVERTENCIA: Falló descarga de miniatura PNG para '{title}': {e}")
+            return None
+
+    def harvest(self, items: list[tuple[str, dict]], output_dir: str,
+                cancel_event: threading.Event | None = None, on_item_done=None) -> list[str]:
+        """
+        Descarga en paralelo las miniaturas de 'items' [(título, entry), ...].
+        'on_item_done(hechos, total, título, ruta)' se llama al terminar cada una
+        (desde un hilo del pool). Devuelve las rutas guardadas.
+        """
+        total = len(items)
+        if not total:
+            return []
+
+        png_pool = None
+        if total >= THUMBNAIL_PROCESS_POOL_MIN_ITEMS:
+            try:
+                png_workers = max(1, min(4, (os.cpu_count() or 2) - 1))
+                png_pool = ProcessPoolExecutor(max_workers=png_workers)
+            except Exception as e:
+                print(f"ADVERTENCIA: No se pudo crear el pool de procesos para PNG: {e}")
+                png_pool = None
+
+        def task(title, entry):
+            if cancel_event is not None and cancel_event.is_set():
+                return title, None
+            return title, self.fetch_png(entry, output_dir, title, png_pool)
+
+        saved_paths = []
+        done = 0
+        try:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, total)) as executor:
+                futures = [executor.submit(task, title, entry) for title, entry in items]
+                for future in as_completed(futures):
+                    title, path = future.result()
+                    done += 1
+                    if path:
+                        saved_paths.append(path)
+                    if on_item_done:
+                        on_item_done(done, total, title, path)
+                    if cancel_event is not None and cancel_event.is_set():
+                        for pending in futures:
+                            pending.cancel()
+        finally:
+            if png_pool is not None:
+                png_pool.shutdown(wait=True)
+
+        return saved_paths
@@ -1,30 +1,64 @@
 """
 video_upscaler.py
 Modulo de reescalado de video usando motores NCNN (Real-ESRGAN, Waifu2x, RealSR, SRMD).
-Flujo: extraer frames (FFmpeg) -> reescalar carpeta (NCNN) -> reensamblar + audio (FFmpeg).
+Flujo clásico: extraer frames (FFmpeg) -> reescalar carpeta (NCNN) -> reensamblar + audio (FFmpeg).
+Flujo por bloques: los frames llegan por tubería en bloques de N, cada bloque pasa
+por NCNN y se codifica como un segmento; el disco usado queda acotado y los
+segmentos terminados permiten reanudar un trabajo interrumpido.
 """
 
+import io
 import os
 import json
+import hashlib
+import queue
 import shutil
 import tempfile
 import subprocess
 import multiprocessing
 import time
 import threading
+from contextlib import contextmanager
 
 from src.core.constants import (
     WAIFU2X_MODELS,
     SRMD_MODELS,
     UPSCALING_TOOLS,
+    UPSCALE_DEFAULT_TEMP_BUDGET_MB,
+    UPSCALE_RING_SLOTS,
+    UPSCALE_MIN_CHUNK_FRAMES,
+    UPSCALE_MAX_CHUNK_FRAMES,
+    UPSCALE_RESUME_MAX_AGE_DAYS,
+    UPSCALE_DEDUP_DEFAULT,
+    UPSCALE_DEDUP_TOLERANCE,
+    UPSCALE_DEDUP_THUMB_SIZE,
+    UPSCALE_NCNN_SHARED_TILE,
+    UPSCALE_NCNN_TILE_BYTES_PER_PIXEL,
+    UPSCALE_NCNN_BASE_MEMORY_MB,
+    UPSCALE_NCNN_GPU_MEMORY_MB,
+    UPSCALE_NCNN_RAM_FRACTION,
+    UPSCALE_NCNN_MIN_SHARD_FRAMES,
+    UPSCALE_NCNN_SHARDS_PER_INSTANCE,
+    UPSCALE_FRAME_FORMATS,
+    UPSCALE_DEFAULT_FRAME_FORMAT,
+    UPSCALE_FRAME_BENCHMARK_FRAMES,
+    UPSCALE_TUNING_TILES,
+    UPSCALE_TUNING_THREADS,
+    UPSCALE_TUNING_SAMPLE_FRAMES,
+    UPSCALE_TUNING_VERSION,
+    UPSCALE_TUNING_MIN_GAIN,
 )
 from src.core.exceptions import UserCancelledError
+from src.core.frame_progress import FrameProgressTracker
 
 
 # ─── Ruta raiz de los binarios ───────────────────────────────────────────────
 _THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 BIN_DIR = os.path.normpath(os.path.join(_THIS_DIR, "..", "..", "bin"))
 
+# ─── Errores de Vulkan que NCNN escribe aunque termine con código 0 ─────────
+VULKAN_ERRORS = ("vkQueueSubmit failed", "vkAllocateMemory failed", "invalid gpu device", "out of gpu memory")
+
 # ─── Mapeo de contenedores a codecs video/audio seguros ──────────────────────
 CONTAINER_CODECS = {
     ".mp4":  {"vcodec": "libx264",      "acodec": "aac",          "pix_fmt": "yuv420p"},
@@ -40,15 +74,36 @@ class VideoUpscaler:
     Motor de reescalado de video usando ejecutables NCNN.
     """
 
-    def __init__(self, ffmpeg_dir: str, upscaling_dir: str = None, cancellation_event=None, progress_callback=None):
+    def __init__(self, ffmpeg_dir: str, upscaling_dir: str = None, cancellation_event=None, progress_callback=None,
+                 temp_budget_mb: int = UPSCALE_DEFAULT_TEMP_BUDGET_MB, resume_dir: str = None,
+                 dedup_mode: str = UPSCALE_DEDUP_DEFAULT, ncnn_devices: str = "", ncnn_instances: int = 1,
+                 frame_format: str = UPSCALE_DEFAULT_FRAME_FORMAT, tuning_cache_path: str = None):
         """
         Args:
             ffmpeg_dir: Carpeta donde vive ffmpeg.exe / ffprobe.exe
             upscaling_dir: Ruta base de los modelos de upscaling (opcional)
             cancellation_event: threading.Event para cancelacion externa
             progress_callback: callable(pct: float, msg: str)
+            temp_budget_mb: Disco máximo para fotogramas temporales (0 = modo clásico)
+            resume_dir: Carpeta donde guardar los bloques terminados para poder reanudar (None = sin reanudación)
+            dedup_mode: Fotogramas repetidos que no pasan por NCNN: "off", "exact" (idénticos) o "similar" (con tolerancia)
+            ncnn_devices: Dispositivos NCNN separados por comas ("0,1"; "-1" = CPU). Vacío = el predeterminado
+            ncnn_instances: Procesos NCNN simultáneos por dispositivo
+            frame_format: Formato de los fotogramas intermedios (clave de UPSCALE_FRAME_FORMATS)
+            tuning_cache_path: JSON con las calibraciones de mosaico/hilos (None = sin calibración)
         """
         self.ffmpeg_dir = ffmpeg_dir
+        self.temp_budget_mb = temp_budget_mb
+        self.resume_dir = resume_dir
+        self.dedup_mode = dedup_mode
+        self.ncnn_devices = ncnn_devices
+        self.ncnn_instances = max(1, int(ncnn_instances or 1))
+        self._ncnn_plan = None
+        self._ncnn_fps = None # Último ritmo medido de NCNN (fotogramas/s)
+        self.frame_format = frame_format if frame_format in UPSCALE_FRAME_FORMATS else UPSCALE_DEFAULT_FRAME_FORMAT
+        self.tuning_cache_path = tuning_cache_path
+        self._tuned_threads = None # Hilos -j elegidos por la calibración para "Automático"
+        self._tuning_key = None
         self.ffmpeg_exe = os.path.join(ffmpeg_dir, "ffmpeg.exe")
         self.ffprobe_exe = os.path.join(ffmpeg_dir, "ffprobe.exe")
         self.cancellation_event = cancellation_event
@@ -99,6 +154,20 @@ class VideoUpscaler:
             return "1:1:1"
         return "1:1:1"
 
+    @property
+    def _frame_ext(self) -> str:
+        return UPSCALE_FRAME_FORMATS[self.frame_format]["ext"]
+
+    def _frame_codec_args(self) -> list:
+        """Parámetros de FFmpeg para escribir los fotogramas intermedios."""
+        return list(UPSCALE_FRAME_FORMATS[self.frame_format]["ffmpeg"])
+
+    def _resolve_frame_format(self, transparency: bool):
+        """JPG no guarda transparencia: en ese caso se usa PNG."""
+        if transparency and not UPSCALE_FRAME_FORMATS[self.frame_format]["alpha"]:
+            print(f"ADVERTENCIA [VideoUpscaler] El formato '{self.frame_format}' no admite transparencia; se usa PNG.")
+            self.frame_format = "png"
+
     # ─── Paso 1: Obtener info del video original ─────────────────────────────
 
     def _get_video_info(self, input_path: str) -> dict:
@@ -109,6 +178,7 @@ class VideoUpscaler:
             "-v", "quiet",
             "-print_format", "json",
             "-show_streams",
+            "-show_format",
             input_path
         ]
         try:
@@ -120,38 +190,60 @@ class VideoUpscaler:
             data = json.loads(result.stdout)
         except Exception as e:
             print(f"ADVERTENCIA: ffprobe fallo ({e}), usando valores por defecto.")
-            return {"fps": "30", "ext": os.path.splitext(input_path)[1].lower(), "has_audio": False}
+            return {"fps": "30", "ext": os.path.splitext(input_path)[1].lower(), "has_audio": False,
+                    "width": 0, "height": 0, "total_frames": 0}
 
         fps = "30"
         has_audio = False
+        width = height = total_frames = 0
+        video_found = False
 
         for stream in data.get("streams", []):
             codec_type = stream.get("codec_type", "")
-            if codec_type == "video":
+            if codec_type == "video" and not video_found:
+                video_found = True
                 r_fps = stream.get("r_frame_rate", "30/1")
                 try:
                     num, den = r_fps.split("/")
                     fps = str(round(int(num) / int(den), 3))
                 except Exception:
                     fps = "30"
+                width = int(stream.get("width") or 0)
+                height = int(stream.get("height") or 0)
+                # nb_frames no siempre viene (p. ej. MKV/WebM): estimar con la duración
+                try:
+                    total_frames = int(stream.get("nb_frames") or 0)
+                    if not total_frames:
+                        total_frames = int(float(stream.get("duration") or 0) * float(fps))
+                except (TypeError, ValueError):
+                    total_frames = 0
             elif codec_type == "audio":
                 has_audio = True
 
+        if video_found and not total_frames:
+            # Sin duración en el stream (MKV/WebM): usar la del contenedor
+            try:
+                total_frames = int(float(data.get("format", {}).get("duration") or 0) * float(fps))
+            except (TypeError, ValueError):
+                total_frames = 0
+
         ext = os.path.splitext(input_path)[1].lower()
-        return {"fps": fps, "ext": ext, "has_audio": has_audio}
+        return {"fps": fps, "ext": ext, "has_audio": has_audio,
+                "width": width, "height": height, "total_frames": total_frames}
 
     # ─── Paso 2: Extraer frames ──────────────────────────────────────────────
 
-    def _extract_frames(self, input_path: str, frames_dir: str, fps: str):
-        """Extrae todos los frames como PNG con FFmpeg."""
+    def _extract_frames(self, input_path: str, frames_dir: str, fps: str, total_frames: int = 0):
+        """Extrae todos los frames con FFmpeg en el formato intermedio ('total_frames' estimado por ffprobe, 0 = desconocido)."""
         self._check_cancel()
         self._report(5, "Preparando extracción de fotogramas...")
 
-        pattern = os.path.join(frames_dir, "frame_%08d.png")
+        pattern = os.path.join(frames_dir, f"frame_%08d{self._frame_ext}")
         cmd = [
             self.ffmpeg_exe,
             "-i", input_path,
             "-vsync", "0",       # Sin duplicar ni omitir frames
+        ] + self._frame_codec_args() + [
             "-f", "image2",
             pattern,
             "-y"
@@ -183,14 +275,18 @@ class VideoUpscaler:
         reader_thread = threading.Thread(target=log_reader, args=(proc.stderr,), daemon=True)
         reader_thread.start()
         
-        # Monitorizar el proceso
-        start_t = time.time()
-        while proc.poll() is None:
-            self._check_cancel(proc)
-            elapsed = time.time() - start_t
-            p = min(14.9, 5 + (elapsed / 2.0)) 
-            self._report(p, f"Extrayendo fotogramas ({int(elapsed)}s)...")
-            time.sleep(0.5)
+        # Monitorizar el proceso: FFmpeg escribe frame_00000001, frame_00000002...
+        tracker = FrameProgressTracker(frames_dir, total_frames, extension=self._frame_ext).start()
+        try:
+            while proc.poll() is None:
+                self._check_cancel(proc)
+                tracker.poll()
+                # Sin total conocido la barra se queda quieta; el texto muestra fotogramas y fps
+                p = min(14.9, 5 + (tracker.count / total_frames) * 10) if total_frames else 5
+                self._report(p, tracker.describe("Extrayendo"))
+                time.sleep(0.5)
+        finally:
+            tracker.stop()
 
         proc.wait() # Asegurar cierre
         reader_thread.join(timeout=1.0)
@@ -200,7 +296,7 @@ class VideoUpscaler:
             print(f"ERROR FFMPEG EXTRACT: {stderr_out}")
             raise Exception(f"FFmpeg fallo al extraer frames (Codigo {proc.returncode}).\n\n{stderr_out[:200]}")
 
-        frames = [f for f in os.listdir(frames_dir) if f.endswith(".png")]
+        frames = [f for f in os.listdir(frames_dir) if f.endswith(self._frame_ext)]
         total = len(frames)
         print(f"INFO [VideoUpscaler] Extraction completa. Total frames: {total}")
         self._report(15, f"Extracción lista: {total} fotogramas.")
@@ -209,20 +305,23 @@ class VideoUpscaler:
     # ─── Paso 3: Reescalar con NCNN ─────────────────────────────────────────
 
     def _build_ncnn_cmd(self, engine: str, model_friendly: str, scale: str,
-                        in_dir: str, out_dir: str, tile_size: str = "0", denoise: str = "-1", tta: bool = False, concurrency: str = "Automático") -> list:
+                        in_dir: str, out_dir: str, tile_size: str = "0", denoise: str = "-1", tta: bool = False, concurrency: str = "Automático",
+                        threads_arg: str = None) -> list:
         """Construye el comando NCNN para procesar un directorio de frames."""
         if not tile_size: tile_size = "0"
         
         # Mapear concurrencia elegida por el usuario
-        if concurrency == "Seguro (Estabilidad)":
+        if threads_arg:
+            pass # Fijado por el planificador de instancias
+        elif concurrency == "Seguro (Estabilidad)":
             threads_arg = "1:1:1"
         elif concurrency == "Equilibrado":
             threads_arg = "1:2:1"
         elif concurrency == "Máximo (Potente)":
             threads_arg = "2:4:2"
         else:
-            # Automático (Lógica interna conservadora para video)
-            threads_arg = self._thread_args()
+            # Automático: lo calibrado para este equipo o, si no, la lógica conservadora para video
+            threads_arg = self._tuned_threads or self._thread_args()
 
         if engine == "SRMD":
             info = SRMD_MODELS.get(model_friendly, {})
@@ -236,7 +335,7 @@ class VideoUpscaler:
                 "-n", denoise,
                 "-s", scale,
                 "-t", tile_size,
-                "-f", "png",
+                "-f", UPSCALE_FRAME_FORMATS[self.frame_format]["ncnn"],
                 "-j", threads_arg,
             ]
             if tta: cmd += ["-x"]
@@ -255,7 +354,7 @@ class VideoUpscaler:
                 "-n", internal_model,
                 "-m", model_path,
                 "-s", scale,
-                "-f", "png",
+                "-f", UPSCALE_FRAME_FORMATS[self.frame_format]["ncnn"],
                 "-j", threads_arg,
             ]
             
@@ -283,22 +382,114 @@ class VideoUpscaler:
                 "-n", denoise,
                 "-s", scale,
                 "-t", tile_size,
-                "-f", "png",
+                "-f", UPSCALE_FRAME_FORMATS[self.frame_format]["ncnn"],
                 "-j", threads_arg,
             ]
             if tta: cmd += ["-x"]
             return cmd
 
+    def _plan_ncnn_instances(self, info: dict, scale: str, tile_size: str) -> list:
+        """
+        Decide cuántos procesos NCNN se lanzan a la vez y en qué dispositivo.
+        Cada dispositivo recibe hasta 'ncnn_instances' procesos, limitados por
+        su presupuesto de memoria. Devuelve [{"device", "threads", "tile"}, ...];
+        una sola entrada sin dispositivo equivale al comportamiento clásico.
+        """
+        devices = [d.strip() for d in (self.ncnn_devices or "").split(",") if d.strip()]
+        if not devices and self.ncnn_instances <= 1:
+            return [{"device": None, "threads": None, "tile": None}]
+
+        per_instance_mb = self._estimate_ncnn_memory_mb(info, scale, tile_size)
+        plan = []
+        for device in devices or [None]:
+            budget_mb = self._device_memory_budget_mb(device)
+            count = max(1, min(self.ncnn_instances, int(budget_mb // per_instance_mb)))
+            if count < self.ncnn_instances:
+                print(f"ADVERTENCIA [VideoUpscaler] Dispositivo {device if device is not None else 'por defecto'}: "
+                      f"solo caben {count} instancias (~{per_instance_mb:.0f} MB cada una, presupuesto {budget_mb:.0f} MB).")
+
+            threads = None
+            if device == "-1":
+                # En CPU los hilos de proceso se reparten entre las instancias
+                threads = f"1:{max(1, (os.cpu_count() or 2) // count)}:1"
+            tile = None
+            if count > 1 and device != "-1" and (not tile_size or tile_size == "0"):
+                # El mosaico automático asume la VRAM entera para un solo proceso
+                tile = str(UPSCALE_NCNN_SHARED_TILE)
+            plan += [{"device": device, "threads": threads, "tile": tile} for _ in range(count)]
+
+        print(f"INFO [VideoUpscaler] Motor AI: {len(plan)} procesos en paralelo "
+              f"({', '.join(str(p['device']) if p['device'] is not None else 'auto' for p in plan)}).")
+        return plan
+
+    def _estimate_ncnn_memory_mb(self, info: dict, scale: str, tile_size: str) -> float:
+        """
+        Cota aproximada de la memoria de un proceso NCNN: fotogramas de entrada
+        y salida en las colas de carga/guardado más el área de trabajo de un mosaico.
+        """
+        width, height = info.get("width") or 1920, info.get("height") or 1080
+        try:
+            factor = float(scale)
+        except (TypeError, ValueError):
+            factor = 2.0
+        try:
+            tile = int(tile_size) or UPSCALE_NCNN_SHARED_TILE
+        except (TypeError, ValueError):
+            tile = UPSCALE_NCNN_SHARED_TILE
+        frame_bytes = width * height * 3 * (1 + factor * factor) * 2
+        workspace_bytes = (tile * factor) ** 2 * UPSCALE_NCNN_TILE_BYTES_PER_PIXEL
+        return UPSCALE_NCNN_BASE_MEMORY_MB + (frame_bytes + workspace_bytes) / (1024 * 1024)
+
+    @staticmethod
+    def _device_memory_budget_mb(device) -> float:
+        """Memoria disponible para NCNN: una parte de la RAM libre en CPU, o el presupuesto fijo de una GPU."""
+        if device != "-1":
+            return UPSCALE_NCNN_GPU_MEMORY_MB
+        try:
+            import psutil
+            return psutil.virtual_memory().available / (1024 * 1024) * UPSCALE_NCNN_RAM_FRACTION
+        except Exception:
+            return UPSCALE_NCNN_GPU_MEMORY_MB
+
+    def _split_shards(self, in_dir: str, instances: int) -> tuple:
+        """
+        Reparte los frames de 'in_dir' en tandas de frames consecutivos (se
+        mueven, no se copian). Hay más tandas que procesos para que uno que
+        termine antes tome la siguiente. Devuelve (carpeta raíz, [tandas]).
+        """
+        names = sorted(f for f in os.listdir(in_dir) if f.endswith(self._frame_ext))
+        shard_count = min(len(names) // UPSCALE_NCNN_MIN_SHARD_FRAMES, instances * UPSCALE_NCNN_SHARDS_PER_INSTANCE)
+        if shard_count <= 1:
+            return None, [in_dir]
+
+        root = tempfile.mkdtemp(prefix="dowp_ncnn_shards_", dir=os.path.dirname(os.path.abspath(in_dir)))
+        size = -(-len(names) // shard_count)
+        shards = []
+        for i, start in enumerate(range(0, len(names), size)):
+            shard_dir = os.path.join(root, f"shard_{i:03d}")
+            os.makedirs(shard_dir)
+            for name in names[start:start + size]:
+                os.replace(os.path.join(in_dir, name), os.path.join(shard_dir, name))
+            shards.append(shard_dir)
+        return root, shards
+
     def _run_ncnn(self, engine: str, model_friendly: str, scale: str,
-                  in_dir: str, out_dir: str, total_frames: int, tile_size: str = "0", denoise: str = "-1", tta: bool = False, concurrency: str = "Automático"):
-        """Ejecuta el proceso NCNN y reporta progreso estimado."""
+                  in_dir: str, out_dir: str, total_frames: int, tile_size: str = "0", denoise: str = "-1", tta: bool = False, concurrency: str = "Automático",
+                  progress_range: tuple = (15.0, 85.0), frames_done_before: int = 0, report_completion: bool = True):
+        """
+        Ejecuta el proceso NCNN y reporta progreso estimado.
+        En el modo por bloques, 'frames_done_before' son los fotogramas de bloques
+        anteriores y 'progress_range' el tramo de la barra que corresponde a NCNN.
+        Con varias instancias (ver _plan_ncnn_instances) los frames se reparten
+        en tandas que procesan varios NCNN a la vez; todos escriben en 'out_dir'
+        con el nombre original, así que el orden se conserva ('in_dir' queda vacío).
+        """
         self._check_cancel()
-        self._report(15, f"Iniciando motor AI ({engine})...")
-
-        cmd = self._build_ncnn_cmd(engine, model_friendly, scale, in_dir, out_dir, tile_size, denoise, tta, concurrency)
-        print(f"DEBUG [VideoUpscaler] NCNN cmd: {' '.join(cmd)}")
+        pct_start, pct_end = progress_range
+        if not frames_done_before:
+            self._report(pct_start, f"Iniciando motor AI ({engine})...")
 
-        exe = cmd[0]
+        exe = self._build_ncnn_cmd(engine, model_friendly, scale, in_dir, out_dir, tile_size, denoise, tta, concurrency)[0]
         if not os.path.exists(exe):
             raise Exception(
                 f"El motor '{engine}' no está instalado.\n\n"
@@ -306,68 +497,111 @@ class VideoUpscaler:
                 "antes de usar el reescalador de video."
             )
 
-        # Hilo para consumir la salida y evitar el llenado del buffer (Deadlock)
-        _logs = []
-        def log_reader(pipe):
-            try:
-                for line in pipe:
-                    if line:
-                        _logs.append(line)
-                        if "error" in line.lower() or "failed" in line.lower():
-                            print(f"UPSCALER LOG: {line.strip()}")
-            except: pass
+        plan = self._ncnn_plan or [{"device": None, "threads": None, "tile": None}]
+        shards_root, shards = (None, [in_dir]) if len(plan) == 1 else self._split_shards(in_dir, len(plan))
+        pending = queue.Queue()
+        for shard in shards:
+            pending.put(shard)
 
-        proc = subprocess.Popen(
-            cmd,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.PIPE,
-            creationflags=self._creationflags(),
-            text=True,
-            errors="ignore",
-            bufsize=1
-        )
+        procs = []
+        results = []
+        abort = threading.Event()
+        lock = threading.Lock()
 
-        reader_thread = threading.Thread(target=log_reader, args=(proc.stderr,), daemon=True)
-        reader_thread.start()
+        def worker(instance):
+            while not abort.is_set():
+                try:
+                    shard = pending.get_nowait()
+                except queue.Empty:
+                    return
+                cmd = self._build_ncnn_cmd(engine, model_friendly, scale, shard, out_dir, instance["tile"] or tile_size,
+                                           denoise, tta, concurrency, threads_arg=instance["threads"])
+                if instance["device"] is not None:
+                    cmd += ["-g", instance["device"]]
+                print(f"DEBUG [VideoUpscaler] NCNN cmd: {' '.join(cmd)}")
+
+                # La salida se consume aquí mismo para evitar el llenado del buffer (Deadlock)
+                proc = subprocess.Popen(
+                    cmd,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                    creationflags=self._creationflags(),
+                    text=True,
+                    errors="ignore",
+                    bufsize=1
+                )
+                with lock:
+                    procs.append(proc)
+                if abort.is_set():
+                    self._kill(proc)
+                logs = []
+                try:
+                    for line in proc.stderr:
+                        if line:
+                            logs.append(line)
+                            if "error" in line.lower() or "failed" in line.lower():
+                                print(f"UPSCALER LOG: {line.strip()}")
+                except: pass
+                proc.wait()
+                with lock:
+                    results.append((proc.returncode, "".join(logs)))
+                if proc.returncode != 0:
+                    abort.set()
+                    return
+
+        # Progreso (15% → 85%): cada proceso genera los frames de su tanda en orden
+        expected = [sorted(f for f in os.listdir(shard) if f.endswith(self._frame_ext)) for shard in shards]
+        tracker = FrameProgressTracker(out_dir, total_frames, expected=expected, extension=self._frame_ext).start()
+
+        workers = [threading.Thread(target=worker, args=(instance,), daemon=True) for instance in plan[:len(shards)]]
+        for t in workers:
+            t.start()
 
-        # Progreso estimado mientras NCNN trabaja (15% → 85%)
-        start_time = time.time()
         last_done = -1
-        while proc.poll() is None:
-            self._check_cancel(proc)
-            
-            # Contar PNGs en la carpeta de salida
-            try:
-                done = len([f for f in os.listdir(out_dir) if f.endswith(".png")])
-            except:
-                done = last_done
-
-            if done != last_done:
-                pct = 15 + (done / max(total_frames, 1)) * 70
-                elapsed = int(time.time() - start_time)
-                msg = f"Procesando: {done}/{total_frames} fotogramas ({elapsed}s)"
-                self._report(min(pct, 84.9), msg)
-                print(f"UPSCALER: {msg}")
-                last_done = done
-            
-            time.sleep(1.0) # Esperar un poco mas para no saturar disco contando archivos
-
-        proc.wait()
-        reader_thread.join(timeout=1.0)
-
-        stderr_out = "".join(_logs)
+        try:
+            while any(t.is_alive() for t in workers):
+                self._check_cancel()
+
+                done = tracker.poll()
+                # En el modo por bloques el ritmo del bloque anterior sirve hasta tener uno nuevo
+                fps = tracker.fps or self._ncnn_fps
+                if tracker.fps:
+                    self._ncnn_fps = tracker.fps
+                total_done = frames_done_before + done
+                pct = pct_start + (total_done / max(total_frames, 1)) * (pct_end - pct_start)
+                msg = tracker.describe("Procesando", total_done, total_frames, fps)
+                self._report(min(pct, pct_end - 0.1), msg)
+                if done != last_done:
+                    print(f"UPSCALER: {msg}")
+                    last_done = done
+
+                time.sleep(0.5)
+        finally:
+            tracker.stop()
+            abort.set()
+            with lock:
+                for proc in procs:
+                    self._kill(proc)
+            for t in workers:
+                t.join(timeout=2.0)
+            if shards_root:
+                shutil.rmtree(shards_root, ignore_errors=True)
+
+        stderr_out = "".join(log for _, log in results)
+        returncode = next((code for code, _ in results if code != 0), 0)
         
         # --- NUEVAS VALIDACIONES DE ERROR ---
         
         # 1. Verificar retorno de error
-        if proc.returncode != 0:
+        if returncode != 0:
             print(f"ERROR NCNN: {stderr_out}")
-            raise Exception(f"El motor AI falló (Código {proc.returncode}).\n\nDetalles:\n{stderr_out[:500]}")
+            raise Exception(f"El motor AI falló (Código {returncode}).\n\nDetalles:\n{stderr_out[:500]}")
 
         # 2. Verificar errores críticos de Vulkan en el log (incluso si retornó 0)
-        vulkan_errors = ["vkQueueSubmit failed", "vkAllocateMemory failed", "invalid gpu device", "out of gpu memory"]
-        if any(err in stderr_out for err in vulkan_errors):
+        if any(err in stderr_out for err in VULKAN_ERRORS):
             print(f"CRITICAL ERROR (Vulkan): {stderr_out}")
+            # Si la configuración venía de la calibración, no volver a usarla
+            self._forget_tuning()
             raise Exception(
                 "Error de Hardware (Vulkan) detectado.\n\n"
                 "Tu tarjeta gráfica no pudo procesar los fotogramas. "
@@ -375,69 +609,215 @@ class VideoUpscaler:
             )
 
         # 3. Verificar integridad de los frames producidos
-        out_frames = [f for f in os.listdir(out_dir) if f.endswith(".png")]
+        out_frames = [f for f in os.listdir(out_dir) if f.endswith(self._frame_ext)]
         if not out_frames:
             raise Exception("El motor AI terminó pero no se generó ningún fotograma reescalado.")
             
         # Comprobar si el primer frame es válido (no 0 bytes)
         first_frame = os.path.join(out_dir, out_frames[0])
-        if os.path.getsize(first_frame) < 100: # Un PNG real pesa más de 100 bytes
+        if os.path.getsize(first_frame) < 100: # Un fotograma real pesa más de 100 bytes
             raise Exception("Error de procesamiento: Los fotogramas generados están vacíos o corruptos (posible incompatibilidad de driver GPU).")
 
-        self._report(85, "Reescalado completado con éxito.")
+        if report_completion:
+            self._report(pct_end, "Reescalado completado con éxito.")
 
-    # ─── Paso 4: Reensamblar con FFmpeg ─────────────────────────────────────
+    # ─── Calibración automática del motor AI ────────────────────────────────
 
-    def _reassemble(self, upscaled_dir: str, original_path: str,
-                    output_path: str, fps: str, container: str, has_audio: bool, transparency: bool = False):
-        """Ensambla los frames reescalados + audio original en el video final."""
-        self._check_cancel()
-        self._report(86, "Preparando ensamblado final...")
+    def _tuning_cache_key(self, engine: str, model: str, scale: str, info: dict, ncnn_opts: dict) -> str:
+        return "|".join([
+            engine, model, str(scale), f"{info.get('width')}x{info.get('height')}",
+            str(ncnn_opts.get("denoise")), "tta" if ncnn_opts.get("tta") else "-",
+            self.ncnn_devices or "auto", self.frame_format,
+        ])
 
-        ext = container if container.startswith(".") else f".{container}"
-        codec_info = CONTAINER_CODECS.get(ext, CONTAINER_CODECS[".mp4"])
+    def _load_tuning_cache(self) -> dict:
+        try:
+            if os.path.exists(self.tuning_cache_path):
+                with open(self.tuning_cache_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == UPSCALE_TUNING_VERSION:
+                    return data
+        except Exception as e:
+            print(f"ADVERTENCIA [VideoUpscaler] No se pudo leer la caché de calibración: {e}")
+        return {"version": UPSCALE_TUNING_VERSION, "entries": {}}
 
-        frame_pattern = os.path.join(upscaled_dir, "frame_%08d.png")
+    def _save_tuning_cache(self, data: dict):
+        tmp_path = self.tuning_cache_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.tuning_cache_path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.tuning_cache_path)
+        except Exception as e:
+            print(f"ADVERTENCIA [VideoUpscaler] No se pudo guardar la caché de calibración: {e}")
+
+    def _forget_tuning(self):
+        """Descarta la calibración en uso (p. ej. tras un error de VRAM con ella)."""
+        if not (self.tuning_cache_path and self._tuning_key):
+            return
+        data = self._load_tuning_cache()
+        if data["entries"].pop(self._tuning_key, None) is not None:
+            print(f"INFO [VideoUpscaler] Calibración descartada tras un error de Vulkan: {self._tuning_key}")
+            self._save_tuning_cache(data)
+        self._tuning_key = None
+
+    def _autotune_ncnn(self, input_path: str, info: dict, engine: str, model: str, scale: str, ncnn_opts: dict) -> dict:
+        """
+        Elige mosaico (-t) e hilos (-j) para lo que esté en "automático"
+        probando unos pocos fotogramas del video con cada candidato, y guarda
+        el resultado por motor, modelo y resolución. Primero se busca el
+        mosaico con los hilos por defecto y después los hilos con ese
+        mosaico; los valores por defecto solo se cambian si la mejora supera
+        el margen de ruido. Una prueba que falla o deja errores de Vulkan se descarta.
+        Devuelve las opciones de NCNN actualizadas.
+        """
+        plan = self._ncnn_plan or [{"device": None, "threads": None, "tile": None}]
+        if len(plan) > 1:
+            # Con varios procesos a la vez lo medido para uno solo no sirve
+            return ncnn_opts
+        tune_tile = not ncnn_opts.get("tile_size") or ncnn_opts["tile_size"] == "0"
+        # En CPU el planificador ya fija los hilos de la instancia
+        tune_threads = ncnn_opts.get("concurrency", "Automático") == "Automático" and not plan[0]["threads"]
+        if not self.tuning_cache_path or not (tune_tile or tune_threads):
+            return ncnn_opts
+
+        key = self._tuning_cache_key(engine, model, scale, info, ncnn_opts)
+        cache = self._load_tuning_cache()
+        entry = cache["entries"].get(key)
+        if entry is None:
+            entry = self._calibrate_ncnn(input_path, engine, model, scale, ncnn_opts, plan[0]["device"], tune_tile, tune_threads)
+            if entry is None:
+                return ncnn_opts
+            cache = self._load_tuning_cache()
+            cache["entries"][key] = entry
+            self._save_tuning_cache(cache)
+        else:
+            print(f"INFO [VideoUpscaler] Calibración en caché: mosaico {entry['tile']}, hilos {entry['threads']} ({key}).")
+
+        self._tuning_key = key
+        tuned = dict(ncnn_opts)
+        if tune_tile:
+            tuned["tile_size"] = entry["tile"]
+        if tune_threads:
+            self._tuned_threads = entry["threads"]
+        return tuned
+
+    def _calibrate_ncnn(self, input_path: str, engine: str, model: str, scale: str, ncnn_opts: dict,
+                        device: str | None, tune_tile: bool, tune_threads: bool) -> dict | None:
+        """Ejecuta las pruebas de calibración. Devuelve {"tile", "threads", "fps"} o None."""
+        abort = threading.Event()
+        work_dir = tempfile.mkdtemp(prefix="dowp_ncnn_tune_")
+        try:
+            sample_dir = os.path.join(work_dir, "in")
+            os.makedirs(sample_dir)
+            cmd = [self.ffmpeg_exe, "-v", "error", "-i", input_path, "-map", "0:v:0",
+                   "-frames:v", str(UPSCALE_TUNING_SAMPLE_FRAMES), "-vsync", "0"]
+            cmd += self._frame_codec_args() + ["-f", "image2", os.path.join(sample_dir, f"frame_%08d{self._frame_ext}"), "-y"]
+            returncode, log = self._run_process(cmd, abort)
+            samples = len(os.listdir(sample_dir))
+            if returncode != 0 or not samples:
+                print(f"ADVERTENCIA [VideoUpscaler] No se pudo preparar la calibración: {log.strip()[-200:]}")
+                return None
+
+            default_tile = ncnn_opts.get("tile_size") or "0"
+            default_threads = self._thread_args()
+            tiles = [str(t) for t in UPSCALE_TUNING_TILES] if tune_tile else [default_tile]
+            threads = list(UPSCALE_TUNING_THREADS) if tune_threads else [None]
+            total_runs = len(tiles) + (len(threads) - 1 if tune_threads else 0)
+            runs = 0
+
+            def measure(tile, threads_arg):
+                nonlocal runs
+                runs += 1
+                self._report(2 + 3 * runs / max(total_runs, 1),
+                             f"Calibrando motor AI ({runs}/{total_runs}): mosaico {tile}, hilos {threads_arg or 'usuario'}...")
+                out_dir = os.path.join(work_dir, f"out_{runs}")
+                os.makedirs(out_dir)
+                cmd = self._build_ncnn_cmd(engine, model, scale, sample_dir, out_dir, tile, ncnn_opts.get("denoise", "-1"),
+                                           ncnn_opts.get("tta", False), ncnn_opts.get("concurrency", "Automático"),
+                                           threads_arg=threads_arg)
+                if device is not None:
+                    cmd += ["-g", device]
+                started = time.monotonic()
+                returncode, log = self._run_process(cmd, abort)
+                elapsed = time.monotonic() - started
+                produced = [f for f in os.listdir(out_dir) if os.path.getsize(os.path.join(out_dir, f)) >= 100]
+                shutil.rmtree(out_dir, ignore_errors=True)
+                stable = returncode == 0 and len(produced) == samples and not any(err in log for err in VULKAN_ERRORS)
+                fps = samples / elapsed if stable and elapsed > 0 else None
+                print(f"INFO [VideoUpscaler] Calibración: mosaico {tile}, hilos {threads_arg or 'usuario'} -> "
+                      f"{f'{fps:.2f} fps' if fps else 'inestable'}")
+                return fps
+
+            # 1) Mosaico, con los hilos por defecto
+            best = None
+            for tile in tiles:
+                fps = measure(tile, default_threads if tune_threads else None)
+                if fps and (best is None or fps > best["fps"] * UPSCALE_TUNING_MIN_GAIN):
+                    best = {"tile": tile, "threads": default_threads, "fps": fps}
+            if best is None:
+                print("ADVERTENCIA [VideoUpscaler] Ninguna configuración de la calibración fue estable; se usan los valores por defecto.")
+                return None
+
+            # 2) Hilos, con el mejor mosaico
+            if tune_threads:
+                for threads_arg in threads:
+                    if threads_arg == default_threads:
+                        continue
+                    fps = measure(best["tile"], threads_arg)
+                    if fps and fps > best["fps"] * UPSCALE_TUNING_MIN_GAIN:
+                        best = {"tile": best["tile"], "threads": threads_arg, "fps": fps}
+
+            best["calibrated"] = time.time()
+            print(f"INFO [VideoUpscaler] Calibración elegida: mosaico {best['tile']}, hilos {best['threads']} ({best['fps']:.2f} fps).")
+            return best
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
 
-        cmd = [
-            self.ffmpeg_exe,
-            "-framerate", fps,
-            "-i", frame_pattern,
-        ]
+    # ─── Fotogramas repetidos ───────────────────────────────────────────────
 
-        if has_audio:
-            cmd += ["-i", original_path]
+    def _dedup_frames(self, frames_dir: str) -> dict:
+        """
+        Borra de 'frames_dir' los fotogramas repetidos para que NCNN no los
+        procese. Devuelve {repetido: original} para restaurarlos después.
+        """
+        if self.dedup_mode == "off":
+            return {}
+        deduper = _FrameDeduper(self.dedup_mode)
+        duplicates = {}
+        for name in sorted(f for f in os.listdir(frames_dir) if f.endswith(self._frame_ext)):
+            self._check_cancel()
+            path = os.path.join(frames_dir, name)
+            with open(path, "rb") as f:
+                original = deduper.check(name, f.read())
+            if original:
+                duplicates[name] = original
+                os.remove(path)
+        return duplicates
+
+    @staticmethod
+    def _restore_duplicates(upscaled_dir: str, duplicates: dict):
+        """Recrea los fotogramas repetidos a partir de su original ya reescalado."""
+        for name, original in duplicates.items():
+            src = os.path.join(upscaled_dir, original)
+            dst = os.path.join(upscaled_dir, name)
+            try:
+                # Un enlace duro no ocupa disco; si el sistema no lo permite, se copia
+                os.link(src, dst)
+            except OSError:
+                shutil.copyfile(src, dst)
 
-        if ext == ".gif":
-            # Para GIFs usamos una lógica de paleta para mayor calidad
-            # y evitamos el codec x264 que no es soportado por el muxer gif
-            cmd += [
-                "-vf", "fps=" + fps + ",scale=trunc(iw/2)*2:trunc(ih/2)*2:flags=lanczos,split[s0][s1];[s0]palettegen[p];[s1][p]paletteuse",
-                "-loop", "0"
-            ]
-        else:
-            if transparency and ext == ".mov":
-                # Usar codec Animation (qtrle) para preservar Alpha en MOV
-                cmd += [
-                    "-c:v", "qtrle", 
-                    "-pix_fmt", "rgba",
-                ]
-            else:
-                cmd += [
-                    "-c:v", codec_info["vcodec"],
-                    "-pix_fmt", codec_info["pix_fmt"],
-                    "-crf", "18",           # Calidad alta
-                    "-preset", "fast",
-                ]
+    # ─── Paso 4: Reensamblar con FFmpeg ─────────────────────────────────────
 
-        if has_audio and ext != ".gif":
-            # Copiar audio del segundo input (-i original_path)
-            cmd += ["-c:a", codec_info["acodec"], "-map", "0:v:0", "-map", "1:a:0?"]
-        else:
-            # Solo video (o GIF)
-            cmd += ["-map", "0:v:0"]
+    def _reassemble(self, upscaled_dir: str, original_path: str,
+                    output_path: str, fps: str, container: str, has_audio: bool, transparency: bool = False):
+        """Ensambla los frames reescalados + audio original en el video final."""
+        self._check_cancel()
+        self._report(86, "Preparando ensamblado final...")
 
-        cmd += ["-y", output_path]
+        frame_pattern = os.path.join(upscaled_dir, f"frame_%08d{self._frame_ext}")
+        cmd = self._build_encode_cmd(["-framerate", fps, "-i", frame_pattern],
+                                     original_path, output_path, fps, container, has_audio, transparency)
 
         print(f"DEBUG [VideoUpscaler] Reensamblando: {' '.join(cmd)}")
         
@@ -483,6 +863,655 @@ class VideoUpscaler:
 
         self._report(100, "¡Vídeo reescalado con éxito!")
 
+    def _video_encode_args(self, ext: str, fps: str, transparency: bool) -> list:
+        """Parámetros de video del archivo final según el contenedor."""
+        codec_info = CONTAINER_CODECS.get(ext, CONTAINER_CODECS[".mp4"])
+        if ext == ".gif":
+            # Para GIFs usamos una lógica de paleta para mayor calidad
+            # y evitamos el codec x264 que no es soportado por el muxer gif
+            return [
+                "-vf", "fps=" + fps + ",scale=trunc(iw/2)*2:trunc(ih/2)*2:flags=lanczos,split[s0][s1];[s0]palettegen[p];[s1][p]paletteuse",
+                "-loop", "0"
+            ]
+        if transparency and ext == ".mov":
+            # Usar codec Animation (qtrle) para preservar Alpha en MOV
+            return [
+                "-c:v", "qtrle", 
+                "-pix_fmt", "rgba",
+            ]
+        return [
+            "-c:v", codec_info["vcodec"],
+            "-pix_fmt", codec_info["pix_fmt"],
+            "-crf", "18",           # Calidad alta
+            "-preset", "fast",
+        ]
+
+    def _audio_map_args(self, ext: str, has_audio: bool) -> list:
+        """Mapeo de pistas: video del primer input y, si hay, audio del original (segundo input)."""
+        if has_audio and ext != ".gif":
+            codec_info = CONTAINER_CODECS.get(ext, CONTAINER_CODECS[".mp4"])
+            return ["-c:a", codec_info["acodec"], "-map", "0:v:0", "-map", "1:a:0?"]
+        # Solo video (o GIF)
+        return ["-map", "0:v:0"]
+
+    def _build_encode_cmd(self, frame_input_args: list, original_path: str, output_path: str,
+                          fps: str, container: str, has_audio: bool, transparency: bool = False) -> list:
+        """
+        Comando FFmpeg que codifica los frames reescalados (+ audio original).
+        'frame_input_args' define de dónde salen los frames (patrón de archivos o tubería).
+        """
+        ext = container if container.startswith(".") else f".{container}"
+
+        cmd = [self.ffmpeg_exe] + list(frame_input_args)
+        if has_audio:
+            cmd += ["-i", original_path]
+        cmd += self._video_encode_args(ext, fps, transparency)
+        cmd += self._audio_map_args(ext, has_audio)
+        cmd += ["-y", output_path]
+        return cmd
+
+    # ─── Modo por bloques (disco acotado) ───────────────────────────────────
+
+    def _plan_chunk_frames(self, info: dict, scale: str, transparency: bool) -> int:
+        """
+        Calcula cuántos fotogramas caben en cada bloque para no pasar del
+        presupuesto de disco. Cota alta: cada frame ocupa como mucho su tamaño
+        sin comprimir, en la carpeta de entrada y (multiplicado por la escala
+        al cuadrado) en la de salida.
+        """
+        width, height = info.get("width") or 1920, info.get("height") or 1080
+        try:
+            factor = float(scale)
+        except (TypeError, ValueError):
+            factor = 2.0
+        bytes_per_pixel = 4 if transparency else 3
+        frame_bytes = width * height * bytes_per_pixel * (1 + factor * factor)
+
+        budget_bytes = self.temp_budget_mb * 1024 * 1024
+        chunk = int(budget_bytes // (UPSCALE_RING_SLOTS * frame_bytes))
+        if chunk < UPSCALE_MIN_CHUNK_FRAMES:
+            print(f"ADVERTENCIA [VideoUpscaler] El presupuesto de {self.temp_budget_mb} MB es muy justo para "
+                  f"{width}x{height}; se usan bloques de {UPSCALE_MIN_CHUNK_FRAMES} fotogramas.")
+        return max(UPSCALE_MIN_CHUNK_FRAMES, min(UPSCALE_MAX_CHUNK_FRAMES, chunk))
+
+    def _iter_frames(self, stream):
+        """Separa la salida 'image2pipe' de FFmpeg según el formato intermedio."""
+        if self.frame_format == "webp":
+            return self._iter_webp_frames(stream)
+        if self.frame_format == "jpg":
+            return self._iter_jpeg_frames(stream)
+        return self._iter_png_frames(stream)
+
+    @staticmethod
+    def _iter_webp_frames(stream):
+        """Cada WebP es un contenedor RIFF: 'RIFF' + tamaño (LE) + 'WEBP' + bloques."""
+        while True:
+            header = stream.read(12)
+            if not header:
+                return
+            if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WEBP":
+                raise Exception("Flujo de fotogramas WebP dañado (cabecera no válida).")
+            remaining = int.from_bytes(header[4:8], "little") - 4
+            body = stream.read(remaining)
+            if len(body) < remaining:
+                raise Exception("Flujo de fotogramas WebP truncado.")
+            yield header + body
+
+    @staticmethod
+    def _iter_jpeg_frames(stream):
+        """
+        Separa JPEGs recorriendo sus segmentos (marcador + longitud) hasta el
+        inicio del barrido (SOS). Dentro de los datos comprimidos un 0xFF
+        siempre va seguido de 0x00 o de un RST, así que el primer 0xFFD9 que
+        aparece después es el final de la imagen (FFmpeg genera JPEG baseline,
+        con un único barrido).
+        """
+        reader = _BufferedPipe(stream)
+        while True:
+            soi = reader.read(2)
+            if not soi:
+                return
+            if soi != b"\xff\xd8":
+                raise Exception("Flujo de fotogramas JPG dañado (falta el inicio de imagen).")
+
+            parts = bytearray(soi)
+            while True:
+                marker = reader.read(2)
+                if len(marker) < 2 or marker[0] != 0xFF:
+                    raise Exception("Flujo de fotogramas JPG truncado o dañado.")
+                parts += marker
+                code = marker[1]
+                if code == 0xD9:
+                    break
+                if 0xD0 <= code <= 0xD7 or code == 0x01:
+                    continue
+                length = reader.read(2)
+                if len(length) < 2:
+                    raise Exception("Flujo de fotogramas JPG truncado.")
+                segment = reader.read(int.from_bytes(length, "big") - 2)
+                parts += length
+                parts += segment
+                if code == 0xDA:
+                    # Datos comprimidos hasta el final de la imagen
+                    data = reader.read_until(b"\xff\xd9")
+                    if data is None:
+                        raise Exception("Flujo de fotogramas JPG truncado.")
+                    parts += data
+                    break
+            yield bytes(parts)
+
+    @staticmethod
+    def _iter_png_frames(stream):
+        """
+        Separa la salida 'image2pipe' de FFmpeg en PNGs individuales leyendo
+        la estructura de bloques del formato (longitud + tipo + datos + CRC).
+        """
+        signature = b"\x89PNG\r\n\x1a\n"
+        while True:
+            header = stream.read(8)
+            if not header:
+                return
+            if header != signature:
+                raise Exception("Flujo de fotogramas PNG dañado (firma no válida).")
+
+            parts = [header]
+            while True:
+                chunk_head = stream.read(8)
+                if len(chunk_head) < 8:
+                    raise Exception("Flujo de fotogramas PNG truncado.")
+                length = int.from_bytes(chunk_head[:4], "big")
+                body = stream.read(length + 4) # datos + CRC
+                if len(body) < length + 4:
+                    raise Exception("Flujo de fotogramas PNG truncado.")
+                parts.append(chunk_head)
+                parts.append(body)
+                if chunk_head[4:8] == b"IEND":
+                    break
+            yield b"".join(parts)
+
+
+    def _segment_format(self, ext: str, fps: str, transparency: bool) -> tuple:
+        """
+        Códec y contenedor de los segmentos por bloque. Se codifican ya con el
+        códec final para unirlos sin recodificar; el GIF necesita una paleta
+        global, así que sus segmentos van sin pérdida (FFV1) y la paleta se
+        calcula al unirlos.
+        """
+        if ext == ".gif":
+            return ["-c:v", "ffv1", "-pix_fmt", "rgb24"], ".mkv"
+        if transparency and ext == ".mov":
+            return self._video_encode_args(ext, fps, transparency), ".mov"
+        return self._video_encode_args(ext, fps, transparency), ".mkv"
+
+    def _build_segment_cmd(self, frames_dir: str, first_frame: int, segment_path: str,
+                           fps: str, ext: str, transparency: bool) -> list:
+        """Codifica los frames reescalados de un bloque como un segmento de video sin audio."""
+        codec_args, _ = self._segment_format(ext, fps, transparency)
+        return [
+            self.ffmpeg_exe,
+            "-v", "error",
+            "-framerate", fps,
+            "-start_number", str(first_frame),
+            "-i", os.path.join(frames_dir, f"frame_%08d{self._frame_ext}"),
+        ] + codec_args + ["-an", "-y", segment_path]
+
+    def _build_concat_cmd(self, list_path: str, original_path: str, output_path: str,
+                          fps: str, ext: str, has_audio: bool, transparency: bool) -> list:
+        """Une los segmentos (concat demuxer) y añade el audio del original."""
+        cmd = [self.ffmpeg_exe, "-f", "concat", "-safe", "0", "-i", list_path]
+        if has_audio:
+            cmd += ["-i", original_path]
+        if ext == ".gif":
+            cmd += self._video_encode_args(ext, fps, transparency)
+        else:
+            # Los segmentos ya tienen el códec final
+            cmd += ["-c:v", "copy"]
+        cmd += self._audio_map_args(ext, has_audio)
+        cmd += ["-y", output_path]
+        return cmd
+
+    def _run_process(self, cmd: list, abort: threading.Event) -> tuple:
+        """
+        Ejecuta un proceso auxiliar (FFmpeg) consumiendo su stderr y lo
+        termina si se cancela. Devuelve (código de salida, log de errores).
+        """
+        logs = []
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                creationflags=self._creationflags(), text=True, errors="ignore")
+        reader = threading.Thread(target=lambda: logs.extend(iter(proc.stderr.readline, "")), daemon=True)
+        reader.start()
+        try:
+            while proc.poll() is None:
+                if abort.is_set():
+                    raise UserCancelledError("Proceso detenido.")
+                self._check_cancel(proc)
+                time.sleep(0.1)
+        finally:
+            self._kill(proc)
+            reader.join(timeout=1.0)
+        return proc.returncode, "".join(logs)
+
+    def _queue_get(self, q: queue.Queue, abort: threading.Event):
+        """Espera un elemento de la cola sin quedarse bloqueado ante una cancelación o error."""
+        while True:
+            if abort.is_set():
+                raise UserCancelledError("Proceso detenido.")
+            self._check_cancel()
+            try:
+                return q.get(timeout=0.2)
+            except queue.Empty:
+                continue
+
+    def _queue_put(self, q: queue.Queue, item, abort: threading.Event):
+        """Encola respetando el límite de la cola; abandona si el proceso se detiene."""
+        while not abort.is_set():
+            try:
+                q.put(item, timeout=0.2)
+                return
+            except queue.Full:
+                continue
+        raise UserCancelledError("Proceso detenido.")
+
+    @staticmethod
+    def _clear_dir(path: str):
+        for name in os.listdir(path):
+            try:
+                os.remove(os.path.join(path, name))
+            except OSError:
+                pass
+
+    @staticmethod
+    def _kill(proc):
+        if proc and proc.poll() is None:
+            try:
+                proc.kill()
+                proc.wait(timeout=2.0)
+            except Exception:
+                pass
+
+    def _stage_extract(self, pipe: "_UpscalePipeline", input_path: str, chunk_frames: int):
+        """
+        Etapa 1 (hilo): un único FFmpeg envía los fotogramas por tubería y los
+        frames se reparten en bloques dentro de los slots libres del anillo.
+        Los bloques ya terminados en una ejecución anterior se descartan y los
+        fotogramas repetidos no llegan a escribirse.
+        """
+        # Los bloques iniciales ya reescalados ni se convierten a imagen
+        skipped_chunks = 0
+        while skipped_chunks in pipe.segments:
+            skipped_chunks += 1
+        frame_number = skipped_chunks * chunk_frames
+
+        cmd = [self.ffmpeg_exe, "-i", input_path, "-map", "0:v:0"]
+        if frame_number:
+            cmd += ["-vf", f"select=gte(n\\,{frame_number})"]
+        cmd += ["-vsync", "0"] + self._frame_codec_args() + ["-f", "image2pipe", "pipe:1"]
+        print(f"DEBUG [VideoUpscaler] Extracción por tubería: {' '.join(cmd)}")
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                creationflags=self._creationflags())
+        pipe.processes.append(proc)
+
+        # Cada bloque se deduplica por separado: el original debe estar en el mismo slot
+        deduper = _FrameDeduper(self.dedup_mode) if self.dedup_mode != "off" else None
+        slot, chunk_index, first_frame, count, duplicates = None, 0, 0, 0, {}
+        try:
+            frames = self._iter_frames(proc.stdout)
+            while True:
+                with pipe.timed("extracción"):
+                    frame_bytes = next(frames, None)
+                if frame_bytes is None:
+                    break
+                frame_number += 1
+                if (frame_number - 1) // chunk_frames in pipe.segments:
+                    continue
+                if slot is None:
+                    # Espera fuera del cronómetro: aquí la etapa está bloqueada por las siguientes
+                    slot = self._queue_get(pipe.free_slots, pipe.abort)
+                    chunk_index, first_frame, count, duplicates = (frame_number - 1) // chunk_frames, frame_number, 0, {}
+                    if deduper:
+                        deduper.reset()
+                with pipe.timed("extracción"):
+                    name = f"frame_{frame_number:08d}{self._frame_ext}"
+                    original = deduper.check(name, frame_bytes) if deduper else None
+                    if original:
+                        duplicates[name] = original
+                    else:
+                        with open(os.path.join(slot["in"], name), "wb") as f:
+                            f.write(frame_bytes)
+                count += 1
+                if count >= chunk_frames:
+                    self._queue_put(pipe.ready_chunks, (chunk_index, slot, first_frame, count, duplicates), pipe.abort)
+                    slot = None
+            if slot is not None and count:
+                self._queue_put(pipe.ready_chunks, (chunk_index, slot, first_frame, count, duplicates), pipe.abort)
+
+            proc.wait()
+            if proc.returncode != 0:
+                raise Exception(f"FFmpeg falló al extraer frames (Codigo {proc.returncode}).")
+            print(f"INFO [VideoUpscaler] Extracción completa. Total frames: {frame_number}")
+            self._queue_put(pipe.ready_chunks, None, pipe.abort)
+        except Exception as e:
+            pipe.fail(e)
+
+    def _stage_encode(self, pipe: "_UpscalePipeline", fps: str, ext: str, transparency: bool):
+        """
+        Etapa 3 (hilo): codifica cada bloque reescalado como un segmento
+        independiente, lo anota en el manifiesto y devuelve su slot al anillo.
+        """
+        _, segment_ext = self._segment_format(ext, fps, transparency)
+        try:
+            while True:
+                item = self._queue_get(pipe.encode_chunks, pipe.abort)
+                if item is None:
+                    return
+                chunk_index, slot, first_frame, count = item
+                segment_name = f"segment_{chunk_index:05d}{segment_ext}"
+                # Se escribe con otro nombre: un segmento a medias nunca cuenta como terminado
+                partial_path = os.path.join(pipe.work_dir, "partial_" + segment_name)
+                cmd = self._build_segment_cmd(slot["out"], first_frame, partial_path, fps, ext, transparency)
+
+                with pipe.timed("codificación"):
+                    returncode, log = self._run_process(cmd, pipe.abort)
+                if returncode != 0:
+                    print(f"ERROR FFMPEG SEGMENT: {log}")
+                    raise Exception(f"FFmpeg falló al codificar el bloque {chunk_index + 1} (Codigo {returncode}):\n{log[-500:]}")
+
+                segment_path = os.path.join(pipe.work_dir, segment_name)
+                os.replace(partial_path, segment_path)
+                pipe.checkpoint(chunk_index, segment_path, first_frame, count)
+                self._clear_dir(slot["out"])
+                pipe.free_slots.put(slot)
+        except Exception as e:
+            pipe.fail(e)
+
+    # ─── Reanudación ────────────────────────────────────────────────────────
+
+    def _resume_key(self, input_path: str, ext: str, engine: str, model: str, scale: str,
+                    ncnn_opts: dict, transparency: bool) -> str:
+        """
+        Identifica un trabajo de reescalado: mismo archivo (ruta, tamaño y
+        fecha) y mismas opciones que cambian el resultado (el deduplicado
+        "similar" también). El tile y la concurrencia solo afectan a la
+        velocidad, así que no cuentan.
+        """
+        stat = os.stat(input_path)
+        raw = json.dumps({
+            "version": _UpscalePipeline.MANIFEST_VERSION,
+            "input": os.path.abspath(input_path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "ext": ext,
+            "engine": engine,
+            "model": model,
+            "scale": str(scale),
+            "denoise": str(ncnn_opts.get("denoise")),
+            "tta": bool(ncnn_opts.get("tta")),
+            "transparency": bool(transparency),
+            "frame_format": self.frame_format,
+            "dedup": self.dedup_mode,
+        }, sort_keys=True)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _prune_resume_dir(self):
+        """Borra los trabajos reanudables abandonados hace más de UPSCALE_RESUME_MAX_AGE_DAYS."""
+        if not os.path.isdir(self.resume_dir):
+            return
+        limit = time.time() - UPSCALE_RESUME_MAX_AGE_DAYS * 86400
+        for name in os.listdir(self.resume_dir):
+            job_dir = os.path.join(self.resume_dir, name)
+            manifest_path = os.path.join(job_dir, _UpscalePipeline.MANIFEST_FILENAME)
+            try:
+                last_used = os.path.getmtime(manifest_path if os.path.exists(manifest_path) else job_dir)
+            except OSError:
+                continue
+            if last_used < limit:
+                print(f"INFO [VideoUpscaler] Eliminando trabajo reanudable caducado: {name}")
+                shutil.rmtree(job_dir, ignore_errors=True)
+
+    def _load_manifest(self, manifest_path: str, key: str) -> dict | None:
+        """Lee el manifiesto de un trabajo anterior; None si no existe o no corresponde."""
+        if not os.path.exists(manifest_path):
+            return None
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except Exception as e:
+            print(f"ADVERTENCIA [VideoUpscaler] Manifiesto de reanudación dañado, se empieza de cero: {e}")
+            return None
+        if manifest.get("key") != key or not manifest.get("chunk_frames"):
+            return None
+        return manifest
+
+    def _upscale_chunked(self, input_path: str, output_path: str, info: dict, ext_out: str,
+                         engine: str, model: str, scale: str, ncnn_opts: dict, transparency: bool):
+        """
+        Reescalado por bloques en tres etapas solapadas unidas por colas acotadas:
+          1. Extracción (hilo) -> ready_chunks
+          2. NCNN (este hilo): empieza con el primer bloque completo -> encode_chunks
+          3. Codificación (hilo): un segmento de video por bloque
+        Al final los segmentos se unen sin recodificar junto al audio original.
+        Solo circulan UPSCALE_RING_SLOTS bloques, así que el disco temporal
+        queda acotado y el tiempo total tiende al de la etapa más lenta.
+
+        Con 'resume_dir' los segmentos terminados y el manifiesto se guardan
+        en una carpeta propia del trabajo y sobreviven a una cancelación o un
+        cierre inesperado: al repetir el mismo video con las mismas opciones
+        solo se procesan los bloques que faltan.
+        """
+        fps = info["fps"]
+        total_frames = info.get("total_frames") or 0
+
+        manifest = None
+        if self.resume_dir:
+            self._prune_resume_dir()
+            key = self._resume_key(input_path, ext_out, engine, model, scale, ncnn_opts, transparency)
+            work_dir = os.path.join(self.resume_dir, key)
+            os.makedirs(work_dir, exist_ok=True)
+            manifest_path = os.path.join(work_dir, _UpscalePipeline.MANIFEST_FILENAME)
+            manifest = self._load_manifest(manifest_path, key)
+            if manifest is None:
+                manifest = {"key": key, "input": os.path.abspath(input_path), "segments": {}}
+        else:
+            work_dir = tempfile.mkdtemp(prefix="dowp_upscale_work_")
+            manifest_path = None
+
+        if manifest and manifest.get("chunk_frames"):
+            # Los límites de los bloques deben coincidir con los ya guardados
+            chunk_frames = manifest["chunk_frames"]
+        else:
+            chunk_frames = self._plan_chunk_frames(info, scale, transparency)
+            if manifest is not None:
+                manifest["chunk_frames"] = chunk_frames
+        print(f"INFO [VideoUpscaler] Modo por bloques: {chunk_frames} fotogramas por bloque, "
+              f"{UPSCALE_RING_SLOTS} bloques en circulación (presupuesto {self.temp_budget_mb} MB).")
+
+        pipe = _UpscalePipeline(work_dir, UPSCALE_RING_SLOTS, manifest, manifest_path)
+        resumed_frames = pipe.completed_frames()
+        if pipe.segments:
+            print(f"INFO [VideoUpscaler] Reanudando: {len(pipe.segments)} bloques ({resumed_frames} fotogramas) "
+                  f"ya reescalados en {work_dir}")
+            self._report(5, f"Reanudando: {len(pipe.segments)} bloques ya reescalados...")
+
+        threads = [
+            threading.Thread(target=self._stage_extract, args=(pipe, input_path, chunk_frames), daemon=True),
+            threading.Thread(target=self._stage_encode, args=(pipe, fps, ext_out, transparency), daemon=True),
+        ]
+        for t in threads:
+            t.start()
+
+        success = False
+        started = time.monotonic()
+        try:
+            # Etapa 2: NCNN
+            frames_done = resumed_frames
+            chunks = 0
+            skipped_duplicates = 0
+            while True:
+                item = self._queue_get(pipe.ready_chunks, pipe.abort)
+                if item is None:
+                    break
+                chunk_index, slot, first_frame, count, duplicates = item
+                print(f"INFO [VideoUpscaler] Bloque {chunk_index + 1}: {count - len(duplicates)} fotogramas a NCNN"
+                      f"{f' ({len(duplicates)} repetidos)' if duplicates else ''}.")
+                with pipe.timed("NCNN"):
+                    self._run_ncnn(engine, model, scale, slot["in"], slot["out"], max(total_frames, frames_done + count),
+                                   progress_range=(5.0, 95.0), frames_done_before=frames_done,
+                                   report_completion=False, **ncnn_opts)
+                    self._restore_duplicates(slot["out"], duplicates)
+                frames_done += count
+                skipped_duplicates += len(duplicates)
+                chunks += 1
+                # Los frames de entrada ya no hacen falta: liberar disco cuanto antes
+                self._clear_dir(slot["in"])
+                self._queue_put(pipe.encode_chunks, (chunk_index, slot, first_frame, count), pipe.abort)
+
+            if frames_done == 0:
+                raise Exception("No se pudieron extraer fotogramas del video.")
+
+            self._report(95, "Codificando los últimos bloques...")
+            self._queue_put(pipe.encode_chunks, None, pipe.abort)
+            while threads[1].is_alive():
+                self._check_cancel()
+                if pipe.errors:
+                    break
+                time.sleep(0.1)
+            pipe.raise_if_failed()
+            if sorted(pipe.segments) != list(range(len(pipe.segments))):
+                raise Exception("Faltan segmentos de video reescalado.")
+
+            # Unión final de segmentos + audio original
+            self._report(97, "Guardando video final (unificando audio)...")
+            list_path = os.path.join(work_dir, "segments.txt")
+            with open(list_path, "w", encoding="utf-8") as f:
+                for index in sorted(pipe.segments):
+                    safe_path = pipe.segments[index].replace("\\", "/").replace("'", "'\\''")
+                    f.write(f"file '{safe_path}'\n")
+            cmd = self._build_concat_cmd(list_path, input_path, output_path, fps, ext_out, info["has_audio"], transparency)
+            print(f"DEBUG [VideoUpscaler] Uniendo segmentos: {' '.join(cmd)}")
+            returncode, log = self._run_process(cmd, pipe.abort)
+            if returncode != 0:
+                print(f"ERROR FFMPEG REASSEMBLE: {log}")
+                raise Exception(f"FFmpeg falló al crear el video final (Codigo {returncode}):\n{log[-500:]}")
+
+            success = True
+            wall = time.monotonic() - started
+            stages = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in pipe.stage_times.items())
+            print(f"INFO [VideoUpscaler] {frames_done - resumed_frames} fotogramas en {chunks} bloques "
+                  f"({skipped_duplicates} repetidos sin pasar por NCNN), {wall:.1f}s en total "
+                  f"(tiempo activo por etapa: {stages}).")
+            self._report(100, "¡Vídeo reescalado con éxito!")
+        except Exception as e:
+            # Un error en otra etapa provoca la parada de esta: informar del original
+            if pipe.errors and isinstance(e, UserCancelledError) and not (
+                    self.cancellation_event and self.cancellation_event.is_set()):
+                raise pipe.errors[0]
+            raise
+        finally:
+            pipe.abort.set()
+            for proc in pipe.processes:
+                self._kill(proc)
+            for t in threads:
+                t.join(timeout=2.0)
+            if success or not self.resume_dir or not pipe.segments:
+                shutil.rmtree(work_dir, ignore_errors=True)
+            else:
+                # Conservar los segmentos terminados para la próxima ejecución
+                shutil.rmtree(pipe.slots_dir, ignore_errors=True)
+                print(f"INFO [VideoUpscaler] Progreso guardado: {len(pipe.segments)} bloques reescalados. "
+                      f"Se reanudará al procesar de nuevo este video con las mismas opciones.")
+            if not success and os.path.exists(output_path):
+                # El video quedó a medias: no dejar un archivo corrupto
+                try:
+                    os.remove(output_path)
+                except OSError:
+                    pass
+
+    # ─── Comparativa de formatos intermedios ────────────────────────────────
+
+    def benchmark_frame_formats(self, input_path: str, sample_frames: int = UPSCALE_FRAME_BENCHMARK_FRAMES,
+                                transparency: bool = False) -> list:
+        """
+        Mide con los primeros 'sample_frames' fotogramas del video lo que cuesta
+        cada formato intermedio: escribirlo (lo que paga la extracción), leerlo
+        (lo que paga la codificación) y el disco que ocupa. Devuelve una lista
+        de dicts ordenada de más rápido a más lento.
+        """
+        self._check_dependencies()
+        abort = threading.Event()
+        info = self._get_video_info(input_path)
+        total_frames = info.get("total_frames") or 0
+        source_args = [self.ffmpeg_exe, "-v", "error", "-i", input_path, "-map", "0:v:0",
+                       "-frames:v", str(sample_frames), "-vsync", "0"]
+
+        # Lo que tarda solo en decodificar el original, para descontarlo
+        started = time.monotonic()
+        returncode, log = self._run_process(source_args + ["-f", "null", "-"], abort)
+        if returncode != 0:
+            raise Exception(f"FFmpeg no pudo leer el video de prueba (Codigo {returncode}):\n{log[-500:]}")
+        decode_s = time.monotonic() - started
+
+        original_format = self.frame_format
+        results = []
+        try:
+            for key, fmt in UPSCALE_FRAME_FORMATS.items():
+                if transparency and not fmt["alpha"]:
+                    continue
+                self.frame_format = key
+                work_dir = tempfile.mkdtemp(prefix="dowp_frame_bench_")
+                try:
+                    pattern = os.path.join(work_dir, f"frame_%08d{fmt['ext']}")
+                    started = time.monotonic()
+                    returncode, log = self._run_process(source_args + self._frame_codec_args() + ["-f", "image2", pattern], abort)
+                    write_s = max(0.0, time.monotonic() - started - decode_s)
+                    if returncode != 0:
+                        print(f"ADVERTENCIA [VideoUpscaler] Formato '{key}' no disponible en este FFmpeg: {log.strip()[-200:]}")
+                        continue
+
+                    files = [os.path.join(work_dir, f) for f in os.listdir(work_dir)]
+                    if not files:
+                        continue
+                    size_bytes = sum(os.path.getsize(f) for f in files)
+
+                    started = time.monotonic()
+                    returncode, _ = self._run_process(
+                        [self.ffmpeg_exe, "-v", "error", "-framerate", info["fps"], "-i", pattern, "-f", "null", "-"], abort)
+                    read_s = time.monotonic() - started
+
+                    per_frame = size_bytes / len(files)
+                    results.append({
+                        "format": key,
+                        "label": fmt["label"],
+                        "frames": len(files),
+                        "write_ms": write_s / len(files) * 1000,
+                        "read_ms": read_s / len(files) * 1000 if returncode == 0 else None,
+                        "mb_per_frame": per_frame / (1024 * 1024),
+                        # Disco de los fotogramas extraídos del video entero (modo clásico)
+                        "total_gb": per_frame * total_frames / (1024 ** 3) if total_frames else None,
+                    })
+                finally:
+                    shutil.rmtree(work_dir, ignore_errors=True)
+        finally:
+            self.frame_format = original_format
+
+        results.sort(key=lambda r: r["write_ms"] + (r["read_ms"] or 0))
+        for line in self.format_benchmark_report(results):
+            print(f"INFO [VideoUpscaler] {line}")
+        return results
+
+    @staticmethod
+    def format_benchmark_report(results: list) -> list:
+        """Una línea legible por formato medido."""
+        lines = []
+        for r in results:
+            line = f"{r['label']}: escribir {r['write_ms']:.1f} ms/fot."
+            if r["read_ms"] is not None:
+                line += f", leer {r['read_ms']:.1f} ms/fot."
+            line += f", {r['mb_per_frame']:.2f} MB/fot."
+            if r["total_gb"]:
+                line += f" (~{r['total_gb']:.1f} GB el video completo)"
+            lines.append(line)
+        return lines
+
     # ─── Orquestador principal ───────────────────────────────────────────────
 
     def upscale_video(self, input_path: str, output_path: str, options: dict) -> str:
@@ -526,6 +1555,22 @@ class VideoUpscaler:
         base, _ = os.path.splitext(output_path)
         output_path = base + ext_out
 
+        ncnn_opts = {
+            "tile_size": options.get("upscale_tile", "0"),
+            "denoise": options.get("upscale_denoise", "-1"),
+            "tta": options.get("upscale_tta", False),
+            "concurrency": options.get("upscale_concurrency", "Automático"),
+        }
+        transparency = options.get("upscale_transparency", False)
+        self._resolve_frame_format(transparency)
+        self._ncnn_plan = self._plan_ncnn_instances(info, scale, ncnn_opts["tile_size"])
+        ncnn_opts = self._autotune_ncnn(input_path, info, engine, model, scale, ncnn_opts)
+
+        # Modo por bloques salvo que el presupuesto sea 0 (modo clásico)
+        if self.temp_budget_mb and self.temp_budget_mb > 0:
+            self._upscale_chunked(input_path, output_path, info, ext_out, engine, model, scale, ncnn_opts, transparency)
+            return output_path
+
         frames_dir = None
         upscaled_dir = None
         try:
@@ -534,19 +1579,18 @@ class VideoUpscaler:
             upscaled_dir = tempfile.mkdtemp(prefix="dowp_upscale_out_")
 
             # Paso 1: Extraer frames
-            total = self._extract_frames(input_path, frames_dir, fps)
+            total = self._extract_frames(input_path, frames_dir, fps, info.get("total_frames") or 0)
             if total == 0:
                 raise Exception("No se pudieron extraer fotogramas del video.")
 
+            # Los fotogramas repetidos no pasan por el motor AI
+            duplicates = self._dedup_frames(frames_dir)
+            if duplicates:
+                print(f"INFO [VideoUpscaler] {len(duplicates)} de {total} fotogramas repetidos no pasan por NCNN.")
+
             # Paso 2: Reescalar con NCNN (Pasamos el tile size y denoise desde opciones)
-            tile_size = options.get("upscale_tile", "0")
-            denoise = options.get("upscale_denoise", "-1")
-            tta = options.get("upscale_tta", False)
-            concurrency = options.get("upscale_concurrency", "Automático")
-            transparency = options.get("upscale_transparency", False)
-            
-            self._run_ncnn(engine, model, scale, frames_dir, upscaled_dir, total, 
-                           tile_size=tile_size, denoise=denoise, tta=tta, concurrency=concurrency)
+            self._run_ncnn(engine, model, scale, frames_dir, upscaled_dir, total - len(duplicates), **ncnn_opts)
+            self._restore_duplicates(upscaled_dir, duplicates)
 
             # Paso 3: Reensamblar
             self._reassemble(upscaled_dir, input_path, output_path, fps, ext_out, has_audio, transparency=transparency)
@@ -561,3 +1605,190 @@ class VideoUpscaler:
                         pass
 
         return output_path
+
+
+class _BufferedPipe:
+    """Lectura de una tubería con búfer propio, para formatos sin tamaño en la cabecera."""
+
+    READ_SIZE = 1024 * 1024
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._buffer = bytearray()
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        data = self._stream.read1(self.READ_SIZE) if hasattr(self._stream, "read1") else self._stream.read(self.READ_SIZE)
+        if not data:
+            self._eof = True
+            return False
+        self._buffer += data
+        return True
+
+    def read(self, size: int) -> bytes:
+        while len(self._buffer) < size and self._fill():
+            pass
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def read_until(self, marker: bytes) -> bytes | None:
+        """Devuelve los datos hasta 'marker' incluido, o None si la tubería termina antes."""
+        start = 0
+        while True:
+            index = self._buffer.find(marker, start)
+            if index >= 0:
+                end = index + len(marker)
+                data = bytes(self._buffer[:end])
+                del self._buffer[:end]
+                return data
+            # El marcador puede quedar partido entre dos lecturas
+            start = max(0, len(self._buffer) - len(marker) + 1)
+            if not self._fill():
+                return None
+
+
+class _FrameDeduper:
+    """
+    Detecta fotogramas repetidos comparando cada uno con el último conservado.
+      - "exact": mismo archivo byte a byte (FFmpeg codifica igual los frames idénticos).
+      - "similar": miniatura con diferencia máxima por píxel dentro de
+        UPSCALE_DEDUP_TOLERANCE. Se usa el máximo y no la media para que un
+        cambio pequeño (p. ej. el cursor en una grabación) no se pierda.
+    """
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.reset()
+
+    def reset(self):
+        self._kept_name = None
+        self._kept_signature = None
+
+    def _signature(self, frame_bytes: bytes):
+        if self.mode == "exact":
+            return hashlib.sha1(frame_bytes).digest()
+        from PIL import Image
+
+        with Image.open(io.BytesIO(frame_bytes)) as img:
+            thumb = img.convert("RGBA")
+            thumb.thumbnail((UPSCALE_DEDUP_THUMB_SIZE, UPSCALE_DEDUP_THUMB_SIZE), Image.Resampling.BOX)
+            return thumb
+
+    def _same(self, signature) -> bool:
+        if self._kept_signature is None:
+            return False
+        if self.mode == "exact":
+            return signature == self._kept_signature
+        from PIL import ImageChops
+
+        if signature.size != self._kept_signature.size:
+            return False
+        extrema = ImageChops.difference(signature, self._kept_signature).getextrema()
+        return max(high for _, high in extrema) <= UPSCALE_DEDUP_TOLERANCE
+
+    def check(self, name: str, frame_bytes: bytes) -> str | None:
+        """Devuelve el nombre del original si el fotograma es repetido; si no, lo conserva."""
+        signature = self._signature(frame_bytes)
+        if self._same(signature):
+            return self._kept_name
+        self._kept_name, self._kept_signature = name, signature
+        return None
+
+
+class _UpscalePipeline:
+    """Estado compartido entre las etapas del reescalado por bloques."""
+
+    STAGES = ("extracción", "NCNN", "codificación")
+    MANIFEST_FILENAME = "manifest.json"
+    MANIFEST_VERSION = 2 # 2: la clave de reanudación incluye el modo de deduplicado
+
+    def __init__(self, work_dir: str, slots: int, manifest: dict | None = None, manifest_path: str | None = None):
+        self.work_dir = work_dir
+        self.slots_dir = os.path.join(work_dir, "slots")
+        self.manifest = manifest
+        self.manifest_path = manifest_path
+        self.free_slots = queue.Queue()
+        self.ready_chunks = queue.Queue(maxsize=slots)   # Extraídos, esperando a NCNN
+        self.encode_chunks = queue.Queue(maxsize=slots)  # Reescalados, esperando al codificador
+        self.segments: dict[int, str] = {}
+        self.processes = []
+        self.abort = threading.Event()
+        self.errors = []
+        self.stage_times = {stage: 0.0 for stage in self.STAGES}
+        self._lock = threading.Lock()
+
+        # Bloques terminados en una ejecución anterior (solo si el segmento sigue en disco)
+        if manifest:
+            for index, entry in list(manifest.get("segments", {}).items()):
+                path = os.path.join(work_dir, entry.get("file", ""))
+                if entry.get("file") and os.path.exists(path):
+                    self.segments[int(index)] = path
+                else:
+                    del manifest["segments"][index]
+
+        # Restos de una ejecución interrumpida
+        shutil.rmtree(self.slots_dir, ignore_errors=True)
+        for name in os.listdir(work_dir):
+            if name.startswith("partial_"):
+                try:
+                    os.remove(os.path.join(work_dir, name))
+                except OSError:
+                    pass
+
+        for i in range(slots):
+            slot = {"in": os.path.join(self.slots_dir, f"slot_{i}", "in"), "out": os.path.join(self.slots_dir, f"slot_{i}", "out")}
+            os.makedirs(slot["in"])
+            os.makedirs(slot["out"])
+            self.free_slots.put(slot)
+
+    def completed_frames(self) -> int:
+        """Fotogramas ya reescalados según el manifiesto."""
+        if not self.manifest:
+            return 0
+        return sum(self.manifest["segments"][str(i)]["count"] for i in self.segments)
+
+    def checkpoint(self, index: int, segment_path: str, first_frame: int, count: int):
+        """Registra un segmento terminado y, si el trabajo es reanudable, guarda el manifiesto."""
+        with self._lock:
+            self.segments[index] = segment_path
+            if self.manifest is None:
+                return
+            self.manifest["segments"][str(index)] = {
+                "file": os.path.basename(segment_path),
+                "first": first_frame,
+                "count": count,
+            }
+            self.manifest["updated"] = time.time()
+            tmp_path = self.manifest_path + ".tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(self.manifest, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.manifest_path)
+            except Exception as e:
+                print(f"ADVERTENCIA [VideoUpscaler] No se pudo guardar el manifiesto de reanudación: {e}")
+
+    @contextmanager
+    def timed(self, stage: str):
+        """Acumula el tiempo activo de una etapa (sin contar las esperas en colas)."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stage_times[stage] += time.monotonic() - start
+
+    def fail(self, error: Exception):
+        """Registra el primer error de una etapa y detiene las demás."""
+        with self._lock:
+            if not self.abort.is_set():
+                self.errors.append(error)
+            self.abort.set()
+
+    def raise_if_failed(self):
+        if self.errors:
+            raise self.errors[0]
@@ -17,8 +17,9 @@ from contextlib import redirect_stdout
 
 from src.core.exceptions import UserCancelledError 
 from src.core.downloader import get_video_info, apply_site_specific_rules, apply_yt_patch
+from src.core.metadata_cache import cookie_key_from_opts
 from src.core.batch_processor import Job
-from src.core.constants import FAST_MODE_SUPPORTED_DOMAINS
+from src.core.constants import FAST_MODE_SUPPORTED_DOMAINS, DOWNLOAD_CONNECTIONS_OPTIONS
 from .dialogs import Tooltip, messagebox, PlaylistSelectionDialog
 
 import requests
@@ -125,9 +126,41 @@ class BatchDownloadTab(ctk.CTkFrame):
         self._create_widgets()
         self._initialize_ui_settings()
 
+        # Rehidratar los trabajos que quedaron sin terminar en la sesión anterior
+        self._restore_saved_queue()
+
         self._save_timer = None
         self.is_initializing = False
 
+    def _restore_saved_queue(self):
+        """
+        Vuelve a mostrar los trabajos pendientes guardados en el diario de la
+        cola. Se usa el análisis guardado, sin volver a llamar a yt-dlp.
+        """
+        restored_jobs = self.queue_manager.restore_from_journal()
+        if not restored_jobs:
+            return
+
+        if all(job.job_type == "LOCAL_RECODE" for job in restored_jobs):
+            self._set_local_batch_mode(True)
+
+        self.queue_placeholder_label.pack_forget()
+
+        for job in restored_jobs:
+            if job.job_type == "PLAYLIST" and job.analysis_data:
+                self.playlist_cache[job.job_id] = {
+                    'info_dict': job.analysis_data,
+                    'thumbnails': {}
+                }
+            self.update_job_ui(job.job_id, "PENDING", "Restaurado de la sesión anterior")
+
+        self.start_queue_button.configure(state="normal")
+        self.global_recode_checkbox.configure(state="normal")
+        # Diferido: el cambio a modo local también escribe en esta etiqueta
+        self.after(0, lambda: self.progress_label.configure(
+            text=f"Se restauraron {len(restored_jobs)} trabajos pendientes. Presiona 'Iniciar Cola' para continuar."
+        ))
+
     def _load_theme_colors(self):
         """Carga los colores desde el sistema de temas de la aplicación."""
         # Colores Principales
@@ -504,6 +537,17 @@ class BatchDownloadTab(ctk.CTkFrame):
         self.auto_save_thumbnail_check.pack(fill="x", padx=10, pady=5)
         self.auto_save_thumbnail_check.configure(state="normal")
 
+        # Conexiones por archivo de este trabajo ("Global" = el ajuste de Configuración)
+        ctk.CTkLabel(self.miniature_frame, text="Conexiones:", anchor="w").pack(fill="x", padx=10, pady=(5, 0))
+        self.batch_connections_menu = ctk.CTkOptionMenu(
+            self.miniature_frame,
+            values=["Global", "Desactivado"] + [str(n) for n in DOWNLOAD_CONNECTIONS_OPTIONS if n > 1],
+            command=self._on_batch_config_change
+        )
+        self.batch_connections_menu.set("Global")
+        self.batch_connections_menu.pack(fill="x", padx=10, pady=(0, 5))
+        Tooltip(self.batch_connections_menu, "Conexiones simultáneas por archivo para este trabajo (descarga segmentada).\n\n• Global: usa el valor de Configuración > Descarga Segmentada.\n• No se aplica a archivos locales.", delay_ms=1000)
+
         # --- 5a - Derecha: Info y Calidad ---
         self.info_frame = ctk.CTkFrame(self.top_config_frame, fg_color="transparent")
         self.info_frame.grid(row=0, column=1, padx=5, pady=5, sticky="nsew")
@@ -904,7 +948,8 @@ class BatchDownloadTab(ctk.CTkFrame):
             self.video_quality_menu, self.audio_quality_menu,
             self.batch_apply_quick_preset_checkbox,
             self.batch_recode_preset_menu,
-            self.batch_keep_original_quick_checkbox
+            self.batch_keep_original_quick_checkbox,
+            self.batch_connections_menu
         ]
         
         for widget in widgets_to_toggle:
@@ -1488,6 +1533,8 @@ class BatchDownloadTab(ctk.CTkFrame):
         self._updating_ui = True
         
         try:
+            self._populate_connections_menu(job)
+
             # --- NUEVO BLOQUE PARA PLAYLIST (EVITA EL CRASHEO) ---
             if job.job_type == "PLAYLIST":
                 print("DEBUG: Llenando panel para trabajo PLAYLIST.")
@@ -2171,6 +2218,7 @@ class BatchDownloadTab(ctk.CTkFrame):
                 # --- FIN DE RESOLUCIÓN DE IDs ---
 
                 print(f"DEBUG: Configuración inteligente guardada en Job {job.job_id[:6]}")
+                self.queue_manager.persist_job(job)
 
                 # Restaurar estado del checkbox de miniatura
                 saved_thumbnail = job.config.get('download_thumbnail', False)
@@ -2466,6 +2514,7 @@ class BatchDownloadTab(ctk.CTkFrame):
         # 2. Iterar y actualizar la configuración de CADA trabajo
         for job in all_jobs:
             job.config['mode'] = selected_mode
+        self.queue_manager.persist_jobs(all_jobs)
 
         # 3. [CRÍTICO] Refrescar el panel de configuración si hay un trabajo seleccionado
         # Esto hace que el usuario vea el cambio reflejado inmediatamente en la UI.
@@ -2540,6 +2589,8 @@ class BatchDownloadTab(ctk.CTkFrame):
                         job.config['audio_format_label'] = best_label
                         job.config['mode'] = "Solo Audio"
 
+        self.queue_manager.persist_jobs(self.queue_manager.jobs)
+
         # 5. Refrescar UI si hay un job seleccionado
         if self.selected_job_id:
             current_job = self.queue_manager.get_job_by_id(self.selected_job_id)
@@ -3478,20 +3529,30 @@ class BatchDownloadTab(ctk.CTkFrame):
             else:
                 print(f"📝 Batch: Sin cookies - configuración predeterminada")
 
-            info_dict = None
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                check_if_cancelled(None)
-                # Actualizar estado inicial (Mensaje genérico)
-                self.app.after(0, self.update_job_ui, job_id, "RUNNING", "Conectando...")
-                                
-                # La magia ocurre aquí dentro. extract_info llamará a nuestro logger
-                info_dict = ydl.extract_info(url, download=False)
-            
-            if not info_dict:
-                raise Exception("No se pudo obtener información.")
-            
-            info_dict = self._normalize_info_dict(info_dict)
+            # --- Caché de metadatos compartida (evita repetir la extracción) ---
+            metadata_cache = getattr(self.app, 'metadata_cache', None)
+            cookie_key = cookie_key_from_opts(ydl_opts)
+            cache_variant = (f"batch:{'playlist' if analizar_playlist else 'video'}:"
+                             f"{'flat' if use_fast_mode else 'full'}")
+            info_dict = metadata_cache.get(url, cookie_key, cache_variant) if metadata_cache else None
+
+            if info_dict:
+                self.app.after(0, self.update_job_ui, job_id, "RUNNING", "Cargando análisis desde caché...")
+            else:
+                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                    check_if_cancelled(None)
+                    # Actualizar estado inicial (Mensaje genérico)
+                    self.app.after(0, self.update_job_ui, job_id, "RUNNING", "Conectando...")
+                                    
+                    # La magia ocurre aquí dentro. extract_info llamará a nuestro logger
+                    info_dict = ydl.extract_info(url, download=False)
+                
+                if not info_dict:
+                    raise Exception("No se pudo obtener información.")
+                
+                info_dict = self._normalize_info_dict(info_dict)
+                if metadata_cache:
+                    metadata_cache.put(url, cookie_key, cache_variant, info_dict)
 
             if self.queue_manager.get_job_by_id(job_id):
                 self.app.after(0, self._on_analysis_complete, info_dict, job_id)
@@ -3623,6 +3684,8 @@ class BatchDownloadTab(ctk.CTkFrame):
                 else:
                     self.queue_manager.add_job(current_job)
 
+            self.queue_manager.persist_jobs(all_jobs)
+
         else:
             # Es un video único
             print("INFO: Video único detectado.")
@@ -3649,6 +3712,8 @@ class BatchDownloadTab(ctk.CTkFrame):
 
             if job_widget:
                 job_widget.title_label.configure(text=title)
+
+            self.queue_manager.persist_job(job)
         
         self.update_job_ui(job_id, "PENDING", "Listo para descargar")
         self.start_queue_button.configure(state="normal")
@@ -3699,6 +3764,12 @@ class BatchDownloadTab(ctk.CTkFrame):
         job.config['audio_format_label'] = self.audio_quality_menu.get()
         job.config['download_thumbnail'] = self.auto_save_thumbnail_check.get()
 
+        connections_label = self.batch_connections_menu.get()
+        if job.job_type == "LOCAL_RECODE" or connections_label == "Global":
+            job.config.pop('download_connections', None)
+        else:
+            job.config['download_connections'] = 1 if connections_label == "Desactivado" else int(connections_label)
+
         is_recode_enabled = self.batch_apply_quick_preset_checkbox.get() == 1
         is_keep_original = self.batch_keep_original_quick_checkbox.get() == 1
         
@@ -3740,6 +3811,17 @@ class BatchDownloadTab(ctk.CTkFrame):
             job.config['resolved_audio_format_id'] = a_info.get('format_id')
         # --- FIN DE CORRECCIÓN ---
 
+        self.queue_manager.persist_job(job)
+
+    def _populate_connections_menu(self, job: Job):
+        """Muestra las conexiones por archivo del trabajo (los archivos locales no descargan)."""
+        connections = job.config.get('download_connections')
+        if connections is None:
+            self.batch_connections_menu.set("Global")
+        else:
+            self.batch_connections_menu.set(str(connections) if connections > 1 else "Desactivado")
+        self.batch_connections_menu.configure(state="disabled" if job.job_type == "LOCAL_RECODE" else "normal")
+
     def _normalize_info_dict(self, info):
         """
         Normaliza el diccionario de info para casos donde yt-dlp no devuelve 'formats'.
@@ -4248,6 +4330,7 @@ class BatchDownloadTab(ctk.CTkFrame):
                 
                 # Forzar el modo del job para que coincida con el preset
                 job.config['mode'] = preset_mode
+        self.queue_manager.persist_jobs(jobs_list)
 
         print(f"Configuración aplicada a {len(jobs_list)} jobs.")
 
@@ -4474,6 +4557,7 @@ class BatchDownloadTab(ctk.CTkFrame):
                     temp_job.config['recode_keep_original'] = True
 
                 # 5. Marcar como listo
+                self.queue_manager.persist_job(temp_job)
                 self.app.after(0, self.update_job_ui, temp_job.job_id, "PENDING", f"Listo para procesar: {base_name}")
 
             except Exception as e:
@@ -4752,6 +4836,8 @@ class BatchDownloadTab(ctk.CTkFrame):
             playlist_title = info_dict.get('title', 'Playlist Desconocida')
             job.config['title'] = playlist_title
             
+            self.queue_manager.persist_job(job)
+
             count = len(result['selected_indices'])
             self.update_job_ui(job.job_id, "PENDING", f"Playlist: {count} videos listos")
             
@@ -4832,6 +4918,7 @@ class BatchDownloadTab(ctk.CTkFrame):
             job.config['playlist_quality'] = result['quality']
             job.config['selected_indices'] = result['selected_indices']
             job.config['total_videos'] = result['total_videos']
+            self.queue_manager.persist_job(job)
             
             count = len(result['selected_indices'])
             self.update_job_ui(job.job_id, "PENDING", f"Playlist actualizada: {count} videos")
@@ -7,6 +7,11 @@ import requests
 import time
 from tkinter import filedialog, messagebox
 from .dialogs import Tooltip, URLInputDialog
+from src.core.constants import (
+    BATCH_MAX_WORKERS_OPTION, DOWNLOAD_CONNECTIONS_OPTIONS, UPSCALE_TEMP_BUDGET_OPTIONS_MB, UPSCALE_RESUME_MAX_AGE_DAYS,
+    UPSCALE_NCNN_MAX_INSTANCES, UPSCALE_FRAME_FORMATS, REMBG_TILE_MEMORY_OPTIONS_MB, ONNX_SESSION_BUDGET_OPTIONS_MB
+)
+from src.core.downloader import ydl_sessions
 
 class ConfigTab(ctk.CTkFrame):
     def __init__(self, master, app, *args, **kwargs):
@@ -233,6 +238,174 @@ class ConfigTab(ctk.CTkFrame):
 
         self._refresh_theme_list()
 
+        # --- BLOQUE: DESCARGAS ---
+        ctk.CTkLabel(frame_general, text="Descargas", font=ctk.CTkFont(size=18, weight="bold")).pack(anchor="w", pady=(10, 2), padx=10)
+        ctk.CTkLabel(frame_general, text="Conexiones usadas para descargar cada archivo.", font=ctk.CTkFont(size=11), text_color="gray60").pack(anchor="w", pady=(0, 10), padx=10)
+
+        self.download_frame = ctk.CTkFrame(frame_general, fg_color=self.CONFIG_CARD_BG, corner_radius=self.CONFIG_CARD_RADIUS, border_width=1, border_color=self.CONFIG_CARD_BORDER)
+        self.download_frame.pack(fill="x", pady=5, padx=5)
+        self.config_cards.append(self.download_frame)
+
+        download_group = ctk.CTkFrame(self.download_frame, fg_color="transparent")
+        download_group.pack(fill="x", padx=15, pady=15)
+
+        download_header = ctk.CTkLabel(download_group, text="Descarga Segmentada", font=ctk.CTkFont(size=15, weight="bold"), text_color=self.SECTION_SUBTITLE)
+        download_header.pack(anchor="w", pady=(0, 10))
+        self.config_subtitles.append(download_header)
+
+        download_row = ctk.CTkFrame(download_group, fg_color="transparent")
+        download_row.pack(fill="x")
+
+        ctk.CTkLabel(download_row, text="Conexiones por archivo:", font=ctk.CTkFont(size=12, weight="bold")).pack(side="left")
+        connection_values = ["Desactivado"] + [str(n) for n in DOWNLOAD_CONNECTIONS_OPTIONS if n > 1]
+        self.download_connections_menu = ctk.CTkOptionMenu(download_row, values=connection_values, width=120, command=self._on_download_connections_change)
+        saved_connections = self.app.download_connections_saved
+        self.download_connections_menu.set(str(saved_connections) if saved_connections > 1 else "Desactivado")
+        self.download_connections_menu.pack(side="left", padx=10)
+
+        download_desc = "Útil para archivos muy grandes o conexiones con mucha latencia. En DASH/HLS descarga varios fragmentos a la vez; en archivos normales necesita aria2c (en bin/aria2 o en el PATH)."
+        ctk.CTkLabel(download_group, text=download_desc, font=ctk.CTkFont(size=11), text_color="gray60", justify="left", wraplength=550).pack(anchor="w", pady=(10, 0))
+
+        # --- BLOQUE: PROCESO POR LOTES ---
+        ctk.CTkLabel(frame_general, text="Proceso por Lotes", font=ctk.CTkFont(size=18, weight="bold")).pack(anchor="w", pady=(10, 2), padx=10)
+        ctk.CTkLabel(frame_general, text="Cuántos trabajos de la cola se ejecutan al mismo tiempo.", font=ctk.CTkFont(size=11), text_color="gray60").pack(anchor="w", pady=(0, 10), padx=10)
+
+        self.batch_frame = ctk.CTkFrame(frame_general, fg_color=self.CONFIG_CARD_BG, corner_radius=self.CONFIG_CARD_RADIUS, border_width=1, border_color=self.CONFIG_CARD_BORDER)
+        self.batch_frame.pack(fill="x", pady=5, padx=5)
+        self.config_cards.append(self.batch_frame)
+
+        batch_group = ctk.CTkFrame(self.batch_frame, fg_color="transparent")
+        batch_group.pack(fill="x", padx=15, pady=15)
+
+        batch_header = ctk.CTkLabel(batch_group, text="Trabajos Simultáneos", font=ctk.CTkFont(size=15, weight="bold"), text_color=self.SECTION_SUBTITLE)
+        batch_header.pack(anchor="w", pady=(0, 10))
+        self.config_subtitles.append(batch_header)
+
+        batch_row = ctk.CTkFrame(batch_group, fg_color="transparent")
+        batch_row.pack(fill="x")
+
+        worker_values = [str(n) for n in range(1, BATCH_MAX_WORKERS_OPTION + 1)]
+
+        ctk.CTkLabel(batch_row, text="Descargas:", font=ctk.CTkFont(size=12, weight="bold")).pack(side="left")
+        self.batch_downloads_menu = ctk.CTkOptionMenu(batch_row, values=worker_values, width=70, command=self._on_batch_concurrency_change)
+        self.batch_downloads_menu.set(str(self.app.batch_max_downloads_saved))
+        self.batch_downloads_menu.pack(side="left", padx=(10, 25))
+
+        ctk.CTkLabel(batch_row, text="Por servidor:", font=ctk.CTkFont(size=12, weight="bold")).pack(side="left")
+        self.batch_per_host_menu = ctk.CTkOptionMenu(batch_row, values=worker_values, width=70, command=self._on_batch_concurrency_change)
+        self.batch_per_host_menu.set(str(self.app.batch_max_per_host_saved))
+        self.batch_per_host_menu.pack(side="left", padx=(10, 25))
+
+        ctk.CTkLabel(batch_row, text="Recodificaciones:", font=ctk.CTkFont(size=12, weight="bold")).pack(side="left")
+        self.batch_recodes_menu = ctk.CTkOptionMenu(batch_row, values=["Automático"] + worker_values, width=110, command=self._on_batch_concurrency_change)
+        self.batch_recodes_menu.set(str(self.app.batch_max_recodes_saved) if self.app.batch_max_recodes_saved else "Automático")
+        self.batch_recodes_menu.pack(side="left", padx=10)
+
+        batch_playlist_row = ctk.CTkFrame(batch_group, fg_color="transparent")
+        batch_playlist_row.pack(fill="x", pady=(10, 0))
+
+        ctk.CTkLabel(batch_playlist_row, text="Ítems de playlist a la vez:", font=ctk.CTkFont(size=12, weight="bold")).pack(side="left")
+        self.batch_playlist_menu = ctk.CTkOptionMenu(batch_playlist_row, values=worker_values, width=70, command=self._on_batch_concurrency_change)
+        self.batch_playlist_menu.set(str(self.app.batch_playlist_workers_saved))
+        self.batch_playlist_menu.pack(side="left", padx=10)
+
+        batch_stream_row = ctk.CTkFrame(batch_group, fg_color="transparent")
+        batch_stream_row.pack(fill="x", pady=(10, 0))
+
+        self.batch_stream_recode_var = ctk.BooleanVar(value=self.app.batch_stream_recode_saved)
+        self.batch_stream_recode_switch = ctk.CTkSwitch(batch_stream_row, text="Recodificar mientras se descarga (sin archivo intermedio)", variable=self.batch_stream_recode_var, command=self._on_batch_stream_recode_toggle)
+        self.batch_stream_recode_switch.pack(side="left")
+
+        recode_segment_row = ctk.CTkFrame(batch_group, fg_color="transparent")
+        recode_segment_row.pack(fill="x", pady=(10, 0))
+
+        self.recode_segment_var = ctk.BooleanVar(value=self.app.recode_segment_parallel_saved)
+        self.recode_segment_switch = ctk.CTkSwitch(recode_segment_row, text="Recodificar archivos largos por segmentos en paralelo", variable=self.recode_segment_var, command=self._on_recode_segment_toggle)
+        self.recode_segment_switch.pack(side="left")
+
+        batch_desc = "Las descargas comparten el ancho de banda; el límite por servidor evita bloqueos por exceso de conexiones. La recodificación local usa la CPU y en modo automático se ajusta a los núcleos disponibles. Con 1 ítem de playlist a la vez, las playlists se descargan en orden. Recodificar mientras se descarga solo se aplica si no se conserva el original y el formato es un único archivo; si no, se usa el proceso normal. Por segmentos, los videos de más de 5 minutos en H.264, H.265, VP8/VP9 o AV1 por CPU se cortan en keyframes y los trozos se codifican a la vez, aprovechando todos los núcleos (en lotes, solo si sobran núcleos tras las recodificaciones simultáneas)."
+        ctk.CTkLabel(batch_group, text=batch_desc, font=ctk.CTkFont(size=11), text_color="gray60", justify="left", wraplength=550).pack(anchor="w", pady=(10, 0))
+
+        # --- BLOQUE: REESCALADO DE VIDEO (IA) ---
+        ctk.CTkLabel(frame_general, text="Reescalado de Video (IA)", font=ctk.CTkFont(size=18, weight="bold")).pack(anchor="w", pady=(10, 2), padx=10)
+        ctk.CTkLabel(frame_general, text="Uso de disco de los fotogramas temporales.", font=ctk.CTkFont(size=11), text_color="gray60").pack(anchor="w", pady=(0, 10), padx=10)
+
+        self.upscale_frame = ctk.CTkFrame(frame_general, fg_color=self.CONFIG_CARD_BG, corner_radius=self.CONFIG_CARD_RADIUS, border_width=1, border_color=self.CONFIG_CARD_BORDER)
+        self.upscale_frame.pack(fill="x", pady=5, padx=5)
+        self.config_cards.append(self.upscale_frame)
+
+        upscale_group = ctk.CTkFrame(self.upscale_frame, fg_color="transparent")
+        upscale_group.pack(fill="x", padx=15, pady=15)
+
+        upscale_header = ctk.CTkLabel(upscale_group, text="Procesamiento por Bloques", font=ctk.CTkFont(size=15, weight="bold"), text_color=self.SECTION_SUBTITLE)
+        upscale_header.pack(anchor="w", pady=(0, 10))
+        self.config_subtitles.append(upscale_header)
+
+        upscale_row = ctk.CTkFrame(upscale_group, fg_color="transparent")
+        upscale_row.pack(fill="x")
+
+        ctk.CTkLabel(upscale_row, text="Espacio temporal máximo:", font=ctk.CTkFont(size=12, weight="bold")).pack(side="left")
+        self._upscale_budget_labels = {self._format_upscale_budget(mb): mb for mb in UPSCALE_TEMP_BUDGET_OPTIONS_MB}
+        self.upscale_budget_menu = ctk.CTkOptionMenu(upscale_row, values=list(self._upscale_budget_labels), width=170, command=self._on_upscale_budget_change)
+        self.upscale_budget_menu.set(self._format_upscale_budget(self.app.upscale_temp_budget_saved))
+        self.upscale_budget_menu.pack(side="left", padx=10)
+
+        upscale_resume_row = ctk.CTkFrame(upscale_group, fg_color="transparent")
+        upscale_resume_row.pack(fill="x", pady=(10, 0))
+
+        self.upscale_resume_var = ctk.BooleanVar(value=self.app.upscale_resume_saved)
+        self.upscale_resume_switch = ctk.CTkSwitch(upscale_resume_row, text="Reanudar reescalados interrumpidos", variable=self.upscale_resume_var, command=self._on_upscale_resume_toggle)
+        self.upscale_resume_switch.pack(side="left")
+
+        upscale_dedup_row = ctk.CTkFrame(upscale_group, fg_color="transparent")
+        upscale_dedup_row.pack(fill="x", pady=(10, 0))
+
+        ctk.CTkLabel(upscale_dedup_row, text="Fotogramas repetidos:", font=ctk.CTkFont(size=12, weight="bold")).pack(side="left")
+        self._upscale_dedup_labels = {"Reescalar todos": "off", "Omitir idénticos": "exact", "Omitir casi idénticos": "similar"}
+        self.upscale_dedup_menu = ctk.CTkOptionMenu(upscale_dedup_row, values=list(self._upscale_dedup_labels), width=170, command=self._on_upscale_dedup_change)
+        self.upscale_dedup_menu.set(next((label for label, mode in self._upscale_dedup_labels.items() if mode == self.app.upscale_dedup_saved), "Omitir idénticos"))
+        self.upscale_dedup_menu.pack(side="left", padx=10)
+
+        upscale_ncnn_row = ctk.CTkFrame(upscale_group, fg_color="transparent")
+        upscale_ncnn_row.pack(fill="x", pady=(10, 0))
+
+        ctk.CTkLabel(upscale_ncnn_row, text="Procesos del motor AI:", font=ctk.CTkFont(size=12, weight="bold")).pack(side="left")
+        self.upscale_instances_menu = ctk.CTkOptionMenu(upscale_ncnn_row, values=[str(i) for i in range(1, UPSCALE_NCNN_MAX_INSTANCES + 1)], width=70, command=self._on_upscale_instances_change)
+        self.upscale_instances_menu.set(str(self.app.upscale_ncnn_instances_saved))
+        self.upscale_instances_menu.pack(side="left", padx=10)
+
+        ctk.CTkLabel(upscale_ncnn_row, text="Dispositivos:", font=ctk.CTkFont(size=12, weight="bold")).pack(side="left", padx=(10, 0))
+        self.upscale_devices_entry = ctk.CTkEntry(upscale_ncnn_row, width=150, placeholder_text="Auto (ej: 0,1 o -1)")
+        if self.app.upscale_ncnn_devices_saved:
+            self.upscale_devices_entry.insert(0, self.app.upscale_ncnn_devices_saved)
+        self.upscale_devices_entry.pack(side="left", padx=10)
+        self.upscale_devices_entry.bind("<KeyRelease>", self._on_upscale_devices_change)
+
+        upscale_autotune_row = ctk.CTkFrame(upscale_group, fg_color="transparent")
+        upscale_autotune_row.pack(fill="x", pady=(10, 0))
+
+        self.upscale_autotune_var = ctk.BooleanVar(value=self.app.upscale_autotune_saved)
+        self.upscale_autotune_switch = ctk.CTkSwitch(upscale_autotune_row, text="Calibrar mosaico e hilos del motor AI", variable=self.upscale_autotune_var, command=self._on_upscale_autotune_toggle)
+        self.upscale_autotune_switch.pack(side="left")
+
+        upscale_format_row = ctk.CTkFrame(upscale_group, fg_color="transparent")
+        upscale_format_row.pack(fill="x", pady=(10, 0))
+
+        ctk.CTkLabel(upscale_format_row, text="Fotogramas intermedios:", font=ctk.CTkFont(size=12, weight="bold")).pack(side="left")
+        self._upscale_format_labels = {fmt["label"]: key for key, fmt in UPSCALE_FRAME_FORMATS.items()}
+        self.upscale_format_menu = ctk.CTkOptionMenu(upscale_format_row, values=list(self._upscale_format_labels), width=200, command=self._on_upscale_format_change)
+        self.upscale_format_menu.set(UPSCALE_FRAME_FORMATS.get(self.app.upscale_frame_format_saved, UPSCALE_FRAME_FORMATS["png"])["label"])
+        self.upscale_format_menu.pack(side="left", padx=10)
+
+        self.upscale_bench_button = ctk.CTkButton(upscale_format_row, text="Comparar formatos...", width=150, command=self._run_upscale_format_benchmark)
+        self.upscale_bench_button.pack(side="left")
+
+        self.upscale_bench_label = ctk.CTkLabel(upscale_group, text="", font=ctk.CTkFont(size=11), text_color="gray60", justify="left", anchor="w")
+        self.upscale_bench_label.pack(anchor="w", fill="x", pady=(5, 0))
+
+        upscale_desc = f"El video se procesa en bloques de fotogramas: la extracción, el motor de IA y la codificación trabajan a la vez y el disco usado no pasa del límite. En modo clásico se extraen todos los fotogramas antes de reescalar (puede ocupar decenas de GB). Al reanudar, los bloques ya reescalados de un trabajo cancelado o fallido se conservan y, si se vuelve a procesar el mismo video con las mismas opciones, solo se reescala lo que falta (solo en modo por bloques; se borran a los {UPSCALE_RESUME_MAX_AGE_DAYS} días). Los fotogramas repetidos (pantallas estáticas, animación) se reescalan una sola vez y se copian; 'casi idénticos' también ignora diferencias mínimas de compresión. Con varios procesos del motor AI los fotogramas se reparten entre ellos (por cada dispositivo indicado: número de GPU o -1 para CPU); solo se lanzan los que caben en memoria. Con la calibración, la primera vez que se usa un motor, modelo y resolución con mosaico o hilos en automático se prueban varias combinaciones con unos pocos fotogramas y se recuerda la más rápida que funcione bien. Los fotogramas intermedios se escriben y leen miles de veces: PNG y WebP no pierden calidad; JPG es el más rápido y ligero, pero con pérdida y sin transparencia. 'Comparar formatos' mide tiempo y espacio con un video tuyo."
+        ctk.CTkLabel(upscale_group, text=upscale_desc, font=ctk.CTkFont(size=11), text_color="gray60", justify="left", wraplength=550).pack(anchor="w", pady=(10, 0))
+
         # --- TÍTULO SECCIÓN ---
         ctk.CTkLabel(frame_general, text="Herramientas de Imagen", font=ctk.CTkFont(size=18, weight="bold")).pack(anchor="w", pady=(10, 2), padx=10)
         ctk.CTkLabel(frame_general, text="Ajustes de procesamiento, modelos de IA y motores vectoriales.", font=ctk.CTkFont(size=11), text_color="gray60").pack(anchor="w", pady=(0, 10), padx=10)
@@ -268,6 +441,44 @@ class ConfigTab(ctk.CTkFrame):
             command=self._manual_vram_clear
         )
         self.clear_vram_btn.pack(side="right")
+
+        ai_budget_row = ctk.CTkFrame(vram_group, fg_color="transparent")
+        ai_budget_row.pack(fill="x", pady=(10, 0))
+
+        ctk.CTkLabel(ai_budget_row, text="Memoria máxima de modelos:", font=ctk.CTkFont(size=12, weight="bold")).pack(side="left")
+        self._ai_budget_labels = {self._format_ai_memory_budget(mb): mb for mb in ONNX_SESSION_BUDGET_OPTIONS_MB}
+        self.ai_budget_menu = ctk.CTkOptionMenu(ai_budget_row, values=list(self._ai_budget_labels), width=120, command=self._on_ai_budget_change)
+        self.ai_budget_menu.set(self._format_ai_memory_budget(self.app.ai_memory_budget_mb_saved))
+        self.ai_budget_menu.pack(side="left", padx=10)
+
+        ai_variant_row = ctk.CTkFrame(vram_group, fg_color="transparent")
+        ai_variant_row.pack(fill="x", pady=(10, 0))
+
+        self.ai_variant_var = ctk.BooleanVar(value=self.app.rembg_auto_variant_saved)
+        self.ai_variant_switch = ctk.CTkSwitch(ai_variant_row, text="Usar la variante más rápida en CPU (INT8/FP16)", variable=self.ai_variant_var, command=self._on_ai_variant_toggle)
+        self.ai_variant_switch.pack(side="left")
+
+        self.ai_sessions_label = ctk.CTkLabel(vram_group, text="", font=ctk.CTkFont(size=11), text_color="gray60", justify="left", anchor="w")
+        self.ai_sessions_label.pack(anchor="w", fill="x", pady=(5, 0))
+
+        ai_budget_desc = "Al cambiar entre modelos (BiRefNet, RMBG 2.0, InSPyReNet...) se descargan los usados hace más tiempo para no pasar del límite. En CPU, la primera carga de cada modelo guarda su versión optimizada en la carpeta de modelos y las siguientes arrancan más rápido. Con la variante más rápida, la primera vez que se usa un modelo en CPU se crea una copia INT8 junto a él y se compara, junto con las variantes ya descargadas (p. ej. Int8 o FP16 de RMBG 2.0), con unas imágenes de prueba: se usa la más rápida cuyo recorte coincide con el del modelo elegido."
+        ctk.CTkLabel(vram_group, text=ai_budget_desc, font=ctk.CTkFont(size=11), text_color="gray60", justify="left", wraplength=550).pack(anchor="w", pady=(5, 0))
+
+        rembg_tile_row = ctk.CTkFrame(vram_group, fg_color="transparent")
+        rembg_tile_row.pack(fill="x", pady=(10, 0))
+
+        self.rembg_tile_var = ctk.BooleanVar(value=self.app.rembg_tile_refine_saved)
+        self.rembg_tile_switch = ctk.CTkSwitch(rembg_tile_row, text="Refinar bordes en fotos grandes", variable=self.rembg_tile_var, command=self._on_rembg_tile_refine_toggle)
+        self.rembg_tile_switch.pack(side="left")
+
+        ctk.CTkLabel(rembg_tile_row, text="Memoria:", font=ctk.CTkFont(size=12, weight="bold")).pack(side="left", padx=(15, 0))
+        self._rembg_tile_memory_labels = {self._format_rembg_tile_memory(mb): mb for mb in REMBG_TILE_MEMORY_OPTIONS_MB}
+        self.rembg_tile_memory_menu = ctk.CTkOptionMenu(rembg_tile_row, values=list(self._rembg_tile_memory_labels), width=100, command=self._on_rembg_tile_memory_change)
+        self.rembg_tile_memory_menu.set(self._format_rembg_tile_memory(self.app.rembg_tile_memory_mb_saved))
+        self.rembg_tile_memory_menu.pack(side="left", padx=10)
+
+        rembg_tile_desc = "Con RMBG 2.0 e InSPyReNet la imagen se reduce a 1024x1024 para detectar el fondo. Al refinar, en fotos más grandes los bordes dudosos (pelo, contornos finos) se vuelven a procesar por teselas a mayor resolución. Es más lento; la memoria indica cuánto puede usar el refinado (con poca memoria se trabaja a una resolución intermedia)."
+        ctk.CTkLabel(vram_group, text=rembg_tile_desc, font=ctk.CTkFont(size=11), text_color="gray60", justify="left", wraplength=550).pack(anchor="w", pady=(10, 0))
         
         # SEPARADOR
         ctk.CTkFrame(self.master_frame, height=2, fg_color=("gray80", "gray25")).pack(fill="x", padx=15)
@@ -1533,11 +1744,154 @@ class ConfigTab(ctk.CTkFrame):
         self.app.preview_vector_dpi = val
         self.app.save_settings()
 
+    def _on_batch_concurrency_change(self, _value=None):
+        """Guarda los límites de concurrencia y los aplica a la cola de lotes en caliente."""
+        recodes_value = self.batch_recodes_menu.get()
+        self.app.batch_max_downloads_saved = int(self.batch_downloads_menu.get())
+        self.app.batch_max_per_host_saved = int(self.batch_per_host_menu.get())
+        self.app.batch_max_recodes_saved = 0 if recodes_value == "Automático" else int(recodes_value)
+        self.app.batch_playlist_workers_saved = int(self.batch_playlist_menu.get())
+
+        if hasattr(self.app, 'batch_tab'):
+            self.app.batch_tab.queue_manager.set_concurrency(
+                downloads=self.app.batch_max_downloads_saved,
+                recodes=self.app.batch_max_recodes_saved,
+                per_host=self.app.batch_max_per_host_saved,
+                playlist_items=self.app.batch_playlist_workers_saved
+            )
+        self.app.save_settings()
+
+    def _on_recode_segment_toggle(self):
+        """Guarda si los archivos largos se recodifican por segmentos en paralelo."""
+        self.app.recode_segment_parallel_saved = self.recode_segment_var.get()
+        self.app.save_settings()
+
+    def _on_batch_stream_recode_toggle(self):
+        """Guarda la preferencia de recodificación en streaming de la cola de lotes."""
+        self.app.batch_stream_recode_saved = self.batch_stream_recode_var.get()
+        self.app.save_settings()
+
+    @staticmethod
+    def _format_upscale_budget(megabytes: int) -> str:
+        if not megabytes:
+            return "Clásico (sin límite)"
+        return f"{megabytes / 1024:g} GB"
+
+    def _on_upscale_budget_change(self, value):
+        """Guarda el límite de disco del reescalado de video (0 = modo clásico)."""
+        self.app.upscale_temp_budget_saved = self._upscale_budget_labels.get(value, 0)
+        self.app.save_settings()
+
+    def _on_upscale_resume_toggle(self):
+        """Guarda la preferencia de reanudación del reescalado de video."""
+        self.app.upscale_resume_saved = self.upscale_resume_var.get()
+        self.app.save_settings()
+
+    def _on_upscale_autotune_toggle(self):
+        """Guarda si se calibran el mosaico y los hilos del motor AI."""
+        self.app.upscale_autotune_saved = self.upscale_autotune_var.get()
+        self.app.save_settings()
+
+    def _on_upscale_dedup_change(self, value):
+        """Guarda cómo se tratan los fotogramas repetidos al reescalar video."""
+        self.app.upscale_dedup_saved = self._upscale_dedup_labels.get(value, "exact")
+        self.app.save_settings()
+
+    def _on_upscale_instances_change(self, value):
+        """Guarda cuántos procesos NCNN se lanzan por dispositivo."""
+        self.app.upscale_ncnn_instances_saved = int(value)
+        self.app.save_settings()
+
+    def _on_upscale_devices_change(self, event=None):
+        """Guarda los dispositivos NCNN (-g) separados por comas; solo acepta números."""
+        devices = [d.strip() for d in self.upscale_devices_entry.get().split(",") if d.strip()]
+        if not all(d.lstrip("-").isdigit() for d in devices):
+            return
+        self.app.upscale_ncnn_devices_saved = ",".join(devices)
+        self.app.save_settings()
+
+    def _on_upscale_format_change(self, value):
+        """Guarda el formato de los fotogramas intermedios del reescalado."""
+        self.app.upscale_frame_format_saved = self._upscale_format_labels.get(value, "png")
+        self.app.save_settings()
+
+    def _run_upscale_format_benchmark(self):
+        """Compara los formatos intermedios con los primeros fotogramas de un video elegido."""
+        video_path = filedialog.askopenfilename(
+            title="Elige un video para comparar formatos",
+            filetypes=[("Videos", "*.mp4 *.mkv *.mov *.avi *.webm *.gif"), ("Todos", "*.*")]
+        )
+        if not video_path:
+            return
+
+        self.upscale_bench_button.configure(state="disabled", text="Midiendo...")
+        self.upscale_bench_label.configure(text="Comparando formatos, puede tardar unos segundos...")
+
+        def bench_task():
+            from src.core.video_upscaler import VideoUpscaler
+            try:
+                upscaler = VideoUpscaler(ffmpeg_dir=os.path.dirname(self.app.ffmpeg_processor.ffmpeg_path))
+                results = upscaler.benchmark_frame_formats(video_path)
+                text = "\n".join(VideoUpscaler.format_benchmark_report(results)) or "Ningún formato disponible."
+            except Exception as e:
+                print(f"ERROR: Falló la comparación de formatos intermedios: {e}")
+                text = f"Error: {str(e)[:120]}"
+            self.app.after(0, lambda: self.upscale_bench_label.configure(text=text))
+            self.app.after(0, lambda: self.upscale_bench_button.configure(state="normal", text="Comparar formatos..."))
+
+        threading.Thread(target=bench_task, daemon=True).start()
+
+    def _on_download_connections_change(self, value):
+        """Guarda el número de conexiones por archivo (1 = descarga clásica)."""
+        self.app.download_connections_saved = 1 if value == "Desactivado" else int(value)
+        self.app.save_settings()
+
     def _on_vram_persistence_toggle(self):
         """Guarda la preferencia de persistencia de modelos IA."""
         self.app.keep_ai_models_in_memory = self.keep_vram_var.get()
         self.app.save_settings()
 
+    @staticmethod
+    def _format_ai_memory_budget(megabytes: int) -> str:
+        if not megabytes:
+            return "Sin límite"
+        return f"{megabytes / 1024:g} GB"
+
+    def _on_ai_budget_change(self, value):
+        """Guarda el límite de memoria de los modelos IA cargados (0 = sin límite)."""
+        self.app.ai_memory_budget_mb_saved = self._ai_budget_labels.get(value, self.app.ai_memory_budget_mb_saved)
+        if hasattr(self.app, 'image_tab') and hasattr(self.app.image_tab, 'image_converter'):
+            self.app.image_tab.image_converter.set_ai_memory_budget(self.app.ai_memory_budget_mb_saved)
+        self.app.save_settings()
+
+    def _on_ai_variant_toggle(self):
+        """Guarda si se elige la variante INT8/FP16 más rápida al eliminar fondos en CPU."""
+        self.app.rembg_auto_variant_saved = self.ai_variant_var.get()
+        if hasattr(self.app, 'image_tab') and hasattr(self.app.image_tab, 'image_converter'):
+            self.app.image_tab.image_converter.set_variant_cache(self.app.get_rembg_variant_cache())
+        self.app.save_settings()
+
+    def refresh_ai_session_stats(self):
+        """Muestra los modelos IA cargados con su memoria y tiempo de carga."""
+        if hasattr(self.app, 'image_tab') and hasattr(self.app.image_tab, 'image_converter'):
+            self.ai_sessions_label.configure(text=self.app.image_tab.image_converter.get_ai_session_summary())
+
+    @staticmethod
+    def _format_rembg_tile_memory(megabytes: int) -> str:
+        if megabytes < 1024:
+            return f"{megabytes} MB"
+        return f"{megabytes / 1024:g} GB"
+
+    def _on_rembg_tile_refine_toggle(self):
+        """Guarda si se refinan los bordes por mosaico al eliminar fondos."""
+        self.app.rembg_tile_refine_saved = self.rembg_tile_var.get()
+        self.app.save_settings()
+
+    def _on_rembg_tile_memory_change(self, value):
+        """Guarda la memoria de trabajo máxima del refinado por mosaico."""
+        self.app.rembg_tile_memory_mb_saved = self._rembg_tile_memory_labels.get(value, self.app.rembg_tile_memory_mb_saved)
+        self.app.save_settings()
+
     def _manual_vram_clear(self):
         """Llama a la limpieza de sesiones de IA de forma manual."""
         if hasattr(self.app, 'image_tab') and hasattr(self.app.image_tab, 'image_converter'):
@@ -1546,6 +1900,7 @@ class ConfigTab(ctk.CTkFrame):
             # Feedback visual en el botón
             original_text = self.clear_vram_btn.cget("text")
             self.clear_vram_btn.configure(text="¡VRAM Liberada!", fg_color="#28a745")
+            self.refresh_ai_session_stats()
             self.app.after(2000, lambda: self.clear_vram_btn.configure(text=original_text, fg_color=("#DC3545", "#c0392b")))
 
     # ================= LOGICA DE MODELOS =================
@@ -2719,6 +3074,9 @@ class ConfigTab(ctk.CTkFrame):
         # Limpiamos la caché de análisis del menú de descarga único
         if hasattr(self.app, 'single_tab'):
             self.app.single_tab.analysis_cache.clear()
+
+        # Las sesiones de yt-dlp reutilizadas tienen las cookies anteriores cargadas
+        ydl_sessions.clear()
             
         print("DEBUG: Cookies detail changed by Settings tab.")
 
@@ -2750,6 +3108,7 @@ class ConfigTab(ctk.CTkFrame):
             self.app.cookies_mode_saved = mode
             if hasattr(self.app, 'single_tab'):
                 self.app.single_tab.analysis_cache.clear()
+            ydl_sessions.clear()
             print(f"DEBUG: Cookie mode changed to {mode}")
 
     def select_cookie_file(self):
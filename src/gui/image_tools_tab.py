@@ -30,7 +30,7 @@ from src.core.setup import get_remote_file_size, format_size
 from src.core.constants import (
     REMBG_MODEL_FAMILIES, WAIFU2X_MODELS, SRMD_MODELS, 
     VIDEO_EXTENSIONS, AUDIO_EXTENSIONS,
-    IMAGE_RASTER_FORMATS, IMAGE_RAW_FORMATS,
+    IMAGE_RASTER_FORMATS, IMAGE_RAW_FORMATS, IMAGE_CONVERT_PROCESS_MIN_FILES,
     AI_FAMILY_HOLDER, AI_ENGINE_HOLDER, AI_MODEL_HOLDER
 )
 from main import REMBG_MODELS_DIR, MODELS_DIR, UPSCALING_DIR
@@ -662,7 +662,9 @@ class ImageToolsTab(ctk.CTkFrame):
         self.image_converter = ImageConverter(
             poppler_path=poppler_path,
             inkscape_service=self.app.inkscape_service,
-            ffmpeg_processor=self.app.ffmpeg_processor
+            ffmpeg_processor=self.app.ffmpeg_processor,
+            ai_memory_budget_mb=self.app.ai_memory_budget_mb_saved,
+            variant_cache_path=self.app.get_rembg_variant_cache()
         )
         
         # Variable para rastrear la última miniatura solicitada
@@ -4127,15 +4129,47 @@ class ImageToolsTab(ctk.CTkFrame):
             if inkscape_active:
                 self.app.inkscape_service.start_session()
 
-            for i, item_data in enumerate(self.file_list_data):
-                # ... (resto del bucle)
-                
-                if cancel_event.is_set():
-                    print("INFO: Proceso cancelado por el usuario")
-                    self.app.after(0, lambda p=processed: self.progress_label.configure(
-                        text=f"Cancelado: {p} archivos procesados antes de cancelar"))
-                    break
+            def record_success(i, filename, output_path):
+                nonlocal processed
+                processed += 1
+                print(f"✅ Convertido: {filename} → {os.path.basename(output_path)}")
+                self._set_item_status_color(i, "success")
                 
+                # --- CORRECCIÓN: Actualizar solo el output sin romper la estructura ---
+                # La estructura es [input, page, output, title]
+                # Solo actualizamos el índice 2 (output)
+                if i < len(self.file_list_data):
+                    # Asegurarnos de que sea una lista mutable
+                    if isinstance(self.file_list_data[i], tuple):
+                        self.file_list_data[i] = list(self.file_list_data[i])
+                    
+                    # Si la lista es vieja (3 elementos), la extendemos
+                    while len(self.file_list_data[i]) < 4:
+                        self.file_list_data[i].append(None)
+                        
+                    # Guardar la ruta de salida
+                    self.file_list_data[i][2] = output_path
+                # ---------------------------------------------------------------------
+
+                successfully_processed_paths.append(output_path)
+
+                # Si es PDF y se va a combinar, guardar ruta
+                if options["format"] == "PDF" and options.get("pdf_combine", False):
+                    generated_pdfs.append(output_path)
+
+            def record_error(i, filename, error_type):
+                nonlocal errors
+                errors += 1
+                self._set_item_status_color(i, "error")
+                error_details.append((filename, error_type))
+
+            def plan_item(i, item_data, reserved=()):
+                """
+                Aplica 'Omitir completados' y la política de conflictos a un ítem.
+                Devuelve (entrada, página, salida) o None si se omite.
+                'reserved' son salidas ya asignadas a otros ítems del mismo lote.
+                """
+                nonlocal skipped
                 # ✅ CORRECCIÓN: Extracción segura por índices
                 # item_data ahora tiene 4 elementos: [input, page, output, title]
                 input_path = item_data[0]
@@ -4155,114 +4189,180 @@ class ImageToolsTab(ctk.CTkFrame):
                     if options["format"] == "PDF" and options.get("pdf_combine", False):
                         generated_pdfs.append(existing_output)
                         
-                    continue # Salta a la siguiente iteración del bucle
+                    return None
                 
                 # Lógica para título personalizado (ya la pusimos antes, pero verifica)
                 custom_title = item_data[3] if len(item_data) > 3 else None
                 
-                filename = os.path.basename(input_path)
-                
-                # --- CALLBACK DE PROGRESO FINO ---
-                def internal_callback(file_pct, message=None):
-                    # file_pct: 0 a 100 (puede ser None si solo es mensaje)
-                    
-                    # Solo actualizar la barra si hay un porcentaje numérico
-                    if file_pct is not None:
-                        weight_per_file = 100 / total_files
-                        base_progress = i * weight_per_file
-                        current_contribution = (file_pct / 100.0) * weight_per_file
-                        total_global = base_progress + current_contribution
-                        
-                        self.app.after(0, lambda p=total_global: self.progress_bar.set(p / 100.0))
-                    
-                    # Actualizar el texto si se proporciona
-                    if message:
-                        self.app.after(0, lambda t=message: self.progress_label.configure(text=t))
-                
-                # Actualizar texto inicial del archivo
-                status_text = f"Procesando ({i+1}/{total_files}): {filename}"
-                if self.app.inkscape_enabled and self.app.inkscape_service:
-                    status_text = f"[Inkscape] Convirtiendo ({i+1}/{total_files}): {filename}"
-                
-                self.app.after(0, lambda t=status_text: self.progress_label.configure(text=t))
-                
                 # 2. Generar el nombre de salida PASANDO EL TÍTULO
                 output_filename = self._get_output_filename(input_path, options, page_num, custom_title)
                 output_path = os.path.join(output_dir, output_filename)
                 
                 # Manejar conflictos
-                if os.path.exists(output_path):
+                if os.path.exists(output_path) or output_path in reserved:
                     action = self._handle_conflict(output_path, conflict_policy)
                     if action == "skip":
-                        print(f"INFO: Omitiendo {filename} (ya existe)")
+                        print(f"INFO: Omitiendo {os.path.basename(input_path)} (ya existe)")
                         skipped += 1
                         self._set_item_status_color(i, "skipped")
-                        continue
+                        return None
                     elif action == "rename":
-                        output_path = self._get_unique_filename(output_path)
+                        output_path = self._get_unique_filename(output_path, reserved)
 
-                # Convertir archivo CON CALLBACK
-                try:
-                    success = self.image_converter.convert_file(
-                        input_path, 
-                        output_path, 
-                        options,
-                        page_number=page_num,
-                        progress_callback=internal_callback,
-                        cancellation_event=cancel_event 
+                return input_path, page_num, output_path
+
+            use_process_pool = (
+                not inkscape_active
+                and total_files >= IMAGE_CONVERT_PROCESS_MIN_FILES
+                and (os.cpu_count() or 1) > 1
+                and self.image_converter.can_convert_in_processes(options)
+            )
+            # Con IA de fondo en este proceso: varias imágenes por inferencia
+            use_rembg_batches = (
+                not use_process_pool
+                and total_files > 1
+                and self.image_converter.can_batch_background_removal(options)
+            )
+
+            if use_process_pool or use_rembg_batches:
+                # --- VARIOS PROCESOS (cada archivo en un núcleo) o LOTES DE IA ---
+                tasks = []
+                reserved = set()
+                for i, item_data in enumerate(self.file_list_data):
+                    planned = plan_item(i, item_data, reserved)
+                    if planned:
+                        input_path, page_num, output_path = planned
+                        tasks.append((i, input_path, output_path, page_num))
+                        reserved.add(output_path)
+
+                if use_process_pool:
+                    workers = max(1, min(len(tasks), (os.cpu_count() or 2) - 1))
+                    print(f"INFO: Convirtiendo {len(tasks)} archivos en {workers} procesos.")
+                    engine_label = f"Procesando en {workers} procesos"
+                else:
+                    engine_label = "Eliminando fondos por lotes"
+                task_inputs = {task[0]: task[1] for task in tasks}
+                task_outputs = {task[0]: task[2] for task in tasks}
+                file_progress = {}
+                finished = total_files - len(tasks) # Los omitidos cuentan como terminados
+
+                def pool_progress(i, file_pct):
+                    file_progress[i] = file_pct
+                    total_global = (finished + sum(file_progress.values()) / 100.0) / total_files
+                    self.app.after(0, lambda p=total_global: self.progress_bar.set(p))
+
+                def pool_result(i, success):
+                    nonlocal finished
+                    finished += 1
+                    file_progress.pop(i, None)
+                    filename = os.path.basename(task_inputs[i])
+                    if success:
+                        record_success(i, filename, task_outputs[i])
+                    elif not cancel_event.is_set():
+                        record_error(i, filename, "Error desconocido durante la conversión")
+                        print(f"❌ Error al convertir: {filename}")
+                    status_text = f"{engine_label} ({finished}/{total_files}): {filename}"
+                    self.app.after(0, lambda t=status_text: self.progress_label.configure(text=t))
+                    self.app.after(0, lambda p=(finished + sum(file_progress.values()) / 100.0) / total_files: self.progress_bar.set(p))
+
+                if tasks and use_process_pool:
+                    self.image_converter.convert_files_parallel(
+                        tasks, options, workers, cancel_event,
+                        progress_callback=pool_progress, result_callback=pool_result
+                    )
+                elif tasks:
+                    self.app.after(0, lambda t=f"{engine_label}...": self.progress_label.configure(text=t))
+                    self.image_converter.convert_files_batched(
+                        tasks, options, cancel_event,
+                        progress_callback=pool_progress, result_callback=pool_result
                     )
+
+                # Mantener el orden de la lista (las tareas terminan en cualquier orden)
+                order = {task[2]: task[0] for task in tasks}
+                successfully_processed_paths.sort(key=lambda path: order.get(path, -1))
+                generated_pdfs.sort(key=lambda path: order.get(path, -1))
+
+                if cancel_event.is_set():
+                    print("INFO: Proceso cancelado por el usuario")
+                    self.app.after(0, lambda p=processed: self.progress_label.configure(
+                        text=f"Cancelado: {p} archivos procesados antes de cancelar"))
+
+            else:
+                # --- UN SOLO PROCESO (reescalado IA, Inkscape o pocos archivos) ---
+                for i, item_data in enumerate(self.file_list_data):
+                    # ... (resto del bucle)
+                
+                    if cancel_event.is_set():
+                        print("INFO: Proceso cancelado por el usuario")
+                        self.app.after(0, lambda p=processed: self.progress_label.configure(
+                            text=f"Cancelado: {p} archivos procesados antes de cancelar"))
+                        break
+                
+                    planned = plan_item(i, item_data)
+                    if not planned:
+                        continue # Salta a la siguiente iteración del bucle
+                    input_path, page_num, output_path = planned
+                
+                    filename = os.path.basename(input_path)
+                
+                    # --- CALLBACK DE PROGRESO FINO ---
+                    def internal_callback(file_pct, message=None):
+                        # file_pct: 0 a 100 (puede ser None si solo es mensaje)
                     
-                    if success:
-                        processed += 1
-                        print(f"✅ Convertido: {filename} → {os.path.basename(output_path)}")
-                        self._set_item_status_color(i, "success")
+                        # Solo actualizar la barra si hay un porcentaje numérico
+                        if file_pct is not None:
+                            weight_per_file = 100 / total_files
+                            base_progress = i * weight_per_file
+                            current_contribution = (file_pct / 100.0) * weight_per_file
+                            total_global = base_progress + current_contribution
                         
-                        # --- CORRECCIÓN: Actualizar solo el output sin romper la estructura ---
-                        # La estructura es [input, page, output, title]
-                        # Solo actualizamos el índice 2 (output)
-                        if i < len(self.file_list_data):
-                            # Asegurarnos de que sea una lista mutable
-                            if isinstance(self.file_list_data[i], tuple):
-                                self.file_list_data[i] = list(self.file_list_data[i])
-                            
-                            # Si la lista es vieja (3 elementos), la extendemos
-                            while len(self.file_list_data[i]) < 4:
-                                self.file_list_data[i].append(None)
-                                
-                            # Guardar la ruta de salida
-                            self.file_list_data[i][2] = output_path
-                        # ---------------------------------------------------------------------
-
-                        successfully_processed_paths.append(output_path)
+                            self.app.after(0, lambda p=total_global: self.progress_bar.set(p / 100.0))
+                    
+                        # Actualizar el texto si se proporciona
+                        if message:
+                            self.app.after(0, lambda t=message: self.progress_label.configure(text=t))
+                
+                    # Actualizar texto inicial del archivo
+                    status_text = f"Procesando ({i+1}/{total_files}): {filename}"
+                    if self.app.inkscape_enabled and self.app.inkscape_service:
+                        status_text = f"[Inkscape] Convirtiendo ({i+1}/{total_files}): {filename}"
+                
+                    self.app.after(0, lambda t=status_text: self.progress_label.configure(text=t))
 
-                        # Si es PDF y se va a combinar, guardar ruta
-                        if options["format"] == "PDF" and options.get("pdf_combine", False):
-                            generated_pdfs.append(output_path)
-                    else:
-                        errors += 1
-                        self._set_item_status_color(i, "error")
-                        error_details.append((filename, "Error desconocido durante la conversión"))
-                        print(f"❌ Error al convertir: {filename}")
+                    # Convertir archivo CON CALLBACK
+                    try:
+                        success = self.image_converter.convert_file(
+                            input_path, 
+                            output_path, 
+                            options,
+                            page_number=page_num,
+                            progress_callback=internal_callback,
+                            cancellation_event=cancel_event 
+                        )
+                    
+                        if success:
+                            record_success(i, filename, output_path)
+                        else:
+                            record_error(i, filename, "Error desconocido durante la conversión")
+                            print(f"❌ Error al convertir: {filename}")
                 
-                except Exception as e:
-                    errors += 1
-                    self._set_item_status_color(i, "error")
-                    error_message = str(e)
+                    except Exception as e:
+                        error_message = str(e)
                     
-                    # 🔧 NUEVO: Categorizar errores comunes
-                    if "decompression bomb" in error_message.lower():
-                        error_type = "Archivo demasiado grande (posible ataque de descompresión)"
-                    elif "could not convert string to float" in error_message.lower():
-                        error_type = "SVG corrupto (atributos inválidos)"
-                    elif "MAX_TEXT_CHUNK" in error_message:
-                        error_type = "Metadatos demasiado grandes (límite de seguridad)"
-                    elif "timeout" in error_message.lower():
-                        error_type = "Tiempo de espera agotado (archivo muy complejo)"
-                    else:
-                        error_type = error_message[:100]  # Primeros 100 caracteres
+                        # 🔧 NUEVO: Categorizar errores comunes
+                        if "decompression bomb" in error_message.lower():
+                            error_type = "Archivo demasiado grande (posible ataque de descompresión)"
+                        elif "could not convert string to float" in error_message.lower():
+                            error_type = "SVG corrupto (atributos inválidos)"
+                        elif "MAX_TEXT_CHUNK" in error_message:
+                            error_type = "Metadatos demasiado grandes (límite de seguridad)"
+                        elif "timeout" in error_message.lower():
+                            error_type = "Tiempo de espera agotado (archivo muy complejo)"
+                        else:
+                            error_type = error_message[:100]  # Primeros 100 caracteres
                     
-                    error_details.append((filename, error_type))
-                    print(f"❌ Error al procesar {filename}: {e}")
+                        record_error(i, filename, error_type)
+                        print(f"❌ Error al procesar {filename}: {e}")
             
             # Combinar PDFs si está activado
             if not cancel_event.is_set() and options["format"] == "PDF" and options.get("pdf_combine", False) and len(generated_pdfs) > 1:
@@ -4539,6 +4639,8 @@ class ImageToolsTab(ctk.CTkFrame):
             "rembg_model": real_model_name,
             "rembg_edge_smooth": self.rembg_smooth_var.get() if hasattr(self, 'rembg_smooth_var') else 0,
             "rembg_edge_expand": self.rembg_expand_var.get() if hasattr(self, 'rembg_expand_var') else 0,
+            "rembg_tile_refine": self.app.rembg_tile_refine_saved,
+            "rembg_tile_memory_mb": self.app.rembg_tile_memory_mb_saved,
             
             # --- NUEVAS OPCIONES DE REESCALADO ---
             "upscale_enabled": self.upscale_checkbox.get() == 1,
@@ -4688,8 +4790,8 @@ class ImageToolsTab(ctk.CTkFrame):
         else:
             return "overwrite"  # Por defecto
 
-    def _get_unique_filename(self, filepath):
-        """Genera un nombre único para evitar sobrescribir."""
+    def _get_unique_filename(self, filepath, reserved=()):
+        """Genera un nombre único para evitar sobrescribir ('reserved': rutas ya asignadas pero aún no escritas)."""
         directory = os.path.dirname(filepath)
         filename = os.path.basename(filepath)
         name, ext = os.path.splitext(filename)
@@ -4698,7 +4800,7 @@ class ImageToolsTab(ctk.CTkFrame):
         while True:
             new_name = f"{name} ({counter}){ext}"
             new_path = os.path.join(directory, new_name)
-            if not os.path.exists(new_path):
+            if not os.path.exists(new_path) and new_path not in reserved:
                 return new_path
             counter += 1
 
@@ -47,6 +47,7 @@ from src.core.image_converter import ImageConverter
 from src.core.image_processor import ImageProcessor
 from src.core.inkscape_service import InkscapeService
 from src.core.downloader import get_video_info, download_media
+from src.core.metadata_cache import MetadataCache
 from src.core.processor import FFmpegProcessor, CODEC_PROFILES
 from src.core.exceptions import UserCancelledError, LocalRecodeFailedError
 from src.core.processor import clean_and_convert_vtt_to_srt
@@ -65,7 +66,12 @@ from .dialogs import (
 from src.core.constants import (
     VIDEO_EXTENSIONS, AUDIO_EXTENSIONS, SINGLE_STREAM_AUDIO_CONTAINERS,
     FORMAT_MUXER_MAP, LANG_CODE_MAP, LANGUAGE_ORDER, DEFAULT_PRIORITY,
-    EDITOR_FRIENDLY_CRITERIA, COMPATIBILITY_RULES
+    EDITOR_FRIENDLY_CRITERIA, COMPATIBILITY_RULES,
+    BATCH_DEFAULT_DOWNLOAD_WORKERS, BATCH_DEFAULT_PER_HOST_LIMIT, BATCH_DEFAULT_RECODE_WORKERS,
+    BATCH_DEFAULT_PLAYLIST_WORKERS, DOWNLOAD_DEFAULT_CONNECTIONS, UPSCALE_DEFAULT_TEMP_BUDGET_MB,
+    UPSCALE_RESUME_DIRNAME, UPSCALE_DEDUP_DEFAULT, UPSCALE_DEFAULT_FRAME_FORMAT, UPSCALE_TUNING_CACHE_FILENAME,
+    RECODE_SEGMENT_THREADS_PER_WORKER, RECODE_SEGMENT_MAX_WORKERS, REMBG_TILE_DEFAULT_MEMORY_MB,
+    ONNX_SESSION_DEFAULT_BUDGET_MB, REMBG_VARIANT_CACHE_FILENAME
 )
 
 def resource_path(relative_path):
@@ -678,6 +684,20 @@ class MainWindow(TkBase):
         self.batch_auto_import_saved = True
         self.image_auto_import_saved = True
         self.batch_fast_mode_saved = True 
+        self.batch_max_downloads_saved = BATCH_DEFAULT_DOWNLOAD_WORKERS
+        self.batch_max_per_host_saved = BATCH_DEFAULT_PER_HOST_LIMIT
+        self.batch_max_recodes_saved = BATCH_DEFAULT_RECODE_WORKERS # 0 = Automático
+        self.batch_playlist_workers_saved = BATCH_DEFAULT_PLAYLIST_WORKERS
+        self.batch_stream_recode_saved = False # Descargar y recodificar sin archivo intermedio
+        self.recode_segment_parallel_saved = False # Recodificar archivos largos por segmentos en paralelo
+        self.download_connections_saved = DOWNLOAD_DEFAULT_CONNECTIONS # 1 = Desactivado
+        self.upscale_temp_budget_saved = UPSCALE_DEFAULT_TEMP_BUDGET_MB # 0 = Modo clásico
+        self.upscale_resume_saved = True # Conservar los bloques terminados para reanudar
+        self.upscale_dedup_saved = UPSCALE_DEDUP_DEFAULT # Fotogramas repetidos: off / exact / similar
+        self.upscale_ncnn_devices_saved = "" # Dispositivos NCNN ("0,1"; "-1" = CPU). Vacío = predeterminado
+        self.upscale_ncnn_instances_saved = 1 # Procesos NCNN simultáneos por dispositivo
+        self.upscale_frame_format_saved = UPSCALE_DEFAULT_FRAME_FORMAT # Fotogramas intermedios: png / webp / jpg
+        self.upscale_autotune_saved = True # Calibrar mosaico e hilos de NCNN cuando están en automático
         self.quick_preset_saved = ""
         self.recode_settings = {}
         self.apply_quick_preset_checkbox_state = False
@@ -687,6 +707,10 @@ class MainWindow(TkBase):
         self.console_enabled = False   # Consola de diagnóstico desactivada por defecto
         self.console_wrap = False      # Ajuste de línea desactivado por defecto
         self.keep_ai_models_in_memory = False # Optimización de VRAM
+        self.ai_memory_budget_mb_saved = ONNX_SESSION_DEFAULT_BUDGET_MB # Límite de los modelos IA cargados (0 = sin límite)
+        self.rembg_auto_variant_saved = False # Variante INT8/FP16 más rápida en CPU
+        self.rembg_tile_refine_saved = False # Refinar bordes por mosaico (RMBG 2.0 / InSPyReNet)
+        self.rembg_tile_memory_mb_saved = REMBG_TILE_DEFAULT_MEMORY_MB
         self.show_onnx_warning = True # Mostrar aviso de rendimiento de ONNX por defecto
         self.vector_dpi = 300 # Calidad de renderizado para PDF/AI/EPS (Estándar: 300)
         self.preview_vector_dpi = 100 # Calidad de previsualización para vectores (Rápida: 100)
@@ -729,6 +753,20 @@ class MainWindow(TkBase):
                     self.batch_auto_import_saved = settings.get("batch_auto_import", self.batch_auto_import_saved)
                     self.image_auto_import_saved = settings.get("image_auto_import", self.image_auto_import_saved) 
                     self.batch_fast_mode_saved = settings.get("batch_fast_mode", self.batch_fast_mode_saved)
+                    self.batch_max_downloads_saved = settings.get("batch_max_downloads", self.batch_max_downloads_saved)
+                    self.batch_max_per_host_saved = settings.get("batch_max_per_host", self.batch_max_per_host_saved)
+                    self.batch_max_recodes_saved = settings.get("batch_max_recodes", self.batch_max_recodes_saved)
+                    self.batch_playlist_workers_saved = settings.get("batch_playlist_workers", self.batch_playlist_workers_saved)
+                    self.batch_stream_recode_saved = settings.get("batch_stream_recode", self.batch_stream_recode_saved)
+                    self.recode_segment_parallel_saved = settings.get("recode_segment_parallel", self.recode_segment_parallel_saved)
+                    self.download_connections_saved = settings.get("download_connections", self.download_connections_saved)
+                    self.upscale_temp_budget_saved = settings.get("upscale_temp_budget_mb", self.upscale_temp_budget_saved)
+                    self.upscale_resume_saved = settings.get("upscale_resume", self.upscale_resume_saved)
+                    self.upscale_dedup_saved = settings.get("upscale_dedup", self.upscale_dedup_saved)
+                    self.upscale_ncnn_devices_saved = settings.get("upscale_ncnn_devices", self.upscale_ncnn_devices_saved)
+                    self.upscale_ncnn_instances_saved = settings.get("upscale_ncnn_instances", self.upscale_ncnn_instances_saved)
+                    self.upscale_frame_format_saved = settings.get("upscale_frame_format", self.upscale_frame_format_saved)
+                    self.upscale_autotune_saved = settings.get("upscale_autotune", self.upscale_autotune_saved)
                     self.quick_preset_saved = settings.get("quick_preset_saved", self.quick_preset_saved)
                     if snooze_str:
                         self.ffmpeg_update_snooze_until = datetime.fromisoformat(snooze_str)
@@ -741,6 +779,10 @@ class MainWindow(TkBase):
                     self.console_enabled = settings.get("console_enabled", False)
                     self.console_wrap = settings.get("console_wrap", False)
                     self.keep_ai_models_in_memory = settings.get("keep_ai_models_in_memory", False)
+                    self.ai_memory_budget_mb_saved = settings.get("ai_memory_budget_mb", self.ai_memory_budget_mb_saved)
+                    self.rembg_auto_variant_saved = settings.get("rembg_auto_variant", self.rembg_auto_variant_saved)
+                    self.rembg_tile_refine_saved = settings.get("rembg_tile_refine", self.rembg_tile_refine_saved)
+                    self.rembg_tile_memory_mb_saved = settings.get("rembg_tile_memory_mb", self.rembg_tile_memory_mb_saved)
                     self.show_onnx_warning = settings.get("show_onnx_warning", True)
                     self.vector_dpi = settings.get("vector_dpi", 300)
                     self.preview_vector_dpi = settings.get("preview_vector_dpi", 100)
@@ -780,6 +822,8 @@ class MainWindow(TkBase):
             # No se necesita 'pass' porque los valores por defecto ya están establecidos
 
         self.ffmpeg_processor = FFmpegProcessor(app_version=self.APP_VERSION, cache_dir=self.APP_DATA_DIR)
+        # Caché compartida de análisis de yt-dlp (pestaña única y lotes)
+        self.metadata_cache = MetadataCache(os.path.join(self.APP_DATA_DIR, "metadata_cache"))
         self.integration_manager = IntegrationManager(self)
 
         self.tab_view = ctk.CTkTabview(self, anchor="nw", command=self._on_tab_view_change)
@@ -835,6 +879,7 @@ class MainWindow(TkBase):
                 self.config_tab._load_local_versions()
                 if hasattr(self.config_tab, 'refresh_all_models'):
                     self.config_tab.refresh_all_models()
+                self.config_tab.refresh_ai_session_stats()
 
     def _check_ytdlp_update_bg(self):
         """Busca actualizaciones exclusivas de yt-dlp silenciosamente al iniciar."""
@@ -1606,6 +1651,22 @@ class MainWindow(TkBase):
             "batch_playlist_analysis": self.batch_playlist_analysis_saved,
             "batch_auto_import": self.batch_auto_import_saved,
             "batch_fast_mode": self.batch_fast_mode_saved,
+            "batch_max_downloads": self.batch_max_downloads_saved,
+            "batch_max_per_host": self.batch_max_per_host_saved,
+            "batch_max_recodes": self.batch_max_recodes_saved,
+            "batch_playlist_workers": self.batch_playlist_workers_saved,
+            "batch_stream_recode": self.batch_stream_recode_saved,
+            "recode_segment_parallel": self.recode_segment_parallel_saved,
+            "download_connections": self.download_connections_saved,
+
+            # Reescalado de Video (IA)
+            "upscale_temp_budget_mb": self.upscale_temp_budget_saved,
+            "upscale_resume": self.upscale_resume_saved,
+            "upscale_dedup": self.upscale_dedup_saved,
+            "upscale_ncnn_devices": self.upscale_ncnn_devices_saved,
+            "upscale_ncnn_instances": self.upscale_ncnn_instances_saved,
+            "upscale_frame_format": self.upscale_frame_format_saved,
+            "upscale_autotune": self.upscale_autotune_saved,
 
             # Herramientas de Imagen
             "image_auto_import": self.image_auto_import_saved,
@@ -1618,6 +1679,10 @@ class MainWindow(TkBase):
 
             # Optimización de VRAM
             "keep_ai_models_in_memory": self.keep_ai_models_in_memory,
+            "ai_memory_budget_mb": self.ai_memory_budget_mb_saved,
+            "rembg_auto_variant": self.rembg_auto_variant_saved,
+            "rembg_tile_refine": self.rembg_tile_refine_saved,
+            "rembg_tile_memory_mb": self.rembg_tile_memory_mb_saved,
             "show_onnx_warning": self.show_onnx_warning,
 
             # Integraciones
@@ -2334,6 +2399,35 @@ class MainWindow(TkBase):
             except Exception as e:
                 print(f"ERROR: No se pudo crear la plantilla de tema: {e}")
 
+    def get_recode_segment_workers(self, concurrent_recodes=1):
+        """
+        FFmpeg simultáneos para recodificar un archivo por segmentos (0 = de una vez).
+        'concurrent_recodes' son las recodificaciones que ya comparten la CPU.
+        """
+        if not self.recode_segment_parallel_saved:
+            return 0
+        workers = min(RECODE_SEGMENT_MAX_WORKERS, (os.cpu_count() or 1) // RECODE_SEGMENT_THREADS_PER_WORKER)
+        workers //= max(1, concurrent_recodes)
+        return workers if workers >= 2 else 0
+
+    def get_upscale_resume_dir(self):
+        """Carpeta de trabajos reanudables del reescalado de video, o None si está desactivado."""
+        if not self.upscale_resume_saved:
+            return None
+        return os.path.join(self.APP_DATA_DIR, UPSCALE_RESUME_DIRNAME)
+
+    def get_upscale_tuning_cache(self):
+        """Archivo con las calibraciones del motor AI, o None si la calibración está desactivada."""
+        if not self.upscale_autotune_saved:
+            return None
+        return os.path.join(self.APP_DATA_DIR, UPSCALE_TUNING_CACHE_FILENAME)
+
+    def get_rembg_variant_cache(self):
+        """Archivo con las variantes elegidas para CPU, o None si la elección automática está desactivada."""
+        if not self.rembg_auto_variant_saved:
+            return None
+        return os.path.join(self.APP_DATA_DIR, REMBG_VARIANT_CACHE_FILENAME)
+
     def get_theme_color(self, key, default_color, is_ctk_widget=False):
         """
         Recupera un color del tema JSON.
@@ -25,6 +25,7 @@ from datetime import datetime, timedelta
 
 # Importar nuestros otros módulos
 from src.core.downloader import get_video_info, download_media, apply_site_specific_rules, apply_yt_patch
+from src.core.metadata_cache import cookie_key_from_app
 from src.core.processor import FFmpegProcessor, CODEC_PROFILES
 from src.core.exceptions import UserCancelledError, LocalRecodeFailedError, PlaylistDownloadError
 from src.core.processor import clean_and_convert_vtt_to_srt, slice_subtitle
@@ -4188,8 +4189,8 @@ class SingleDownloadTab(ctk.CTkFrame):
         print("DEBUG: Botón de Cancelar presionado.")
         self.cancellation_event.set()
         
-        # 1. Cancelar el procesador interno (si se está usando recodificación local)
-        self.ffmpeg_processor.cancel_current_process()
+        # 1. Cancelar el FFmpeg del hilo de la operación (si se está usando recodificación local)
+        self.ffmpeg_processor.cancel_current_process(self.active_operation_thread)
         
         # 2. FUERZA BRUTA: Matar ffmpeg.exe para liberar a yt-dlp
         # yt-dlp lanza ffmpeg como subproceso interno sin darnos el PID.
@@ -4885,14 +4886,16 @@ class SingleDownloadTab(ctk.CTkFrame):
                 "pre_params": pre_params, 
                 "mode": recode_options.get('mode'),
                 "selected_video_stream_index": None if "-filter_complex" in final_ffmpeg_params else recode_options.get('selected_video_stream_index'),
-                "selected_audio_stream_index": None if is_gif_format else recode_options.get('selected_audio_stream_index')
+                "selected_audio_stream_index": None if is_gif_format else recode_options.get('selected_audio_stream_index'),
+                "segment_workers": self.app.get_recode_segment_workers()
             }
 
             # Ejecutar recodificación
             self.ffmpeg_processor.execute_recode(
                 command_options, 
                 self.update_progress, 
-                self.cancellation_event
+                self.cancellation_event,
+                event_callback=self._on_ffmpeg_progress_event
             )
 
             # Renombrar archivo temporal al nombre final
@@ -5135,7 +5138,7 @@ class SingleDownloadTab(ctk.CTkFrame):
         # 🔧 INTENTOS DE DESCARGA
         if audio_extraction_fallback:
             print(f"DEBUG: [FALLBACK] Descargando video: {precise_selector}")
-            downloaded_filepath = download_media(options["url"], ydl_opts, self.update_progress, self.cancellation_event)
+            downloaded_filepath = download_media(options["url"], ydl_opts, self.update_progress, self.cancellation_event, connections=self.app.download_connections_saved)
             temp_video_for_extraction = downloaded_filepath
             return downloaded_filepath, temp_video_for_extraction 
         else:
@@ -5155,7 +5158,7 @@ class SingleDownloadTab(ctk.CTkFrame):
                         # If system FFmpeg doesn't exist, it will instantly raise a DownloadError and trigger the fallback dialog.
                         original_ffmpeg = ydl_opts.pop('ffmpeg_location', None)
                         try:
-                            downloaded_filepath = download_media(options["url"], ydl_opts, self.update_progress, self.cancellation_event)
+                            downloaded_filepath = download_media(options["url"], ydl_opts, self.update_progress, self.cancellation_event, connections=self.app.download_connections_saved)
                         finally:
                             if original_ffmpeg:
                                 ydl_opts['ffmpeg_location'] = original_ffmpeg
@@ -5217,10 +5220,10 @@ class SingleDownloadTab(ctk.CTkFrame):
                         
                         options["fragment_enabled"] = True  # Mantener para corte con FFmpeg
                         
-                        downloaded_filepath = download_media(options["url"], ydl_opts_full, self.update_progress, self.cancellation_event)
+                        downloaded_filepath = download_media(options["url"], ydl_opts_full, self.update_progress, self.cancellation_event, connections=self.app.download_connections_saved)
                 else:
                     # Descarga normal sin fragmento
-                    downloaded_filepath = download_media(options["url"], ydl_opts, self.update_progress, self.cancellation_event)
+                    downloaded_filepath = download_media(options["url"], ydl_opts, self.update_progress, self.cancellation_event, connections=self.app.download_connections_saved)
                 
             except yt_dlp.utils.DownloadError as e:
                 print(f"DEBUG: Falló el intento 1. Error: {e}")
@@ -5259,7 +5262,7 @@ class SingleDownloadTab(ctk.CTkFrame):
                     
                     ydl_opts['format'] = strict_flexible_selector
                     print(f"DEBUG: INTENTO 2: Descargando con selector flexible: {strict_flexible_selector}")
-                    downloaded_filepath = download_media(options["url"], ydl_opts, self.update_progress, self.cancellation_event)
+                    downloaded_filepath = download_media(options["url"], ydl_opts, self.update_progress, self.cancellation_event, connections=self.app.download_connections_saved)
                     
                 except yt_dlp.utils.DownloadError:
                     print("DEBUG: Falló intento 2. Pasando al Paso 3 (compromiso).")
@@ -5286,7 +5289,7 @@ class SingleDownloadTab(ctk.CTkFrame):
                             if mode == "Video+Audio":
                                 final_selector = 'bv+ba' if self.has_audio_streams else 'bv'
                         ydl_opts['format'] = final_selector
-                        downloaded_filepath = download_media(options["url"], ydl_opts, self.update_progress, self.cancellation_event)
+                        downloaded_filepath = download_media(options["url"], ydl_opts, self.update_progress, self.cancellation_event, connections=self.app.download_connections_saved)
                     else:
                         raise UserCancelledError("Descarga cancelada por el usuario en el diálogo de compromiso.")
             except Exception as final_e:
@@ -5756,6 +5759,14 @@ class SingleDownloadTab(ctk.CTkFrame):
         
         return final_path, backup_path
 
+    def _on_ffmpeg_progress_event(self, event):
+        """
+        Receptor de FFmpegProgressEvent. Si no se conoce la duración, FFmpeg
+        no da porcentaje: se muestra la barra indeterminada con velocidad y fps.
+        """
+        if event.duration <= 0 and not event.finished:
+            self.update_progress(-1, event.to_message())
+
     def update_progress(self, percentage, message):
         """
         Actualiza la barra de progreso. AHORA es inteligente y acepta:
@@ -5821,6 +5832,15 @@ class SingleDownloadTab(ctk.CTkFrame):
                 self.update_progress(100, "Resultado encontrado en caché. Cargando...")
                 self.on_analysis_complete(cached_entry['data'])
                 return
+        # Caché compartida en disco (sobrevive a reinicios)
+        metadata_cache = getattr(self.app, 'metadata_cache', None)
+        if metadata_cache:
+            cached_info = metadata_cache.get(url, cookie_key_from_app(self.app), "single")
+            if cached_info:
+                print("DEBUG: Resultado encontrado en la caché de metadatos. Cargando...")
+                self.update_progress(100, "Resultado encontrado en caché. Cargando...")
+                self.on_analysis_complete(cached_info)
+                return
         self.analyze_button.configure(text="Cancelar", fg_color=self.CANCEL_BTN_COLOR, hover_color=self.CANCEL_BTN_HOVER, command=self.cancel_operation)
         self.download_button.configure(state="disabled") 
         self.open_folder_button.configure(state="disabled")
@@ -5975,6 +5995,10 @@ class SingleDownloadTab(ctk.CTkFrame):
             if info.get('is_live'):
                 self.app.after(0, lambda: self.on_analysis_complete(None, "AVISO: La URL apunta a una transmisión en vivo."))
                 return
+
+            metadata_cache = getattr(self.app, 'metadata_cache', None)
+            if metadata_cache:
+                metadata_cache.put(url, cookie_key_from_app(self.app), "single", info, ttl_seconds=self.CACHE_TTL)
                 
             self.app.after(0, self.on_analysis_complete, info)
 
@@ -7258,7 +7282,14 @@ class SingleDownloadTab(ctk.CTkFrame):
                 ffmpeg_dir=ffmpeg_dir,
                 upscaling_dir=UPSCALING_DIR,
                 cancellation_event=self.cancellation_event,
-                progress_callback=self.update_progress
+                progress_callback=self.update_progress,
+                temp_budget_mb=self.app.upscale_temp_budget_saved,
+                resume_dir=self.app.get_upscale_resume_dir(),
+                dedup_mode=self.app.upscale_dedup_saved,
+                ncnn_devices=self.app.upscale_ncnn_devices_saved,
+                ncnn_instances=self.app.upscale_ncnn_instances_saved,
+                frame_format=self.app.upscale_frame_format_saved,
+                tuning_cache_path=self.app.get_upscale_tuning_cache()
             )
 
             final_path = upscaler.upscale_video(input_path, out_path, options)